@@ -12,6 +12,8 @@ from src.extraction import ModelExtractor
 from src.utils import generate_spice_model
 from src.visualization import *
 from src.physics import DiodePhysics, MOSFETPhysics
+from src.cache import ResultCache
+from src.datasets import CurveSet
 
 st.set_page_config(page_title="Compact Model Extractor", layout="wide") # set browser tab title and layout format
 st.title("Compact Model Parameter Extractor") # display main heading of app
@@ -21,6 +23,48 @@ device_type = st.sidebar.selectbox("Select Device Type", ["Diode", "MOSFET"]) #
 if device_type == "Diode" or device_type == "MOSFET":
     app_mode = st.sidebar.radio("App Mode", ["Extraction", "Physics Explorer"])
 
+@st.cache_resource
+def get_result_cache():
+    """
+    Shared on-disk extraction cache, reruns and repeated uploads of the same data skip the solver
+    """
+    return ResultCache('.cache/extraction')
+
+def zoom_window(x, key):
+    """
+    Range slider for the plotted x window, decimated plots reach full resolution once the window is narrow enough
+    """
+    x_min, x_max = float(np.nanmin(x)), float(np.nanmax(x))
+    if x_min == x_max:
+        return None
+    return st.slider("Zoom window", min_value=x_min, max_value=x_max, value=(x_min, x_max), format="%.3f", key=key)
+
+# positions of the bias sliders in the Physics Explorer, every band diagram of a slider is precomputed as one frame
+V_BIAS_LATTICE = np.round(np.arange(-2.0, 1.0 + 1e-9, 0.05), 2)
+V_GS_LATTICE = np.round(np.arange(-2.0, 5.0 + 1e-9, 0.05), 2)
+
+@st.cache_data(max_entries=32)
+def diode_band_frames(na, nd, t):
+    """
+    Band diagrams of the whole bias slider for one doping / temperature state, computed in one vectorized call and
+    served as a figure dict with one frame per slider position, the Streamlit slider is the only bias control so the
+    metrics and the diagram always show the same bias, the 32 most recent states stay cached
+    """
+    phys = DiodePhysics(10**na, 10**nd, t)
+    w, _, _ = phys.get_dep_width(V_BIAS_LATTICE.min()) # widest depletion region of the sweep sets the window
+    limit = max(w * 2, 1e-4)
+    band = phys.compute_energy_bands(V_BIAS_LATTICE, np.linspace(-limit, limit, 300))
+    return animate_diode_bands(band, controls=False).to_dict()
+
+@st.cache_data(max_entries=32)
+def mos_band_frames(na, tox_nm, t):
+    """
+    MOS band diagrams of the whole gate voltage slider for one doping / oxide / temperature state, see diode_band_frames
+    """
+    phys = MOSFETPhysics(10**na, tox_nm * 1e-7, t)
+    band = phys.compute_band_diagrams(V_GS_LATTICE, np.linspace(0, 1e-4, 300))
+    return animate_mos_bands(band, V_GS_LATTICE, controls=False).to_dict()
+
 def generate_synthetic_diode_iv(I_s=1e-10, n=1.5, R_s=2.5, points=50, noise=0.02):
     """
     Function to generate synthetic diode I-V data given user-input parameters
@@ -69,8 +113,8 @@ def generate_synthetic_mosfet(V_th=0.7, k_n=1e-3, lam=0.02, V_ds=1.0, points=50,
     """
     model = MOSFETModel()
     V_gs = np.linspace(0, 2.0, points)
-    params = {'V_th': V_th, 'k_n': k_n, 'lam': lam, 'V_ds': V_ds}
-    I_true = model.compute_current(V_gs, params)
+    params = {'V_th': V_th, 'k_n': k_n, 'lam': lam}
+    I_true = model.compute_current(V_gs, params, V_ds=V_ds)
     np.random.seed(67)
     I_noise = I_true * (1 + np.random.normal(0, noise, size=I_true.shape))
     return pd.DataFrame({'V_gs': V_gs, 'I_d': I_noise, 'V_ds': V_ds}), model
@@ -80,19 +124,17 @@ def generate_synthetic_mosfet_family(V_th=0.7, k_n=1e-3, lam=0.02, V_gs=[1.0, 1.
     Function to generate synthetic MOSFET family curves given user-input parameterss
     """
     model = MOSFETModel()
-    data = []
     V_ds = np.linspace(0, 5.0, points)
     np.random.seed(4321)
-    for vgs in V_gs:
-        vgs_array = np.full_like(V_ds, vgs)
-        params = {'V_th': V_th, 'k_n': k_n, 'lam': lam, 'V_ds': V_ds}
-        I_true = model.compute_current(vgs_array, params)
-        I_noise = I_true * (1 + np.random.normal(0, noise, size=I_true.shape))
-        
-        for vds, id in zip(V_ds, I_noise):
-            data.append({'V_gs': vgs, 'V_ds': vds, 'I_d': id})
-            
-    return pd.DataFrame(data), model
+    params = {'V_th': V_th, 'k_n': k_n, 'lam': lam}
+    I_true = model.compute_grid(V_gs, V_ds, params) # whole family in one call, one row per V_gs
+    I_noise = I_true * (1 + np.random.normal(0, noise, size=I_true.shape))
+    
+    return pd.DataFrame({
+        'V_gs': np.repeat(np.asarray(V_gs, dtype=float), len(V_ds)),
+        'V_ds': np.tile(V_ds, len(V_gs)),
+        'I_d': I_noise.ravel()
+    }), model
 
 if device_type == "Diode": # Diode logic
     if app_mode == "Extraction":
@@ -212,7 +254,7 @@ if device_type == "Diode": # Diode logic
                 
             if run_btn: # extraction logic
                 model = DiodeModel()
-                extractor = ModelExtractor(model)
+                extractor = ModelExtractor(model, cache=get_result_cache())
                 
                 if fit_mode == 'C-V Curve':
                     initial = {'C_j': g_Cj, 'V_bi': g_Vbi, 'm': g_m}
@@ -224,11 +266,7 @@ if device_type == "Diode": # Diode logic
                         'model': model
                     }
                 elif fit_mode == "Multi-Temperature I-V":
-                    datasets = []
-                    unique_temps = sorted(df['T'].unique())
-                    for T in unique_temps:
-                        sub = df[df['T'] == T].sort_values('V')
-                        datasets.append((sub['V'].values, sub['I'].values, float(T)))
+                    datasets = CurveSet.from_frame(df, 'V', 'I', by='T')
                     
                     initial = {'I_s': g_Is, 'n': g_n, 'R_s': g_Rs, 'Eg': g_Eg}
                     report = extractor.diode_temp_fit(datasets, initial_params=initial)
@@ -314,35 +352,16 @@ if device_type == "Diode": # Diode logic
 
             elif result['type'] == 'multi':
                 datasets = result['datasets']
-                fig, ax = plt.subplots(figsize=(10, 6))
-                colors = plt.cm.plasma(np.linspace(0, 1, len(datasets)))
-                T_ref = 300.0
-                fit_params = report['parameters']
-                
-                for idx, (v_data, i_data, T) in enumerate(datasets):
-                    c = colors[idx]
-                    ax.semilogy(v_data, i_data, 'o', alpha=0.4, color=c, label=f'{T}K Data')
-                    Is_T = fit_params['I_s'] * (T / T_ref)**3 * np.exp(((fit_params['Eg'] * q_e) / k_B) * (1/T_ref - 1/T))
-                    p_local = {'I_s': Is_T, 'n': fit_params['n'], 'R_s': fit_params['R_s']}
-                    i_fit = model.compute_current(v_data, p_local, T=T)
-                    ax.semilogy(v_data, i_fit, '-', color=c, label=f'{T}K Fit')
-                
-                ax.set_xlabel("Voltage [V]")
-                ax.set_ylabel("Current [A]")
-                ax.set_title("Temperature-Dependent Diode Fit")
-                ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-                st.pyplot(fig)
+                x_range = zoom_window(datasets.x, key='diode_multi_zoom')
+                fig = plot_diode_fit_gl(datasets, None, model, report['parameters'], x_range=x_range)
+                fig.update_layout(title="Temperature-Dependent Diode Fit")
+                st.plotly_chart(fig, width='stretch')
             
             else:
                 df_res = result['df']
-                fig, ax = plt.subplots(figsize=(10, 5))
-                ax.semilogy(df_res['V'], df_res['I'], 'o', alpha=0.5, label='Data')
-                I_fit = model.compute_current(df_res['V'].values, report['parameters'])
-                ax.semilogy(df_res['V'], I_fit, 'r-', label='Fit')
-                ax.set_xlabel("Voltage [V]")
-                ax.set_ylabel("Current [A]")
-                ax.legend()
-                st.pyplot(fig)
+                x_range = zoom_window(df_res['V'].values, key='diode_zoom')
+                fig = plot_diode_fit_gl(df_res['V'].values, df_res['I'].values, model, report['parameters'], x_range=x_range)
+                st.plotly_chart(fig, width='stretch')
                 
             if result['type'] != 'cv':
                 st.divider()
@@ -359,7 +378,7 @@ if device_type == "Diode": # Diode logic
                         v_min = float(result['df']['V'].min())
                         v_max = float(result['df']['V'].max())
                     elif result['type'] == 'multi':
-                        all_v = np.concatenate([d[0] for d in result['datasets']])
+                        all_v = result['datasets'].x
                         v_min = float(all_v.min())
                         v_max = float(all_v.max())
                     
@@ -377,10 +396,9 @@ if device_type == "Diode": # Diode logic
                         v_max = float(result['df']['V'].max())
                         t_min, t_max = 280, 340
                     else:
-                        v = np.concatenate([d[0] for d in result['datasets']])
-                        v_max = float(v.max())
-                        t = [d[2] for d in result['datasets']]
-                        t_min, t_max = float(min(t)), float(max(t))
+                        v_max = float(result['datasets'].x.max())
+                        t = result['datasets'].values
+                        t_min, t_max = float(t.min()), float(t.max())
                         
                     fig = plot_3d_diode(model, report['parameters'], v_max, t_min, t_max)
                     st.plotly_chart(fig, width='stretch')
@@ -429,11 +447,8 @@ if device_type == "Diode": # Diode logic
             else:
                 st.success("**Equilibrium**: no net current flows, the Fermi level ($E_F$) is constant throughout the device.")
             
-            limit = max(w * 2, 1e-4)
-            x_grid = np.linspace(-limit, limit, 500)
-            band = phys.compute_energy_bands(v_bias, x_grid)
-            fig = plot_diode_bands(band)
-            st.pyplot(fig)
+            frame = int(np.abs(V_BIAS_LATTICE - v_bias).argmin())
+            st.plotly_chart(show_frame(diode_band_frames(na, nd, t), frame), width='stretch')
 
 elif device_type == "MOSFET": # MOSFET logic
     if app_mode == "Extraction":
@@ -547,14 +562,10 @@ elif device_type == "MOSFET": # MOSFET logic
                 
                 if st.button("Run Global Extraction", type="primary"):
                     model = MOSFETModel()
-                    extractor = ModelExtractor(model)
+                    extractor = ModelExtractor(model, cache=get_result_cache())
                     initial = {'V_th': st.session_state['guess_Vth'], 'k_n': st.session_state['guess_kn'], 'lam': 0.0}
                     
-                    datasets = []
-                    unique_vgs = sorted(df['V_gs'].unique())
-                    for vgs in unique_vgs:
-                        sub = df[df['V_gs'] == vgs].sort_values('V_ds')
-                        datasets.append((sub['V_ds'].values, sub['I_d'].values, float(vgs)))
+                    datasets = CurveSet.from_frame(df, 'V_ds', 'I_d', by='V_gs')
                     
                     report = extractor.multi_mosfet_fit(datasets, initial_params=initial)
                     
@@ -586,7 +597,7 @@ elif device_type == "MOSFET": # MOSFET logic
                 
                 if st.button("Run Extraction", type="primary"):
                     model = MOSFETModel()
-                    extractor = ModelExtractor(model)
+                    extractor = ModelExtractor(model, cache=get_result_cache())
                     initial = {'V_th': g_Vth, 'k_n': g_kn, 'lam': 0.0}
                     
                     if sweep_type == "$I_{d}-V_{gs}$ (Transfer)":
@@ -639,52 +650,28 @@ elif device_type == "MOSFET": # MOSFET logic
             )
             
             if result['type'] == 'multi':
-                fig, ax = plt.subplots(figsize=(10, 6))
                 datasets = result['datasets']
-                colors = plt.cm.jet(np.linspace(0, 1, len(datasets)))
-                
-                for idx, (vds_data, id_data, vgs_val) in enumerate(datasets):
-                    c = colors[idx]
-                    ax.plot(vds_data, id_data, 'o', alpha=0.4, color=c, label=f'Data {vgs_val}V')
-                    
-                    p = report['parameters'].copy()
-                    p['V_ds'] = vds_data
-                    vgs_arr = np.full_like(vds_data, vgs_val)
-                    I_fit = model.compute_current(vgs_arr, p)
-                    
-                    ax.plot(vds_data, I_fit, '-', color=c, label=f'Fit {vgs_val}V')
-                
-                ax.set_xlabel("$V_{ds}$ [V]")
-                ax.set_ylabel("$I_{d}$ [A]")
-                ax.set_title("Global Fit: Output Characteristics")
-                ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-                st.pyplot(fig)
+                x_range = zoom_window(datasets.x, key='mosfet_multi_zoom')
+                st.plotly_chart(plot_mosfet_multi_gl(datasets, model, report['parameters'], x_range=x_range), width='stretch')
                 
             elif result['type'] == 'single':
-                fig, ax = plt.subplots(figsize=(10, 5))
                 subset = result['subset']
                 sweep_type = result['sweep_type']
                 v_ds_arg = result['v_ds_arg']
                 v_gs_arg = result['v_gs_arg']
                 
                 if sweep_type == "$I_{d}-V_{gs}$ (Transfer)":
-                    x_data = subset['V_gs']
-                    x_label = "$V_{gs}$ [V]"
+                    x_data = subset['V_gs'].values
+                    x_label = "V_gs [V]"
                 else:
-                    x_data = subset['V_ds']
-                    x_label = "$V_{ds}$ [V]"
+                    x_data = subset['V_ds'].values
+                    x_label = "V_ds [V]"
                     
-                ax.plot(x_data, subset['I_d'], 'o', alpha=0.5, label='Data')
-                
-                fit_params = report['parameters']
-                fit_params['V_ds'] = v_ds_arg
-                I_fit = model.compute_current(v_gs_arg, fit_params)
-                
-                ax.plot(x_data, I_fit, 'r-', label='Fit')
-                ax.set_xlabel(x_label)
-                ax.set_ylabel('$I_{d}$ [A]')
-                ax.legend()
-                st.pyplot(fig)
+                I_fit = model.compute_current(v_gs_arg, report['parameters'], V_ds=v_ds_arg)
+                x_range = zoom_window(x_data, key='mosfet_zoom')
+                fig = plot_fit_family_gl([(x_data, subset['I_d'].values, '')], lambda i, idx: I_fit[idx], x_label, "I_d [A]",
+                                         x_range=x_range)
+                st.plotly_chart(fig, width='stretch')
 
             st.divider()
             st.subheader("MOSFET Physics & Characteristics")
@@ -767,7 +754,5 @@ elif device_type == "MOSFET": # MOSFET logic
             else:
                 st.success("**Inversion**: $V_{gs} > V_{th}$, so the bands bend significantly downward such that the intrinsic level $E_{i}$ crosses the Fermi level, causing the minority carriers to gather at the surface and form a conductive n-channel.")
                 
-            x_grid = np.linspace(0, 1e-4, 500)
-            band = phys.compute_band_diagrams(vgs, x_grid)
-            fig = plot_mos_bands(band)
-            st.pyplot(fig)
\ No newline at end of file
+            frame = int(np.abs(V_GS_LATTICE - vgs).argmin())
+            st.plotly_chart(show_frame(mos_band_frames(na, tox_nm, t), frame), width='stretch')
\ No newline at end of file
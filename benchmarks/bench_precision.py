@@ -0,0 +1,66 @@
+# float64 vs float32 evaluation of large sweeps: Monte Carlo diode I-V and C-V sets, MOSFET surface sets and a
+# physics band-diagram sweep over a doping map. Reports the best of 3 wall times, throughput in million points per
+# second, peak traced memory (numpy allocations, outputs and work buffers) and the largest deviation of float32 from
+# float64, relative for the diode, absolute in A or eV for the MOSFET and the bands (see src/precision.py for bounds)
+# Run from the repository root: python -m benchmarks.bench_precision [n_sets]
+
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+from src.models import DiodeModel, MOSFETModel
+from src.physics import DiodePhysics
+
+n_sets = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+rng = np.random.default_rng(67)
+diode = DiodeModel()
+mosfet = MOSFETModel()
+
+def measure(fn):
+    fn() # plan creation outside the timing
+    times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, min(times), peak
+
+V = np.linspace(-1.0, 1.0, 150)
+diode_sets = {'I_s': 1e-12 * np.exp(0.3 * rng.standard_normal(n_sets)), 'n': 1.3 + 0.02 * rng.standard_normal(n_sets),
+              'R_s': rng.uniform(0.0, 1.0, n_sets)}
+V_cv = np.linspace(-5.0, 0.7, 150)
+cv_sets = {'C_j': 1e-12 * rng.uniform(0.8, 1.2, n_sets), 'V_bi': rng.uniform(0.7, 0.9, n_sets), 'm': 0.5}
+V_gs, V_ds = np.meshgrid(np.linspace(0, 3, 40), np.linspace(0, 3, 40), indexing='ij')
+mos_sets = {'V_th': 0.7 + 0.03 * rng.standard_normal(n_sets // 10), 'k_n': 2e-3, 'lam': 0.04}
+doping = np.logspace(15, 18, 40)
+x = np.linspace(-2e-4, 2e-4, 400)
+bias = np.linspace(-2.0, 0.5, 26)[:, None, None] # broadcasts against the doping map
+
+cases = [
+    (f'diode I-V {n_sets}x150', 'rel', lambda dt: diode.compute_current_sets(V, diode_sets, dtype=dt)),
+    (f'diode C-V {n_sets}x150', 'rel', lambda dt: diode.compute_capacitance_sets(V_cv, cv_sets, dtype=dt)),
+    (f'MOSFET {n_sets // 10}x40x40', 'abs A',
+     lambda dt: mosfet.compute_current_sets(V_gs, mos_sets, V_ds=V_ds, dtype=dt)),
+    ('bands 26x40x40x400', 'abs eV',
+     lambda dt: DiodePhysics(doping[:, None], doping[None, :], 300, dtype=dt).compute_energy_bands(bias, x)['Ec']),
+]
+
+print(f"{'workload':<24}{'dtype':>9}{'ms':>9}{'Mpts/s':>9}{'peak MB':>10}{'speedup':>9}{'memory':>8}{'max dev':>18}")
+
+for name, kind, run in cases:
+    ref, ref_time, ref_peak = measure(lambda: run(np.float64))
+    out, out_time, out_peak = measure(lambda: run(np.float32))
+    dev = np.abs(out - ref)
+    dev = np.max(dev / np.maximum(np.abs(ref), 1e-300)) if kind == 'rel' else np.max(dev)
+
+    for dtype, elapsed, peak in [('float64', ref_time, ref_peak), ('float32', out_time, out_peak)]:
+        line = f"{name:<24}{dtype:>9}{elapsed * 1e3:>9.1f}{ref.size / elapsed / 1e6:>9.1f}{peak / 2**20:>10.1f}"
+        if dtype == 'float32':
+            line += f"{ref_time / out_time:>8.2f}x{ref_peak / out_peak:>7.2f}x{dev:>11.2e} {kind}"
+        print(line)
@@ -0,0 +1,60 @@
+# Compares direct model calls with prepared sweeps on the grids evaluated most often: the 150-point training grid,
+# a 30x30 MOSFET surface and a 51-point tester sweep. Reports microseconds per evaluation for one parameter set along
+# an optimizer-like path of small parameter steps, and per set when 1000 sets are evaluated in one batched call
+# Run from the repository root: python -m benchmarks.bench_prepared
+
+import time
+import numpy as np
+
+from src.models import DiodeModel, MOSFETModel
+
+rng = np.random.default_rng(67)
+n_steps = 200
+n_sets = 1000
+
+def timed(fn, repeats):
+    fn() # first call outside the timing (plan creation, warm start)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+def path(center, rel=1e-3):
+    # small relative steps around a parameter set, like consecutive least squares evaluations
+    return [{k: v * (1 + rng.normal(0, rel)) for k, v in center.items()} for _ in range(n_steps)]
+
+diode = DiodeModel()
+mosfet = MOSFETModel()
+diode_params = {'I_s': 1e-12, 'n': 1.3, 'R_s': 0.5}
+cv_params = {'C_j': 2e-12, 'V_bi': 0.75, 'm': 0.45}
+mosfet_params = {'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.04}
+
+V_train = np.linspace(0, 1.0, 150)
+V_tester = np.linspace(0, 1.0, 51)
+V_cv = np.linspace(-5, 0, 150)
+V_gs_grid, V_ds_grid = np.meshgrid(np.linspace(0, 3, 30), np.linspace(0, 5, 30), indexing='ij')
+
+cases = [
+    ('diode I-V 150 pts', diode_params,
+     lambda p: diode.compute_current(V_train, p), diode.prepare(V_train).current),
+    ('diode I-V tester 51', diode_params,
+     lambda p: diode.compute_current(V_tester, p), diode.prepare(V_tester).current),
+    ('diode C-V 150 pts', cv_params,
+     lambda p: diode.compute_capacitance(V_cv, p), diode.prepare(V_cv).capacitance),
+    ('MOSFET 30x30', mosfet_params,
+     lambda p: mosfet.compute_current(V_gs_grid, p, V_ds=V_ds_grid), mosfet.prepare(V_gs_grid, V_ds_grid).current),
+]
+
+print(f"{'grid':<22}{'direct us':>11}{'prepared us':>13}{'loop us/set':>13}{'batch us/set':>14}")
+
+for name, center, direct, prepared in cases:
+    steps = path(center)
+    direct_time = timed(lambda: [direct(p) for p in steps], 3) / n_steps
+    prepared_time = timed(lambda: [prepared(p) for p in steps], 3) / n_steps
+
+    sets = {k: v * rng.uniform(0.8, 1.2, n_sets) for k, v in center.items()}
+    loop_sets = [{k: v[i] for k, v in sets.items()} for i in range(n_sets)]
+    loop_time = timed(lambda: [direct(p) for p in loop_sets], 1) / n_sets
+    batch_time = timed(lambda: prepared(sets), 3) / n_sets
+
+    print(f"{name:<22}{direct_time * 1e6:>11.1f}{prepared_time * 1e6:>13.1f}{loop_time * 1e6:>13.1f}{batch_time * 1e6:>14.2f}")
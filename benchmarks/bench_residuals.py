@@ -0,0 +1,77 @@
+# Profiles the residual evaluation path used by ModelExtractor
+# Compares the previous per-call residual (fresh params dict, normalizer and temporaries every call) against
+# _ResidualEvaluator (weights computed once, params dict reused, residual formed in place on the model output)
+# Run from the repository root: python -m benchmarks.bench_residuals
+
+import time
+import tracemalloc
+import numpy as np
+
+from src.models import DiodeModel, MOSFETModel
+from src.extraction import ModelExtractor, _ResidualEvaluator
+
+
+def legacy_residual(compute, names, y_data, fixed=None):
+    def residuals(param_vector):
+        params = dict(zip(names, param_vector))
+        if fixed:
+            params.update(fixed)
+        y_guess = compute(params)
+        return (y_guess - y_data) / np.maximum(np.abs(y_data), 1e-15)
+
+    return residuals
+
+def profile(fn, x, n_calls):
+    fn(x) # warm up
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        fn(x)
+    per_call = (time.perf_counter() - start) / n_calls
+
+    tracemalloc.start()
+    for _ in range(10):
+        fn(x)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return per_call, peak
+
+diode = DiodeModel()
+mosfet = MOSFETModel()
+cases = []
+
+for n_points in [150, 10000]:
+    V = np.linspace(0, 0.8, n_points)
+    I = diode.compute_current(V, {'I_s': 1e-10, 'n': 1.5, 'R_s': 2.5})
+    cases.append((f"diode I-V ({n_points} pts)", lambda p, V=V: diode.compute_current(V, p), ['I_s', 'n', 'R_s'], I, None, np.array([1e-10, 1.5, 2.5])))
+
+    V_cv = np.linspace(-5, 0, n_points)
+    C = diode.compute_capacitance(V_cv, {'C_j': 1e-12, 'V_bi': 0.7, 'm': 0.5})
+    cases.append((f"diode C-V ({n_points} pts)", lambda p, V=V_cv: diode.compute_capacitance(V, p), ['C_j', 'V_bi', 'm'], C, None, np.array([1e-12, 0.7, 0.5])))
+
+    V_gs = np.linspace(0, 2, n_points)
+    I_d = mosfet.compute_current(V_gs, {'V_th': 0.7, 'k_n': 1e-3, 'lam': 0.02, 'V_ds': 1.0})
+    cases.append((f"MOSFET transfer ({n_points} pts)", lambda p, V=V_gs: mosfet.compute_current(V, p), ['V_th', 'k_n', 'lam'], I_d, {'V_ds': 1.0}, np.array([0.7, 1e-3, 0.02])))
+
+print(f"{'case':<32}{'legacy us/call':>16}{'new us/call':>14}{'legacy peak KB':>16}{'new peak KB':>14}")
+
+for name, compute, names, y_data, fixed, x in cases:
+    legacy = legacy_residual(compute, names, y_data, fixed)
+    evaluator = _ResidualEvaluator(compute, names, y_data, fixed=fixed)
+    assert np.allclose(legacy(x), evaluator(x), rtol=1e-12, atol=0)
+
+    n_calls = 200 if len(y_data) < 1000 else 20
+    t_old, mem_old = profile(legacy, x, n_calls)
+    t_new, mem_new = profile(evaluator, x, n_calls)
+    print(f"{name:<32}{t_old * 1e6:>16.1f}{t_new * 1e6:>14.1f}{mem_old / 1024:>16.1f}{mem_new / 1024:>14.1f}")
+
+# full fits, time per function evaluation
+np.random.seed(67)
+V = np.linspace(0, 0.8, 150)
+I = diode.compute_current(V, {'I_s': 1e-10, 'n': 1.5, 'R_s': 2.5})
+I_noise = I * (1 + np.random.normal(0, 0.02, size=I.shape))
+extractor = ModelExtractor(diode)
+start = time.perf_counter()
+report = extractor.diode_fit(V, I_noise, initial_params={'I_s': 1e-11, 'n': 1.4, 'R_s': 0.1})
+elapsed = time.perf_counter() - start
+print(f"\ndiode_fit: {report['num_iters']} nfev, {elapsed * 1e3:.1f} ms total, {elapsed / report['num_iters'] * 1e6:.1f} us per nfev")
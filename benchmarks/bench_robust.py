@@ -0,0 +1,75 @@
+# Compares plain and robust losses, and the least_squares and IRLS solvers, on contaminated synthetic data
+# Clean curves come from the CSV generators in src.utils, then get 1% multiplicative noise and 5% outlier points
+# (scaled by 3-10x). Reports wall time per fit, function evaluations and the worst relative parameter error
+# Run from the repository root: python -m benchmarks.bench_robust
+
+import os
+import tempfile
+import time
+import numpy as np
+
+from src.models import DiodeModel, MOSFETModel
+from src.extraction import ModelExtractor
+from src.dataloader import DataLoader
+from src.datasets import CurveSet
+from src.utils import generate_mosfet_csv, generate_multi_mosfet_csv
+
+rng = np.random.default_rng(67)
+tmp_dir = tempfile.mkdtemp()
+col_map = {'V_Gate': 'V_gs', 'V_Drain': 'V_ds', 'I_Drain': 'I_d'}
+
+def contaminate(y, frac=0.05):
+    y = y * (1 + rng.normal(0, 0.01, size=y.shape))
+    idx = rng.choice(len(y), size=max(1, int(frac * len(y))), replace=False)
+    y[idx] *= rng.uniform(3, 10, size=len(idx))
+    return y
+
+mosfet_params = {'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.04}
+cv_params = {'C_j': 2e-12, 'V_bi': 0.75, 'm': 0.45}
+
+# MOSFET transfer curve, above threshold so relative residuals stay meaningful
+transfer_path = os.path.join(tmp_dir, 'transfer.csv')
+generate_mosfet_csv(transfer_path, mosfet_params, sweep_type='Id-Vgs', sweep=np.linspace(0.8, 3.0, 400), val=1.0)
+transfer = DataLoader().load_csv(transfer_path, col_map=col_map)
+V_gs, V_ds = transfer['V_gs'].to_numpy(), transfer['V_ds'].to_numpy()
+I_transfer = contaminate(transfer['I_d'].to_numpy())
+
+# MOSFET output family
+family_path = os.path.join(tmp_dir, 'family.csv')
+generate_multi_mosfet_csv(family_path, mosfet_params, [1.5, 2.0, 2.5, 3.0, 3.5], np.linspace(0.05, 4.0, 200))
+loader = DataLoader()
+loader.load_csv(family_path, col_map=col_map)
+family = loader.get_mosfet_datasets()
+family = CurveSet(family.x, contaminate(family.y), family.offsets, family.values, family.names)
+
+# diode C-V
+diode = DiodeModel()
+V_cv = np.linspace(-5, 0.3, 400)
+C_data = contaminate(diode.compute_capacitance(V_cv, cv_params))
+
+mosfet_guess = {'V_th': 0.5, 'k_n': 1e-3, 'lam': 0.0}
+cv_guess = {'C_j': 1e-12, 'V_bi': 0.6, 'm': 0.5}
+true_transfer = {'V_th': mosfet_params['V_th']} # k_n and lam are collinear at a single V_ds
+cases = [
+    ('MOSFET transfer', true_transfer, lambda ex, **kw: ex.mosfet_fit(V_gs, I_transfer, V_ds, initial_params=dict(mosfet_guess), **kw), MOSFETModel),
+    ('MOSFET family', mosfet_params, lambda ex, **kw: ex.multi_mosfet_fit(family, initial_params=dict(mosfet_guess), **kw), MOSFETModel),
+    ('diode C-V', cv_params, lambda ex, **kw: ex.diode_cv_fit(V_cv, C_data, initial_params=dict(cv_guess), **kw), DiodeModel),
+]
+
+def param_error(fit, true):
+    return max(abs(fit[k] - v) / abs(v) for k, v in true.items())
+
+print(f"{'case':<18}{'loss':<10}{'solver':<8}{'ms/fit':>9}{'nfev':>7}{'max rel err':>14}")
+
+for name, true, run, model_cls in cases:
+    for loss in ['linear', 'huber', 'soft_l1', 'cauchy']:
+        for solver in ['trf', 'irls']:
+            extractor = ModelExtractor(model_cls())
+            report = run(extractor, loss=loss, f_scale=0.05, solver=solver)
+            n_runs = 20
+            start = time.perf_counter()
+            for _ in range(n_runs):
+                run(extractor, loss=loss, f_scale=0.05, solver=solver)
+            elapsed = (time.perf_counter() - start) / n_runs
+            print(f"{name:<18}{loss:<10}{solver:<8}{elapsed * 1e3:>9.2f}{report['num_iters']:>7}{param_error(report['parameters'], true):>14.2e}")
+    print()
@@ -0,0 +1,78 @@
+# Compares initial guess strategies of ModelExtractor: neural network estimators, closed-form pre-extraction, the
+# better of both and fixed defaults. Each case fits a batch of noisy synthetic curves with random true parameters.
+# Reports the batched guess time per curve, the total guess + fit time per curve, mean function evaluations and the
+# fraction of fits that recover the true parameters
+# Run from the repository root: python -m benchmarks.bench_seeding
+
+import time
+import numpy as np
+
+from src.models import DiodeModel, MOSFETModel
+from src.extraction import ModelExtractor, GUESS_STRATEGIES
+
+rng = np.random.default_rng(67)
+n_curves = 50
+diode = DiodeModel()
+mosfet = MOSFETModel()
+
+def noisy(y):
+    return y * (1 + rng.normal(0, 0.01, size=y.shape))
+
+V_iv = np.linspace(0, 1.0, 101)
+V_cv = np.linspace(-5, 0.3, 200)
+V_gs = np.linspace(0, 3, 151)
+V_ds = np.linspace(0, 4, 101)
+
+iv_true = [{'I_s': 10 ** rng.uniform(-14, -10), 'n': rng.uniform(1.0, 1.8), 'R_s': rng.uniform(0.1, 2.0)} for _ in range(n_curves)]
+cv_true = [{'C_j': 10 ** rng.uniform(-13, -10), 'V_bi': rng.uniform(0.5, 1.0), 'm': rng.uniform(0.3, 0.6)} for _ in range(n_curves)]
+mos_true = [{'V_th': rng.uniform(0.4, 1.2), 'k_n': 10 ** rng.uniform(-4, -2), 'lam': rng.uniform(0.01, 0.08)} for _ in range(n_curves)]
+v_ds_bias = rng.uniform(0.1, 3.0, n_curves)
+v_gs_bias = rng.uniform(2.0, 3.0, n_curves)
+
+# mode: (curves, fit of one curve, true parameters checked)
+cases = {
+    'diode': (
+        [(V_iv, noisy(diode.compute_current(V_iv, p)), 300.0) for p in iv_true],
+        lambda ex, x, y, bias: ex.diode_fit(x, y, T=bias),
+        [{'I_s': p['I_s'], 'n': p['n']} for p in iv_true],
+    ),
+    'diode_cv': (
+        [(V_cv, noisy(diode.compute_capacitance(V_cv, p)), None) for p in cv_true],
+        lambda ex, x, y, bias: ex.diode_cv_fit(x, y),
+        cv_true,
+    ),
+    'mosfet_transfer': (
+        [(V_gs, noisy(mosfet.compute_current(V_gs, p, V_ds=v)), v) for p, v in zip(mos_true, v_ds_bias)],
+        lambda ex, x, y, bias: ex.mosfet_fit(x, y, bias),
+        [{'V_th': p['V_th']} for p in mos_true], # k_n and lam are collinear at a single V_ds
+    ),
+    'mosfet_output': (
+        [(V_ds, noisy(mosfet.compute_current(v, p, V_ds=V_ds)), v) for p, v in zip(mos_true, v_gs_bias)],
+        lambda ex, x, y, bias: ex.mosfet_fit(np.full_like(x, bias), y, x),
+        mos_true,
+    ),
+}
+
+def recovered(fit, true, rtol=0.05):
+    return all(abs(fit[k] - v) / abs(v) < rtol for k, v in true.items())
+
+print(f"{'mode':<17}{'guess':<10}{'guess us/curve':>16}{'total ms/curve':>16}{'nfev':>7}{'recovered':>11}")
+
+for mode, (curves, fit, true) in cases.items():
+    for strategy in GUESS_STRATEGIES:
+        extractor = ModelExtractor(diode if mode.startswith('diode') else mosfet, guess=strategy)
+        extractor.guess_batch(mode, curves[:2]) # load estimator weights outside the timing
+
+        start = time.perf_counter()
+        extractor.guess_batch(mode, curves)
+        guess_time = (time.perf_counter() - start) / n_curves
+
+        # the fits compute their own guess, so this is the end-to-end cost of one curve
+        start = time.perf_counter()
+        reports = [fit(extractor, x, y, bias) for x, y, bias in curves]
+        total_time = (time.perf_counter() - start) / n_curves
+
+        nfev = np.mean([r['num_iters'] for r in reports])
+        ok = np.mean([recovered(r['parameters'], t) for r, t in zip(reports, true)])
+        print(f"{mode:<17}{strategy:<10}{guess_time * 1e6:>16.1f}{total_time * 1e3:>16.2f}{nfev:>7.1f}{ok:>11.0%}")
+    print()
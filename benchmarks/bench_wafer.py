@@ -0,0 +1,64 @@
+# End-to-end scale benchmark: synthetic lot -> streamed files -> ingest -> clean -> extract -> SPICE export
+# A lot of diodes with spatially correlated variation is written as one CSV, one structured .npy and one file per die,
+# each is read back with DataLoader, then the .npy data is cleaned and every device is fitted with closed-form seeds.
+# Reports wall time and throughput per stage and the extraction error against the true per-die parameters
+# Run from the repository root: python -m benchmarks.bench_wafer [n_wafers]
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+from src.models import DiodeModel
+from src.extraction import ModelExtractor
+from src.dataloader import DataLoader
+from src.wafer import sample_lot, write_lot
+from src.utils import write_spice_library
+
+n_wafers = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+tmp_dir = tempfile.mkdtemp()
+V = np.linspace(0, 1.0, 101)
+sweep = {'V': V, 'T': 300.0}
+compliance = 1e-2
+
+def stage(name, n, unit, start):
+    elapsed = time.perf_counter() - start
+    print(f"{name:<26}{elapsed:>9.2f} s{n / elapsed:>14.0f} {unit}/s")
+
+start = time.perf_counter()
+lot = sample_lot({'I_s': 1e-12, 'n': 1.3, 'R_s': 0.5}, {'I_s': 0.3, 'n': 0.02, 'R_s': 0.1}, n_wafers=n_wafers,
+                 radial={'n': 0.05}, bounds=DiodeModel().get_param_bounds(), seed=67)
+stage(f"sample {len(lot)} dies", len(lot), 'dies', start)
+
+paths = {'csv': os.path.join(tmp_dir, 'lot.csv'), 'npy': os.path.join(tmp_dir, 'lot.npy'), 'per_die': os.path.join(tmp_dir, 'dies')}
+for fmt, path in paths.items():
+    start = time.perf_counter()
+    rows = write_lot(path, lot, 'diode', sweep, compliance=compliance, seed=1)
+    stage(f"write {fmt}", rows, 'rows', start)
+
+loader = DataLoader()
+for fmt, path in paths.items():
+    start = time.perf_counter()
+    df = loader.load_many(path) if fmt == 'per_die' else loader.load(path)
+    stage(f"load {fmt}", len(df), 'rows', start)
+
+df = loader.load(paths['npy'])
+start = time.perf_counter()
+cleaned = loader.clean('V', 'I', by='device', df=df, compliance=compliance, noise_floor=1e-10)
+stage("clean", len(df), 'rows', start)
+
+extractor = ModelExtractor(DiodeModel(), guess='analytic')
+start = time.perf_counter()
+fits = {device: extractor.diode_fit(curve['V'].to_numpy(), curve['I'].to_numpy())['parameters']
+        for device, curve in cleaned.groupby('device', sort=False)}
+stage("extract", len(fits), 'devices', start)
+
+start = time.perf_counter()
+library = write_spice_library(os.path.join(tmp_dir, 'lot.lib'), fits, 'diode')
+stage("export", library['devices'], 'models', start)
+
+truth = lot.set_index('device')
+for name in ['I_s', 'n', 'R_s']:
+    err = np.array([abs(p[name] - truth.loc[d, name]) / truth.loc[d, name] for d, p in fits.items()])
+    print(f"{name:<4} median rel err {np.median(err):.2e}, 95th percentile {np.percentile(err, 95):.2e}")
@@ -0,0 +1,158 @@
+# Content-addressed cache for extraction results
+# Reports are stored on disk under the SHA-256 of everything that determines a fit (input arrays, fit mode,
+# temperature, initial parameters, model version and estimator weights), so identical requests skip the solver
+
+import hashlib
+import os
+import pickle
+import numpy as np
+
+_FILE_HASHES = {}
+
+def file_hash(filepath):
+    """
+    SHA-256 of a file's contents, cached per (path, mtime, size), empty string if the file does not exist
+    """
+    if not os.path.exists(filepath):
+        return ''
+
+    stat = os.stat(filepath)
+    key = (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size)
+
+    if key not in _FILE_HASHES:
+        h = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        _FILE_HASHES[key] = h.hexdigest()
+
+    return _FILE_HASHES[key]
+
+def _update(h, value):
+    # every value is tagged with its type so e.g. 1.0 and [1.0] or None and 'None' never collide
+    if value is None:
+        h.update(b'N')
+    elif isinstance(value, dict):
+        h.update(b'D%d' % len(value))
+        for k in sorted(value, key=str):
+            _update(h, str(k))
+            _update(h, value[k])
+    elif isinstance(value, (list, tuple)):
+        h.update(b'L%d' % len(value))
+        for v in value:
+            _update(h, v)
+    elif isinstance(value, str):
+        data = value.encode()
+        h.update(b'S%d:' % len(data) + data)
+    elif isinstance(value, (bool, np.bool_)):
+        h.update(b'B1' if value else b'B0')
+    else:
+        arr = np.ascontiguousarray(value, dtype=float)
+        h.update(b'A' + str(arr.shape).encode() + b':')
+        h.update(arr.tobytes())
+
+def make_key(*parts):
+    """
+    Hashes arrays, scalars, strings and nested dicts/lists into a hex cache key
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        _update(h, part)
+
+    return h.hexdigest()
+
+class ResultCache:
+    def __init__(self, directory='.cache/extraction', max_bytes=256 * 2**20):
+        """
+        ResultCache constructor, an on-disk store of pickled reports evicted in least-recently-used order
+
+        Args:
+            directory (str, optional): cache directory, created if missing, defaults to '.cache/extraction'
+            max_bytes (int, optional): total size limit of stored reports, defaults to 256 MiB
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+        # index of key -> [size, last access], built once from the directory and kept in sync afterwards
+        self._index = {}
+        for name in os.listdir(directory):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(directory, name))
+                self._index[name[:-4]] = [stat.st_size, stat.st_mtime]
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def size(self):
+        return sum(entry[0] for entry in self._index.values())
+
+    def get(self, key):
+        """
+        Returns the stored report for a key and marks it as recently used, None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                report = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self._index.pop(key, None)
+            self.misses += 1
+            return None
+
+        os.utime(path) # access time is kept in mtime so LRU order survives restarts
+        self._index[key] = [os.path.getsize(path), os.path.getmtime(path)]
+        self.hits += 1
+
+        return report
+
+    def put(self, key, report):
+        """
+        Stores a report and evicts least recently used entries beyond max_bytes
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(report, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path) # atomic, concurrent readers never see a partial file
+
+        self._index[key] = [os.path.getsize(path), os.path.getmtime(path)]
+        self._evict()
+
+    def _evict(self):
+        total = self.size
+        if total <= self.max_bytes:
+            return
+
+        for key, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            total -= size
+            del self._index[key]
+
+    def clear(self):
+        """
+        Removes every stored report
+        """
+        for key in list(self._index):
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+        self._index.clear()
@@ -0,0 +1,171 @@
+# Vectorized data-quality prefilter applied per sweep before extraction
+# All sweeps of a frame are cleaned together: rows are sorted once by (sweep, x) and every stage works on the flat
+# arrays with per-sweep offsets, so there is no Python loop over sweeps. Stages, in order:
+#   compliance   - points clamped at the instrument compliance (fixed limit, or 'auto' for a flat plateau at the sweep maximum)
+#   noise_floor  - points whose magnitude is below the measurement floor
+#   duplicate    - repeated x within a sweep, collapsed into one point with the mean y
+#   outlier      - glitches far from the running median of their neighbours, threshold in MADs of the sweep
+
+import numpy as np
+import pandas as pd
+
+REASONS = ['compliance', 'noise_floor', 'duplicate', 'outlier']
+
+def _segment_starts(group):
+    # start index of every run of equal group ids in a sorted array
+    return np.flatnonzero(np.r_[True, group[1:] != group[:-1]]) if len(group) else np.empty(0, dtype=np.int64)
+
+def _group_median(values, group, n_groups):
+    """
+    Median of values per group id, NaN for empty groups
+    """
+    med = np.full(n_groups, np.nan)
+    if not len(values):
+        return med
+
+    order = np.lexsort((values, group))
+    v, g = values[order], group[order]
+    starts = _segment_starts(g)
+    counts = np.diff(np.append(starts, len(g)))
+    med[g[starts]] = 0.5 * (v[starts + (counts - 1) // 2] + v[starts + counts // 2])
+
+    return med
+
+def _window_index(group, window):
+    """
+    Indices of each point's neighbourhood (window points centred on it), neighbourhoods are clipped to the point's sweep
+    """
+    starts = _segment_starts(group)
+    ends = np.append(starts[1:], len(group)) - 1
+    seg = np.cumsum(np.r_[False, group[1:] != group[:-1]]) # segment index of every point
+
+    half = window // 2
+    idx = np.arange(len(group))[:, None] + np.arange(-half, half + 1)[None, :]
+
+    return np.clip(idx, starts[seg][:, None], ends[seg][:, None])
+
+def _find_outliers(z, group, n_groups, threshold, window, min_scale, max_passes=5):
+    """
+    Hampel-style rejection against the running median, only the worst point of each neighbourhood is rejected per pass
+    since a large glitch also drags the running median of its neighbours
+    """
+    outlier = np.zeros(len(z), dtype=bool)
+    idx_all = np.arange(len(z))
+
+    for _ in range(max_passes):
+        live = idx_all[~outlier]
+        zl, gl = z[live], group[live]
+        if not len(zl):
+            break
+
+        window_idx = _window_index(gl, window)
+        resid = np.abs(zl - np.median(zl[window_idx], axis=1))
+        scale = np.maximum(1.4826 * np.nan_to_num(_group_median(resid, gl, n_groups)), min_scale)
+
+        flagged = (resid > threshold * scale[gl]) & (resid >= np.max(resid[window_idx], axis=1))
+        if not flagged.any():
+            break
+        outlier[live[flagged]] = True
+
+    return outlier
+
+def clean_sweeps(df, x_col, y_col, by=None, compliance=None, compliance_rtol=1e-3, noise_floor=None, dedupe=True,
+                 x_tol=0.0, outlier_threshold=None, window=5, log=True, min_scale=0.05):
+    """
+    Cleans every sweep of a long-format frame in one vectorized pass
+
+    Args:
+        df (DataFrame): measured data
+        x_col (str): swept column, e.g. 'V' or 'V_ds'
+        y_col (str): measured column, e.g. 'I' or 'I_d'
+        by (str/list, optional): column(s) identifying a sweep, e.g. 'T' or ['device', 'V_gs'], whole frame is one sweep if None
+        compliance (float/str, optional): compliance limit on |y|, or 'auto' to drop a flat plateau at each sweep's maximum
+            ('auto' assumes y keeps rising along the sweep, a saturated output curve with lam=0 would be clipped)
+        compliance_rtol (float, optional): relative tolerance for a point to count as clamped, defaults to 1e-3
+        noise_floor (float, optional): points with |y| below the floor are dropped
+        dedupe (bool, optional): collapse points with repeated x (within x_tol) into one with the mean y, defaults to True
+        x_tol (float, optional): x spacing at or below which points count as duplicates, defaults to 0 (exact repeats)
+        outlier_threshold (float, optional): reject points more than this many scaled MADs from the running median, off if None
+        window (int, optional): running median window in points, defaults to 5
+        log (bool, optional): judge outliers on log|y| (currents over decades), zeros are then never flagged, defaults to True
+        min_scale (float, optional): lower bound of the MAD scale so near-noiseless sweeps keep their points, defaults to 0.05
+
+    Returns:
+        tuple: (cleaned DataFrame sorted by sweep and x, report dict with 'total', 'kept', 'removed' counts per reason
+               and 'reasons', a Series of the removal reason per original row index)
+    """
+    n = len(df)
+    x = df[x_col].to_numpy(dtype=float)
+    y = df[y_col].to_numpy(dtype=float)
+    group = df.groupby(by, sort=True).ngroup().to_numpy() if by is not None else np.zeros(n, dtype=np.int64)
+
+    order = np.lexsort((x, group))
+    x, y, group = x[order], y[order], group[order]
+    n_groups = int(group.max()) + 1 if n else 0
+    reason = np.full(n, '', dtype=object)
+    keep = np.ones(n, dtype=bool)
+    abs_y = np.abs(y)
+
+    # compliance clamps
+    if compliance is not None:
+        if compliance == 'auto':
+            limit = np.zeros(n_groups)
+            np.maximum.at(limit, group, abs_y)
+            clamped = abs_y >= limit[group] * (1 - compliance_rtol)
+            plateau = np.bincount(group[clamped], minlength=n_groups) >= 2 # a single maximum is just the end of the sweep
+            clamped &= plateau[group]
+        else:
+            clamped = abs_y >= compliance * (1 - compliance_rtol)
+        reason[clamped] = 'compliance'
+        keep &= ~clamped
+
+    # noise floor
+    if noise_floor is not None:
+        floor = keep & (abs_y < noise_floor)
+        reason[floor] = 'noise_floor'
+        keep &= ~floor
+
+    x_out, y_out, g_out = x[keep], y[keep], group[keep]
+    src = np.flatnonzero(keep) # sorted position of each surviving point
+
+    # duplicate x within a sweep, the first point of each run carries the mean
+    if dedupe and len(x_out):
+        dup = np.r_[False, (g_out[1:] == g_out[:-1]) & (np.diff(x_out) <= x_tol)]
+        if dup.any():
+            run = np.cumsum(~dup) - 1
+            counts = np.bincount(run)
+            y_out = np.bincount(run, weights=y_out) / counts
+            x_out, g_out = x_out[~dup], g_out[~dup]
+            reason[src[dup]] = 'duplicate'
+            src = src[~dup]
+
+    # outliers against the running median
+    if outlier_threshold is not None and len(x_out):
+        if log:
+            valid = y_out != 0
+            z = np.log(np.abs(y_out[valid]))
+        else:
+            valid = np.ones(len(y_out), dtype=bool)
+            z = y_out
+
+        outlier = np.zeros(len(y_out), dtype=bool)
+        outlier[valid] = _find_outliers(z, g_out[valid], n_groups, outlier_threshold, window, min_scale)
+
+        reason[src[outlier]] = 'outlier'
+        x_out, y_out, src = x_out[~outlier], y_out[~outlier], src[~outlier]
+
+    clean = df.iloc[order[src]].copy()
+    clean[x_col] = x_out
+    clean[y_col] = y_out
+
+    reason[order] = reason.copy() # back to the original row order
+    reasons = pd.Series(reason, index=df.index)
+    reasons = reasons[reasons != '']
+    report = {
+        'total': n,
+        'kept': len(clean),
+        'removed': {r: int(np.sum(reason == r)) for r in REASONS},
+        'reasons': reasons,
+    }
+
+    return clean, report
@@ -1,6 +1,136 @@
 import pandas as pd
 import numpy as np
-import os
+import os, re, glob
+import collections
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from src.simformats import read_ngspice_raw, read_plt, read_whitespace_table
+from src.datasets import CurveSet
+from src.cleaning import clean_sweeps
+
+def _apply_col_map(df, col_map):
+    df.columns = df.columns.str.strip() # strip whitespace from headers
+    
+    if col_map: # apply column mapping if included in args
+        for file_col, std_col in col_map.items():
+            if file_col not in df.columns:
+                raise ValueError(f"Column '{file_col}' not found in file. Available: {list(df.columns)}")
+            
+        df = df.rename(columns=col_map)
+        
+    return df
+
+def _read_table(filepath, col_map=None, comment_char='!'):
+    """
+    Reads one CSV into a dataframe with stripped and mapped column names, module-level so process pools can pickle it
+    """
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"File not found: {filepath}")
+    
+    try: # read through the CSV, skip comments
+        df = pd.read_csv(filepath, comment=comment_char)
+    except Exception as e:
+        raise ValueError(f"Error reading CSV: {e}")
+    
+    return _apply_col_map(df, col_map)
+
+# file extension -> format understood by _read_any
+FORMATS = {
+    '.csv': 'csv',
+    '.raw': 'raw',
+    '.plt': 'plt',
+    '.txt': 'table',
+    '.dat': 'table',
+    '.tbl': 'table',
+    '.npy': 'npy',
+}
+
+def _read_any(filepath, col_map=None, comment_char='!', fmt=None, scale=None, plot=0):
+    """
+    Reads CSV, ngspice raw, Sentaurus .plt, whitespace tables or structured .npy arrays, chosen by fmt or the file extension
+    """
+    if fmt is None:
+        ext = os.path.splitext(filepath)[1].lower()
+        fmt = FORMATS.get(ext, 'table' if re.fullmatch(r'\.s\d+p', ext) else 'csv') # Touchstone .s1p, .s2p, ...
+        
+    if fmt == 'csv':
+        df = _read_table(filepath, col_map, comment_char)
+    else:
+        if not os.path.exists(filepath):
+            raise FileNotFoundError(f"File not found: {filepath}")
+        
+        try:
+            if fmt == 'raw':
+                df = read_ngspice_raw(filepath, plot=plot)
+            elif fmt == 'plt':
+                df = read_plt(filepath)
+            elif fmt == 'table':
+                df = read_whitespace_table(filepath, comment_char=comment_char)
+            elif fmt == 'npy': # structured array, e.g. written by src.wafer.write_lot
+                df = pd.DataFrame(np.load(filepath, mmap_mode='r'))
+            else:
+                raise ValueError(f"Unknown format '{fmt}'. Available: {sorted(set(FORMATS.values()))}")
+        except (OSError, ValueError, KeyError, IndexError) as e:
+            raise ValueError(f"Error reading {fmt} file: {e}")
+        
+        df = _apply_col_map(df, col_map)
+        
+    if scale: # e.g. {'I_d': -1} for ngspice source currents or unit conversions
+        for col, factor in scale.items():
+            df[col] = df[col] * factor
+            
+    return df
+
+def _read_device(args):
+    filepath, device, col_map, comment_char, on_error, fmt, scale = args
+    try:
+        df = _read_any(filepath, col_map, comment_char, fmt, scale)
+    except Exception as e:
+        if on_error == 'raise':
+            raise ValueError(f"{filepath}: {e}") from e
+        return device, filepath, None, str(e)
+    
+    return device, filepath, df, None
+
+def _resolve_sources(sources, pattern):
+    """
+    Expands file paths, directories (searched recursively for pattern) and glob patterns into a sorted file list
+    """
+    if isinstance(sources, (str, os.PathLike)):
+        sources = [sources]
+        
+    files = []
+    for source in sources:
+        source = os.fspath(source)
+        if os.path.isdir(source):
+            files.extend(glob.glob(os.path.join(source, '**', pattern), recursive=True))
+        elif glob.has_magic(source):
+            files.extend(glob.glob(source, recursive=True))
+        else:
+            files.append(source)
+            
+    files = sorted(set(f for f in files if not os.path.isdir(f)))
+    if not files:
+        raise FileNotFoundError(f"No files matched: {sources}")
+    
+    return files
+
+def _ordered_map(fn, items, workers, executor):
+    """
+    Parallel map that yields results in input order while keeping at most 2 * workers reads in flight
+    """
+    pool_cls = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    
+    with pool_cls(max_workers=workers) as pool:
+        pending = collections.deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+                
+        while pending:
+            yield pending.popleft().result()
 
 class DataLoader:
     def __init__(self):
@@ -9,6 +139,8 @@ class DataLoader:
         """
         self.df = None
         self.req_cols = []
+        self.errors = []
+        self.cleaning_report = None
         
     def load_csv(self, filepath, col_map=None, comment_char='!'):
         """
@@ -23,23 +155,80 @@ class DataLoader:
             FileNotFoundError: in case filepath is invalid
             ValueError: error when reading the CSV or when column not found in the CSV
         """
-        if not os.path.exists(filepath):
-            raise FileNotFoundError(f"File not found: {filepath}")
+        self.df = _read_table(filepath, col_map, comment_char)
+        return self.df
+    
+    def load(self, filepath, col_map=None, fmt=None, comment_char='!', scale=None, plot=0):
+        """
+        Load I-V or C-V data from a CSV or simulator output file without an intermediate conversion
+
+        Args:
+            filepath (str): path to file
+            col_map (dict, optional): mapping from file columns to standard names, e.g. {'v(gate)': 'V_gs', 'i(vd)': 'I_d'}
+            fmt (str, optional): 'csv', 'raw' (ngspice binary/ASCII), 'plt' (Sentaurus) or 'table' (whitespace) or 'npy' (structured array), inferred from the extension if None
+            comment_char (str, optional): character that indicates comments to skip in CSV and whitespace tables
+            scale (dict, optional): factors applied to mapped columns, e.g. {'I_d': -1} for currents through ngspice sources
+            plot (int/str, optional): plot index or name for ngspice raw files holding several plots, defaults to 0
+
+        Raises:
+            FileNotFoundError: in case filepath is invalid
+            ValueError: error when parsing the file or when column not found in the file
+        """
+        self.df = _read_any(filepath, col_map, comment_char, fmt, scale, plot)
+        return self.df
+    
+    def iter_many(self, sources, col_map=None, comment_char='!', pattern='*.csv', workers=None, executor='thread',
+                  device_fn=None, on_error='raise', fmt=None, scale=None):
+        """
+        Lazily parses many files in a thread or process pool, yielding one dataframe per device in file order
+
+        Args:
+            sources (str/list): file paths, directories (searched recursively) or glob patterns
+            col_map (dict, optional): mapping from file columns to standard names applied to every file
+            comment_char (str, optional): character that indicates comments to skip
+            pattern (str, optional): file pattern used when a source is a directory, defaults to '*.csv'
+            workers (int, optional): number of parallel readers, defaults to the executor's default
+            executor (str, optional): 'thread' or 'process', defaults to 'thread'
+            device_fn (callable, optional): maps a file path to a device id, defaults to the file name without extension
+            on_error (str, optional): 'raise' or 'skip' unreadable files, skipped files are listed in self.errors
+            fmt (str, optional): file format for every file, inferred per file from the extension if None, see load
+            scale (dict, optional): factors applied to mapped columns, see load
+
+        Yields:
+            tuple: (device, dataframe) with 'device' and 'file' metadata columns attached
+        """
+        if device_fn is None:
+            device_fn = lambda path: os.path.splitext(os.path.basename(path))[0]
+            
+        files = _resolve_sources(sources, pattern)
+        self.errors = []
+        jobs = ((f, device_fn(f), col_map, comment_char, on_error, fmt, scale) for f in files)
         
-        try: # read through the CSV, skip comments
-            self.df = pd.read_csv(filepath, comment=comment_char)
-        except Exception as e:
-            raise ValueError(f"Error reading CSV: {e}")
+        for device, filepath, df, error in _ordered_map(_read_device, jobs, workers, executor):
+            if df is None:
+                self.errors.append((filepath, error))
+                continue
+            
+            df['device'] = device
+            df['file'] = filepath
+            yield device, df
+            
+    def load_many(self, sources, col_map=None, comment_char='!', pattern='*.csv', workers=None, executor='thread',
+                  device_fn=None, on_error='raise', fmt=None, scale=None):
+        """
+        Parses many files in parallel into one concatenated dataframe, see iter_many for the arguments
+
+        Returns:
+            DataFrame: all rows with categorical 'device' and 'file' metadata columns
+        """
+        frames = [df for _, df in self.iter_many(sources, col_map, comment_char, pattern, workers, executor, device_fn, on_error, fmt, scale)]
+        if not frames:
+            raise ValueError(f"No readable files in: {sources}")
         
-        self.df.columns = self.df.columns.str.strip() # strip whitespace from headers
+        self.df = pd.concat(frames, ignore_index=True)
+        self.df['device'] = self.df['device'].astype('category')
+        self.df['file'] = self.df['file'].astype('category')
         
-        if col_map: # apply column mapping if included in args
-            for file_col, std_col in col_map.items():
-                if file_col not in self.df.columns:
-                    raise ValueError(f"Column '{file_col}' not found in file. Available: {list(self.df.columns)}")
-                
-            self.df.rename(columns=col_map, inplace=True)
-            
         return self.df
     
     def filter_compliance(self, current_col='I_d', limit=0.1):
@@ -49,23 +238,64 @@ class DataLoader:
         if self.df is not None and current_col in self.df.columns:
             self.df = self.df[self.df[current_col] < limit]
             
-    def get_mosfet_datasets(self, vgs_col='V_gs', vds_col='V_ds', id_col='I_d'):
+    def clean(self, x_col, y_col, by=None, df=None, **options):
         """
-        Splits dataframe into list of datasets to be parsed by ModelExtractor
+        Runs the vectorized cleaning stage per sweep, see src.cleaning.clean_sweeps for the options
+
+        Args:
+            x_col (str): swept column, e.g. 'V_ds'
+            y_col (str): measured column, e.g. 'I_d'
+            by (str/list, optional): column(s) identifying a sweep, e.g. ['device', 'V_gs']
+            df (DataFrame, optional): frame to clean, defaults to the loaded data which is then replaced by the cleaned frame
+            **options: compliance, noise_floor, dedupe, x_tol, outlier_threshold, window, log, min_scale
 
         Returns:
-            datasets (list): list of tuples (Vds_array, Id_array, Vgs)
+            DataFrame: cleaned frame sorted by sweep and x, the report ('total', 'kept', 'removed' counts per reason and
+            per-row 'reasons') is kept in self.cleaning_report
         """
-        if self.df is None:
+        replace = df is None
+        if df is None:
+            df = self.df
+            
+        if df is None:
             raise ValueError("No data loaded, call load_csv() first")
         
-        datasets = []
-        grouped = self.df.groupby(vgs_col)
+        clean, self.cleaning_report = clean_sweeps(df, x_col, y_col, by=by, **options)
+        if replace:
+            self.df = clean
+            
+        return clean
+            
+    def get_curves(self, x_col, y_col, by, df=None, meta_cols=None):
+        """
+        Splits dataframe into a CurveSet with one curve per unique value of `by`
+
+        Args:
+            x_col (str): swept column, e.g. 'V'
+            y_col (str): measured column, e.g. 'I'
+            by (str): column that identifies a curve, e.g. 'T'
+            df (DataFrame, optional): frame to split, defaults to the loaded data
+            meta_cols (list, optional): per-curve columns kept as metadata, e.g. ['device']
+
+        Returns:
+            CurveSet: curves sorted by `by` and, within each curve, by x
+        """
+        if df is None:
+            df = self.df
+            
+        if df is None:
+            raise ValueError("No data loaded, call load_csv() first")
         
-        for vgs, group in grouped:
-            group = group.sort_values(vds_col)
-            vds_data = group[vds_col].values
-            id_data = group[id_col].values
-            datasets.append((vds_data, id_data, float(vgs)))
+        return CurveSet.from_frame(df, x_col, y_col, by, meta_cols=meta_cols)
             
-        return datasets
\ No newline at end of file
+    def get_mosfet_datasets(self, vgs_col='V_gs', vds_col='V_ds', id_col='I_d', df=None):
+        """
+        Splits dataframe into the datasets parsed by ModelExtractor
+
+        Args:
+            df (DataFrame, optional): frame to split, e.g. one device from iter_many, defaults to the loaded data
+
+        Returns:
+            datasets (CurveSet): one Id-Vds curve per V_gs, iterating yields tuples (Vds_array, Id_array, Vgs)
+        """
+        return self.get_curves(vds_col, id_col, vgs_col, df=df)
@@ -0,0 +1,170 @@
+# Columnar container for families of curves (multi-temperature I-V, Id-Vds at several V_gs, ...)
+# Every curve lives in one contiguous x/y buffer, curve i spans x[offsets[i]:offsets[i + 1]], with one value (T or V_gs)
+# and optional metadata per curve. Iterating yields (x, y, value) views so code written for lists of tuples keeps working
+
+import numpy as np
+import pandas as pd
+
+class CurveSet:
+    __slots__ = ('x', 'y', 'offsets', 'values', 'meta', 'names')
+
+    def __init__(self, x, y, offsets, values, names=('x', 'y', 'value'), meta=None):
+        """
+        CurveSet constructor, takes already packed buffers, see from_curves and from_frame for the usual constructors
+
+        Args:
+            x (numpy array): swept variable of every curve, concatenated
+            y (numpy array): measured variable of every curve, concatenated
+            offsets (numpy array): n_curves + 1 start indices into x and y, offsets[-1] == len(x)
+            values (numpy array): per-curve value, e.g. temperature or V_gs
+            names (tuple, optional): column names of x, y and the per-curve value, e.g. ('V_ds', 'I_d', 'V_gs')
+            meta (dict, optional): additional per-curve arrays, e.g. {'device': [...]}
+
+        Raises:
+            ValueError: inconsistent buffer lengths
+        """
+        self.x = np.ascontiguousarray(x, dtype=float)
+        self.y = np.ascontiguousarray(y, dtype=float)
+        self.offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+        self.values = np.ascontiguousarray(values, dtype=float)
+        self.names = tuple(names)
+        self.meta = {k: np.asarray(v) for k, v in (meta or {}).items()}
+
+        n_curves = len(self.offsets) - 1
+        if len(self.x) != len(self.y) or self.offsets[0] != 0 or self.offsets[-1] != len(self.x):
+            raise ValueError(f"Buffers of {len(self.x)} x and {len(self.y)} y points do not match offsets ending at {self.offsets[-1]}")
+        if np.any(np.diff(self.offsets) < 0):
+            raise ValueError("Offsets must be non-decreasing")
+        if len(self.values) != n_curves or any(len(v) != n_curves for v in self.meta.values()):
+            raise ValueError(f"Expected one value and one metadata entry per curve ({n_curves} curves)")
+
+    @classmethod
+    def from_curves(cls, curves, names=('x', 'y', 'value'), meta=None):
+        """
+        Packs a list of (x, y, value) tuples, the format previously passed to the global fits
+
+        Args:
+            curves (list): list of tuples (x_data, y_data, value)
+            names (tuple, optional): column names of x, y and the per-curve value
+            meta (dict, optional): additional per-curve arrays
+
+        Returns:
+            CurveSet: packed curves
+        """
+        if isinstance(curves, cls):
+            return curves
+
+        curves = list(curves)
+        lengths = [len(c[0]) for c in curves]
+        offsets = np.zeros(len(curves) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        x = np.concatenate([np.asarray(c[0], dtype=float) for c in curves]) if curves else np.empty(0)
+        y = np.concatenate([np.asarray(c[1], dtype=float) for c in curves]) if curves else np.empty(0)
+        values = np.array([float(c[2]) for c in curves])
+
+        return cls(x, y, offsets, values, names, meta)
+
+    @classmethod
+    def from_frame(cls, df, x_col, y_col, by, meta_cols=None, sort=True):
+        """
+        Splits a long-format dataframe into curves, one per unique value of `by`, without a Python loop over groups
+
+        Args:
+            df (DataFrame): measured data, e.g. columns V_gs, V_ds, I_d
+            x_col (str): swept column, e.g. 'V_ds'
+            y_col (str): measured column, e.g. 'I_d'
+            by (str): column that identifies a curve, e.g. 'V_gs' or 'T'
+            meta_cols (list, optional): columns constant within a curve to keep as metadata, e.g. ['device']
+            sort (bool, optional): sort each curve by x, defaults to True
+
+        Returns:
+            CurveSet: curves ordered by ascending `by`
+        """
+        key = df[by].to_numpy(dtype=float)
+        x = df[x_col].to_numpy(dtype=float)
+        order = np.lexsort((x, key)) if sort else np.argsort(key, kind='stable')
+
+        key = key[order]
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(key) else np.empty(0, dtype=np.int64)
+        offsets = np.append(starts, len(key))
+        meta = {col: df[col].to_numpy()[order][starts] for col in (meta_cols or [])}
+
+        return cls(x[order], df[y_col].to_numpy(dtype=float)[order], offsets, key[starts], (x_col, y_col, by), meta)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        """
+        Integer index returns the (x, y, value) tuple of one curve as views, slices and index arrays return a CurveSet
+        """
+        if isinstance(idx, (int, np.integer)):
+            if idx < 0:
+                idx += len(self)
+            if not 0 <= idx < len(self):
+                raise IndexError(f"Curve index {idx} out of range for {len(self)} curves")
+            start, stop = self.offsets[idx], self.offsets[idx + 1]
+            return self.x[start:stop], self.y[start:stop], float(self.values[idx])
+
+        return self.take(np.arange(len(self))[idx])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return f"CurveSet({len(self)} curves, {len(self.x)} points, names={self.names})"
+
+    def take(self, indices):
+        """
+        Returns a new CurveSet holding the selected curves in the given order
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        lengths = self.lengths[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        # gather the point ranges of every selected curve with one fancy index
+        point_idx = np.repeat(self.offsets[indices] - offsets[:-1], lengths) + np.arange(offsets[-1])
+        meta = {k: v[indices] for k, v in self.meta.items()}
+
+        return CurveSet(self.x[point_idx], self.y[point_idx], offsets, self.values[indices], self.names, meta)
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    @property
+    def curve_idx(self):
+        """
+        Curve index of every point, used to broadcast per-curve quantities onto the packed points
+        """
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    @property
+    def point_values(self):
+        """
+        Per-curve value (T or V_gs) repeated onto every point
+        """
+        return np.repeat(self.values, self.lengths)
+
+    @property
+    def nbytes(self):
+        return self.x.nbytes + self.y.nbytes + self.offsets.nbytes + self.values.nbytes + sum(v.nbytes for v in self.meta.values())
+
+    def to_frame(self):
+        """
+        Returns the curves as a long-format dataframe with one row per point
+        """
+        df = pd.DataFrame({self.names[2]: self.point_values, self.names[0]: self.x, self.names[1]: self.y})
+        for k, v in self.meta.items():
+            df[k] = np.repeat(v, self.lengths)
+
+        return df
+
+def as_curveset(datasets, names=('x', 'y', 'value')):
+    """
+    Accepts a CurveSet or a list of (x, y, value) tuples and returns a CurveSet
+    """
+    return CurveSet.from_curves(datasets, names)
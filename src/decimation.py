@@ -0,0 +1,107 @@
+# Point decimation for plotting large curves
+# Both methods return indices into the original arrays, so data, fits and hover values stay aligned, and both keep
+# the first and last point. min-max keeps the extremes of equal-count buckets and is fully vectorized, LTTB (largest
+# triangle three buckets) keeps the points that best preserve the visual shape and walks the buckets once
+# A zoom window is applied before decimating, a narrow window that holds fewer points than the budget is returned at
+# full resolution
+
+import numpy as np
+
+METHODS = ('lttb', 'minmax')
+
+def minmax_indices(y, n_out):
+    """
+    Indices of the minimum and maximum of (n_out - 2) // 2 equal-count buckets, plus the end points, in ascending order
+
+    Args:
+        y (numpy array): values in plotting order
+        n_out (int): point budget, every index is returned when len(y) <= n_out
+
+    Returns:
+        Numpy array: sorted indices into y
+    """
+    n = len(y)
+    if n <= n_out or n_out < 4:
+        return np.arange(n)
+
+    n_buckets = (n_out - 2) // 2
+    size = -(-n // n_buckets)
+    padded = np.pad(np.asarray(y, dtype=float), (0, n_buckets * size - n), mode='edge').reshape(n_buckets, size)
+    start = np.arange(n_buckets) * size
+    picks = np.concatenate([[0, n - 1], start + padded.argmin(axis=1), start + padded.argmax(axis=1)])
+    return np.unique(np.minimum(picks, n - 1))
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-triangle-three-buckets selection of n_out points
+
+    The interior points are split into n_out - 2 buckets, and each bucket keeps the point that forms the largest
+    triangle with the point kept from the previous bucket and the mean of the next bucket
+
+    Args:
+        x (numpy array): x values in plotting order
+        y (numpy array): y values
+        n_out (int): number of points to keep, every index is returned when len(x) <= n_out
+
+    Returns:
+        Numpy array: sorted indices into x and y
+    """
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    counts = np.diff(edges)
+
+    # mean of the following bucket for every bucket, the last point for the last one
+    next_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / counts, x[-1])[1:]
+    next_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / counts, y[-1])[1:]
+
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        area = np.abs((x[a] - next_x[b]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[b] - y[a]))
+        a = lo + int(area.argmax())
+        idx[b + 1] = a
+
+    return idx
+
+def decimate(x, y, n_out=2000, method='lttb', x_range=None, log_y=False):
+    """
+    Reduces a curve to at most n_out points for plotting
+
+    Args:
+        x (numpy array): x values in plotting order
+        y (numpy array): y values
+        n_out (int, optional): point budget, defaults to 2000
+        method (str, optional): 'lttb' or 'minmax', defaults to 'lttb'
+        x_range (tuple, optional): (x_min, x_max) zoom window applied before decimating, whole curve if None
+        log_y (bool, optional): select points on log10|y|, for curves drawn on a log axis
+
+    Returns:
+        tuple: (indices, x, y), indices into the original arrays and the kept points
+
+    Raises:
+        ValueError: unknown method
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown decimation method '{method}'. Available: {list(METHODS)}")
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    if x_range is not None:
+        keep &= (x >= x_range[0]) & (x <= x_range[1])
+    window = np.flatnonzero(keep)
+
+    y_sel = y[window]
+    if log_y:
+        y_sel = np.log10(np.abs(y_sel) + 1e-300)
+    local = lttb_indices(x[window], y_sel, n_out) if method == 'lttb' else minmax_indices(y_sel, n_out)
+
+    idx = window[local]
+    return idx, x[idx], y[idx]
@@ -7,49 +7,471 @@ import torch
 import os 
 
 from src.models import *
-from scipy.optimize import least_squares
+from src.cache import make_key, file_hash
+from src.datasets import as_curveset
+from src.preextract import analytic_guess_batch, guess_cost, diode_temp_guess, mosfet_surface_guess
+from scipy.optimize import least_squares, OptimizeResult
 from scipy.constants import k as k_B, e as q_e
 
+_ESTIMATORS = {}
+
+def _load_estimator(model_path, net_cls, input_size):
+    """
+    Loads estimator weights once per process, later guesses reuse the cached network until the weights file changes
+    """
+    key = (model_path, net_cls.__name__, input_size, os.path.getmtime(model_path))
+    
+    if key not in _ESTIMATORS:
+        model = net_cls(input_size=input_size)
+        model.load_state_dict(torch.load(model_path))
+        model.eval()
+        _ESTIMATORS[key] = model
+        
+    return _ESTIMATORS[key]
+
+def _log_interp(x_data, y_data, target, floor):
+    sort_idx = np.argsort(x_data) # sort data to get interpolation to work
+    y_interp = np.interp(target, x_data[sort_idx], y_data[sort_idx])
+    return np.log10(np.abs(y_interp) + floor) # log transform to match training data preprocessing
+
+def _diode_iv_features(V_data, I_data, bias=None):
+    return _log_interp(V_data, I_data, np.linspace(0, 1.0, 150), 1e-15)
+
+def _diode_cv_features(V_data, C_data, bias=None):
+    return _log_interp(V_data, C_data, np.linspace(-5.0, 0.0, 150), 1e-20)
+
+def _mosfet_features(V_data, I_data, bias):
+    bias = float(np.mean(bias)) if np.ndim(bias) > 0 else float(bias)
+    v_max = float(np.max(V_data))
+    i_log = _log_interp(V_data, I_data, np.linspace(0, v_max, 150), 1e-15)
+    meta = np.array([bias / 5.0, v_max / 5.0])
+    return np.concatenate([i_log, meta])
+
+def _decode_diode_iv(preds):
+    return {'I_s': 10 ** preds[0], 'n': preds[1], 'R_s': preds[2]}
+
+def _decode_diode_cv(preds):
+    return {'C_j': 10 ** preds[0], 'V_bi': preds[1], 'm': preds[2]}
+
+def _decode_mosfet(preds):
+    return {'V_th': preds[0], 'k_n': 10 ** preds[1], 'lam': preds[2]}
+
+# mode: (weights path, network class, feature builder, prediction decoder, warning label)
+ML_ESTIMATORS = {
+    'diode': ('models/diode_model_weights.pth', DiodeNet, _diode_iv_features, _decode_diode_iv, 'Diode I-V'),
+    'diode_cv': ('models/diode_cv_model_weights.pth', DiodeNet, _diode_cv_features, _decode_diode_cv, 'Diode C-V'),
+    'mosfet_transfer': ('models/mosfet_transfer_model_weights.pth', MOSFETNet, _mosfet_features, _decode_mosfet, 'MOSFET transfer'),
+    'mosfet_output': ('models/mosfet_output_model_weights.pth', MOSFETNet, _mosfet_features, _decode_mosfet, 'MOSFET output'),
+}
+
+# robust loss: (rho(z), rho'(z)) with z = (residual / f_scale)**2, same definitions as scipy least_squares
+ROBUST_LOSSES = {
+    'linear': (lambda z: z, lambda z: np.ones_like(z)),
+    'huber': (lambda z: np.where(z <= 1, z, 2 * np.sqrt(z) - 1), lambda z: np.where(z <= 1, 1.0, 1 / np.sqrt(np.maximum(z, 1)))),
+    'soft_l1': (lambda z: 2 * (np.sqrt(1 + z) - 1), lambda z: 1 / np.sqrt(1 + z)),
+    'cauchy': (lambda z: np.log1p(z), lambda z: 1 / (1 + z)),
+    'arctan': (lambda z: np.arctan(z), lambda z: 1 / (1 + z**2)),
+}
+
+SOLVERS = ('trf', 'irls')
+
+# initial guess when a fit gets no initial_params: neural network, closed-form pre-extraction, the better of both, or defaults
+GUESS_STRATEGIES = ('ml', 'analytic', 'both', 'none')
+
+def _irls(fun, jac, x0, lower, upper, loss='linear', f_scale=1.0, max_iter=100, xtol=1e-10, ftol=1e-12, gtol=1e-10):
+    """
+    Iteratively reweighted Levenberg-Marquardt with an analytic Jacobian, the fast path for cheap closed-form models
+
+    Every iteration evaluates the residual and Jacobian once over all points, refreshes the robust weights rho'(z)
+    and solves the damped, column-scaled weighted normal equations for the step. Steps are clipped to the bounds
+
+    Args:
+        fun (callable): residual vector for a parameter vector
+        jac (callable): Jacobian of the residual, shape (n_points, n_params)
+        x0 (numpy array): initial parameter vector
+        lower (numpy array): lower bounds
+        upper (numpy array): upper bounds
+        loss (str, optional): key of ROBUST_LOSSES, defaults to 'linear'
+        f_scale (float, optional): residual scale at which robust losses start down-weighting, defaults to 1.0
+        max_iter (int, optional): maximum number of accepted steps, defaults to 100
+        xtol (float, optional): relative parameter change for convergence, defaults to 1e-10
+        ftol (float, optional): relative cost change for convergence, defaults to 1e-12
+        gtol (float, optional): scaled gradient norm for convergence, defaults to 1e-10
+
+    Returns:
+        OptimizeResult: x, cost, fun, jac (weighted), nfev, njev, status, success and message like least_squares
+    """
+    rho, rho_prime = ROBUST_LOSSES[loss]
+    
+    def robust_cost(r):
+        return 0.5 * f_scale**2 * np.sum(rho((r / f_scale)**2))
+    
+    x = np.clip(np.asarray(x0, dtype=float), lower, upper)
+    r = fun(x)
+    cost = robust_cost(r)
+    mu = 1e-3
+    nfev, njev = 1, 0
+    status, message = 0, "The maximum number of iterations is exceeded."
+    
+    for _ in range(max_iter):
+        J = jac(x)
+        njev += 1
+        w = rho_prime((r / f_scale)**2)
+        Jw = J * w[:, None]
+        A = J.T @ Jw
+        g = Jw.T @ r
+        scale = np.sqrt(np.diag(A))
+        scale[scale == 0] = 1.0
+        A_scaled = A / np.outer(scale, scale)
+        g_scaled = g / scale
+        
+        if np.max(np.abs(g_scaled)) <= gtol:
+            status, message = 1, "`gtol` termination condition is satisfied."
+            break
+        
+        accepted = False
+        for _ in range(10): # damping grows 4x per rejected step
+            step = -np.linalg.solve(A_scaled + mu * np.eye(len(x)), g_scaled) / scale
+            x_new = np.clip(x + step, lower, upper)
+            r_new = fun(x_new)
+            nfev += 1
+            cost_new = robust_cost(r_new)
+            
+            if cost_new < cost:
+                accepted = True
+                mu = max(mu / 3, 1e-12)
+                break
+            mu *= 4
+        
+        if not accepted:
+            status, message = 2, "No further decrease of the cost function."
+            break
+        
+        dx = np.max(np.abs(x_new - x) / np.maximum(np.abs(x), 1e-300))
+        df = cost - cost_new
+        x, r, cost = x_new, r_new, cost_new
+        
+        if df <= ftol * cost:
+            status, message = 2, "`ftol` termination condition is satisfied."
+            break
+        if dx <= xtol:
+            status, message = 3, "`xtol` termination condition is satisfied."
+            break
+    
+    J = jac(x)
+    njev += 1
+    w = rho_prime((r / f_scale)**2)
+    
+    return OptimizeResult(x=x, cost=cost, fun=r, jac=J * np.sqrt(w)[:, None], nfev=nfev, njev=njev,
+                          status=status, success=status > 0, message=message)
+
+class _ResidualEvaluator:
+    def __init__(self, compute, names, y_data, fixed=None, compute_jac=None, weights=None, floor=1e-15):
+        """
+        Normalized residual w * (y_model - y_data) / max(|y_data|, floor) for the least squares fits
+
+        The inverse weights are computed once per fit and the params dict is reused between calls, the residual is
+        formed in place on the array returned by the model so each call allocates nothing beyond the model output.
+        The returned array must stay fresh since least_squares keeps the previous residual for its Jacobian
+
+        Args:
+            compute (callable): evaluates the model for a params dict and returns a new float array
+            names (list): parameter names in the order of the optimizer's parameter vector
+            y_data (numpy array): measured data
+            fixed (dict, optional): entries added to the params dict that are not fitted
+            compute_jac (callable, optional): analytic model derivatives for a params dict, returns {name: array}
+            weights (numpy array, optional): per-point weights w, e.g. operating-region weights, defaults to 1
+            floor (float, optional): smallest normalization, e.g. the noise floor of the instrument, defaults to 1e-15
+        """
+        self.compute = compute
+        self.compute_jac = compute_jac
+        self.names = names
+        self.params = dict(fixed) if fixed else {}
+        self.y_data = np.asarray(y_data, dtype=float)
+        self.scale = 1.0 / np.maximum(np.abs(self.y_data), floor)
+        self.inv_weight = self.scale.copy()
+        if weights is not None:
+            self.set_weights(weights)
+        self.nfev = 0
+    
+    def set_weights(self, weights):
+        """
+        Replaces the per-point weights in place, e.g. after the operating regions were reclassified
+        """
+        np.multiply(self.scale, weights, out=self.inv_weight)
+        
+    def __call__(self, param_vector):
+        for name, value in zip(self.names, param_vector):
+            self.params[name] = value
+            
+        residual = np.asarray(self.compute(self.params), dtype=float)
+        np.subtract(residual, self.y_data, out=residual)
+        np.multiply(residual, self.inv_weight, out=residual)
+        self.nfev += 1
+        
+        return residual
+    
+    def jacobian(self, param_vector):
+        """
+        Jacobian of the normalized residual from the analytic model derivatives, shape (n_points, n_params)
+        """
+        for name, value in zip(self.names, param_vector):
+            self.params[name] = value
+            
+        derivs = self.compute_jac(self.params)
+        J = np.empty((len(self.y_data), len(self.names)))
+        for col, name in enumerate(self.names):
+            J[:, col] = derivs[name]
+        J *= self.inv_weight[:, None]
+        
+        return J
+
+def _surface_points(V_gs, V_ds, I_d):
+    """
+    Flattened V_gs, V_ds and I_d of a scattered table or a grid, points with a non-finite entry are dropped
+
+    A grid may be given as 1-D V_gs (rows) and V_ds (columns) axes with an (n_vgs, n_vds) current array, otherwise
+    V_gs and V_ds must broadcast against I_d
+    """
+    V_gs, V_ds, I_d = [np.asarray(a, dtype=float) for a in (V_gs, V_ds, I_d)]
+    if V_gs.ndim == V_ds.ndim == 1 and I_d.shape == (len(V_gs), len(V_ds)) and V_gs.shape != I_d.shape:
+        V_gs, V_ds = V_gs[:, None], V_ds[None, :]
+
+    V_gs, V_ds, I_d = [a.ravel() for a in np.broadcast_arrays(V_gs, V_ds, I_d)]
+    keep = np.isfinite(V_gs) & np.isfinite(V_ds) & np.isfinite(I_d)
+    return V_gs[keep], V_ds[keep], I_d[keep]
+
+def _classify(model, V_gs, V_ds, I_data, params, noise_floor):
+    """
+    Operating regions of the current parameter estimate, points measured at or below the noise floor count as cutoff
+    """
+    regions = model.classify_regions(V_gs, V_ds, params)
+    if noise_floor:
+        regions[np.abs(I_data) <= noise_floor] = 0
+    return regions
+
+def _region_weights(regions, region_weights):
+    """
+    Per-point weights from {region name: weight}, regions missing from the dict keep weight 1
+    """
+    unknown = set(region_weights) - set(MOSFET_REGIONS)
+    if unknown:
+        raise ValueError(f"Unknown MOSFET regions {sorted(unknown)}. Available: {list(MOSFET_REGIONS)}")
+    
+    return np.array([region_weights.get(name, 1.0) for name in MOSFET_REGIONS], dtype=float)[regions]
+
+def _median_guess(guesses):
+    """
+    Combines per-curve guesses of a device into one by taking the median of every parameter, None if all are missing
+    """
+    guesses = [g for g in guesses if g is not None]
+    if not guesses:
+        return None
+    
+    return {k: float(np.median([g[k] for g in guesses])) for k in guesses[0]}
+
 class ModelExtractor:
-    def __init__(self, model):
+    def __init__(self, model, cache=None, guess='ml'):
         """
         ModelExtractor constructor for generic device model
 
         Args:
             model: Instance of device Model class
+            cache (ResultCache, optional): result cache checked before every fit, identical inputs skip the solver
+            guess (str, optional): initial guess strategy when a fit gets no initial_params, 'ml' (neural network
+                estimators), 'analytic' (closed-form pre-extraction), 'both' (whichever fits the data better) or 'none'
+                (fixed defaults), defaults to 'ml'
+
+        Raises:
+            ValueError: unknown guess strategy
         """
+        if guess not in GUESS_STRATEGIES:
+            raise ValueError(f"Unknown guess strategy '{guess}'. Available: {list(GUESS_STRATEGIES)}")
+        
         self.model = model
+        self.cache = cache
+        self.guess = guess
         self.result = None
         self.report = None
         
-    def _get_diode_ml_guess(self, V_data, I_data):
-        model_path = 'models/diode_model_weights.pth'
-        if not os.path.exists(model_path):
+    def _cache_key(self, mode, estimators, *parts):
+        """
+        Builds the content hash of a fit request, None when caching is disabled
+
+        Args:
+            mode (str): fit method name
+            estimators (list): ML estimator modes the fit may use for its initial guess, their weights are hashed
+            parts: input arrays, temperature and initial parameters of the fit
+        """
+        if self.cache is None:
             return None
         
-        try:
-            target_v = np.linspace(0, 1.0, 150)
-            sort_idx = np.argsort(V_data) # sort data to get interpolation to work
-            v_sort = V_data[sort_idx]
-            i_sort = I_data[sort_idx]
-            i_interp = np.interp(target_v, v_sort, i_sort)
-            i_log = np.log10(np.abs(i_interp) + 1e-15) # log transform to match training data preprocessing
-            inputs = torch.tensor(i_log, dtype=torch.float32).unsqueeze(0) # (1, 150)
+        model_version = f"{type(self.model).__name__}:{getattr(self.model, 'version', 0)}:{getattr(self.model, 'temp', None)}"
+        weights = [file_hash(ML_ESTIMATORS[e][0]) for e in estimators] if self.guess in ('ml', 'both') else []
+        
+        return make_key(mode, model_version, self.guess, weights, *parts)
+    
+    def _cached_report(self, key):
+        if key is None:
+            return None
+        
+        report = self.cache.get(key)
+        if report is not None: # solver skipped, there is no least squares result for this report
+            self.result = None
+            self.report = report
             
-            model = DiodeNet(input_size=150)
-            model.load_state_dict(torch.load(model_path))
-            model.eval()
+        return report
+    
+    def _store_report(self, key, report):
+        if key is not None:
+            self.cache.put(key, report)
+            
+    def _solve(self, residuals, x0, lower_bound, upper_bound, loss='linear', f_scale=1.0, solver='trf', max_iter=None):
+        """
+        Runs least squares or the IRLS fast path on a residual evaluator, analytic Jacobians are used when available,
+        max_iter caps the solver iterations, status 0 when reached
+
+        Raises:
+            ValueError: unknown loss or solver, or 'irls' requested for a model without analytic derivatives
+        """
+        if loss not in ROBUST_LOSSES:
+            raise ValueError(f"Unknown loss '{loss}'. Available: {list(ROBUST_LOSSES)}")
+        if solver not in SOLVERS:
+            raise ValueError(f"Unknown solver '{solver}'. Available: {list(SOLVERS)}")
+        
+        jac = residuals.jacobian if residuals.compute_jac is not None else '2-point'
+        x0 = np.clip(x0, lower_bound, upper_bound) # estimator guesses are not bounded
+        
+        if solver == 'irls':
+            if residuals.compute_jac is None:
+                raise ValueError("The 'irls' solver requires analytic model derivatives")
+            return _irls(residuals, jac, x0, lower_bound, upper_bound, loss=loss, f_scale=f_scale, max_iter=max_iter or 100)
+        
+        # solve for x / scale with a typical magnitude per parameter taken from its bounds (geometric mean for positive
+        # ranges): least_squares nudges x0 off the bounds by an absolute 1e-10, which would otherwise move parameters
+        # like I_s ~ 1e-12 (lower bound 1e-16) by decades before the first iteration
+        positive = lower_bound > 0
+        scale = np.where(positive, np.sqrt(np.abs(lower_bound * upper_bound)), upper_bound - lower_bound)
+        fun = lambda u: residuals(u * scale)
+        if residuals.compute_jac is not None:
+            jac = lambda u: residuals.jacobian(u * scale) * scale
+        bounds = (lower_bound / scale, upper_bound / scale)
+        
+        ls = least_squares(
+            fun,
+            x0 / scale,
+            jac=jac,
+            bounds=bounds,
+            method='trf',
+            loss=loss,
+            f_scale=f_scale,
+            max_nfev=max_iter + 1 if max_iter else None # a restart spends one evaluation on its start point
+        )
+        
+        ls.x = ls.x * scale
+        ls.jac = ls.jac / scale
+        
+        return ls
+        
+    def _solve_by_region(self, residuals, bias, x0, lower_bound, upper_bound, loss, f_scale, solver, region_weights,
+                         noise_floor, reclassify_every, max_rounds=20):
+        """
+        Runs _solve in chunks of reclassify_every iterations on a MOSFET residual with region weights, the regions of
+        the current estimate are recomputed between chunks. The fit ends once a chunk converges and the
+        regions of its result match the ones it was weighted with
+
+        Args:
+            residuals (_ResidualEvaluator): residual whose weights are replaced each round
+            bias (tuple): (V_gs, V_ds, I_data) arrays of the fitted points
+            region_weights (dict): weight per region name of MOSFET_REGIONS, 0 masks a region
+
+        Returns:
+            tuple: (result of the last chunk with nfev summed over all chunks, regions of the final estimate)
+        """
+        estimate = lambda x: {**residuals.params, **dict(zip(residuals.names, x))}
+        x, nfev = np.asarray(x0, dtype=float), 0
+        regions = _classify(self.model, *bias, estimate(x), noise_floor)
+        
+        for _ in range(max_rounds):
+            residuals.set_weights(_region_weights(regions, region_weights))
+            ls = self._solve(residuals, x, lower_bound, upper_bound, loss, f_scale, solver, max_iter=reclassify_every)
+            nfev += ls.nfev
+            x = ls.x
+            
+            previous, regions = regions, _classify(self.model, *bias, estimate(x), noise_floor)
+            if ls.status != 0 and np.array_equal(regions, previous):
+                break
+            
+        ls.nfev = nfev
+        return ls, regions
+        
+    def _mosfet_names(self, initial_params):
+        """
+        Fitted parameter names of the MOSFET model and the entries of initial_params it holds fixed, e.g. phi of the
+        EKV model
+        """
+        names = list(self.model.param_names)
+        return names, {k: initial_params[k] for k in self.model.defaults if k not in names}
+        
+    def ml_guess_batch(self, mode, curves):
+        """
+        Predicts initial guesses for several curves with a single forward pass of the neural network estimator
+
+        Args:
+            mode (str): 'diode', 'diode_cv', 'mosfet_transfer' or 'mosfet_output'
+            curves (list): list of tuples (x_data, y_data, bias), bias is V_ds for transfer and V_gs for output curves
+
+        Returns:
+            list: one parameter dict per curve, None entries if the estimator is unavailable or fails
+        """
+        model_path, net_cls, features, decode, label = ML_ESTIMATORS[mode]
+        if not os.path.exists(model_path):
+            return [None] * len(curves)
+        
+        try:
+            x = np.stack([features(np.asarray(v), np.asarray(y), bias) for v, y, bias in curves])
+            inputs = torch.tensor(x, dtype=torch.float32) # (n_curves, n_features)
+            model = _load_estimator(model_path, net_cls, x.shape[1])
             
             with torch.no_grad():
-                preds = model(inputs).numpy()[0]
+                preds = model(inputs).numpy()
                 
-            return {'I_s': 10 ** preds[0], 'n': preds[1], 'R_s': preds[2]}
+            return [decode(p) for p in preds]
         
         except Exception as e:
-            print(f"Diode I-V ML interference warning: {e}")
-            return None
+            print(f"{label} ML interference warning: {e}")
+            return [None] * len(curves)
+        
+    def guess_batch(self, mode, curves):
+        """
+        Initial guesses for several curves following the extractor's guess strategy
 
-    def diode_fit(self, V_data, I_data, T=None, initial_params=None):
+        Args:
+            mode (str): 'diode', 'diode_cv', 'mosfet_transfer' or 'mosfet_output'
+            curves (list): list of tuples (x_data, y_data, bias), bias is T for diode, V_ds for transfer and V_gs for
+                output curves
+
+        Returns:
+            list: one parameter dict per curve, None entries where no estimate is available
+        """
+        if self.guess == 'none':
+            return [None] * len(curves)
+        if self.guess == 'ml':
+            return self.ml_guess_batch(mode, curves)
+        if self.guess == 'analytic':
+            return analytic_guess_batch(mode, curves)
+        
+        # 'both': keep whichever guess lies closer to the data, curve by curve
+        ml = self.ml_guess_batch(mode, curves)
+        analytic = analytic_guess_batch(mode, curves)
+        use_ml = guess_cost(mode, curves, ml) < guess_cost(mode, curves, analytic)
+        
+        return [m if pick else a for m, a, pick in zip(ml, analytic, use_ml)]
+    
+    def _get_diode_ml_guess(self, V_data, I_data):
+        return self.ml_guess_batch('diode', [(V_data, I_data, None)])[0]
+
+    def diode_fit(self, V_data, I_data, T=None, initial_params=None, loss='linear', f_scale=0.1):
         """
         Fit a single I-V curve to extract saturation current, ideality factor and series resistance of a device
 
@@ -58,12 +480,19 @@ class ModelExtractor:
             I_data (scalar/numpy array): measured current
             T (float, optional): temperature in Kelvin, defaults to model temperature if None
             initial_params (dict, optional): initial guess for I_s, n and R_s
+            loss (str, optional): 'linear' (plain least squares), 'huber', 'soft_l1', 'cauchy' or 'arctan', defaults to 'linear'
+            f_scale (float, optional): relative error at which robust losses start to down-weight points, defaults to 0.1
 
         Returns:
             dict: report containing fitted parameters, errors and solver status
         """
+        key = self._cache_key('diode_fit', ['diode'], V_data, I_data, self.model.temp if T is None else T, initial_params, loss, f_scale)
+        cached = self._cached_report(key)
+        if cached is not None:
+            return cached
+        
         if initial_params is None:
-            ml_g = self._get_diode_ml_guess(V_data, I_data)
+            ml_g = self.guess_batch('diode', [(V_data, I_data, self.model.temp if T is None else T)])[0]
             if ml_g:
                 initial_params = ml_g
             else:
@@ -76,31 +505,22 @@ class ModelExtractor:
         if 'R_s' not in initial_params:
             initial_params['R_s'] = 0.1
         
-        def residuals(param_vector, V_data, I_data, T):
-            """
-            Calculates normalized current residuals
-            """
-            params = {'I_s': param_vector[0], 'n': param_vector[1], 'R_s': param_vector[2]}
-            I_guess = self.model.compute_current(V_data, params, T=T)
-            residual = (I_guess - I_data) / np.maximum(np.abs(I_data), 1e-15)
-            
-            return residual
+        # warm-started Newton solves between optimizer steps, always in float64 whatever the src.precision policy
+        sweep = self.model.prepare(V_data, T=T, dtype=np.float64)
+        residuals = _ResidualEvaluator(
+            sweep.current,
+            ['I_s', 'n', 'R_s'],
+            I_data
+        )
         
         x0 = np.array([initial_params['I_s'], initial_params['n'], initial_params['R_s']])
         bounds = self.model.get_param_bounds()
         lower_bound = np.array([bounds['I_s'][0], bounds['n'][0], bounds['R_s'][0]])
         upper_bound = np.array([bounds['I_s'][1], bounds['n'][1], bounds['R_s'][1]])
-        ls = least_squares(
-            residuals, 
-            x0, 
-            bounds=(lower_bound, upper_bound), 
-            args=(V_data, I_data, T), 
-            method='trf'
-        )
+        ls = self._solve(residuals, x0, lower_bound, upper_bound, loss, f_scale)
         
         ls_params = {'I_s': ls.x[0], 'n': ls.x[1], 'R_s': ls.x[2]}
-        I_fit = self.model.compute_current(V_data, ls_params, T=T)
-        res = (I_fit - I_data) / np.maximum(np.abs(I_data), 1e-15)
+        res = residuals(ls.x)
         rms_err = np.sqrt(np.mean(res**2))
         max_err = np.max(np.abs(res))
         
@@ -115,22 +535,33 @@ class ModelExtractor:
         
         self.result = ls
         self.report = report
+        self._store_report(key, report)
         
         return report
         
-    def diode_temp_fit(self, datasets, initial_params=None):
+    def diode_temp_fit(self, datasets, initial_params=None, loss='linear', f_scale=0.1):
         """
         Perform a simulatenous fit on multiple I-V datasets at different temperatures
 
         Args:
-            datasets (list): list ot tuples (V_data, I_data, T)
+            datasets (CurveSet/list): curves with the temperature as per-curve value, or list ot tuples (V_data, I_data, T)
             initial_params (dict, optional): initial guesses for I_s, Eg, n and R_s
+            loss (str, optional): 'linear' (plain least squares), 'huber', 'soft_l1', 'cauchy' or 'arctan', defaults to 'linear'
+            f_scale (float, optional): relative error at which robust losses start to down-weight points, defaults to 0.1
 
         Returns:
             dict: report contianing fitted gloabl parameters and combined RMS error
         """
         T_ref = 300.0
+        curves = as_curveset(datasets, names=('V', 'I', 'T'))
+        
+        key = self._cache_key('diode_temp_fit', [], curves.x, curves.y, curves.offsets, curves.values, initial_params, loss, f_scale)
+        cached = self._cached_report(key)
+        if cached is not None:
+            return cached
         
+        if initial_params is None and self.guess in ('analytic', 'both'): # there is no multi-temperature estimator network
+            initial_params = diode_temp_guess(curves, T_ref=T_ref)
         if initial_params is None:
             initial_params = {'I_s': 1e-12, 'Eg': 1.12, 'n': 1.0, 'R_s': 0.1}
             
@@ -143,35 +574,25 @@ class ModelExtractor:
         if 'R_s' not in initial_params:
             initial_params['R_s'] = 0.1
         
-        def Is_at_T(Is_ref, Eg, T):
-            return Is_ref * (T / T_ref)**3 * (np.exp(((Eg * q_e) / k_B) * (1/T_ref - 1/T)))
+        # curves are already packed, the residual is a single vectorized model call over all temperatures
+        V_all, I_all, temps, t_idx = curves.x, curves.y, curves.values, curves.curve_idx
+        T_all = temps[t_idx]
+        local_params = {}
         
-        def global_residuals(param_vector):
-            """
-            Calculates normalized current residuals
-            """
-            Is_ref, Eg, n, Rs = param_vector
-            residuals = []
-            
-            for V, I_measured, T in datasets:
-                Is_local = Is_at_T(Is_ref, Eg, T)
-                local_params = {'I_s': Is_local, 'n': n, 'R_s': Rs}
-                I_data = self.model.compute_current(V, local_params, T=T)
-                residual = (I_data - I_measured) / np.maximum(np.abs(I_measured), 1e-15)
-                residuals.append(residual)
-            
-            return np.concatenate(residuals)
+        def compute(params):
+            Is_T = self.model.compute_sat_current(params['I_s'], params['Eg'], temps, T_ref=T_ref) # one value per curve
+            local_params['I_s'] = Is_T[t_idx]
+            local_params['n'] = params['n']
+            local_params['R_s'] = params['R_s']
+            return self.model.compute_current(V_all, local_params, T=T_all, dtype=np.float64)
+        
+        global_residuals = _ResidualEvaluator(compute, ['I_s', 'Eg', 'n', 'R_s'], I_all)
         
         x0 = np.array([initial_params['I_s'], initial_params['Eg'], initial_params['n'], initial_params['R_s']])
         bounds = self.model.get_param_bounds()
         lower_bound = np.array([bounds['I_s'][0], bounds['Eg'][0], bounds['n'][0], bounds['R_s'][0]])
         upper_bound = np.array([bounds['I_s'][1], bounds['Eg'][1], bounds['n'][1], bounds['R_s'][1]])
-        ls = least_squares(
-            global_residuals, 
-            x0, 
-            bounds=(lower_bound, upper_bound),  
-            method='trf'
-        )
+        ls = self._solve(global_residuals, x0, lower_bound, upper_bound, loss, f_scale)
         
         ls_params = {'I_s': ls.x[0], 'Eg': ls.x[1], 'n': ls.x[2], 'R_s': ls.x[3]}
         res = global_residuals(ls.x)
@@ -187,39 +608,35 @@ class ModelExtractor:
         
         self.result = ls
         self.report = report
+        self._store_report(key, report)
         
         return report
     
     def _get_diode_cv_guess(self, V_data, C_data):
-        model_path = 'models/diode_cv_model_weights.pth'
-        if not os.path.exists(model_path):
-            return None
-        
-        try:
-            target_v = np.linspace(-5.0, 0.0, 150)
-            sort_idx = np.argsort(V_data) # sort data to get interpolation to work
-            v_sort = V_data[sort_idx]
-            c_sort = C_data[sort_idx]
-            c_interp = np.interp(target_v, v_sort, c_sort)
-            c_log = np.log10(np.abs(c_interp) + 1e-20) # log transform to match training data preprocessing
-            inputs = torch.tensor(c_log, dtype=torch.float32).unsqueeze(0) # (1, 150)
-            
-            model = DiodeNet(input_size=150)
-            model.load_state_dict(torch.load(model_path))
-            model.eval()
-            
-            with torch.no_grad():
-                preds = model(inputs).numpy()[0]
-                
-            return {'C_j': 10 ** preds[0], 'V_bi': preds[1], 'm': preds[2]}
-        
-        except Exception as e:
-            print(f"Diode C-V ML interference warning: {e}")
-            return None
+        return self.ml_guess_batch('diode_cv', [(V_data, C_data, None)])[0]
     
-    def diode_cv_fit(self, V_data, C_data, initial_params=None):
+    def diode_cv_fit(self, V_data, C_data, initial_params=None, loss='linear', f_scale=0.1, solver='trf'):
+        """
+        Fit a C-V curve to extract zero-bias junction capacitance, built-in potential and grading coefficient
+
+        Args:
+            V_data (scalar/numpy array): applied (reverse) voltage
+            C_data (scalar/numpy array): measured capacitance
+            initial_params (dict, optional): initial guesses for C_j, V_bi and m
+            loss (str, optional): 'linear' (plain least squares), 'huber', 'soft_l1', 'cauchy' or 'arctan', defaults to 'linear'
+            f_scale (float, optional): relative error at which robust losses start to down-weight points, defaults to 0.1
+            solver (str, optional): 'trf' (scipy least_squares) or 'irls' (iteratively reweighted fast path), defaults to 'trf'
+
+        Returns:
+            dict: report containing fitted parameters, errors and solver status
+        """
+        key = self._cache_key('diode_cv_fit', ['diode_cv'], V_data, C_data, initial_params, loss, f_scale, solver)
+        cached = self._cached_report(key)
+        if cached is not None:
+            return cached
+        
         if initial_params is None:
-            ml_g = self._get_diode_cv_guess(V_data, C_data)
+            ml_g = self.guess_batch('diode_cv', [(V_data, C_data, None)])[0]
             if ml_g:
                 initial_params = ml_g
             else:
@@ -232,26 +649,22 @@ class ModelExtractor:
         if 'm' not in initial_params:
             initial_params['m'] = 0.5
         
-        def residuals(param_vector, V_data, C_data):
-            local_params = {'C_j': param_vector[0], 'V_bi': param_vector[1], 'm': param_vector[2]}
-            C_guess = self.model.compute_capacitance(V_data, local_params)
-            residual = (C_guess - C_data) / np.maximum(np.abs(C_data), 1e-15)
-            return residual
+        sweep = self.model.prepare(V_data, dtype=np.float64)
+        residuals = _ResidualEvaluator(
+            sweep.capacitance,
+            ['C_j', 'V_bi', 'm'],
+            C_data,
+            compute_jac=lambda params: self.model.capacitance_jacobian(V_data, params)
+        )
         
         x0 = np.array([initial_params['C_j'], initial_params['V_bi'], initial_params['m']])
         bounds = self.model.get_param_bounds()
         lower_bound = np.array([bounds['C_j'][0], bounds['V_bi'][0], bounds['m'][0]])
         upper_bound = np.array([bounds['C_j'][1], bounds['V_bi'][1], bounds['m'][1]])
-        ls = least_squares(
-            residuals,
-            x0,
-            bounds=(lower_bound, upper_bound),
-            args=(V_data, C_data),
-            method='trf'
-        )
+        ls = self._solve(residuals, x0, lower_bound, upper_bound, loss, f_scale, solver)
         
         ls_params = {'C_j': ls.x[0], 'V_bi': ls.x[1], 'm': ls.x[2]}
-        res = residuals(ls.x, V_data, C_data)
+        res = residuals(ls.x)
         rms_err = np.sqrt(np.mean(res**2))
         
         report = {
@@ -264,115 +677,186 @@ class ModelExtractor:
         
         self.result = ls
         self.report = report
+        self._store_report(key, report)
         
         return report
     
-    def _get_mosfet_transfer_ml_guess(self, V_data, I_data, V_ds):
-        model_path = 'models/mosfet_transfer_model_weights.pth'
-        if not os.path.exists(model_path):
-            return None
+    def diode_joint_fit(self, iv_datasets, cv_datasets, initial_params=None, T_ref=300.0, loss='linear', f_scale=0.1,
+                        solver='trf'):
+        """
+        Fits I-V and C-V curves measured at several temperatures in one solve
+
+        Both kinds of curves share one parameter vector: I_s, n and R_s with the I_s(T) law of compute_sat_current,
+        C_j, V_bi and m with the SPICE V_bi(T) and C_j(T) laws, and a single Eg that enters both I_s(T) and V_bi(T).
+        The residual is one vectorized model call per kind over the packed curves, I-V rows depend only on I_s, Eg, n,
+        R_s and C-V rows only on Eg, C_j, V_bi, m, and the analytic Jacobian is assembled with that block structure
+
+        Args:
+            iv_datasets (CurveSet/list): I-V curves with the temperature as per-curve value, or list of tuples (V, I, T)
+            cv_datasets (CurveSet/list): C-V curves with the temperature as per-curve value, or list of tuples (V, C, T)
+            initial_params (dict, optional): initial guesses for I_s, Eg, n, R_s, C_j, V_bi and m at T_ref
+            T_ref (float, optional): reference temperature of the fitted parameters, defaults to 300 K
+            loss (str, optional): 'linear' (plain least squares), 'huber', 'soft_l1', 'cauchy' or 'arctan', defaults to 'linear'
+            f_scale (float, optional): relative error at which robust losses start to down-weight points, defaults to 0.1
+            solver (str, optional): 'trf' (scipy least_squares) or 'irls' (iteratively reweighted fast path), defaults to 'trf'
+
+        Returns:
+            dict: report containing fitted parameters, combined and per-kind RMS errors and solver status
+        """
+        iv = as_curveset(iv_datasets, names=('V', 'I', 'T'))
+        cv = as_curveset(cv_datasets, names=('V', 'C', 'T'))
         
-        try:
-            if np.ndim(V_ds) > 0:
-                vds = float(np.mean(V_ds))
-            else:
-                vds = float(V_ds)
-                
-            v_max = float(np.max(V_data))
-            target_v = np.linspace(0, v_max, 150)
-            sort_idx = np.argsort(V_data) # sort data to get interpolation to work
-            v_sort = V_data[sort_idx]
-            i_sort = I_data[sort_idx]
-            i_interp = np.interp(target_v, v_sort, i_sort)
-            i_log = np.log10(np.abs(i_interp) + 1e-15) # log transform to match training data preprocessing
-            
-            meta = np.array([vds / 5.0, v_max / 5.0])
-            features = np.concatenate([i_log, meta])
-            inputs = torch.tensor(features, dtype=torch.float32).unsqueeze(0) # (1, 152)
-            
-            model = MOSFETNet(input_size=152)
-            model.load_state_dict(torch.load(model_path))
-            model.eval()
-            
-            with torch.no_grad():
-                preds = model(inputs).numpy()[0]
-                
-            return {'V_th': preds[0], 'k_n': 10 ** preds[1], 'lam': preds[2]}
+        key = self._cache_key('diode_joint_fit', [], iv.x, iv.y, iv.offsets, iv.values, cv.x, cv.y, cv.offsets, cv.values,
+                              initial_params, T_ref, loss, f_scale, solver)
+        cached = self._cached_report(key)
+        if cached is not None:
+            return cached
         
-        except Exception as e:
-            print(f"MOSFET transfer ML interference warning: {e}")
-            return None
+        if initial_params is None and self.guess in ('analytic', 'both'): # there are no joint estimator networks
+            initial_params = diode_temp_guess(iv, T_ref=T_ref) or {}
+            cv_guesses = analytic_guess_batch('diode_cv', cv)
+            nearest = cv_guesses[int(np.argmin(np.abs(cv.values - T_ref)))] # V_bi drifts by about -2 mV/K
+            initial_params.update(nearest or _median_guess(cv_guesses) or {})
+        defaults = {'I_s': 1e-12, 'Eg': 1.12, 'n': 1.0, 'R_s': 0.1, 'C_j': 1e-12, 'V_bi': 0.7, 'm': 0.5}
+        initial_params = {**defaults, **(initial_params or {})}
         
-    def _get_mosfet_output_ml_guess(self, V_data, I_data, V_gs):
-        model_path = 'models/mosfet_output_model_weights.pth'
-        if not os.path.exists(model_path):
-            return None
+        names = list(defaults)
+        V_iv, T_iv, iv_idx = iv.x, iv.point_values, iv.curve_idx
+        V_cv, cv_idx = cv.x, cv.curve_idx
+        n_iv, n_cv = len(V_iv), len(V_cv)
+        t = (cv.values / T_ref)[cv_idx] # reduced temperature of every C-V point
+        iv_params, cv_params = {}, {}
         
-        try:
-            if np.ndim(V_gs) > 0:
-                vgs = float(np.mean(V_gs))
-            else:
-                vgs = float(V_gs)
-                
-            v_max = float(np.max(V_data))
-            target_v = np.linspace(0, v_max, 150)
-            sort_idx = np.argsort(V_data) # sort data to get interpolation to work
-            v_sort = V_data[sort_idx]
-            i_sort = I_data[sort_idx]
-            i_interp = np.interp(target_v, v_sort, i_sort)
-            i_log = np.log10(np.abs(i_interp) + 1e-15) # log transform to match training data preprocessing
-            
-            meta = np.array([vgs / 5.0, v_max / 5.0])
-            features = np.concatenate([i_log, meta])
-            inputs = torch.tensor(features, dtype=torch.float32).unsqueeze(0) # (1, 152)
+        def local(params):
+            # per-point parameters at the measurement temperatures, temperature laws evaluated once per curve
+            iv_params['I_s'] = self.model.compute_sat_current(params['I_s'], params['Eg'], iv.values, T_ref=T_ref)[iv_idx]
+            iv_params['n'] = params['n']
+            iv_params['R_s'] = params['R_s']
+            cv_params['V_bi'] = self.model.compute_bi_potential(params['V_bi'], params['Eg'], cv.values, T_ref=T_ref)[cv_idx]
+            cv_params['C_j'] = self.model.compute_zero_bias_cap(params['C_j'], params['V_bi'], params['m'], params['Eg'],
+                                                                cv.values, T_ref=T_ref)[cv_idx]
+            cv_params['m'] = params['m']
+        
+        def compute(params):
+            local(params)
+            y = np.empty(n_iv + n_cv)
+            y[:n_iv] = self.model.compute_current(V_iv, iv_params, T=T_iv, dtype=np.float64)
+            y[n_iv:] = self.model.compute_capacitance(V_cv, cv_params, dtype=np.float64)
+            return y
+        
+        def compute_jac(params):
+            local(params)
+            dI = self.model.current_jacobian(V_iv, iv_params, T=T_iv)
+            dC = self.model.capacitance_jacobian(V_cv, cv_params)
             
-            model = MOSFETNet(input_size=152)
-            model.load_state_dict(torch.load(model_path))
-            model.eval()
+            # chain rule through the temperature laws: dI_s(T)/dI_s = I_s(T) / I_s,
+            # dI_s(T)/dEg = I_s(T) q / k (1/T_ref - 1/T), dV_bi(T)/dV_bi = t, dV_bi(T)/dEg = 1 - t
+            # and C_j(T) = C_j (1 + m (4e-4 (T - T_ref) + 1 - V_bi(T) / V_bi))
+            dI_dIs = dI['I_s'] * iv_params['I_s']
+            ratio = cv_params['V_bi'] / params['V_bi']
+            dCj_dVbi = -params['C_j'] * params['m'] * (t - ratio) / params['V_bi']
+            dCj_dEg = -params['C_j'] * params['m'] * (1 - t) / params['V_bi']
+            dCj_dm = params['C_j'] * (4e-4 * (t - 1) * T_ref + 1 - ratio)
             
-            with torch.no_grad():
-                preds = model(inputs).numpy()[0]
-                
-            return {'V_th': preds[0], 'k_n': 10 ** preds[1], 'lam': preds[2]}
+            iv_zero, cv_zero = np.zeros(n_iv), np.zeros(n_cv)
+            return {
+                'I_s': np.concatenate([dI_dIs / params['I_s'], cv_zero]),
+                'Eg': np.concatenate([dI_dIs * (q_e / k_B) * (1 / T_ref - 1 / T_iv),
+                                      dC['C_j'] * dCj_dEg + dC['V_bi'] * (1 - t)]),
+                'n': np.concatenate([dI['n'], cv_zero]),
+                'R_s': np.concatenate([dI['R_s'], cv_zero]),
+                'C_j': np.concatenate([iv_zero, dC['C_j'] * cv_params['C_j'] / params['C_j']]),
+                'V_bi': np.concatenate([iv_zero, dC['C_j'] * dCj_dVbi + dC['V_bi'] * t]),
+                'm': np.concatenate([iv_zero, dC['m'] + dC['C_j'] * dCj_dm]),
+            }
         
-        except Exception as e:
-            print(f"MOSFET output ML interference warning: {e}")
-            return None
+        residuals = _ResidualEvaluator(compute, names, np.concatenate([iv.y, cv.y]), compute_jac=compute_jac)
+        
+        x0 = np.array([initial_params[k] for k in names])
+        bounds = self.model.get_param_bounds()
+        lower_bound = np.array([bounds[k][0] for k in names])
+        upper_bound = np.array([bounds[k][1] for k in names])
+        ls = self._solve(residuals, x0, lower_bound, upper_bound, loss, f_scale, solver)
+        
+        ls_params = dict(zip(names, ls.x.tolist()))
+        res = residuals(ls.x)
+        
+        report = {
+            'parameters': ls_params,
+            'rms_err': np.sqrt(np.mean(res**2)),
+            'rms_err_iv': np.sqrt(np.mean(res[:n_iv]**2)),
+            'rms_err_cv': np.sqrt(np.mean(res[n_iv:]**2)),
+            'success': ls.success,
+            'num_iters': ls.nfev,
+            'message': ls.message,
+        }
+        
+        self.result = ls
+        self.report = report
+        self._store_report(key, report)
+        
+        return report
+    
+    def _get_mosfet_transfer_ml_guess(self, V_data, I_data, V_ds):
+        return self.ml_guess_batch('mosfet_transfer', [(V_data, I_data, V_ds)])[0]
+        
+    def _get_mosfet_output_ml_guess(self, V_data, I_data, V_gs):
+        return self.ml_guess_batch('mosfet_output', [(V_data, I_data, V_gs)])[0]
 
-    def mosfet_fit(self, V_gs, I_data, V_ds, initial_params=None):
+    def mosfet_fit(self, V_gs, I_data, V_ds, initial_params=None, loss='linear', f_scale=0.1, solver='trf',
+                   region_weights=None, noise_floor=None, reclassify_every=10):
         """
-        Fit a single I-V curve to extract threshold voltage, transconductance, lambda, and drain-to-source voltage of a device
+        Fit a single I-V curve to extract threshold voltage, transconductance, lambda, and drain-to-source voltage of a device,
+        plus theta and gamma when the extractor holds an EKVMOSFETModel
+
+        Relative residuals are normalized by max(|I_data|, noise_floor), so points at the instrument floor cannot
+        dominate the fit. With region_weights the residual of each point is scaled by the weight of its operating
+        region, points at or below the noise floor count as cutoff, and the regions follow the parameter estimate: they are
+        recomputed every reclassify_every solver iterations until the fit converges on a stable classification
 
         Args:
             V_gs (scalar/numpy array): gate-to-source voltage
             I_data (scalar/numpy array): collected current values
             V_ds (scalar/numpy array): drain-to-source voltage
             initial_params (dict, optional): initial guesses for V_th, k_n, and lambda
+            loss (str, optional): 'linear' (plain least squares), 'huber', 'soft_l1', 'cauchy' or 'arctan', defaults to 'linear'
+            f_scale (float, optional): relative error at which robust losses start to down-weight points, defaults to 0.1
+            solver (str, optional): 'trf' (scipy least_squares) or 'irls' (iteratively reweighted fast path), defaults to 'trf'
+            region_weights (dict, optional): weight per region name of MOSFET_REGIONS, missing regions weigh 1 and 0
+                masks a region, unweighted if None
+            noise_floor (float, optional): measurement floor in A, the smallest residual normalization, defaults to 1e-15
+            reclassify_every (int, optional): solver iterations between region updates, defaults to 10
 
         Returns:
-            dict: report containing fitted parameters, errors and solver status
+            dict: report containing fitted parameters, unweighted errors and solver status, and the points per region
+            when region_weights is given
+
+        Raises:
+            ValueError: unknown region name
         """
+        key = self._cache_key('mosfet_fit', ['mosfet_transfer', 'mosfet_output'], V_gs, I_data, V_ds, initial_params, loss, f_scale, solver,
+                              region_weights, noise_floor, reclassify_every)
+        cached = self._cached_report(key)
+        if cached is not None:
+            return cached
+        
         if initial_params is None:
             is_transfer = np.std(V_gs) > np.std(V_ds)
             ml_g = None
             if is_transfer:
-                ml_g = self._get_mosfet_transfer_ml_guess(V_gs, I_data, V_ds)
+                ml_g = self.guess_batch('mosfet_transfer', [(V_gs, I_data, V_ds)])[0]
             else:
-                ml_g = self._get_mosfet_output_ml_guess(V_ds, I_data, V_gs)
+                ml_g = self.guess_batch('mosfet_output', [(V_ds, I_data, V_gs)])[0]
             
             if ml_g:
                 initial_params = ml_g
             else:
                 initial_params = {'V_th': 0.5, 'k_n': 1e-4, 'lam': 0.0}
             
-        if 'V_th' not in initial_params:
-            initial_params['V_th'] = 0.5
-        if 'k_n' not in initial_params:
-            initial_params['k_n'] = 1e-4
-        if 'lam' not in initial_params:
-            initial_params['lam'] = 0.0
+        for name, value in {'V_th': 0.5, 'k_n': 1e-4, **self.model.defaults}.items():
+            initial_params.setdefault(name, value)
             
-        I_check = self.model.compute_current(V_gs, initial_params)
+        I_check = self.model.compute_current(V_gs, initial_params, V_ds=V_ds, dtype=np.float64)
         if np.all(I_check <= 1e-15) and np.any(I_data > 1e-9):
             print("Warning: initial guess places devices in cutoff, adjusting v_th")
             pos_vgs = V_gs[V_gs > 0]
@@ -381,31 +865,31 @@ class ModelExtractor:
             else:
                 initial_params['V_th'] = 0.5
             
-        def residuals(param_vector, V_gs, I_data, V_ds):
-            """
-            Calculates normalized current residuals
-            """
-            params = {'V_th': param_vector[0], 'k_n': param_vector[1], 'lam': param_vector[2], 'V_ds': V_ds}
-            I_guess = self.model.compute_current(V_gs, params)
-            residual = (I_guess - I_data) / np.maximum(np.abs(I_data), 1e-15)
-            
-            return residual
+        names, fixed = self._mosfet_names(initial_params)
+        floor = noise_floor or 1e-15
+        sweep = self.model.prepare(V_gs, V_ds, dtype=np.float64)
+        residuals = _ResidualEvaluator(
+            sweep.current,
+            names,
+            I_data,
+            fixed=fixed,
+            compute_jac=sweep.jacobian,
+            floor=floor
+        )
         
-        x0 = np.array([initial_params['V_th'], initial_params['k_n'], initial_params['lam']])
+        x0 = np.array([initial_params[name] for name in names])
         bounds = self.model.get_param_bounds()
-        lower_bound = np.array([bounds['V_th'][0], bounds['k_n'][0], bounds['lam'][0]])
-        upper_bound = np.array([bounds['V_th'][1], bounds['k_n'][1], bounds['lam'][1]])
-        ls = least_squares(
-            residuals, 
-            x0, 
-            bounds=(lower_bound, upper_bound), 
-            args=(V_gs, I_data, V_ds), 
-            method='trf'
-        )
+        lower_bound = np.array([bounds[name][0] for name in names])
+        upper_bound = np.array([bounds[name][1] for name in names])
+        if region_weights:
+            bias = np.broadcast_arrays(*[np.asarray(a, dtype=float) for a in (V_gs, V_ds, I_data)])
+            ls, regions = self._solve_by_region(residuals, bias, x0, lower_bound, upper_bound, loss, f_scale, solver,
+                                                region_weights, noise_floor, reclassify_every)
+        else:
+            ls = self._solve(residuals, x0, lower_bound, upper_bound, loss, f_scale, solver)
         
-        ls_params = {'V_th': ls.x[0], 'k_n': ls.x[1], 'lam': ls.x[2], 'V_ds': V_ds}
-        I_fit = self.model.compute_current(V_gs, ls_params)
-        res = (I_fit - I_data) / np.maximum(np.abs(I_data), 1e-15)
+        ls_params = {**dict(zip(names, ls.x)), **fixed, 'V_ds': V_ds}
+        res = (sweep.current(ls_params) - I_data) / np.maximum(np.abs(I_data), floor)
         rms_err = np.sqrt(np.mean(res**2))
         max_err = np.max(np.abs(res))
         
@@ -417,72 +901,79 @@ class ModelExtractor:
             'num_iters': ls.nfev,
             'message': ls.message,
         }
+        if region_weights:
+            report['regions'] = dict(zip(MOSFET_REGIONS, np.bincount(regions.ravel(), minlength=len(MOSFET_REGIONS)).tolist()))
         
         self.result = ls
         self.report = report
+        self._store_report(key, report)
         
         return report
     
-    def multi_mosfet_fit(self, datasets, initial_params=None):
+    def multi_mosfet_fit(self, datasets, initial_params=None, loss='linear', f_scale=0.1, solver='trf'):
         """
         Fits multiple I-V curves to extract threshold voltage, transconductance and lambda of a device
 
         Args:
-            datasets (list): list ot tuples (V_ds, I_measured, V_gs)
+            datasets (CurveSet/list): curves with V_gs as per-curve value, or list ot tuples (V_ds, I_measured, V_gs)
             initial_params (dict, optional): initial guesses for V_th, k_n and lam
+            loss (str, optional): 'linear' (plain least squares), 'huber', 'soft_l1', 'cauchy' or 'arctan', defaults to 'linear'
+            f_scale (float, optional): relative error at which robust losses start to down-weight points, defaults to 0.1
+            solver (str, optional): 'trf' (scipy least_squares) or 'irls' (iteratively reweighted fast path), defaults to 'trf'
 
         Returns:
             dict: report containing fitted parameters, errors and solver status
         """
+        curves = as_curveset(datasets, names=('V_ds', 'I_d', 'V_gs'))
+        key = self._cache_key('multi_mosfet_fit', ['mosfet_output'], curves.x, curves.y, curves.offsets, curves.values, initial_params, loss, f_scale, solver)
+        cached = self._cached_report(key)
+        if cached is not None:
+            return cached
+        
         if initial_params is None:
-            try: # make guess using higheest v_gs
-                best_idx = np.argmax([d[2] for d in datasets])
-                v_ds, i, v_gs = datasets[best_idx]
-                ml_g = self._get_mosfet_output_ml_guess(v_ds, i, v_gs)
+            if self.guess == 'analytic':
+                initial_params = _median_guess(analytic_guess_batch('mosfet_output', curves))
+            elif self.guess in ('ml', 'both'):
+                try: # make guess using higheest v_gs
+                    v_ds, i, v_gs = curves[np.argmax(curves.values)]
+                    ml_g = self.ml_guess_batch('mosfet_output', [(v_ds, i, v_gs)])[0]
+                    
+                    if ml_g:
+                        initial_params = ml_g
+                except Exception as e:
+                    print(f"Multi-curve ML guess failed: {e}")
                 
-                if ml_g:
-                    initial_params = ml_g
-            except Exception as e:
-                print(f"Multi-curve ML guess failed: {e}")
+                if self.guess == 'both':
+                    analytic = _median_guess(analytic_guess_batch('mosfet_output', curves))
+                    candidates = [initial_params, analytic]
+                    costs = [np.sum(guess_cost('mosfet_output', curves, [g] * len(curves))) for g in candidates]
+                    initial_params = candidates[int(np.argmin(costs))]
                 
             if initial_params is None:
                 initial_params = {'V_th': 0.5, 'k_n': 1e-4, 'lam': 0.0}
             
-        if 'V_th' not in initial_params:
-            initial_params['V_th'] = 0.5
-        if 'k_n' not in initial_params:
-            initial_params['k_n'] = 1e-4
-        if 'lam' not in initial_params:
-            initial_params['lam'] = 0.0
-            
-        def global_residuals(param_vector):
-            """
-            Calculates normalized current residuals
-            """
-            V_th, k_n, lam = param_vector
-            residuals = []
+        for name, value in {'V_th': 0.5, 'k_n': 1e-4, **self.model.defaults}.items():
+            initial_params.setdefault(name, value)
             
-            for V_ds, I_measured, V_gs in datasets:
-                local_params = {'V_th': V_th, 'k_n': k_n, 'lam': lam, 'V_ds': V_ds}
-                Vgs_array = np.full_like(V_ds, V_gs)
-                I_data = self.model.compute_current(Vgs_array, local_params)
-                residual = (I_data - I_measured) / np.maximum(np.abs(I_measured), 1e-15)
-                residuals.append(residual)
-            
-            return np.concatenate(residuals)
+        # curves are already packed, the residual is a single vectorized model call over the whole family
+        Vds_all, I_all, Vgs_all = curves.x, curves.y, curves.point_values
+        names, fixed = self._mosfet_names(initial_params)
+        sweep = self.model.prepare(Vgs_all, Vds_all, dtype=np.float64)
+        global_residuals = _ResidualEvaluator(
+            sweep.current,
+            names,
+            I_all,
+            fixed=fixed,
+            compute_jac=sweep.jacobian
+        )
         
-        x0 = np.array([initial_params['V_th'], initial_params['k_n'], initial_params['lam']])
+        x0 = np.array([initial_params[name] for name in names])
         bounds = self.model.get_param_bounds()
-        lower_bound = np.array([bounds['V_th'][0], bounds['k_n'][0], bounds['lam'][0]])
-        upper_bound = np.array([bounds['V_th'][1], bounds['k_n'][1], bounds['lam'][1]])
-        ls = least_squares(
-            global_residuals, 
-            x0, 
-            bounds=(lower_bound, upper_bound), 
-            method='trf'
-        )
+        lower_bound = np.array([bounds[name][0] for name in names])
+        upper_bound = np.array([bounds[name][1] for name in names])
+        ls = self._solve(global_residuals, x0, lower_bound, upper_bound, loss, f_scale, solver)
         
-        ls_params = {'V_th': ls.x[0], 'k_n': ls.x[1], 'lam': ls.x[2]}
+        ls_params = {**dict(zip(names, ls.x)), **fixed}
         res = global_residuals(ls.x)
         rms_err = np.sqrt(np.mean(res**2))
         
@@ -496,6 +987,94 @@ class ModelExtractor:
         
         self.result = ls
         self.report = report
+        self._store_report(key, report)
+        
+        return report
+        
+    def mosfet_surface_fit(self, V_gs, V_ds=None, I_d=None, initial_params=None, region_weights=None, loss='linear',
+                           f_scale=0.1, solver='trf', noise_floor=None, reclassify_every=10):
+        """
+        Fits the MOSFET model parameters (V_th, k_n and lam for Level 1) to a whole measured V_gs x V_ds surface in one
+        solve
+
+        The points may be a full grid, several transfer and output sweeps mixed together or scattered bias points. The
+        model is evaluated on every point in one broadcast call of a prepared sweep and its analytic Jacobian is used. Points are assigned to the cutoff, triode and saturation regions of the parameter estimate, and
+        region_weights scales their relative residuals, e.g. to balance a surface dominated by saturation points. The
+        regions are recomputed every reclassify_every solver iterations, see mosfet_fit
+
+        Args:
+            V_gs (numpy array/DataFrame): gate-to-source voltage of every point, the V_gs axis of a grid, or a table
+                with columns V_gs, V_ds and I_d when V_ds and I_d are None
+            V_ds (numpy array, optional): drain-to-source voltage of every point or the V_ds axis of a grid
+            I_d (numpy array, optional): measured drain current, one per point or (n_vgs, n_vds) for a grid
+            initial_params (dict, optional): initial guesses for V_th, k_n and lam
+            region_weights (dict, optional): weight per region name of MOSFET_REGIONS, missing regions weigh 1
+            loss (str, optional): 'linear' (plain least squares), 'huber', 'soft_l1', 'cauchy' or 'arctan', defaults to 'linear'
+            f_scale (float, optional): relative error at which robust losses start to down-weight points, defaults to 0.1
+            solver (str, optional): 'trf' (scipy least_squares) or 'irls' (iteratively reweighted fast path), defaults to 'trf'
+            noise_floor (float, optional): measurement floor in A, the smallest residual normalization, defaults to 1e-15
+            reclassify_every (int, optional): solver iterations between region updates, defaults to 10
+
+        Returns:
+            dict: report containing fitted parameters, unweighted errors, points per region and solver status
+
+        Raises:
+            ValueError: unknown region name
+        """
+        if V_ds is None and I_d is None:
+            V_gs, V_ds, I_d = V_gs['V_gs'], V_gs['V_ds'], V_gs['I_d']
+        V_gs, V_ds, I_d = _surface_points(V_gs, V_ds, I_d)
+        
+        key = self._cache_key('mosfet_surface_fit', [], V_gs, V_ds, I_d, initial_params, region_weights, loss, f_scale, solver,
+                              noise_floor, reclassify_every)
+        cached = self._cached_report(key)
+        if cached is not None:
+            return cached
+        
+        if initial_params is None and self.guess in ('analytic', 'both'): # the estimator networks take single curves
+            initial_params = mosfet_surface_guess(V_gs, V_ds, I_d)
+        initial_params = {'V_th': 0.5, 'k_n': 1e-4, **self.model.defaults, **(initial_params or {})}
+        
+        names, fixed = self._mosfet_names(initial_params)
+        floor = noise_floor or 1e-15
+        sweep = self.model.prepare(V_gs, V_ds, dtype=np.float64)
+        residuals = _ResidualEvaluator(
+            sweep.current,
+            names,
+            I_d,
+            fixed=fixed,
+            compute_jac=sweep.jacobian,
+            floor=floor
+        )
+        
+        x0 = np.array([initial_params[name] for name in names])
+        bounds = self.model.get_param_bounds()
+        lower_bound = np.array([bounds[name][0] for name in names])
+        upper_bound = np.array([bounds[name][1] for name in names])
+        if region_weights:
+            ls, regions = self._solve_by_region(residuals, (V_gs, V_ds, I_d), x0, lower_bound, upper_bound, loss,
+                                                f_scale, solver, region_weights, noise_floor, reclassify_every)
+        else:
+            ls = self._solve(residuals, x0, lower_bound, upper_bound, loss, f_scale, solver)
+            regions = None
+        
+        ls_params = {**dict(zip(names, ls.x)), **fixed}
+        if regions is None:
+            regions = _classify(self.model, V_gs, V_ds, I_d, ls_params, noise_floor)
+        res = (sweep.current(ls_params) - I_d) / np.maximum(np.abs(I_d), floor)
+        
+        report = {
+            'parameters': ls_params,
+            'rms_err': np.sqrt(np.mean(res**2)),
+            'max_err': np.max(np.abs(res)),
+            'regions': dict(zip(MOSFET_REGIONS, np.bincount(regions, minlength=len(MOSFET_REGIONS)).tolist())),
+            'success': ls.success,
+            'num_iters': ls.nfev,
+            'message': ls.message,
+        }
+        
+        self.result = ls
+        self.report = report
+        self._store_report(key, report)
         
         return report
-    
\ No newline at end of file
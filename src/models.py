@@ -4,12 +4,212 @@
 # n: ideality factor
 # V_t: threshold voltage
 
+import collections
 import numpy as np
 import torch
 import torch.nn as nn
 from scipy.constants import k as k_B, e as q_e
 
-class DiodeModel():
+from src.precision import resolve_dtype, solve_rtol
+
+def _solve_shockley(V, I_s, R_s, inv_vt, I):
+    """
+    Newton-Raphson solve of I = I_s * (exp((V - I * R_s) / (n * V_t)) - 1) in place on I, which holds the start point
+
+    The solve runs in the dtype of I, a point converges once its step drops below 1e-12 A, in float32 also once it
+    drops below src.precision.solve_rtol of the current since larger currents cannot resolve 1e-12 A
+
+    Args:
+        V, I_s, R_s, inv_vt (numpy arrays): applied voltage, parameters and 1 / (n * V_t), broadcastable to I, in the
+            dtype of I
+        I (numpy array): initial current, overwritten with the solution
+
+    Returns:
+        Numpy array: I
+    """
+    shape = I.shape
+    gain = I_s * R_s * inv_vt
+    active = np.ones(shape, dtype=bool) # points still iterating, converged points are frozen
+    pending = np.empty(shape, dtype=bool)
+    rtol = solve_rtol(I.dtype)
+    
+    # work buffers are allocated once per call and reused by every iteration through out= ufuncs
+    arg = np.empty(shape, dtype=I.dtype)
+    exp_arg = np.empty(shape, dtype=I.dtype)
+    f_val = np.empty(shape, dtype=I.dtype)
+    step = np.empty(shape, dtype=I.dtype)
+
+    for _ in range(50):
+        np.multiply(I, R_s, out=arg)
+        np.subtract(V, arg, out=arg) # diode voltage V - I * R_s
+        np.multiply(arg, inv_vt, out=arg)
+        np.clip(arg, -50, 50, out=arg) # prevent exponential overflow
+        np.exp(arg, out=exp_arg)
+        np.subtract(exp_arg, 1, out=f_val)
+        np.multiply(f_val, I_s, out=f_val)
+        np.subtract(f_val, I, out=f_val) # f = I_s * (exp(arg) - 1) - I
+        np.multiply(exp_arg, gain, out=step)
+        np.add(step, 1, out=step) # -df = I_s * exp(arg) * R_s / (n * V_t) + 1, never singular
+        np.divide(f_val, step, out=step) # Newton step I_new - I = -f / df
+        np.add(I, step, out=I, where=active)
+        np.abs(step, out=step)
+        if rtol:
+            np.abs(I, out=arg) # arg is free until the next iteration
+            np.multiply(arg, rtol, out=arg)
+            np.add(arg, 1e-12, out=arg)
+            np.greater_equal(step, arg, out=pending)
+        else:
+            np.greater_equal(step, 1e-12, out=pending)
+        np.logical_and(active, pending, out=active)
+
+        if not active.any():
+            break
+
+    return I
+
+def _as_param_sets(param_sets):
+    """
+    Columnar form {name: 1-D array} of a list of parameter dicts or a dict of arrays, scalars in a dict are shared by
+    every set
+    """
+    if not isinstance(param_sets, dict):
+        param_sets = list(param_sets)
+        return {k: np.array([p[k] for p in param_sets], dtype=float) for k in param_sets[0]}
+    
+    if all(np.ndim(v) == 0 for v in param_sets.values()): # a single set still gets its set axis
+        return {k: np.atleast_1d(np.asarray(v, dtype=float)) for k, v in param_sets.items()}
+    
+    return {k: np.asarray(v, dtype=float) for k, v in param_sets.items()} # lists become arrays, float64 arrays are not copied
+
+def _param_sets(params, names, defaults, dtype=np.dtype(np.float64)):
+    """
+    Parameter values of a prepared sweep as broadcastable arrays, 1-D arrays hold one entry per parameter set and become
+    (n_sets, 1) columns against the flattened points. Arrays are cast to the dtype of the sweep, numpy float64 scalars
+    to a scalar of that dtype since they would otherwise promote a float32 sweep
+
+    Returns:
+        tuple: (list of arrays in the order of names, number of sets or None when every parameter is a scalar)
+    """
+    values = []
+    n_sets = None
+    for name in names:
+        value = params[name] if name in params or name not in defaults else defaults[name]
+        if isinstance(value, (float, int)): # plain scalars (also numpy float64) need no conversion in float64
+            values.append(value if dtype == np.float64 else dtype.type(value))
+            continue
+        
+        value = np.asarray(value, dtype=dtype)
+        if value.ndim:
+            if n_sets is not None and value.shape[0] != n_sets:
+                raise ValueError(f"Parameter '{name}' has {value.shape[0]} sets, expected {n_sets}")
+            n_sets = value.shape[0]
+            value = value.reshape(-1, 1)
+        values.append(value)
+        
+    return values, n_sets
+
+class _PreparedPlans:
+    """
+    Small LRU of prepared sweeps keyed by the grid contents, repeated grids (training, tester sweeps) skip preparation
+    """
+    max_entries = 16
+    
+    def _prepared(self, cls, *arrays, dtype=None):
+        plans = self.__dict__.setdefault('_plans', collections.OrderedDict())
+        dtype = resolve_dtype(dtype)
+        arrays = [np.asarray(a, dtype=float) for a in arrays]
+        key = (cls.__name__, dtype.str) + tuple((a.shape, a.tobytes()) for a in arrays)
+        
+        plan = plans.get(key)
+        if plan is None:
+            plan = plans[key] = cls(*arrays, dtype=dtype)
+            if len(plans) > self.max_entries:
+                plans.popitem(last=False)
+        else:
+            plans.move_to_end(key)
+            plan.reset()
+            
+        return plan
+
+class DiodeSweep:
+    def __init__(self, V, T, dtype=np.float64):
+        """
+        Diode evaluation plan for a fixed voltage grid and temperature, see DiodeModel.prepare
+
+        Args:
+            V (numpy array): applied voltage, any shape
+            T (float/numpy array): temperature in Kelvin, broadcastable to V
+            dtype (numpy dtype, optional): evaluation precision, defaults to float64
+        """
+        self.dtype = np.dtype(dtype)
+        self.V = np.asarray(V, dtype=self.dtype)
+        self.shape = self.V.shape
+        self._v = self.V.ravel()
+        inv_kT = q_e / (k_B * np.broadcast_to(np.asarray(T, dtype=float), self.shape)) # 1 / V_t at n = 1
+        self._inv_kT = inv_kT.ravel().astype(self.dtype, copy=False)
+        self._warm = None
+    
+    def reset(self):
+        """
+        Forgets the previous solution so the next evaluation starts from zero current
+        """
+        self._warm = None
+    
+    def _shape_out(self, flat, n_sets):
+        return flat.reshape(self.shape if n_sets is None else (n_sets,) + self.shape)
+        
+    def current(self, params):
+        """
+        Diode current for one parameter set, or for many when the parameters are 1-D arrays of equal length
+
+        The Newton iteration starts from the previous solution, consecutive optimizer steps or Monte Carlo chunks differ
+        little so a few iterations suffice instead of a solve from zero. When the number of sets changed, the first
+        previous set seeds every new one
+
+        Args:
+            params (dict): I_s, n and optionally R_s, scalars or arrays of n_sets values
+
+        Returns:
+            Numpy array: current shaped like V, or (n_sets, *V.shape) for parameter arrays
+        """
+        (I_s, n, R_s), n_sets = _param_sets(params, ['I_s', 'n', 'R_s'], {'R_s': 0.0}, self.dtype)
+        inv_vt = self._inv_kT / n
+        shape = (len(self._v),) if n_sets is None else (n_sets, len(self._v))
+        
+        if self._warm is None:
+            I = np.zeros(shape, dtype=self.dtype)
+        elif self._warm.shape == shape:
+            I = self._warm.copy()
+        else:
+            I = np.array(np.broadcast_to(self._warm.reshape(-1, shape[-1])[0], shape))
+        _solve_shockley(self._v, I_s, R_s, inv_vt, I)
+        self._warm = I.copy() # the caller may modify the returned array in place
+        
+        return self._shape_out(I, n_sets)
+    
+    def capacitance(self, params):
+        """
+        Junction capacitance for one parameter set, or for many when the parameters are 1-D arrays of equal length
+
+        Args:
+            params (dict): C_j, V_bi and optionally m, scalars or arrays of n_sets values
+
+        Returns:
+            Numpy array: capacitance shaped like V, or (n_sets, *V.shape) for parameter arrays
+        """
+        (C_j, V_bi, m), n_sets = _param_sets(params, ['C_j', 'V_bi', 'm'], {'m': 0.5}, self.dtype)
+        C = np.empty(np.broadcast_shapes(self._v.shape, np.shape(C_j), np.shape(V_bi), np.shape(m)), dtype=self.dtype)
+        np.divide(self._v, V_bi, out=C) # single output buffer, every following step is done in place
+        np.subtract(1, C, out=C)
+        np.maximum(C, 1e-3, out=C)
+        np.power(C, m, out=C)
+        np.divide(C_j, C, out=C)
+        
+        return self._shape_out(C, n_sets)
+
+class DiodeModel(_PreparedPlans):
+    version = 1 # bump when the model equations change, invalidates cached extraction results
+    
     def __init__(self, T=300):
         """
         Class constructor for a generic diode device
@@ -19,62 +219,181 @@ class DiodeModel():
         """
         self.temp = T
         
-    def compute_current(self, V, params, T=None):
+    def compute_current(self, V, params, T=None, dtype=None):
         """
         Comptue diode current using Shockley equation with Newton-Raphson iteration to account for series resistance
 
+        All points are solved together, V, the parameters and T may be arrays of any broadcast-compatible shapes
+        (e.g. a per-point temperature and saturation current for a packed multi-temperature dataset)
+
         Args:
             V (scalar/numpy array): applied voltage
             params (dict): model parameters including saturation current, ideality, and series resistance
-            T (float, optional): temperature in Kelvin, defaults to model's temperature if None
+            T (float/numpy array, optional): temperature in Kelvin, defaults to model's temperature if None
+            dtype (numpy dtype, optional): evaluation precision, the src.precision policy (float64 unless changed) if
+                None
 
         Returns:
             Numpy array: calculated current at each voltage point
         """
-        I_s = params['I_s']
-        n = params['n']
-        R_s = params.get('R_s', 0.0)
-        
+        dtype = resolve_dtype(dtype)
+        I_s = np.asarray(params['I_s'], dtype=dtype)
+        n = np.asarray(params['n'], dtype=float)
+        R_s = np.asarray(params.get('R_s', 0.0), dtype=dtype)
+
         if T is None:
             T = self.temp
-            
-        V = np.asarray(V)
+
+        V = np.asarray(V, dtype=dtype)
+        T = np.asarray(T, dtype=float)
+        shape = np.broadcast_shapes(V.shape, I_s.shape, n.shape, R_s.shape, T.shape)
+
+        inv_vt = (q_e / (n * k_B * T)).astype(dtype, copy=False) # 1 / (n * V_t), formed in float64
+        I = np.zeros(shape, dtype=dtype)
         
-        def solve_current(V):
-            I = 0.0
-            
-            for _ in range(50):
-                Vd = V - I * R_s
-                arg = np.clip(q_e * Vd / (n * k_B * T), -50, 50) # prevent exponential overflow
-                f_val = I_s * (np.exp(arg) - 1) - I
-                df_val = -(I_s * np.exp(arg) * R_s * q_e / (n * k_B * T)) - 1
-                
-                if abs(df_val) < 1e-15:
-                    break
-                
-                I_new = I - f_val / df_val
-                
-                if abs(I_new - I) < 1e-12:
-                    return I_new
-                
-                I = I_new
-                
-            return I
-        
-        solve_vec = np.vectorize(solve_current, otypes=[float])(V)
-        return solve_vec
+        return _solve_shockley(V, I_s, R_s, inv_vt, I)
+    
+    def compute_current_sets(self, V, param_sets, T=None, dtype=None):
+        """
+        Diode current of many parameter sets on one voltage grid in a single vectorized call
+
+        Args:
+            V (scalar/numpy array): applied voltage
+            param_sets (dict/list): {name: array of n_sets values} (scalars are shared by all sets) or a list of dicts
+            T (float/numpy array, optional): temperature in Kelvin, defaults to model's temperature if None
+            dtype (numpy dtype, optional): evaluation precision, the src.precision policy if None
+
+        Returns:
+            Numpy array: current of shape (n_sets, *V.shape)
+        """
+        return self.prepare(V, T=T, dtype=dtype).current(_as_param_sets(param_sets))
+    
+    def compute_capacitance_sets(self, V, param_sets, dtype=None):
+        """
+        Junction capacitance of many parameter sets on one voltage grid in a single vectorized call
+
+        Args:
+            V (scalar/numpy array): applied voltage
+            param_sets (dict/list): {name: array of n_sets values} (scalars are shared by all sets) or a list of dicts
+            dtype (numpy dtype, optional): evaluation precision, the src.precision policy if None
+
+        Returns:
+            Numpy array: capacitance of shape (n_sets, *V.shape)
+        """
+        return self.prepare(V, dtype=dtype).capacitance(_as_param_sets(param_sets))
+    
+    def prepare(self, V, T=None, dtype=None):
+        """
+        Returns the evaluation plan of a voltage grid, plans are kept per grid and dtype so repeated sweeps reuse them
+
+        Args:
+            V (scalar/numpy array): applied voltage
+            T (float/numpy array, optional): temperature in Kelvin, defaults to model's temperature if None
+            dtype (numpy dtype, optional): evaluation precision, the src.precision policy if None
+
+        Returns:
+            DiodeSweep: plan with current(params) and capacitance(params)
+        """
+        return self._prepared(DiodeSweep, V, self.temp if T is None else T, dtype=dtype)
     
     def compute_sat_current(self, Is, Eg, T, T_ref=300):
         return Is * (T / T_ref)**3 * np.exp(((Eg * q_e) / k_B) * (1/T_ref - 1/T))
     
-    def compute_capacitance(self, V, params):
+    def compute_bi_potential(self, V_bi, Eg, T, T_ref=300):
+        """
+        Built-in potential at temperature T, SPICE junction law with the temperature-independent band gap of
+        compute_sat_current: V_bi(T) = V_bi T / T_ref - 3 V_t ln(T / T_ref) - Eg (T / T_ref - 1)
+        """
+        t = T / T_ref
+        return V_bi * t - 3 * (k_B * T / q_e) * np.log(t) - Eg * (t - 1)
+    
+    def compute_zero_bias_cap(self, C_j, V_bi, m, Eg, T, T_ref=300):
+        """
+        Zero-bias junction capacitance at temperature T, SPICE law C_j (1 + m (4e-4 (T - T_ref) - (V_bi(T) / V_bi - 1)))
+        """
+        return C_j * (1 + m * (4e-4 * (T - T_ref) - (self.compute_bi_potential(V_bi, Eg, T, T_ref) / V_bi - 1)))
+    
+    def current_jacobian(self, V, params, T=None):
+        """
+        Analytic derivatives of compute_current with respect to I_s, n and R_s, by implicit differentiation of the
+        Shockley equation with series resistance at the solved current
+
+        Args:
+            V (scalar/numpy array): applied voltage
+            params (dict): model parameters including saturation current, ideality, and series resistance
+            T (float/numpy array, optional): temperature in Kelvin, defaults to model's temperature if None
+
+        Returns:
+            Dict: dI/dI_s, dI/dn and dI/dR_s, each an array with the broadcast shape of the inputs
+        """
+        I = self.compute_current(V, params, T=T, dtype=np.float64)
+        I_s = np.asarray(params['I_s'], dtype=float)
+        n = np.asarray(params['n'], dtype=float)
+        R_s = np.asarray(params.get('R_s', 0.0), dtype=float)
+        T = np.asarray(self.temp if T is None else T, dtype=float)
+        
+        inv_vt = q_e / (n * k_B * T)
+        arg = np.clip((np.asarray(V, dtype=float) - I * R_s) * inv_vt, -50, 50)
+        branch = I_s * np.exp(arg)
+        denom = 1 + branch * R_s * inv_vt # -dF/dI of F = I_s (exp(arg) - 1) - I, dI/dp = (dF/dp) / denom
+        
+        return {
+            'I_s': (branch / I_s - 1) / denom,
+            'n': -branch * arg / n / denom,
+            'R_s': -branch * I * inv_vt / denom,
+        }
+    
+    def compute_capacitance(self, V, params, dtype=None):
+        """
+        Compute junction capacitance C_j / (1 - V / V_bi)^m, clamped near the built-in potential
+
+        Args:
+            V (scalar/numpy array): applied voltage
+            params (dict): model parameters including zero-bias capacitance, built-in potential and grading coefficient
+            dtype (numpy dtype, optional): evaluation precision, the src.precision policy if None
+
+        Returns:
+            Numpy array: calculated capacitance at each voltage point
+        """
+        dtype = resolve_dtype(dtype)
+        C_j = np.asarray(params['C_j'], dtype=dtype)
+        V_bi = np.asarray(params['V_bi'], dtype=dtype)
+        m = np.asarray(params.get('m', 0.5), dtype=dtype)
+        V = np.asarray(V, dtype=dtype)
+        Cj = np.empty(np.broadcast_shapes(V.shape, V_bi.shape, m.shape, C_j.shape), dtype=dtype)
+        np.divide(V, V_bi, out=Cj) # single output buffer, every following step is done in place
+        np.subtract(1, Cj, out=Cj)
+        np.maximum(Cj, 1e-3, out=Cj)
+        np.power(Cj, m, out=Cj)
+        np.divide(C_j, Cj, out=Cj)
+        return Cj if Cj.ndim else Cj[()]
+    
+    def capacitance_jacobian(self, V, params):
+        """
+        Analytic derivatives of compute_capacitance with respect to its parameters
+
+        Args:
+            V (scalar/numpy array): applied voltage
+            params (dict): model parameters including zero-bias capacitance, built-in potential and grading coefficient
+
+        Returns:
+            Dict: dC/dC_j, dC/dV_bi and dC/dm, each an array shaped like V
+        """
         C_j = params['C_j']
         V_bi = params['V_bi']
         m = params.get('m', 0.5)
-        V = np.asarray(V)
-        arg = 1 - V / V_bi
-        Cj = C_j / np.power(np.maximum(arg, 1e-3), m)
-        return Cj
+        V = np.asarray(V, dtype=float)
+        
+        u_raw = 1 - V / V_bi
+        u = np.maximum(u_raw, 1e-3)
+        dC_dCj = u**(-m)
+        C = C_j * dC_dCj
+        
+        return {
+            'C_j': dC_dCj,
+            'V_bi': np.where(u_raw > 1e-3, -m * C / u * V / V_bi**2, 0.0), # du/dV_bi = V / V_bi^2, zero on the clamp
+            'm': -C * np.log(u),
+        }
     
     def get_param_bounds(self):
         """
@@ -136,8 +455,95 @@ class MOSFETNet(nn.Module):
 # V_DS: drain-to-soruce voltage
 # k_n: transconductance
 # lambda: channel-length modulation parameter
+
+MOSFET_REGIONS = ('cutoff', 'triode', 'saturation') # region codes 0, 1 and 2 of MOSFETModel.classify_regions
+
+def _level1_kernel(V_gs, V_ds, V_th, k_n, lam, jacobian=False):
+    """
+    Drain current of the Level 1 model, and its derivatives with respect to V_th, k_n and lam
+
+    All three regions are evaluated in a single pass without masking. Every argument broadcasts against the others,
+    see _ekv_kernel, and the arithmetic stays in the dtype of the inputs
+
+    Returns:
+        Numpy array, or dict {name: array} of the current ('I') and its derivatives when jacobian is True
+    """
+    # Cutoff: V_GS <= V_TH, overdrive clips to zero so the current vanishes
+    V_ov = np.maximum(V_gs - V_th, 0.0)
+    
+    # Triode: 0 < V_DS < V_GS - V_TH, clipping V_DS to the pinch-off voltage turns the triode expression into
+    # 1/2 k_n (V_GS - V_TH)**2 for the saturation region
+    V_ch = np.minimum(np.maximum(V_ds, 0.0), V_ov)
+    shape = V_ov * V_ch
+    shape -= 0.5 * V_ch**2
+    
+    # Saturation: V_DS >= V_GS - V_TH, apply channel-length modulation
+    sat = V_ds >= V_ov
+    clm = np.where(sat, 1 + lam * V_ds, 1.0)
+    I = k_n * shape * clm
+    if not jacobian:
+        return I
+    
+    # d(shape)/dV_ov = V_ch in both triode and saturation, and dV_ov/dV_th = -1 above threshold
+    return {
+        'I': I,
+        'V_th': -k_n * V_ch * clm,
+        'k_n': shape * clm,
+        'lam': k_n * shape * np.where(sat, V_ds, 0.0),
+    }
+        
+class MOSFETSweep:
+    def __init__(self, V_gs, V_ds, dtype=np.float64):
+        """
+        Level 1 evaluation plan for fixed V_gs and V_ds points, see MOSFETModel.prepare
+
+        Args:
+            V_gs (numpy array): gate-to-source voltage
+            V_ds (numpy array): drain-to-source voltage, broadcastable against V_gs
+            dtype (numpy dtype, optional): evaluation precision, defaults to float64
+        """
+        self.dtype = np.dtype(dtype)
+        V_gs, V_ds = np.broadcast_arrays(np.asarray(V_gs, dtype=self.dtype), np.asarray(V_ds, dtype=self.dtype))
+        self.shape = V_gs.shape
+        self._vgs = V_gs.ravel().copy()
+        self._vds = V_ds.ravel().copy()
+        
+    def reset(self):
+        pass # stateless, kept for the common plan interface
+    
+    def _shape_out(self, flat, n_sets):
+        return flat.reshape(self.shape if n_sets is None else (n_sets,) + self.shape)
+    
+    def _evaluate(self, params, jacobian):
+        values, n_sets = _param_sets(params, ['V_th', 'k_n', 'lam'], {'lam': 0.0}, self.dtype)
+        return _level1_kernel(self._vgs, self._vds, *values, jacobian=jacobian), n_sets
         
-class MOSFETModel:
+    def current(self, params):
+        """
+        Drain current for one parameter set, or for many when the parameters are 1-D arrays of equal length
+
+        Args:
+            params (dict): V_th, k_n and optionally lam, scalars or arrays of n_sets values
+
+        Returns:
+            Numpy array: current shaped like the grid, or (n_sets, *grid shape) for parameter arrays
+        """
+        I, n_sets = self._evaluate(params, False)
+        return self._shape_out(I, n_sets)
+    
+    def jacobian(self, params):
+        """
+        Derivatives of current with respect to V_th, k_n and lam, same shapes as current
+        """
+        derivs, n_sets = self._evaluate(params, True)
+        shape = np.shape(derivs['I']) # a per-set k_n or lam leaves the set axis off some derivatives
+        return {name: self._shape_out(np.broadcast_to(derivs[name], shape), n_sets) for name in MOSFETModel.param_names}
+
+class MOSFETModel(_PreparedPlans):
+    version = 1 # bump when the model equations change, invalidates cached extraction results
+    param_names = ('V_th', 'k_n', 'lam') # fitted by the extractor, in the order of its parameter vector
+    defaults = {'lam': 0.0}
+    
     def __init__(self, T=300):
         """
         Class constructor for a generic MOSFET device
@@ -147,35 +553,126 @@ class MOSFETModel:
         """
         self.temp = T
         
-    def compute_current(self, V_gs, params, T=None):
+    def compute_current(self, V_gs, params, T=None, V_ds=None, dtype=None):
+        """
+        Compute drain current of the Level 1 model, all three regions are evaluated in a single pass without masking
+
+        V_gs, V_ds and the parameters broadcast against each other, so a transfer curve, an output curve, a packed
+        family or a full surface all come from one call
+
+        Args:
+            V_gs (scalar/numpy array): gate-to-source voltage
+            params (dict): model parameters including threshold voltage, transconductance and lambda
+            T (float, optional): temperature in Kelvin, unused by the Level 1 model
+            V_ds (scalar/numpy array, optional): drain-to-source voltage, falls back to params['V_ds'] if None
+            dtype (numpy dtype, optional): evaluation precision, the src.precision policy if None
+
+        Returns:
+            Numpy array: calculated drain current with the broadcast shape of the inputs
+        """
+        dtype = resolve_dtype(dtype)
+        V_th = np.asarray(params['V_th'], dtype=dtype)
+        k_n = np.asarray(params['k_n'], dtype=dtype)
+        lam = np.asarray(params.get('lam', 0.0), dtype=dtype)
+        
+        if V_ds is None:
+            V_ds = params['V_ds']
+        
+        V_gs = np.asarray(V_gs, dtype=dtype)
+        V_ds = np.asarray(V_ds, dtype=dtype)
+        
+        return _level1_kernel(V_gs, V_ds, V_th, k_n, lam)
+    
+    def current_jacobian(self, V_gs, params, T=None, V_ds=None):
+        """
+        Analytic derivatives of compute_current with respect to V_th, k_n and lam, broadcast like compute_current
+
+        Args:
+            V_gs (scalar/numpy array): gate-to-source voltage
+            params (dict): model parameters including threshold voltage, transconductance and lambda
+            T (float, optional): temperature in Kelvin, unused by the Level 1 model
+            V_ds (scalar/numpy array, optional): drain-to-source voltage, falls back to params['V_ds'] if None
+
+        Returns:
+            Dict: dI/dV_th, dI/dk_n and dI/dlam, each an array with the broadcast shape of the inputs
+        """
         V_th = params['V_th']
         k_n = params['k_n']
-        V_ds = params['V_ds']
         lam = params.get('lam', 0.0)
         
-        V_gs = np.asarray(V_gs)
-        I_d = np.zeros_like(V_gs, dtype=float)
+        if V_ds is None:
+            V_ds = params['V_ds']
         
-        if np.ndim(V_ds) == 0:
-            V_ds = np.full_like(V_gs, V_ds)
+        V_gs = np.asarray(V_gs, dtype=float)
+        V_ds = np.asarray(V_ds, dtype=float)
         
-        # Cutoff: V_GS <= V_TH, no code needed since I_D will be zero by default
-            
-        # Triode: V_GS > V_TH, 0 < V_DS < VGS - VTH
-        triode = (V_gs > V_th) & (V_ds > 0) & (V_gs - V_th > V_ds)
-        if np.any(triode):
-            vgs_triode = V_gs[triode]
-            vds_triode = V_ds[triode]
-            I_d[triode] = k_n * ((vgs_triode - V_th) * vds_triode - 0.5 * vds_triode**2)
-            
-        # Saturation: V_GS > V_TH, V_DS >= V_GS - V_TH
-        saturation = (V_gs > V_th) & (V_ds >= V_gs - V_th)
-        if np.any(saturation):
-            vgs_sat = V_gs[saturation]
-            vds_sat = V_ds[saturation]
-            I_d[saturation] = 0.5 * k_n * (vgs_sat - V_th)**2 * (1 + lam * vds_sat)
-            
-        return I_d
+        derivs = _level1_kernel(V_gs, V_ds, V_th, k_n, lam, jacobian=True)
+        return {name: derivs[name] for name in self.param_names}
+    
+    def classify_regions(self, V_gs, V_ds, params):
+        """
+        Level 1 operating region of every bias point as an index into MOSFET_REGIONS, with the same boundaries as
+        compute_current: cutoff for V_gs <= V_th, saturation for V_ds >= V_gs - V_th, triode otherwise
+
+        Args:
+            V_gs (scalar/numpy array): gate-to-source voltage
+            V_ds (scalar/numpy array): drain-to-source voltage, broadcastable against V_gs
+            params (dict): model parameters including threshold voltage
+
+        Returns:
+            Numpy array: int8 region codes with the broadcast shape of V_gs and V_ds
+        """
+        V_ov = np.asarray(V_gs, dtype=float) - params['V_th']
+        return np.where(V_ov <= 0, 0, np.where(np.asarray(V_ds, dtype=float) >= V_ov, 2, 1)).astype(np.int8)
+    
+    def compute_current_sets(self, V_gs, param_sets, V_ds, T=None, dtype=None):
+        """
+        Drain current of many parameter sets on the same bias points in a single vectorized call
+
+        Args:
+            V_gs (scalar/numpy array): gate-to-source voltage
+            param_sets (dict/list): {name: array of n_sets values} (scalars are shared by all sets) or a list of dicts
+            V_ds (scalar/numpy array): drain-to-source voltage, broadcastable against V_gs
+            T (float, optional): temperature in Kelvin, unused by the Level 1 model
+            dtype (numpy dtype, optional): evaluation precision, the src.precision policy if None
+
+        Returns:
+            Numpy array: current of shape (n_sets, *bias shape)
+        """
+        return self.prepare(V_gs, V_ds, dtype=dtype).current(_as_param_sets(param_sets))
+    
+    def prepare(self, V_gs, V_ds, dtype=None):
+        """
+        Returns the evaluation plan of a set of bias points, plans are kept per grid and dtype so repeated sweeps reuse
+        them
+
+        Args:
+            V_gs (scalar/numpy array): gate-to-source voltage
+            V_ds (scalar/numpy array): drain-to-source voltage, broadcastable against V_gs
+            dtype (numpy dtype, optional): evaluation precision, the src.precision policy if None
+
+        Returns:
+            MOSFETSweep: plan with current(params) and jacobian(params)
+        """
+        return self._prepared(MOSFETSweep, V_gs, V_ds, dtype=dtype)
+    
+    def compute_grid(self, V_gs, V_ds, params, T=None, dtype=None):
+        """
+        Compute drain current over the full V_gs x V_ds grid in one call
+
+        Args:
+            V_gs (numpy array): gate-to-source voltages, one per row
+            V_ds (numpy array): drain-to-source voltages, one per column
+            params (dict): model parameters including threshold voltage, transconductance and lambda
+            T (float, optional): temperature in Kelvin, unused by the Level 1 model
+            dtype (numpy dtype, optional): evaluation precision, the src.precision policy if None
+
+        Returns:
+            Numpy array: drain current of shape (n_vgs, n_vds)
+        """
+        V_gs = np.asarray(V_gs, dtype=float).reshape(-1, 1)
+        V_ds = np.asarray(V_ds, dtype=float).reshape(1, -1)
+        return self.compute_current(V_gs, params, T=T, V_ds=V_ds, dtype=dtype)
     
     def get_param_bounds(self):
         """
@@ -189,4 +686,217 @@ class MOSFETModel:
             'k_n': (1e-9, 1e-1),
             'lam': (0.0, 0.5)
         }
-        
\ No newline at end of file
+        
+# EKV-style smooth MOSFET, long channel with the bulk referenced to the source
+# V_TH0 = V_TH + gamma * (sqrt(phi + V_SB) - sqrt(phi)): body effect
+# n = 1 + gamma / (2 * sqrt(phi + V_SB)): slope factor, held at its source-side value
+# V_P = (V_GS - V_TH0) / n: pinch-off voltage
+# i_f = ln(1 + exp(V_P / (2 U_t)))**2, i_r = ln(1 + exp((V_P - V_DS) / (2 U_t)))**2: forward and reverse inversion
+# I_D = 2 n k_n U_t**2 (i_f - i_r) (1 + lambda * V_DS) / (1 + theta * 2 n U_t sqrt(i_f))
+
+# U_t: thermal voltage k T / q
+# gamma: body-effect coefficient, phi: surface potential 2 phi_F, see MOSFETPhysics.body_effect_params
+# theta: mobility degradation, 2 n U_t sqrt(i_f) is the smoothed overdrive V_GS - V_TH0 in strong inversion
+
+# One expression covers weak inversion (exponential with n U_t ln(10) volts per decade), the triode and saturation
+# regions of strong inversion and the transitions between them. With gamma = theta = 0 and V_GS well above V_TH it is
+# the Level 1 model, except that channel-length modulation applies in triode as well
+
+EKV_PARAMS = ('V_th', 'k_n', 'lam', 'theta', 'gamma', 'phi')
+EKV_DEFAULTS = {'lam': 0.0, 'theta': 0.0, 'gamma': 0.0, 'phi': 0.7}
+
+def _ekv_kernel(V_gs, V_ds, V_sb, U_t, V_th, k_n, lam, theta, gamma, phi, jacobian=False):
+    """
+    Drain current of the EKV-style model, and its derivatives with respect to V_th, k_n, lam, theta and gamma
+
+    Every argument broadcasts against the others, so one call serves a single curve, a surface or (n_sets, 1)
+    parameter columns against flattened bias points. The arithmetic stays in the dtype of the inputs
+
+    Returns:
+        Numpy array, or dict {name: array} of the current ('I') and its derivatives when jacobian is True
+    """
+    root = np.sqrt(np.maximum(phi + V_sb, 1e-6)) # forward body bias beyond phi would leave the model
+    n = 1 + gamma / (2 * root)
+    V_p = (V_gs - V_th - gamma * (root - np.sqrt(phi))) / n
+    
+    a = 1 / (2 * U_t)
+    s_f = np.logaddexp(0, V_p * a) # sqrt(i_f), softplus written without overflow
+    s_r = np.logaddexp(0, (V_p - V_ds) * a)
+    i_spec = 2 * n * U_t**2
+    clm = 1 + lam * V_ds
+    V_ov = 2 * n * U_t * s_f
+    mob = 1 + theta * V_ov
+    shape = i_spec * (s_f**2 - s_r**2) / mob
+    I = k_n * shape * clm
+    if not jacobian:
+        return I
+    
+    # d(s)/dV_p is a * sigmoid, and dV_ov/dV_p = n sigmoid(V_p a) with n held
+    g_f = 1 / (1 + np.exp(-V_p * a))
+    g_r = 1 / (1 + np.exp((V_ds - V_p) * a))
+    dI_dVp = (k_n * clm * i_spec * 2 * a * (s_f * g_f - s_r * g_r) - I * theta * n * g_f) / mob
+    dI_dn = I / (n * mob) # at fixed V_p, through i_spec and the smoothed overdrive
+    
+    return {
+        'I': I,
+        'V_th': -dI_dVp / n,
+        'k_n': shape * clm,
+        'lam': k_n * shape * V_ds,
+        'theta': -I * V_ov / mob,
+        'gamma': dI_dVp * (-(root - np.sqrt(phi)) - V_p / (2 * root)) / n + dI_dn / (2 * root),
+    }
+
+class EKVMOSFETSweep:
+    def __init__(self, V_gs, V_ds, V_sb, T, dtype=np.float64):
+        """
+        EKV evaluation plan for fixed bias points and temperature, see EKVMOSFETModel.prepare
+
+        Args:
+            V_gs (numpy array): gate-to-source voltage
+            V_ds (numpy array): drain-to-source voltage, broadcastable against V_gs
+            V_sb (numpy array): source-to-bulk voltage, broadcastable against V_gs
+            T (float): temperature in Kelvin
+            dtype (numpy dtype, optional): evaluation precision, defaults to float64
+        """
+        self.dtype = np.dtype(dtype)
+        arrays = np.broadcast_arrays(*[np.asarray(a, dtype=self.dtype) for a in (V_gs, V_ds, V_sb)])
+        self.shape = arrays[0].shape
+        self._vgs, self._vds, self._vsb = [a.ravel().copy() for a in arrays]
+        self._ut = self.dtype.type(k_B * float(T) / q_e)
+        
+    def reset(self):
+        pass # stateless, kept for the common plan interface
+    
+    def _shape_out(self, flat, n_sets):
+        return flat.reshape(self.shape if n_sets is None else (n_sets,) + self.shape)
+    
+    def _evaluate(self, params, jacobian):
+        values, n_sets = _param_sets(params, EKV_PARAMS, EKV_DEFAULTS, self.dtype)
+        return _ekv_kernel(self._vgs, self._vds, self._vsb, self._ut, *values, jacobian=jacobian), n_sets
+        
+    def current(self, params):
+        """
+        Drain current for one parameter set, or for many when the parameters are 1-D arrays of equal length
+
+        Args:
+            params (dict): V_th, k_n and optionally lam, theta, gamma and phi, scalars or arrays of n_sets values
+
+        Returns:
+            Numpy array: current shaped like the grid, or (n_sets, *grid shape) for parameter arrays
+        """
+        I, n_sets = self._evaluate(params, False)
+        return self._shape_out(I, n_sets)
+    
+    def jacobian(self, params):
+        """
+        Derivatives of current with respect to V_th, k_n, lam, theta and gamma, same shapes as current
+        """
+        derivs, n_sets = self._evaluate(params, True)
+        return {name: self._shape_out(derivs[name], n_sets) for name in EKVMOSFETModel.param_names}
+
+class EKVMOSFETModel(_PreparedPlans):
+    version = 1 # bump when the model equations change, invalidates cached extraction results
+    param_names = ('V_th', 'k_n', 'lam', 'theta', 'gamma') # fitted, phi is held at its given value
+    defaults = dict(EKV_DEFAULTS)
+    
+    def __init__(self, T=300):
+        """
+        Class constructor for a MOSFET with the EKV-style smooth model
+
+        Args:
+            T (int, optional): temperature, defaults to 300.
+        """
+        self.temp = T
+        
+    def _bias(self, V_gs, V_ds, V_sb, T, dtype):
+        dtype = resolve_dtype(dtype)
+        U_t = dtype.type(k_B * (self.temp if T is None else T) / q_e)
+        return [np.asarray(v, dtype=dtype) for v in (V_gs, V_ds, V_sb)] + [U_t], dtype
+    
+    def compute_current(self, V_gs, params, T=None, V_ds=None, dtype=None, V_sb=0.0):
+        """
+        Compute drain current of the EKV-style model, one smooth expression for every region
+
+        Args:
+            V_gs (scalar/numpy array): gate-to-source voltage
+            params (dict): V_th, k_n and optionally lam, theta, gamma and phi (defaults in EKV_DEFAULTS)
+            T (float, optional): temperature in Kelvin, the model temperature if None
+            V_ds (scalar/numpy array, optional): drain-to-source voltage, falls back to params['V_ds'] if None
+            dtype (numpy dtype, optional): evaluation precision, the src.precision policy if None
+            V_sb (scalar/numpy array, optional): source-to-bulk voltage, defaults to 0
+
+        Returns:
+            Numpy array: calculated drain current with the broadcast shape of the inputs
+        """
+        bias, dtype = self._bias(V_gs, params['V_ds'] if V_ds is None else V_ds, V_sb, T, dtype)
+        values = [np.asarray(params.get(name, EKV_DEFAULTS.get(name)), dtype=dtype) for name in EKV_PARAMS]
+        return _ekv_kernel(*bias, *values)
+    
+    def current_jacobian(self, V_gs, params, T=None, V_ds=None, V_sb=0.0):
+        """
+        Analytic derivatives of compute_current with respect to the fitted parameters, broadcast like compute_current
+
+        Returns:
+            Dict: dI/dV_th, dI/dk_n, dI/dlam, dI/dtheta and dI/dgamma
+        """
+        bias, dtype = self._bias(V_gs, params['V_ds'] if V_ds is None else V_ds, V_sb, T, np.float64)
+        values = [params.get(name, EKV_DEFAULTS.get(name)) for name in EKV_PARAMS]
+        derivs = _ekv_kernel(*bias, *values, jacobian=True)
+        shape = np.shape(derivs['I'])
+        return {name: np.broadcast_to(derivs[name], shape).copy() for name in self.param_names}
+    
+    def classify_regions(self, V_gs, V_ds, params, V_sb=0.0):
+        """
+        Operating region of every bias point as an index into MOSFET_REGIONS: cutoff for weak inversion
+        (V_gs <= V_th0 with body effect), saturation for V_ds >= V_p, triode otherwise. The model current is smooth
+        across these boundaries, the regions only group points for weighting
+
+        Returns:
+            Numpy array: int8 region codes with the broadcast shape of V_gs and V_ds
+        """
+        gamma, phi = params.get('gamma', 0.0), params.get('phi', EKV_DEFAULTS['phi'])
+        root = np.sqrt(np.maximum(phi + np.asarray(V_sb, dtype=float), 1e-6))
+        V_p = (np.asarray(V_gs, dtype=float) - params['V_th'] - gamma * (root - np.sqrt(phi))) / (1 + gamma / (2 * root))
+        return np.where(V_p <= 0, 0, np.where(np.asarray(V_ds, dtype=float) >= V_p, 2, 1)).astype(np.int8)
+    
+    def compute_current_sets(self, V_gs, param_sets, V_ds, T=None, dtype=None, V_sb=0.0):
+        """
+        Drain current of many parameter sets on the same bias points in a single vectorized call
+
+        Returns:
+            Numpy array: current of shape (n_sets, *bias shape)
+        """
+        return self.prepare(V_gs, V_ds, V_sb=V_sb, T=T, dtype=dtype).current(_as_param_sets(param_sets))
+    
+    def prepare(self, V_gs, V_ds, V_sb=0.0, T=None, dtype=None):
+        """
+        Returns the evaluation plan of a set of bias points, plans are kept per grid, temperature and dtype
+
+        Returns:
+            EKVMOSFETSweep: plan with current(params) and jacobian(params)
+        """
+        return self._prepared(EKVMOSFETSweep, V_gs, V_ds, V_sb, self.temp if T is None else T, dtype=dtype)
+    
+    def compute_grid(self, V_gs, V_ds, params, T=None, dtype=None):
+        """
+        Compute drain current over the full V_gs x V_ds grid in one call, shape (n_vgs, n_vds)
+        """
+        V_gs = np.asarray(V_gs, dtype=float).reshape(-1, 1)
+        V_ds = np.asarray(V_ds, dtype=float).reshape(1, -1)
+        return self.compute_current(V_gs, params, T=T, V_ds=V_ds, dtype=dtype)
+    
+    def get_param_bounds(self):
+        """
+        Returns standard bounds for EKV MOSFET parameters
+
+        Returns:
+            Dict: Level 1 ranges plus mobility degradation, body effect and surface potential
+        """
+        return {
+            'V_th': (0.1, 5.0),
+            'k_n': (1e-9, 1e-1),
+            'lam': (0.0, 0.5),
+            'theta': (0.0, 5.0),
+            'gamma': (0.0, 3.0),
+            'phi': (0.3, 1.2),
+        }
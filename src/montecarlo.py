@@ -0,0 +1,137 @@
+# Monte Carlo corner analysis over extracted parameter distributions
+# Parameters are sampled jointly from a multivariate normal (log-normal for scale parameters such as I_s and k_n)
+# with the correlation measured over a device population. The model is evaluated for a chunk of parameter sets at a
+# time through a prepared sweep, so 100k samples never need more than one chunk of intermediate buffers, and the
+# corner curves are per-point percentiles of the stored results
+
+import numpy as np
+
+from src.models import _as_param_sets
+
+# parameters spread over decades, sampled as log-normal
+LOG_PARAMS = ('I_s', 'k_n', 'C_j')
+
+def population_stats(param_sets, log_params=LOG_PARAMS):
+    """
+    Nominal values, spreads and correlation of parameters extracted over a device population
+
+    Args:
+        param_sets (list/dict): one parameter dict per device, or {name: array of per-device values}
+        log_params (tuple, optional): parameters whose statistics are taken in natural log space
+
+    Returns:
+        dict: 'nominal' (median per parameter), 'sigma' (standard deviation, of ln(value) for log parameters) and
+              'corr' (correlation matrix in the order of 'nominal', computed in the same spaces)
+    """
+    columns = _as_param_sets(param_sets)
+    names = list(columns)
+    space = np.column_stack([np.log(columns[k]) if k in log_params else columns[k] for k in names])
+
+    sigma = space.std(axis=0, ddof=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = np.corrcoef(space, rowvar=False) if len(names) > 1 else np.ones((1, 1))
+    corr = np.where(np.isfinite(corr), corr, 0.0) # constant parameters are uncorrelated
+    np.fill_diagonal(corr, 1.0)
+
+    return {
+        'nominal': {k: float(np.median(columns[k])) for k in names},
+        'sigma': dict(zip(names, sigma.tolist())),
+        'corr': corr,
+    }
+
+def sample_parameters(nominal, sigma, corr=None, n_samples=100_000, log_params=LOG_PARAMS, bounds=None, seed=None):
+    """
+    Draws correlated parameter sets around a nominal device
+
+    Args:
+        nominal (dict): nominal parameter values
+        sigma (dict): standard deviation per parameter, of ln(value) for log parameters (0.1 is about 10% spread),
+            parameters missing from sigma are held at their nominal value
+        corr (numpy array, optional): correlation matrix in the order of sigma's keys, uncorrelated if None
+        n_samples (int, optional): number of parameter sets, defaults to 100000
+        log_params (tuple, optional): parameters sampled as log-normal
+        bounds (dict, optional): (lower, upper) per parameter, samples are clipped into them, e.g. model.get_param_bounds()
+        seed (int, optional): random seed
+
+    Returns:
+        dict: {name: array of n_samples values} for every parameter in nominal
+
+    Raises:
+        ValueError: correlation matrix of the wrong shape or not positive definite
+    """
+    rng = np.random.default_rng(seed)
+    names = list(sigma)
+    corr = np.eye(len(names)) if corr is None else np.asarray(corr, dtype=float)
+    if corr.shape != (len(names), len(names)):
+        raise ValueError(f"Correlation matrix of shape {corr.shape} does not match {len(names)} parameters")
+
+    try:
+        L = np.linalg.cholesky(corr)
+    except np.linalg.LinAlgError:
+        raise ValueError("Correlation matrix is not positive definite")
+
+    z = rng.standard_normal((n_samples, len(names))) @ L.T
+    samples = {k: np.full(n_samples, float(v)) for k, v in nominal.items()}
+    for col, name in enumerate(names):
+        spread = sigma[name] * z[:, col]
+        samples[name] = nominal[name] * np.exp(spread) if name in log_params else nominal[name] + spread
+
+    for name, (lower, upper) in (bounds or {}).items():
+        if name in samples:
+            np.clip(samples[name], lower, upper, out=samples[name])
+
+    return samples
+
+def monte_carlo(compute, samples, percentiles=(0.135, 50.0, 99.865), chunk_size=2000, dtype=np.float32):
+    """
+    Evaluates a model for every sampled parameter set and reduces the results to corner curves
+
+    Args:
+        compute (callable): maps {name: array of n values} to an (n, *grid) array, e.g. model.prepare(V).current, a
+            prepared sweep warm-starts each chunk from the previous one
+        samples (dict): {name: array of n_samples values}, e.g. from sample_parameters
+        percentiles (tuple, optional): per-point percentiles to report, defaults to the median and +-3 sigma
+        chunk_size (int, optional): parameter sets evaluated per call, bounds the size of the work buffers, defaults
+            to 2000
+        dtype (numpy dtype, optional): storage type of the results, defaults to float32 (60 MB for 100k x 150 points)
+
+    Returns:
+        dict: 'percentiles' {p: curve}, 'mean' and 'std' curves, and 'values', the stored (n_samples, *grid) results
+    """
+    n_samples = len(next(iter(samples.values())))
+    values = None
+
+    for start in range(0, n_samples, chunk_size):
+        chunk = {k: v[start:start + chunk_size] for k, v in samples.items()}
+        result = compute(chunk)
+        if values is None:
+            values = np.empty((n_samples,) + result.shape[1:], dtype=dtype)
+        values[start:start + len(result)] = result
+
+    corners = np.percentile(values, percentiles, axis=0)
+
+    return {
+        'percentiles': {p: corner.astype(float) for p, corner in zip(percentiles, corners)},
+        'mean': values.mean(axis=0, dtype=float),
+        'std': values.std(axis=0, dtype=float),
+        'values': values,
+    }
+
+def metric_corners(samples, metric, percentiles=(0.135, 50.0, 99.865)):
+    """
+    Picks the sampled parameter sets that sit at percentiles of a scalar figure of merit, e.g. the drive current
+    I_d(V_gs = V_dd, V_ds = V_dd) for slow / typical / fast corners
+
+    Args:
+        samples (dict): {name: array of n_samples values}
+        metric (numpy array): figure of merit per sample
+        percentiles (tuple, optional): percentiles of the metric, defaults to the median and +-3 sigma
+
+    Returns:
+        dict: {percentile: parameter dict of the sample whose metric is closest to that percentile}
+    """
+    metric = np.asarray(metric, dtype=float)
+    targets = np.percentile(metric, percentiles)
+    idx = np.abs(metric[None, :] - targets[:, None]).argmin(axis=1)
+
+    return {p: {k: float(v[i]) for k, v in samples.items()} for p, i in zip(percentiles, idx)}
@@ -0,0 +1,215 @@
+# Incremental extraction for sweeps that are still being measured
+# Points are buffered as they arrive and the fit is rerun every K points (or after a time budget), warm-started from
+# the previous solution. Parameter uncertainty comes from the Jacobian at the solution: cov = s^2 (J^T J)^-1
+
+import time
+import numpy as np
+
+FIT_PARAMS = {
+    'diode': ['I_s', 'n', 'R_s'],
+    'diode_cv': ['C_j', 'V_bi', 'm'],
+    'mosfet_transfer': ['V_th', 'k_n', 'lam'],
+    'mosfet_output': ['V_th', 'k_n', 'lam'],
+}
+
+def _fit_names(extractor, fit_mode):
+    """
+    Fitted parameter names of a fit mode, MOSFET modes follow the extractor's model (theta and gamma for EKV)
+    """
+    if fit_mode.startswith('mosfet'):
+        return list(getattr(extractor.model, 'param_names', FIT_PARAMS[fit_mode]))
+    return FIT_PARAMS[fit_mode]
+
+class IncrementalExtractor:
+    def __init__(self, extractor, fit_mode='diode', bias=None, refit_every=10, time_budget=None, min_points=10,
+                 rtol=1e-3, patience=3, initial_params=None):
+        """
+        IncrementalExtractor constructor, wraps a ModelExtractor and refits as streamed points arrive
+
+        Args:
+            extractor (ModelExtractor): extractor whose fit methods are used for every refit
+            fit_mode (str, optional): 'diode', 'diode_cv', 'mosfet_transfer' or 'mosfet_output', defaults to 'diode'
+            bias (float, optional): fixed bias of the sweep, T for 'diode', V_ds for 'mosfet_transfer' and V_gs for 'mosfet_output'
+            refit_every (int, optional): number of new points that triggers a refit, defaults to 10
+            time_budget (float, optional): seconds after the last fit after which any new point triggers a refit, defaults to None
+            min_points (int, optional): number of points required before the first fit, defaults to 10
+            rtol (float, optional): relative parameter change below which a refit counts as stable, defaults to 1e-3
+            patience (int, optional): consecutive stable refits required to flag the estimate as stabilized, defaults to 3
+            initial_params (dict, optional): initial guess for the first fit, ML/default guess of the extractor if None
+
+        Raises:
+            ValueError: unknown fit mode or missing bias for a MOSFET sweep
+        """
+        if fit_mode not in FIT_PARAMS:
+            raise ValueError(f"Unknown fit mode '{fit_mode}'. Available: {list(FIT_PARAMS)}")
+
+        if fit_mode.startswith('mosfet') and bias is None:
+            raise ValueError(f"Fit mode '{fit_mode}' requires the fixed sweep bias")
+
+        self.extractor = extractor
+        self.fit_mode = fit_mode
+        self.bias = bias
+        self.refit_every = refit_every
+        self.time_budget = time_budget
+        self.names = _fit_names(extractor, fit_mode)
+        self.min_points = max(min_points, len(self.names) + 1)
+        self.rtol = rtol
+        self.patience = patience
+        self.initial_params = initial_params
+
+        self.n_points = 0
+        self._x = np.empty(64)
+        self._y = np.empty(64)
+        self._last_fit_points = 0
+        self._last_fit_time = time.monotonic()
+        self._stable_count = 0
+
+        self.estimate = None
+        self.uncertainty = None
+        self.report = None
+        self.history = []
+
+    @property
+    def x(self):
+        return self._x[:self.n_points]
+
+    @property
+    def y(self):
+        return self._y[:self.n_points]
+
+    @property
+    def is_stable(self):
+        """
+        True once the estimate changed by less than rtol over `patience` consecutive refits
+        """
+        return self._stable_count >= self.patience
+
+    def add_point(self, x, y):
+        """
+        Buffer one measured point and refit if the point or time trigger is reached
+
+        Args:
+            x (float): swept voltage
+            y (float): measured current or capacitance
+
+        Returns:
+            dict: report of the refit, None if no refit was triggered
+        """
+        if self.n_points == len(self._x): # grow buffers geometrically so appends stay amortized O(1)
+            self._x = np.concatenate([self._x, np.empty_like(self._x)])
+            self._y = np.concatenate([self._y, np.empty_like(self._y)])
+
+        self._x[self.n_points] = x
+        self._y[self.n_points] = y
+        self.n_points += 1
+
+        if self._should_refit():
+            return self.refit()
+
+        return None
+
+    def add_points(self, xs, ys):
+        """
+        Buffer several measured points in arrival order
+
+        Returns:
+            dict: report of the last refit, None if no refit was triggered
+        """
+        report = None
+        for x, y in zip(np.atleast_1d(xs), np.atleast_1d(ys)):
+            r = self.add_point(x, y)
+            if r is not None:
+                report = r
+
+        return report
+
+    def _should_refit(self):
+        if self.n_points < self.min_points:
+            return False
+
+        new_points = self.n_points - self._last_fit_points
+        if new_points >= self.refit_every or self.estimate is None:
+            return True
+
+        if self.time_budget is not None and new_points > 0:
+            return time.monotonic() - self._last_fit_time >= self.time_budget
+
+        return False
+
+    def refit(self):
+        """
+        Refit all points received so far, warm-started from the previous estimate
+
+        Returns:
+            dict: report of the fit extended with 'uncertainty' (1-sigma per parameter) and 'stable'
+        """
+        x = self.x.copy()
+        y = self.y.copy()
+
+        if self.estimate is not None:
+            initial = dict(self.estimate)
+        elif self.initial_params is not None:
+            initial = dict(self.initial_params)
+        else:
+            initial = None
+
+        if self.fit_mode == 'diode':
+            report = self.extractor.diode_fit(x, y, T=self.bias, initial_params=initial)
+        elif self.fit_mode == 'diode_cv':
+            report = self.extractor.diode_cv_fit(x, y, initial_params=initial)
+        elif self.fit_mode == 'mosfet_transfer':
+            report = self.extractor.mosfet_fit(x, y, V_ds=self.bias, initial_params=initial)
+        else:
+            report = self.extractor.mosfet_fit(np.full_like(x, self.bias), y, V_ds=x, initial_params=initial)
+
+        names = self.names
+        estimate = {name: float(report['parameters'][name]) for name in names}
+        held = [k for k in getattr(self.extractor.model, 'defaults', {}) if k not in names and k in report['parameters']]
+        estimate.update({k: float(report['parameters'][k]) for k in held}) # e.g. the EKV phi, carried to the warm start
+
+        if self.estimate is not None:
+            old = np.array([self.estimate[name] for name in names])
+            new = np.array([estimate[name] for name in names])
+            change = np.max(np.abs(new - old) / np.maximum(np.abs(old), 1e-30))
+            self._stable_count = self._stable_count + 1 if change < self.rtol else 0
+
+        self.estimate = estimate
+        if self.extractor.result is not None:
+            self.uncertainty = param_uncertainty(self.extractor.result, names)
+        elif self.uncertainty is None: # cache hit without solver result, keep the last known uncertainty
+            self.uncertainty = {name: np.nan for name in names}
+        self._last_fit_points = self.n_points
+        self._last_fit_time = time.monotonic()
+        self.history.append((self.n_points, estimate))
+
+        self.report = dict(report)
+        self.report['uncertainty'] = self.uncertainty
+        self.report['stable'] = self.is_stable
+
+        return self.report
+
+def param_uncertainty(result, names):
+    """
+    Estimates 1-sigma parameter uncertainties from a least squares result
+
+    Args:
+        result (OptimizeResult): result returned by scipy least_squares
+        names (list): parameter names in the order of the result's parameter vector
+
+    Returns:
+        dict: standard deviation of each parameter, inf when the residual has no degrees of freedom
+    """
+    J = result.jac
+    dof = J.shape[0] - J.shape[1]
+
+    if dof <= 0:
+        return {name: np.inf for name in names}
+
+    s_sq = 2 * result.cost / dof # residual variance, cost is 0.5 * sum(residuals**2)
+    scale = np.linalg.norm(J, axis=0) # column scaling, parameters span many decades (I_s ~ 1e-10 vs n ~ 1)
+    scale[scale == 0] = 1.0
+    J_scaled = J / scale
+    cov = s_sq * np.linalg.pinv(J_scaled.T @ J_scaled) / np.outer(scale, scale)
+    std = np.sqrt(np.abs(np.diag(cov)))
+
+    return {name: float(s) for name, s in zip(names, std)}
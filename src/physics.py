@@ -1,27 +1,60 @@
 import numpy as np
 from scipy.constants import k as k_B, e as q_e, epsilon_0
 
+from src.precision import resolve_dtype
+
+def _as_input(value):
+    """
+    Scalars stay Python floats, lists and arrays become float arrays that broadcast against the other inputs
+    """
+    return float(value) if np.ndim(value) == 0 else np.asarray(value, dtype=float)
+
+def _scalar_or_array(value):
+    value = np.asarray(value)
+    return value if value.ndim else float(value)
+
+def _in_dtype(value, dtype):
+    """
+    Derived quantity stored in the evaluation dtype, scalars as numpy scalars of that dtype so they never promote
+    float32 grids
+    """
+    value = np.asarray(value)
+    return dtype.type(value) if value.ndim == 0 else value.astype(dtype, copy=False)
+
+def _col(value):
+    # device and bias quantities along a trailing axis for the spatial grid
+    return np.asarray(value)[..., None]
+
 class DiodePhysics:
-    def __init__(self, Na, Nd, T):
+    def __init__(self, Na, Nd, T, dtype=None):
         """
         DiodePhysics class constructor
+
+        Na, Nd and T can be arrays that broadcast against each other, e.g. open grids Na[:, None, None],
+        Nd[None, :, None] and T[None, None, :]; every derived quantity then carries the broadcast shape, so design
+        maps of V_bi or depletion width over millions of points come from one object
+
+        The material constants are derived in float64 and stored in dtype (see src.precision), float32 halves the
+        memory of large design maps and band sweeps
         """
-        self.Na = Na
-        self.Nd = Nd
-        self.T = T
+        self.dtype = dtype = resolve_dtype(dtype)
+        Na, Nd, T = _as_input(Na), _as_input(Nd), _as_input(T)
         
-        self.Nc = 2.8e19 * (T / 300)**1.5
-        self.Nv = 1.04e19 * (T / 300)**1.5
-        self.Eg = 1.17 - (4.73e-4 * T**2)/(636 + T)
-        self.ni = np.sqrt(self.Nc * self.Nv) * np.exp((-self.Eg * q_e) / (2 * k_B * T))
+        Nc = 2.8e19 * (T / 300)**1.5
+        Nv = 1.04e19 * (T / 300)**1.5
+        Eg = 1.17 - (4.73e-4 * T**2)/(636 + T)
+        ni = np.sqrt(Nc * Nv) * np.exp((-Eg * q_e) / (2 * k_B * T))
+        
+        self.Na, self.Nd, self.T = _in_dtype(Na, dtype), _in_dtype(Nd, dtype), _in_dtype(T, dtype)
+        self.Nc, self.Nv, self.Eg, self.ni = _in_dtype(Nc, dtype), _in_dtype(Nv, dtype), _in_dtype(Eg, dtype), _in_dtype(ni, dtype)
         self.eps_si = 11.7 * (epsilon_0 / 100)
-        self.Vt = (k_B * T) / q_e
+        self.Vt = _in_dtype((k_B * T) / q_e, dtype)
         
     def get_bi_potential(self):
         """
         Calculates the built in potential of the device
         """
-        v_bi = self.Vt * np.log((self.Na * self.Nd) / self.ni**2)
+        v_bi = self.Vt * (np.log(self.Na) + np.log(self.Nd) - 2 * np.log(self.ni)) # log form, Na * Nd overflows float32
         return v_bi
     
     def get_dep_width(self, v_bias):
@@ -47,48 +80,42 @@ class DiodePhysics:
         """
         Calculates the Ec and Ev energy band levels and the quasi-Fermi levels across a bunch of points
 
+        Every region is evaluated on the whole grid and selected with masks, so an array of biases gives all band
+        diagrams of a bias sweep in one call
+
         Args:
-            v_bias (float): bias voltage applied to device
+            v_bias (float/numpy array): bias voltage applied to device, or an array of n_bias voltages
             x_grid (numpy array): array of spatial coordinates 
 
         Returns:
-            dict: dictionary containing values for Ec and Ev
-        """
-        w, xp, xn = self.get_dep_width(v_bias)
-        v_bi = self.get_bi_potential()
-        Ec = np.zeros_like(x_grid)
-        Ev = np.zeros_like(x_grid)
+            dict: dictionary containing values for Ec and Ev, band arrays have shape (n_x,) for a scalar bias and
+                  (n_bias, n_x) for an array of biases, for array device parameters the bias broadcasts against
+                  them and x is the last axis
+        """
+        bias = np.asarray(v_bias, dtype=self.dtype)
+        v = _col(bias)
+        x = np.asarray(x_grid, dtype=self.dtype)
+        w, xp, xn = [_col(a) for a in self.get_dep_width(bias)]
+        v_bi = _col(self.get_bi_potential())
+        Na, Nd, Eg = _col(self.Na), _col(self.Nd), _col(self.Eg)
         K = q_e / (2 * self.eps_si)
-        Ev_bulk = -self.Vt * np.log(self.Nv / self.Na)
-        Ec_bulk = Ev_bulk + self.Eg
-        Efp = np.zeros_like(x_grid) # use as reference level
-        Efn = np.zeros_like(x_grid)
+        Ev_bulk = -_col(self.Vt) * np.log(_col(self.Nv) / Na)
+        Ec_bulk = Ev_bulk + Eg
         L_diff = 2 * w
         
-        for i, x in enumerate(x_grid):
-            if x < -xp:
-                phi = 0
-            elif -xp <= x < 0:
-                phi = K * self.Na * (x + xp)**2
-            elif 0 <= x < xn:
-                phi = (v_bi - v_bias) - K * self.Nd * (xn - x)**2
-            elif x >= xn:
-                phi = v_bi - v_bias
-                
-            Ec[i] = Ec_bulk - phi
-            Ev[i] = Ec[i] - self.Eg
-            
-            if x < -xp:
-                Efp[i] = 0.0
-                dist = x - (-xp)
-                Efn[i] = v_bias * np.exp(dist / L_diff)
-            elif x > xn:
-                Efn[i] = v_bias
-                dist = x - xn
-                Efp[i] = v_bias * (1 - np.exp(-dist / L_diff))
-            else:
-                Efp[i] = 0.0
-                Efn[i] = v_bias
+        p_side = x < -xp
+        n_side = x >= xn
+        
+        # potential: flat p bulk, parabolic on each side of the junction, flat n bulk
+        phi = np.select([p_side, x < 0, ~n_side],
+                        [0.0, K * Na * (x + xp)**2, (v_bi - v) - K * Nd * (xn - x)**2], default=v_bi - v)
+        Ec = Ec_bulk - phi
+        Ev = Ec - Eg
+        
+        # quasi-Fermi levels split inside the depletion region and relax over L_diff in the bulk, Efp as reference
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            Efp = np.where(x > xn, v * (1 - np.exp(-(x - xn) / L_diff)), 0.0)
+            Efn = np.where(p_side, v * np.exp((x + xp) / L_diff), v * np.ones_like(phi))
             
         Ei = (Ec + Ev) / 2
         
@@ -103,78 +130,83 @@ class DiodePhysics:
         }
 
 class MOSFETPhysics:
-    def __init__(self, Na, tox, T):
+    def __init__(self, Na, tox, T, dtype=None):
         """
         MOSFETPhysics class constructor
+
+        Na, tox and T can be arrays that broadcast against each other, see DiodePhysics, e.g. a V_th map over
+        Na[:, None] and tox[None, :], the derived quantities are stored in dtype (see src.precision)
         """
-        self.Na = Na
-        self.tox = tox
-        self.T = T
+        self.dtype = dtype = resolve_dtype(dtype)
+        Na, tox, T = _as_input(Na), _as_input(tox), _as_input(T)
         
-        self.Nc = 2.8e19 * (T / 300)**1.5
-        self.Nv = 1.04e19 * (T / 300)**1.5
-        self.Eg = 1.17 - (4.73e-4 * T**2)/(636 + T)
-        self.ni = np.sqrt(self.Nc * self.Nv) * np.exp((-self.Eg * q_e) / (2 * k_B * T))
-        self.cox = (epsilon_0 / 100) * 3.9 / tox
-        self.Vt = (k_B * T) / q_e
-        self.gamma = np.sqrt(2 * q_e * 11.7 * (epsilon_0 / 100) * Na) / self.cox
-        self.phi_f = self.Vt * np.log(self.Na / self.ni)
-        self.Vth = -0.9 + 2*self.phi_f + self.gamma * np.sqrt(2 * self.phi_f)
+        Nc = 2.8e19 * (T / 300)**1.5
+        Nv = 1.04e19 * (T / 300)**1.5
+        Eg = 1.17 - (4.73e-4 * T**2)/(636 + T)
+        ni = np.sqrt(Nc * Nv) * np.exp((-Eg * q_e) / (2 * k_B * T))
+        cox = (epsilon_0 / 100) * 3.9 / tox
+        Vt = (k_B * T) / q_e
+        gamma = np.sqrt(2 * q_e * 11.7 * (epsilon_0 / 100) * Na) / cox
+        phi_f = Vt * np.log(Na / ni)
+        Vth = -0.9 + 2*phi_f + gamma * np.sqrt(2 * phi_f)
+        
+        self.Na, self.tox, self.T = _in_dtype(Na, dtype), _in_dtype(tox, dtype), _in_dtype(T, dtype)
+        self.Nc, self.Nv, self.Eg, self.ni = _in_dtype(Nc, dtype), _in_dtype(Nv, dtype), _in_dtype(Eg, dtype), _in_dtype(ni, dtype)
+        self.cox, self.Vt, self.gamma = _in_dtype(cox, dtype), _in_dtype(Vt, dtype), _in_dtype(gamma, dtype)
+        self.phi_f, self.Vth = _in_dtype(phi_f, dtype), _in_dtype(Vth, dtype)
         
     def solve_surface_potential(self, Vgs):
         """
-        Calculates the surface potential of the device
+        Calculates the surface potential of the device, element-wise for an array of gate voltages
         """
-        V_eff = Vgs + 0.9
-        phi_s = 0.0
+        V_eff = np.asarray(Vgs, dtype=self.dtype) + 0.9
+        
+        # depletion / weak inversion, capped at strong inversion onset
+        phi_dep = ((-self.gamma + np.sqrt(self.gamma**2 + 4 * np.maximum(V_eff, 0.0)))/2)**2
+        phi_dep = np.minimum(phi_dep, 2 * self.phi_f)
         
-        if V_eff < 0: # accumulation
-            phi_s = V_eff
-        elif V_eff < (self.Vth + 0.9):
-            phi_s = ((-self.gamma + np.sqrt(self.gamma**2 + 4 * V_eff))/2)**2
-            if phi_s > 2 * self.phi_f:
-                phi_s = 2 * self.phi_f
-        else: # strong inversion
-            phi_s = 2 * self.phi_f + (V_eff - self.Vth) * 0.05
+        phi_s = np.where(V_eff < 0, V_eff, # accumulation
+                         np.where(V_eff < (self.Vth + 0.9), phi_dep,
+                                  2 * self.phi_f + (V_eff - self.Vth) * 0.05)) # strong inversion
             
-        return phi_s
-    
+        return _scalar_or_array(phi_s)
+
+    def body_effect_params(self):
+        """
+        Threshold voltage, body-effect coefficient gamma and surface potential phi = 2 phi_F in the parameter names of
+        EKVMOSFETModel, e.g. for its initial guess or the fixed phi of an extraction
+        """
+        return {'V_th': _scalar_or_array(self.Vth), 'gamma': _scalar_or_array(self.gamma),
+                'phi': _scalar_or_array(2 * self.phi_f)}
+
     def compute_band_diagrams(self, Vgs, x_grid):
         """
         Computes the energy band diagram for a MOS capacitor
 
         Args:
-            Vgs (scalar): gate-to-source voltage
+            Vgs (scalar/numpy array): gate-to-source voltage, or an array of n_bias voltages
             x_grid (numpy array): array of spatial coordinates 
 
         Returns:
-            dict: dictionary containing values for Ec and Ev alongside other values
+            dict: dictionary containing values for Ec and Ev alongside other values, band arrays have shape (n_x,)
+                  for a scalar Vgs and (n_bias, n_x) for an array, phi_s and w have the shape of Vgs, for array
+                  device parameters Vgs broadcasts against them and x is the last axis
         """
-        phi_s = self.solve_surface_potential(Vgs)
-        
-        if phi_s > 0:
-            w = np.sqrt(2 * 11.7 * (epsilon_0 / 100) * phi_s / (q_e * self.Na))
-        else:
-            w = 0.0
-        
+        phi_s = np.asarray(self.solve_surface_potential(Vgs))
+        w = np.sqrt(2 * 11.7 * (epsilon_0 / 100) * np.maximum(phi_s, 0.0) / (q_e * self.Na))
         L_debye = np.sqrt(11.7 * (epsilon_0 / 100) * self.Vt / (q_e * self.Na))
-        phi = np.zeros_like(x_grid)
         
-        for i, x in enumerate(x_grid):
-            if x < 0:
-                phi[i] = phi_s
-            elif phi_s < 0: # accumulation
-                phi[i] = phi_s * np.exp(-x / L_debye)
-            elif x < w: # depletion
-                phi[i] = phi_s * (1 - x/w)**2
-            else:
-                phi[i] = 0.0
+        x = np.asarray(x_grid, dtype=self.dtype)
+        ps, ws = _col(phi_s), _col(w)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            phi = np.select([x < 0, ps < 0, x < ws], # oxide, accumulation, depletion
+                            [ps, ps * np.exp(-x / _col(L_debye)), ps * (1 - x/ws)**2], default=0.0)
                 
-        Ef = np.zeros_like(x_grid)
-        Ei_bulk = self.phi_f
+        Ef = np.zeros_like(phi)
+        Ei_bulk = _col(self.phi_f)
         Ei = Ei_bulk - phi
-        Ec = Ei + self.Eg/2
-        Ev = Ei - self.Eg/2
+        Ec = Ei + _col(self.Eg)/2
+        Ev = Ei - _col(self.Eg)/2
         
         return {
             'x': x_grid,
@@ -182,9 +214,6 @@ class MOSFETPhysics:
             'Ev': Ev,
             'Ei': Ei,
             'Ef': Ef,
-            'phi_s': phi_s,
-            'w': w
+            'phi_s': _scalar_or_array(phi_s),
+            'w': _scalar_or_array(w)
         }
-                
-                
-            
\ No newline at end of file
@@ -0,0 +1,99 @@
+# Evaluation dtype policy for bulk model sweeps
+# Model and physics evaluation runs in float64 unless float32 is requested, either per call (dtype=np.float32), for a
+# block of code (with precision(np.float32): ...) or for the whole process (set_default_dtype(np.float32)). The
+# per-call argument wins over the block, the block wins over the process default. Blocks are tracked per thread, so a
+# float32 block in one worker does not change the precision of extractions running in another
+# The optimizer path always asks for float64 explicitly: least-squares steps, finite-difference Jacobians and the
+# convergence tests of the extractor need more than the 7 significant digits float32 holds
+#
+# Error bounds of float32 evaluation relative to float64 (eps = 2**-23 = 1.2e-7), see tests/test_precision.py and
+# python -m benchmarks.bench_precision for measured values:
+#   diode current      |dI| / |I| <= (2 |V| / (n V_t) + 4) * eps, the exponent amplifies the rounding of V, 1 / (n V_t)
+#                      and their product, about 1e-5 at 1 V and n = 1; Newton stops at a step of 64 eps |I|
+#   diode capacitance  |dC| / C <= (m / u + 4) * eps with u = max(1 - V / V_bi, 1e-3), 1 - V / V_bi cancels towards
+#                      forward bias, about 1e-6 at V = V_bi / 2 and 3e-5 on the clamp
+#   MOSFET current     |dI| <= 4 eps k_n V_gs max(V_gs, V_ds), an absolute bound: the overdrive V_gs - V_th loses
+#                      digits to cancellation, so the relative error grows as V_gs / (V_gs - V_th) near threshold
+#                      away from pinch-off; a point within an ulp of V_ds = V_gs - V_th may change region, a jump of
+#                      lam V_ds I_d, the Level 1 discontinuity itself
+#   band diagrams      |dE| <= 8 eps max|E| (about 1e-6 eV), log-form built-in potential so doping products of up
+#                      to 1e21 x 1e21 cm^-6 do not overflow float32
+# Currents below the float32 normal range (1.2e-38 A) flush towards zero, far below any measurement floor
+
+import contextlib
+import threading
+import numpy as np
+
+DTYPES = (np.float32, np.float64)
+
+_default = np.dtype(np.float64)
+_local = threading.local()
+
+def _checked(dtype):
+    """Numpy dtype of a supported evaluation precision"""
+    dtype = np.dtype(dtype)
+    if dtype not in [np.dtype(d) for d in DTYPES]:
+        raise ValueError(f"Unsupported evaluation dtype '{dtype}'. Available: {[np.dtype(d).name for d in DTYPES]}")
+    return dtype
+
+def set_default_dtype(dtype):
+    """
+    Sets the process-wide evaluation precision used when neither the call nor a precision block picks one
+
+    Args:
+        dtype (numpy dtype): np.float32 or np.float64
+
+    Raises:
+        ValueError: unsupported dtype
+    """
+    global _default
+    _default = _checked(dtype)
+
+def get_default_dtype():
+    """Process-wide evaluation precision"""
+    return _default
+
+@contextlib.contextmanager
+def precision(dtype):
+    """
+    Evaluates model sweeps of the enclosed block in dtype, on the current thread only
+
+    Args:
+        dtype (numpy dtype): np.float32 or np.float64
+
+    Raises:
+        ValueError: unsupported dtype
+    """
+    stack = _local.__dict__.setdefault('stack', [])
+    stack.append(_checked(dtype))
+    try:
+        yield
+    finally:
+        stack.pop()
+
+def resolve_dtype(dtype=None):
+    """
+    Evaluation precision of a call: the explicit dtype, else the innermost precision block, else the default
+
+    Args:
+        dtype (numpy dtype, optional): precision requested by the caller
+
+    Returns:
+        numpy dtype: float32 or float64
+
+    Raises:
+        ValueError: unsupported dtype
+    """
+    if dtype is not None:
+        return _checked(dtype)
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else _default
+
+def solve_rtol(dtype):
+    """
+    Relative step tolerance of iterative solves, zero in float64 where the absolute tolerance applies. In float32 the
+    rounding of exp(V / (n V_t)) leaves steps of up to |V| / (n V_t) ulps at high current, so the test sits above
+    that noise, Newton converges quadratically and the last step already lands within rounding of the root
+    """
+    dtype = np.dtype(dtype)
+    return 0.0 if dtype == np.float64 else 64 * float(np.finfo(dtype).eps)
@@ -0,0 +1,432 @@
+# Closed-form parameter estimators used as initial guesses for the least squares fits
+# Every estimator works on a whole batch of curves at once: the curves are packed into a CurveSet and the classical
+# linearizations become weighted straight-line fits whose sums are reduced per curve, so there is no Python loop over
+# curves. Estimators:
+#   diode            - I_s and n from the log-linear region of ln(I) vs V / V_t, R_s from the drop at the highest current
+#   diode_cv         - C_j, V_bi and m from a log-log fit of C vs (1 - V / V_bi), V_bi by a grid search over its bounds
+#   mosfet_transfer  - V_th and k_n from the sqrt(I_d) vs V_gs intercept, linear extrapolation for triode curves
+#   mosfet_output    - V_th, k_n and lam from the saturation plateau and the triode slope at small V_ds
+#   mosfet_surface   - V_th, k_n and lam of a scattered or gridded V_gs x V_ds surface, from transfer and output curves
+#                      cut out of it
+
+import numpy as np
+from scipy.constants import k as k_B, e as q_e
+
+from src.models import DiodeModel, MOSFETModel
+from src.datasets import CurveSet
+
+def _pack(curves, default_bias):
+    """
+    Packs a CurveSet or a list of (x, y, bias) tuples into a CurveSet sorted by x within each curve
+    """
+    if not isinstance(curves, CurveSet):
+        curves = CurveSet.from_curves([
+            (x, y, default_bias if bias is None else np.mean(bias)) for x, y, bias in curves
+        ])
+
+    order = np.lexsort((curves.x, curves.curve_idx))
+    return CurveSet(curves.x[order], curves.y[order], curves.offsets, curves.values, curves.names)
+
+def _segment_sum(a, offsets):
+    """
+    Sum of the last axis of a per curve, zero for empty curves
+    """
+    a = np.asarray(a, dtype=float)
+    lengths = np.diff(offsets)
+    out = np.zeros(a.shape[:-1] + (len(lengths),))
+    nonempty = lengths > 0
+    if nonempty.any():
+        out[..., nonempty] = np.add.reduceat(a, offsets[:-1][nonempty], axis=-1)
+    return out
+
+def _segment_max(a, offsets):
+    """
+    Maximum of a per curve, -inf for empty curves
+    """
+    lengths = np.diff(offsets)
+    out = np.full(len(lengths), -np.inf)
+    nonempty = lengths > 0
+    if nonempty.any():
+        out[nonempty] = np.maximum.reduceat(a, offsets[:-1][nonempty])
+    return out
+
+def _linfit(x, y, w, offsets):
+    """
+    Weighted straight-line fit y = slope * x + intercept per curve, x and y may carry leading grid axes
+
+    Sums are taken about the per-curve means so large offsets (ln C ~ -27) do not cancel out. Points with zero weight
+    may hold non-finite values
+
+    Returns:
+        tuple: (slope, intercept, sum of squared residuals), slope is NaN for curves with fewer than two distinct x
+    """
+    x, y, w = np.broadcast_arrays(x, y, w)
+    w = w.astype(float)
+    used = w > 0
+    x = np.where(used, x, 0.0)
+    y = np.where(used, y, 0.0)
+    lengths = np.diff(offsets)
+
+    S = _segment_sum(w, offsets)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mx = np.nan_to_num(_segment_sum(w * x, offsets) / S)
+        my = np.nan_to_num(_segment_sum(w * y, offsets) / S)
+        dx = x - np.repeat(mx, lengths, axis=-1)
+        dy = y - np.repeat(my, lengths, axis=-1)
+
+        Sxx = _segment_sum(w * dx * dx, offsets)
+        Sxy = _segment_sum(w * dx * dy, offsets)
+        Syy = _segment_sum(w * dy * dy, offsets)
+
+        slope = np.where((S >= 2) & (Sxx > 0), Sxy / Sxx, np.nan)
+        intercept = my - slope * mx
+        sse = Syy - slope * Sxy
+
+    return slope, intercept, sse
+
+def _local_slope(x, y, offsets):
+    """
+    Central difference dy/dx of every point against its neighbours in the same curve, one-sided at the curve ends
+    """
+    n_curves = len(offsets) - 1
+    curve = np.repeat(np.arange(n_curves), np.diff(offsets))
+    idx = np.arange(len(x))
+    lo = np.maximum(idx - 1, offsets[:-1][curve])
+    hi = np.minimum(idx + 1, offsets[1:][curve] - 1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (y[hi] - y[lo]) / (x[hi] - x[lo])
+
+    return slope, lo, hi
+
+def _clip_to_bounds(guess, bounds):
+    return {name: np.clip(value, *bounds[name]) if name in bounds else value for name, value in guess.items()}
+
+def diode_iv_guess(curves, ideal_fraction=0.8):
+    """
+    Estimates I_s, n and R_s of every I-V curve from the log-linear region of the forward characteristic
+
+    ln(I) is linear in V / V_t with slope 1/n and intercept ln(I_s) once V >> n V_t and before series resistance bends
+    the curve, the region is taken as the points whose local slope is within ideal_fraction of the curve's maximum.
+    R_s is the voltage left over at the highest current after the ideal diode drop, divided by that current
+
+    Args:
+        curves (CurveSet/list): curves with the temperature as per-curve value, or list of tuples (V, I, T)
+        ideal_fraction (float, optional): minimum local slope relative to the curve's steepest point, defaults to 0.8
+
+    Returns:
+        dict: arrays 'I_s', 'n' and 'R_s' with one entry per curve, NaN where a curve has no usable region
+    """
+    cs = _pack(curves, 300.0)
+    V, I, offsets, curve = cs.x, cs.y, cs.offsets, cs.curve_idx
+    Vt = k_B * cs.values / q_e
+    x = V / Vt[curve]
+
+    pos = I > 0
+    lnI = np.log(np.where(pos, I, 1.0))
+    slope, lo, hi = _local_slope(x, lnI, offsets)
+
+    # well above n V_t (n <= 2) the -1 of the Shockley equation no longer bends ln(I)
+    valid = pos & pos[lo] & pos[hi] & (x > 6.0) & np.isfinite(slope)
+    steepest = _segment_max(np.where(valid, slope, -np.inf), offsets)
+    ideal = valid & (slope >= ideal_fraction * steepest[curve])
+
+    inv_n, ln_Is, _ = _linfit(x, lnI, ideal, offsets)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        n = 1.0 / inv_n
+        I_s = np.exp(ln_Is)
+
+        # series resistance from the highest current point of each curve
+        I_max = _segment_max(np.where(pos, I, -np.inf), offsets)
+        top = pos & (I == I_max[curve])
+        V_ideal = n[curve] * Vt[curve] * np.log1p(I / I_s[curve])
+        R_s = _segment_sum(np.where(top, (V - V_ideal) / I, 0.0), offsets) / _segment_sum(top, offsets)
+
+    return _clip_to_bounds({'I_s': I_s, 'n': n, 'R_s': R_s}, DiodeModel().get_param_bounds())
+
+def diode_cv_guess(curves, n_grid=15):
+    """
+    Estimates C_j, V_bi and m of every C-V curve with a log-log fit of C against (1 - V / V_bi)
+
+    For a fixed V_bi, ln(C) = ln(C_j) - m ln(1 - V / V_bi) is a straight line, this generalizes the 1/C^2 plot (exact
+    only for m = 0.5) to any grading coefficient. The line is fitted for every V_bi of a coarse grid spanning the model
+    bounds in one broadcast pass, then again on a finer grid around each curve's best candidate, and each curve keeps
+    the V_bi with the smallest residual
+
+    Args:
+        curves (CurveSet/list): C-V curves, or list of tuples (V, C, bias) where bias is unused
+        n_grid (int, optional): number of V_bi candidates per pass, defaults to 15 (about 14 mV final resolution over
+            the default bounds)
+
+    Returns:
+        dict: arrays 'C_j', 'V_bi' and 'm' with one entry per curve, NaN where a curve has fewer than two points
+    """
+    cs = _pack(curves, 0.0)
+    V, C, offsets, curve = cs.x, cs.y, cs.offsets, cs.curve_idx
+    bounds = DiodeModel().get_param_bounds()
+    lower, upper = bounds['V_bi']
+
+    pos = C > 0
+    lnC = np.log(np.where(pos, C, 1.0))
+    cols = np.arange(len(cs))
+    step = (upper - lower) / (n_grid - 1)
+    grid = np.broadcast_to(np.linspace(lower, upper, n_grid)[:, None], (n_grid, len(cs))) # (n_grid, n_curves)
+
+    for _ in range(2):
+        ln_u = np.log(np.maximum(1 - V / grid[:, curve], 1e-3)) # same clamp as compute_capacitance
+        slope, intercept, sse = _linfit(ln_u, lnC, pos, offsets)
+        sse = np.where(np.isfinite(slope), sse, np.inf)
+        best = np.argmin(sse, axis=0)
+        V_bi = grid[best, cols]
+
+        # refine around the best candidate of every curve
+        grid = np.clip(V_bi + np.linspace(-step, step, n_grid)[:, None], lower, upper)
+        step = 2 * step / (n_grid - 1)
+
+    found = np.isfinite(sse[best, cols])
+    with np.errstate(over='ignore'):
+        guess = {
+            'C_j': np.where(found, np.exp(intercept[best, cols]), np.nan),
+            'V_bi': np.where(found, V_bi, np.nan),
+            'm': np.where(found, -slope[best, cols], np.nan),
+        }
+
+    return _clip_to_bounds(guess, bounds)
+
+def mosfet_transfer_guess(curves, on_fraction=0.2, n_passes=3):
+    """
+    Estimates V_th and k_n of every transfer curve from the sqrt(I_d) vs V_gs intercept
+
+    In saturation sqrt(I_d) = sqrt(k_n / 2) (V_gs - V_th), so V_th is the V_gs intercept and k_n = 2 slope^2. Points
+    with V_gs - V_th > V_ds are in triode where I_d = k_n V_ds (V_gs - V_th - V_ds / 2) is linear in V_gs instead.
+    Both fits are repeated with the region split taken from the previous estimate and every curve keeps the fit of
+    its majority region. lam cannot be separated from k_n at a single V_ds and is returned as zero
+
+    Args:
+        curves (CurveSet/list): transfer curves with V_ds as per-curve value, or list of tuples (V_gs, I_d, V_ds)
+        on_fraction (float, optional): points below this fraction of the curve's maximum sqrt(I_d) are ignored as
+            off-state or subthreshold, defaults to 0.2
+        n_passes (int, optional): region split refinements, defaults to 3
+
+    Returns:
+        dict: arrays 'V_th', 'k_n' and 'lam' with one entry per curve, NaN where a curve never turns on
+    """
+    cs = _pack(curves, np.inf) # unknown V_ds, assume saturation
+    V_gs, I, offsets, curve = cs.x, cs.y, cs.offsets, cs.curve_idx
+    V_ds = cs.values
+
+    root = np.sqrt(np.maximum(I, 0.0))
+    on = (root > 0) & (root >= on_fraction * _segment_max(root, offsets)[curve])
+
+    a, b, _ = _linfit(V_gs, root, on, offsets)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        V_th, k_n = -b / a, 2 * a**2
+
+        for _ in range(n_passes):
+            sat = on & (V_gs - V_th[curve] <= V_ds[curve])
+            triode = on & ~sat
+
+            a, b, _ = _linfit(V_gs, root, sat, offsets)
+            g, c, _ = _linfit(V_gs, I, triode, offsets)
+            V_th_sat, k_sat = -b / a, 2 * a**2
+            V_th_tri, k_tri = -c / g - V_ds / 2, g / V_ds
+
+            use_sat = np.isfinite(V_th_sat) & ((_segment_sum(sat, offsets) >= _segment_sum(triode, offsets)) | ~np.isfinite(V_th_tri))
+            V_th = np.where(use_sat, V_th_sat, V_th_tri)
+            k_n = np.where(use_sat, k_sat, k_tri)
+
+    guess = {'V_th': V_th, 'k_n': k_n, 'lam': np.where(np.isfinite(V_th), 0.0, np.nan)}
+    return _clip_to_bounds(guess, MOSFETModel().get_param_bounds())
+
+def mosfet_output_guess(curves, sat_fraction=0.6, triode_fraction=0.5):
+    """
+    Estimates V_th, k_n and lam of every output curve from its saturation plateau and triode slope
+
+    The plateau I_d = I_0 (1 + lam V_ds) gives lam = slope / I_0 with I_0 = k_n / 2 (V_gs - V_th)^2. In triode
+    I_d / V_ds = k_n (V_gs - V_th) - k_n / 2 V_ds, whose intercept g_0 = k_n (V_gs - V_th) together with I_0 gives
+    V_gs - V_th = 2 I_0 / g_0 and k_n = g_0 / (V_gs - V_th)
+
+    Args:
+        curves (CurveSet/list): output curves with V_gs as per-curve value, or list of tuples (V_ds, I_d, V_gs)
+        sat_fraction (float, optional): points above this fraction of the curve's maximum V_ds form the plateau,
+            defaults to 0.6
+        triode_fraction (float, optional): points below this fraction of the curve's maximum current form the triode
+            region, defaults to 0.5
+
+    Returns:
+        dict: arrays 'V_th', 'k_n' and 'lam' with one entry per curve, NaN where a curve is off or too short
+    """
+    cs = _pack(curves, np.nan)
+    V_ds, I, offsets, curve = cs.x, cs.y, cs.offsets, cs.curve_idx
+    V_gs = cs.values
+
+    plateau = V_ds >= sat_fraction * _segment_max(V_ds, offsets)[curve]
+    slope, I_0, _ = _linfit(V_ds, I, plateau, offsets)
+
+    triode = (V_ds > 0) & (I > 0) & (I <= triode_fraction * _segment_max(I, offsets)[curve])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        _, g_0, _ = _linfit(V_ds, I / np.where(triode, V_ds, 1.0), triode, offsets)
+        # coarse sweeps with a single triode point fall back to the chord through the origin
+        chord = _segment_sum(np.where(triode, I * V_ds, 0.0), offsets) / _segment_sum(np.where(triode, V_ds**2, 0.0), offsets)
+        g_0 = np.where(np.isfinite(g_0), g_0, chord)
+
+        V_ov = 2 * I_0 / g_0
+        guess = {'V_th': V_gs - V_ov, 'k_n': g_0 / V_ov, 'lam': slope / I_0}
+
+    guess = {k: np.where((I_0 > 0) & (g_0 > 0), v, np.nan) for k, v in guess.items()}
+    return _clip_to_bounds(guess, MOSFETModel().get_param_bounds())
+
+def diode_temp_guess(curves, T_ref=300.0):
+    """
+    Estimates the global I_s(T_ref), Eg, n and R_s of a multi-temperature I-V family
+
+    Every curve gets its own I_s from diode_iv_guess, then ln(I_s(T) / (T / T_ref)^3) is linear in (1/T_ref - 1/T)
+    with slope q Eg / k_B and intercept ln(I_s(T_ref)). n and R_s are the medians over the curves
+
+    Args:
+        curves (CurveSet/list): curves with the temperature as per-curve value, or list of tuples (V, I, T)
+        T_ref (float, optional): reference temperature of I_s, defaults to 300 K
+
+    Returns:
+        dict: initial guess for I_s, Eg, n and R_s, None if no curve yields an estimate
+    """
+    cs = _pack(curves, T_ref)
+    per_curve = diode_iv_guess(cs)
+    ok = np.isfinite(per_curve['I_s']) & np.isfinite(per_curve['n'])
+    if not ok.any():
+        return None
+
+    T = cs.values[ok]
+    x = 1 / T_ref - 1 / T
+    y = np.log(per_curve['I_s'][ok] / (T / T_ref)**3)
+    slope, intercept, _ = _linfit(x, y, np.ones(len(x)), np.array([0, len(x)]))
+
+    guess = {
+        'I_s': np.exp(intercept[0]) if np.isfinite(slope[0]) else float(np.median(per_curve['I_s'][ok])),
+        'Eg': slope[0] * k_B / q_e if np.isfinite(slope[0]) else 1.12,
+        'n': np.median(per_curve['n'][ok]),
+        'R_s': np.nanmedian(per_curve['R_s'][ok]) if np.isfinite(per_curve['R_s'][ok]).any() else 0.1,
+    }
+    return {k: float(v) for k, v in _clip_to_bounds(guess, DiodeModel().get_param_bounds()).items()}
+
+def _quantize(v, n_levels):
+    """
+    Snaps values to the centers of n_levels equal-width bins, unchanged when there are at most n_levels distinct values
+    """
+    if len(np.unique(v)) <= n_levels:
+        return v
+    edges = np.linspace(v.min(), v.max(), n_levels + 1)
+    idx = np.clip(np.searchsorted(edges, v, side='right') - 1, 0, n_levels - 1)
+    return ((edges[:-1] + edges[1:]) / 2)[idx]
+
+def _curves_by(x, y, key, names):
+    """
+    CurveSet with one curve per distinct key, sorted by x within each curve
+    """
+    order = np.lexsort((x, key))
+    key = key[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    return CurveSet(x[order], y[order], np.append(starts, len(key)), key[starts], names)
+
+def mosfet_surface_guess(V_gs, V_ds, I_d, n_levels=16):
+    """
+    Estimates V_th, k_n and lam of a whole V_gs x V_ds surface
+
+    The points are cut into transfer curves (one per V_ds) and output curves (one per V_gs), scattered points are
+    binned to n_levels levels first. V_th and k_n are the medians of the transfer estimates, lam the median of the
+    output estimates, each falling back to the other family when it yields nothing
+
+    Args:
+        V_gs, V_ds, I_d (numpy array): 1-D arrays with one entry per measured point
+        n_levels (int, optional): maximum number of distinct V_ds and V_gs levels, defaults to 16
+
+    Returns:
+        dict: initial guess for V_th, k_n and lam, None if no curve yields an estimate
+    """
+    V_gs, V_ds, I_d = [np.asarray(a, dtype=float) for a in (V_gs, V_ds, I_d)]
+    transfer = mosfet_transfer_guess(_curves_by(V_gs, I_d, _quantize(V_ds, n_levels), ('V_gs', 'I_d', 'V_ds')))
+    output = mosfet_output_guess(_curves_by(V_ds, I_d, _quantize(V_gs, n_levels), ('V_ds', 'I_d', 'V_gs')))
+
+    guess = {}
+    for name, first, second in [('V_th', transfer, output), ('k_n', transfer, output), ('lam', output, transfer)]:
+        for estimates in (first[name], second[name]):
+            estimates = estimates[np.isfinite(estimates)]
+            if len(estimates):
+                guess[name] = float(np.median(estimates))
+                break
+
+    return guess if len(guess) == 3 else None
+
+# mode: batched estimator returning one array per parameter
+ANALYTIC_ESTIMATORS = {
+    'diode': diode_iv_guess,
+    'diode_cv': diode_cv_guess,
+    'mosfet_transfer': mosfet_transfer_guess,
+    'mosfet_output': mosfet_output_guess,
+}
+
+def analytic_guess_batch(mode, curves):
+    """
+    Closed-form initial guesses for several curves, same interface as ModelExtractor.ml_guess_batch
+
+    Args:
+        mode (str): 'diode', 'diode_cv', 'mosfet_transfer' or 'mosfet_output'
+        curves (CurveSet/list): list of tuples (x_data, y_data, bias), bias is T for diode, V_ds for transfer and
+            V_gs for output curves
+
+    Returns:
+        list: one parameter dict per curve, None entries where the estimate fails
+    """
+    guess = ANALYTIC_ESTIMATORS[mode](curves)
+    names = list(guess)
+    values = np.column_stack([guess[k] for k in names]) if len(names) else np.empty((0, 0))
+
+    return [dict(zip(names, row.tolist())) if np.all(np.isfinite(row)) else None for row in values]
+
+def guess_cost(mode, curves, guesses):
+    """
+    Median absolute normalized residual of each curve at its guess, used to pick between competing initial guesses
+
+    The median keeps cutoff points of MOSFET curves, where any current is a huge relative error, from deciding the
+    comparison
+
+    Args:
+        mode (str): 'diode', 'diode_cv', 'mosfet_transfer' or 'mosfet_output'
+        curves (CurveSet/list): curves in the format of analytic_guess_batch
+        guesses (list): one parameter dict or None per curve
+
+    Returns:
+        numpy array: cost per curve, inf for missing guesses
+    """
+    cs = _pack(curves, 300.0 if mode == 'diode' else np.nan)
+    missing = np.array([g is None for g in guesses], dtype=bool)
+    if missing.all():
+        return np.full(len(cs), np.inf)
+
+    names = next(list(g) for g in guesses if g is not None)
+    curve = cs.curve_idx
+    params = {k: np.array([np.nan if g is None else g[k] for g in guesses], dtype=float)[curve] for k in names}
+
+    with np.errstate(invalid='ignore', over='ignore'):
+        if mode == 'diode':
+            y_model = DiodeModel().compute_current(cs.x, params, T=cs.point_values, dtype=np.float64)
+        elif mode == 'diode_cv':
+            y_model = DiodeModel().compute_capacitance(cs.x, params, dtype=np.float64)
+        elif mode == 'mosfet_transfer':
+            y_model = MOSFETModel().compute_current(cs.x, params, V_ds=cs.point_values, dtype=np.float64)
+        else:
+            y_model = MOSFETModel().compute_current(cs.point_values, params, V_ds=cs.x, dtype=np.float64)
+
+        res = np.abs(y_model - cs.y) / np.maximum(np.abs(cs.y), 1e-15)
+    res = np.where(np.isfinite(res), res, np.inf)
+
+    # median per curve from one sort of (curve, residual)
+    order = np.lexsort((res, curve))
+    lengths = cs.lengths
+    lo = cs.offsets[:-1] + np.maximum(lengths - 1, 0) // 2
+    hi = cs.offsets[:-1] + lengths // 2
+    cost = np.full(len(cs), np.inf)
+    nonempty = lengths > 0
+    cost[nonempty] = 0.5 * (res[order][lo[nonempty]] + res[order][np.minimum(hi, len(res) - 1)[nonempty]])
+
+    return np.where(missing, np.inf, cost)
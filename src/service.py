@@ -0,0 +1,354 @@
+# Local asyncio extraction service
+# Jobs are queued, their ML initial guesses are pooled into micro-batches (one estimator forward pass per batch and
+# mode), and the least squares fits run in a worker process pool. Results are streamed back as they complete
+
+import asyncio
+import collections
+import json
+import multiprocessing
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from src.models import DiodeModel, MOSFETModel
+from src.extraction import ModelExtractor, ML_ESTIMATORS
+
+DEFAULT_GUESSES = {
+    'diode': {'I_s': 1e-12, 'n': 1.0, 'R_s': 0.1},
+    'diode_cv': {'C_j': 1e-12, 'V_bi': 0.7, 'm': 0.5},
+    'mosfet_transfer': {'V_th': 0.5, 'k_n': 1e-4, 'lam': 0.0},
+    'mosfet_output': {'V_th': 0.5, 'k_n': 1e-4, 'lam': 0.0},
+}
+
+def run_fit(mode, x, y, bias, initial_params):
+    """
+    Runs a single extraction, executed inside the worker processes
+
+    Args:
+        mode (str): 'diode', 'diode_cv', 'mosfet_transfer' or 'mosfet_output'
+        x (numpy array): swept voltage
+        y (numpy array): measured current or capacitance
+        bias (float): T for 'diode', V_ds for 'mosfet_transfer' and V_gs for 'mosfet_output', unused for 'diode_cv'
+        initial_params (dict): initial guess, always provided so workers never load the estimators
+
+    Returns:
+        dict: report from the ModelExtractor fit
+    """
+    if mode == 'diode':
+        return ModelExtractor(DiodeModel()).diode_fit(x, y, T=bias, initial_params=initial_params)
+    elif mode == 'diode_cv':
+        return ModelExtractor(DiodeModel()).diode_cv_fit(x, y, initial_params=initial_params)
+    elif mode == 'mosfet_transfer':
+        return ModelExtractor(MOSFETModel()).mosfet_fit(x, y, V_ds=bias, initial_params=initial_params)
+    else:
+        return ModelExtractor(MOSFETModel()).mosfet_fit(np.full_like(x, bias), y, V_ds=x, initial_params=initial_params)
+
+def _to_builtin(value):
+    """
+    Converts numpy scalars and arrays in a report to JSON-serializable Python types
+    """
+    if isinstance(value, dict):
+        return {k: _to_builtin(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+class ExtractionService:
+    def __init__(self, max_batch_size=32, max_wait=0.01, max_workers=None, executor=None, guess='ml'):
+        """
+        ExtractionService constructor
+
+        Args:
+            max_batch_size (int, optional): maximum number of jobs whose ML guesses share one forward pass, defaults to 32
+            max_wait (float, optional): seconds to wait for a batch to fill after its first job arrives, defaults to 0.01
+            max_workers (int, optional): size of the worker process pool, defaults to the number of CPUs
+            executor (Executor, optional): executor used for the fits instead of a new process pool
+            guess (str, optional): initial guess strategy of jobs without initial_params, 'ml', 'analytic', 'both' or
+                'none', see ModelExtractor, defaults to 'ml'
+        """
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_workers = max_workers
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._extractor = ModelExtractor(None, guess=guess) # only used for batched guesses, estimators stay loaded in this process
+
+        self._queue = None
+        self._results = None
+        self._consumers = 0 # results() iterators currently open, results are only kept for them
+        self._batcher = None
+        self._next_id = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.batch_sizes = collections.deque(maxlen=1000)
+        self.latencies = collections.deque(maxlen=1000)
+
+    async def start(self):
+        """
+        Starts the batching loop and the worker pool
+        """
+        if self._executor is None:
+            # spawn keeps workers independent of the torch threads already running in this process
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+        self._queue = asyncio.Queue()
+        self._results = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._batch_loop())
+
+        return self
+
+    async def stop(self):
+        """
+        Stops accepting work, cancels the batching loop and shuts down the worker pool. Jobs that were still queued
+        resolve with an error result, jobs already running in the pool finish
+        """
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+
+        if self._queue is not None:
+            queue, self._queue = self._queue, None
+            while not queue.empty():
+                job, future, submitted = queue.get_nowait()
+                self.in_flight += 1 # counted as taken so _finish balances it
+                self._finish(None, job, future, submitted, error=RuntimeError("Service stopped before the job ran"))
+
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def submit(self, job):
+        """
+        Queues an extraction job
+
+        Args:
+            job (dict): 'mode', 'x', 'y', optional 'bias', 'initial_params' and 'id'
+
+        Raises:
+            RuntimeError: the service is not running
+            ValueError: unknown fit mode, x and y of different lengths or a MOSFET job without 'bias'
+
+        Returns:
+            asyncio.Future: resolves to the result dict {'id', 'report', 'latency'}
+        """
+        if self._queue is None:
+            raise RuntimeError("ExtractionService is not running, call start() or use it as an async context manager")
+        if job.get('mode') not in ML_ESTIMATORS:
+            raise ValueError(f"Unknown fit mode '{job.get('mode')}'. Available: {list(ML_ESTIMATORS)}")
+
+        job = dict(job)
+        if job.get('id') is None:
+            job['id'] = self._next_id
+            self._next_id += 1
+
+        job['x'] = np.asarray(job['x'], dtype=float)
+        job['y'] = np.asarray(job['y'], dtype=float)
+        if job['x'].ndim != 1 or job['x'].shape != job['y'].shape or not job['x'].size:
+            raise ValueError(f"x and y must be non-empty 1D arrays of the same length, got {job['x'].shape} and {job['y'].shape}")
+        if job['mode'].startswith('mosfet'):
+            if job.get('bias') is None:
+                raise ValueError(f"'{job['mode']}' jobs need a 'bias' ({'V_ds' if job['mode'] == 'mosfet_transfer' else 'V_gs'})")
+            job['bias'] = float(job['bias'])
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((job, future, time.perf_counter()))
+
+        return future
+
+    async def extract(self, job):
+        """
+        Queues an extraction job and waits for its result
+        """
+        return await self.submit(job)
+
+    async def results(self):
+        """
+        Async iterator over results in completion order
+
+        Only results completed while an iterator is open are delivered, so the service keeps nothing when no one is
+        listening
+        """
+        self._consumers += 1
+        try:
+            while True:
+                yield await self._results.get()
+        finally:
+            self._consumers -= 1
+            if not self._consumers:
+                while not self._results.empty():
+                    self._results.get_nowait()
+
+    def metrics(self):
+        """
+        Returns queue depth, throughput counters, batch sizes and latency percentiles (seconds) of recent jobs
+        """
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'in_flight': self.in_flight,
+            'completed': self.completed,
+            'failed': self.failed,
+            'mean_batch_size': float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            'latency_p50': float(np.percentile(latencies, 50)),
+            'latency_p95': float(np.percentile(latencies, 95)),
+            'latency_max': float(np.max(latencies)),
+        }
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+            except asyncio.CancelledError:
+                for item in batch: # back to the queue, stop() fails the jobs left there
+                    self._queue.put_nowait(item)
+                raise
+
+        return batch
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._next_batch()
+            self.batch_sizes.append(len(batch))
+            self.in_flight += len(batch)
+            dispatched = 0
+            try:
+                await self._guess(loop, batch)
+                for job, future, submitted in batch:
+                    self._dispatch(loop, job, future, submitted)
+                    dispatched += 1
+            except asyncio.CancelledError:
+                # stopped mid-batch, jobs not yet handed to the pool would otherwise never resolve
+                for job, future, submitted in batch[dispatched:]:
+                    self._finish(None, job, future, submitted, error=RuntimeError("Service stopped before the job ran"))
+                raise
+            except Exception as e:
+                # a failing batch resolves its own jobs with an error, the loop keeps serving the next ones
+                for job, future, submitted in batch[dispatched:]:
+                    self._finish(None, job, future, submitted, error=e)
+
+    async def _guess(self, loop, batch):
+        by_mode = collections.defaultdict(list)
+        for item in batch:
+            if item[0].get('initial_params') is None:
+                by_mode[item[0]['mode']].append(item)
+
+        for mode, items in by_mode.items():
+            curves = [(job['x'], job['y'], job.get('bias')) for job, _, _ in items]
+            try:
+                guesses = await loop.run_in_executor(None, self._extractor.guess_batch, mode, curves)
+            except Exception:
+                guesses = [None] * len(items) # the guess is only a starting point, fall back to the defaults
+            for (job, _, _), guess in zip(items, guesses):
+                job['initial_params'] = guess if guess else dict(DEFAULT_GUESSES[mode])
+
+    def _dispatch(self, loop, job, future, submitted):
+        bias = job.get('bias', 300 if job['mode'] == 'diode' else None)
+        try:
+            fit = loop.run_in_executor(self._executor, run_fit, job['mode'], job['x'], job['y'], bias, job['initial_params'])
+        except Exception as e: # e.g. a broken or shut down pool
+            self._finish(None, job, future, submitted, error=e)
+            return
+        fit.add_done_callback(lambda f: self._finish(f, job, future, submitted))
+
+    def _finish(self, fit, job, future, submitted, error=None):
+        self.in_flight -= 1
+        latency = time.perf_counter() - submitted
+        self.latencies.append(latency)
+
+        if error is None:
+            error = asyncio.CancelledError() if fit.cancelled() else fit.exception()
+        if error is not None:
+            self.failed += 1
+            result = {'id': job['id'], 'error': str(error) or type(error).__name__, 'latency': latency}
+        else:
+            self.completed += 1
+            result = {'id': job['id'], 'report': fit.result(), 'latency': latency}
+
+        if not future.done():
+            future.set_result(result)
+        if self._consumers:
+            self._results.put_nowait(result)
+
+    async def serve(self, host='127.0.0.1', port=0):
+        """
+        Serves the extraction service on a local TCP socket using newline-delimited JSON
+
+        Each request line is a job dict, each response line is a result dict written as soon as that job completes,
+        so responses can arrive out of order and are matched by 'id'. A {"metrics": true} line returns the metrics
+
+        Args:
+            host (str, optional): interface to bind, defaults to localhost
+            port (int, optional): port to bind, defaults to 0 for any free port
+
+        Returns:
+            asyncio.Server: running server, the bound port is server.sockets[0].getsockname()[1]
+        """
+        async def handle(reader, writer):
+            pending = set()
+            lock = asyncio.Lock()
+
+            async def respond(payload):
+                async with lock:
+                    writer.write((json.dumps(_to_builtin(payload)) + '\n').encode())
+                    await writer.drain()
+
+            async def run(job):
+                try:
+                    result = await self.submit(job)
+                except Exception as e:
+                    result = {'id': job.get('id'), 'error': str(e)}
+                await respond(result)
+
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    await respond({'error': f"Invalid JSON: {e}"})
+                    continue
+
+                if not isinstance(request, dict):
+                    await respond({'error': f"Expected a JSON object, got {type(request).__name__}"})
+                    continue
+
+                if request.get('metrics'):
+                    await respond({'metrics': self.metrics()})
+                    continue
+
+                task = asyncio.create_task(run(request))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+            if pending:
+                await asyncio.gather(*pending)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (asyncio.CancelledError, ConnectionError):
+                pass # client gone or server shutting down
+
+        return await asyncio.start_server(handle, host, port)
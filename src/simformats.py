@@ -0,0 +1,202 @@
+# Readers for simulator output formats, parsed straight into dataframes without an intermediate CSV
+# ngspice raw: header lines, a variable table, then a Binary: (little-endian float64, point-major) or Values: (ASCII) block,
+#              one file may hold several plots back to back
+# Sentaurus .plt (DF-ISE text): Info { datasets = [ "name" ... ] } followed by Data { values ... } in dataset order
+# whitespace tables (Touchstone-like): '!' comments, '#' option lines, optional header line of column names
+
+import re
+import numpy as np
+import pandas as pd
+
+def _read_raw_header(f):
+    """
+    Reads one plot header from an ngspice raw file, returns None at end of file
+    """
+    header = {}
+    names = []
+
+    while True:
+        line = f.readline()
+        if not line:
+            return None
+
+        text = line.decode('latin-1').strip()
+        if not text:
+            continue
+
+        key, _, value = text.partition(':')
+        key = key.strip().lower()
+
+        if key == 'variables':
+            n_vars = int(header['no. variables'])
+            if value.strip(): # first variable can share the line with the keyword
+                names.append(value.split()[1])
+            while len(names) < n_vars:
+                tokens = f.readline().decode('latin-1').split()
+                if tokens:
+                    names.append(tokens[1])
+        elif key in ('binary', 'values'):
+            header['names'] = names
+            header['block'] = key
+            return header
+        else:
+            header[key] = value.strip()
+
+def iter_ngspice_raw(filepath):
+    """
+    Streams the plots of an ngspice raw file (binary or ASCII), one plot is parsed at a time
+
+    Args:
+        filepath (str): path to the raw file
+
+    Yields:
+        tuple: (plot name, DataFrame with one column per variable), complex plots have complex columns
+    """
+    with open(filepath, 'rb') as f:
+        while True:
+            header = _read_raw_header(f)
+            if header is None:
+                return
+
+            names = header['names']
+            n_vars = len(names)
+            n_points = int(header['no. points'])
+            is_complex = 'complex' in header.get('flags', 'real').lower()
+
+            if header['block'] == 'binary':
+                width = 2 if is_complex else 1
+                count = n_points * n_vars * width
+                data = np.frombuffer(f.read(8 * count), dtype='<f8', count=count)
+                if is_complex:
+                    data = data.view('<c16')
+                values = data.reshape(n_points, n_vars)
+            else:
+                values = np.empty((n_points, n_vars), dtype=complex if is_complex else float)
+                for p in range(n_points):
+                    v = 0
+                    while v < n_vars:
+                        tokens = f.readline().decode('latin-1').split()
+                        if not tokens:
+                            continue
+                        token = tokens[-1] # the first variable of a point is preceded by the point index
+                        if is_complex:
+                            re_part, im_part = token.split(',')
+                            values[p, v] = complex(float(re_part), float(im_part))
+                        else:
+                            values[p, v] = float(token)
+                        v += 1
+
+            yield header.get('plotname', ''), pd.DataFrame(values, columns=names)
+
+def read_ngspice_raw(filepath, plot=0):
+    """
+    Reads one plot of an ngspice raw file
+
+    Args:
+        filepath (str): path to the raw file
+        plot (int/str, optional): plot index or plot name, defaults to the first plot
+
+    Raises:
+        ValueError: plot not found in the file
+
+    Returns:
+        DataFrame: one column per raw variable, e.g. 'v(gate)', 'i(vd)'
+    """
+    available = []
+    for idx, (name, df) in enumerate(iter_ngspice_raw(filepath)):
+        if plot == idx or plot == name:
+            return df
+        available.append(name)
+
+    raise ValueError(f"Plot '{plot}' not found in {filepath}. Available: {available}")
+
+def read_plt(filepath):
+    """
+    Reads a Sentaurus/DF-ISE text .plt table
+
+    Args:
+        filepath (str): path to the .plt file
+
+    Raises:
+        ValueError: missing datasets list or Data block
+
+    Returns:
+        DataFrame: one column per dataset, e.g. 'gate OuterVoltage', 'drain TotalCurrent'
+    """
+    with open(filepath, 'r', encoding='latin-1') as f:
+        info = []
+        for line in f:
+            if re.match(r'\s*Data\s*\{', line):
+                break
+            info.append(line)
+        else:
+            raise ValueError(f"No Data block in {filepath}")
+
+        match = re.search(r'datasets\s*=\s*\[(.*?)\]', ''.join(info), re.S)
+        if match is None:
+            raise ValueError(f"No datasets list in {filepath}")
+        names = re.findall(r'"([^"]*)"', match.group(1))
+
+        chunks = []
+        for line in f: # values are row-major in dataset order but rows can wrap across lines
+            text = line.split('}')[0]
+            if text.strip():
+                chunks.append(np.array(text.split(), dtype=float))
+            if '}' in line:
+                break
+
+    values = np.concatenate(chunks) if chunks else np.empty(0)
+    if values.size % len(names):
+        raise ValueError(f"Data block of {filepath} does not match {len(names)} datasets")
+
+    return pd.DataFrame(values.reshape(-1, len(names)), columns=names)
+
+def _is_number(token):
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
+
+def read_whitespace_table(filepath, names=None, comment_char='!'):
+    """
+    Reads a whitespace-delimited table such as Touchstone-style exports
+
+    Args:
+        filepath (str): path to the table
+        names (list, optional): column names, defaults to the header line if present, else col0, col1, ...
+        comment_char (str, optional): character that starts comments, defaults to '!'
+
+    Returns:
+        DataFrame: table values, the Touchstone option line (if any) is kept in df.attrs['options']
+    """
+    skip = 0
+    header = None
+    options = None
+
+    with open(filepath, 'r', encoding='latin-1') as f:
+        for line in f:
+            text = line.split(comment_char)[0].strip()
+            if not text:
+                skip += 1
+                continue
+            if text.startswith('#'):
+                options = text[1:].strip()
+                skip += 1
+                continue
+            tokens = text.split()
+            if not all(_is_number(t) for t in tokens):
+                header = tokens
+                skip += 1
+            break
+
+    if names is None:
+        names = header
+
+    df = pd.read_csv(filepath, sep=r'\s+', comment=comment_char, skiprows=skip, header=None, names=names, engine='c')
+    if names is None:
+        df.columns = [f"col{i}" for i in range(df.shape[1])]
+
+    df.attrs['options'] = options
+
+    return df
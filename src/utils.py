@@ -1,8 +1,12 @@
+import csv
+import os
+import re
 import numpy as np
 import pandas as pd
 from scipy.constants import e as q_e, k as k_B
 
-from src.models import MOSFETModel, DiodeModel
+from src.models import MOSFETModel, DiodeModel, EKVMOSFETModel
+from src.montecarlo import metric_corners
 
 
 def generate_diode_csv(filepath, params, v_sweep, T=300):
@@ -52,9 +56,7 @@ def generate_mosfet_csv(filepath, params, sweep_type='Id-Vgs', sweep=None, val=1
     if sweep_type == 'Id-Vgs':
         vgs = sweep
         vds = val
-        local_params = params.copy()
-        local_params['V_ds'] = vds
-        i_d = model.compute_current(vgs, local_params)
+        i_d = model.compute_current(vgs, params, V_ds=vds)
         df = pd.DataFrame({
             'V_Gate': vgs,
             'V_Drain': vds,
@@ -64,10 +66,7 @@ def generate_mosfet_csv(filepath, params, sweep_type='Id-Vgs', sweep=None, val=1
     else:
         vds = sweep
         vgs = val
-        local_params = params.copy()
-        local_params['V_ds'] = vds
-        vgs_array = np.full_like(vds, vgs)
-        i_d = model.compute_current(vgs_array, local_params)
+        i_d = model.compute_current(vgs, params, V_ds=vds)
         df = pd.DataFrame({
             'V_Gate': vgs,
             'V_Drain': vds,
@@ -81,57 +80,188 @@ def generate_multi_mosfet_csv(filepath, params, vgs_list, vds_sweep):
     Generates CSV file for multi-curve MOSFET I-V data
     """
     model = MOSFETModel()
-    data = []
-    for vgs in vgs_list:
-        vgs_array = np.full_like(vds_sweep, vgs)
-        i_d = model.compute_current(vgs_array, {**params, 'V_ds': vds_sweep})
-        for vds, id in zip(vds_sweep, i_d):
-            data.append({'V_Gate': vgs, 'V_Drain': vds, 'I_Drain': id})
-            
-    df = pd.DataFrame(data)
+    i_d = model.compute_grid(vgs_list, vds_sweep, params) # (n_vgs, n_vds), one row per curve
+    df = pd.DataFrame({
+        'V_Gate': np.repeat(np.asarray(vgs_list, dtype=float), len(vds_sweep)),
+        'V_Drain': np.tile(vds_sweep, len(vgs_list)),
+        'I_Drain': i_d.ravel()
+    })
     df.to_csv(filepath, index=False)
     
+# SPICE name, format and default of each extracted parameter, parameters without a default are written when present
+SPICE_PARAMS = {
+    'diode': ('D', [('I_s', 'IS', '.5e', 1e-14), ('n', 'N', '.4f', 1.0), ('R_s', 'RS', '.4f', 0.0),
+                    ('Eg', 'EG', '.4f', None), ('C_j', 'CJO', '.5e', None), ('V_bi', 'VJ', '.4f', None),
+                    ('m', 'M', '.4f', None)]),
+    'MOSFET': ('NMOS', [('V_th', 'VTO', '.4f', 0.7), ('k_n', 'KP', '.5e', 1e-4), ('lam', 'LAMBDA', '.4f', 0.0)]),
+    'EKV': ('NMOS', [('V_th', 'VTO', '.4f', 0.7), ('k_n', 'KP', '.5e', 1e-4), ('lam', 'LAMBDA', '.4f', 0.0),
+                     ('gamma', 'GAMMA', '.4f', 0.0), ('phi', 'PHI', '.4f', 0.7), ('theta', 'THETA', '.4f', 0.0)]),
+}
+# LEVEL of the card. The EKV cards claim no simulator level: LAMBDA is the 1/V channel-length modulation and THETA and
+# the slope factor follow the simplified forms of the repo model, not EKV 2.6 (LEVEL 44, where LAMBDA is a depletion
+# length coefficient), so no simulator reproduces them and they are only read back by this repo. Without a LEVEL a
+# simulator would run them as Level 1
+SPICE_LEVELS = {'MOSFET': 1}
+# repo model evaluating each device type, for corner metrics and verification references
+SPICE_MODELS = {'diode': DiodeModel, 'MOSFET': MOSFETModel, 'EKV': EKVMOSFETModel}
+
+# statistical corner sections of a model library and the percentile of the corner metric each one sits at
+CORNERS = {'TT': 50.0, 'FF': 99.865, 'SS': 0.135}
+
+def _spice_card(params, device_type, model_name):
+    spice_type, fields = SPICE_PARAMS[device_type]
+    parts = [f"LEVEL={SPICE_LEVELS[device_type]}"] if device_type in SPICE_LEVELS else []
+    for name, spice_name, fmt, default in fields:
+        value = params.get(name, default)
+        if value is not None and not np.isfinite(value): # unfitted optional parameter, fall back to the default
+            value = default
+        if value is not None:
+            parts.append(f"{spice_name}={value:{fmt}}")
+    return f".MODEL {model_name} {spice_type}({' '.join(parts)})\n"
+
 def generate_spice_model(params, device_type, model_name='DUT'):
     """
     Generates a SPICE .MODEL from the extracted parameters
 
     Args:
         params (dict): extracted device parameters
-        device_type (str): 'diode' or 'MOSFET' to define .MODEL device type 
+        device_type (str): 'diode', 'MOSFET' (Level 1) or 'EKV' to define .MODEL device type
         model_name (str, optional): optional name of the model, defaults to 'DUT'
     
     Returns:
         str: Formatted SPICE model string
     """
+    if device_type not in SPICE_PARAMS:
+        return ""
+    return _spice_card(params, device_type, model_name)
+
+def spice_model_name(device, prefix=''):
+    """
+    Turns a device name into a valid SPICE model name, '+' and '-' become 'P' and 'M', other symbols '_'
+    """
+    name = prefix + re.sub(r'[^A-Za-z0-9_]', '_', str(device).replace('+', 'P').replace('-', 'M'))
+    return name if name[:1].isalpha() else 'M' + name
+
+def _drive_metric(device_type):
+    # fast / slow ordering of devices: forward current at 0.7 V for diodes, I_d(V_gs = V_ds = 3 V) for MOSFETs
     if device_type == 'diode':
-        I_s = params.get('I_s', 1e-14)
-        n = params.get('n', 1.0)
-        R_s = params.get('R_s', 0.0)
-        
-        param_str = f"IS={I_s:.5e} N={n:.4f} RS={R_s:.4f}"
-        
-        if 'Eg' in params:
-            param_str += f" EG={params['Eg']:.4f}"
-        
-        if 'C_j' in params:
-            param_str += f" CJO={params['C_j']:.5e}"
-        if 'V_bi' in params:
-            param_str += f" VJ={params['V_bi']:.4f}"
-        if 'm' in params:
-            param_str += f" M={params['m']:.4f}"
-            
-        return f".MODEL {model_name} D({param_str})\n"
-
-    elif device_type == 'MOSFET':
-        V_th = params.get('V_th', 0.7)
-        k_n = params.get('k_n', 1e-4)
-        lam = params.get('lam', 0.0)
-        
-        param_str = f"LEVEL=1 VTO={V_th:.4f} KP={k_n:.5e} LAMBDA={lam:.4f}"
-        
-        return f".MODEL {model_name} D({param_str})\n"
-    
-    return ""
+        return lambda columns: DiodeModel().compute_current_sets(0.7, columns)
+    return lambda columns: SPICE_MODELS[device_type]().compute_current_sets(3.0, columns, V_ds=3.0)
+
+def _result_chunks(results, chunk_size):
+    # (device names, {parameter: array}) per chunk from a DataFrame, a {device: params} dict or an iterable of either
+    # DataFrame chunks or (device, params) pairs
+    if isinstance(results, pd.DataFrame):
+        table = results
+        results = (table.iloc[start:start + chunk_size] for start in range(0, len(table), chunk_size))
+    elif isinstance(results, dict):
+        results = iter(results.items())
+
+    pending = []
+    for item in results:
+        if isinstance(item, pd.DataFrame):
+            yield item['device'].astype(str).tolist(), {k: item[k].to_numpy(dtype=float) for k in item.columns
+                                                        if k != 'device' and pd.api.types.is_numeric_dtype(item[k])}
+            continue
+        pending.append(item)
+        if len(pending) == chunk_size:
+            yield _pairs_to_columns(pending)
+            pending = []
+    if pending:
+        yield _pairs_to_columns(pending)
+
+def _pairs_to_columns(pairs):
+    names = list(dict.fromkeys(k for _, p in pairs for k in p)) # union, devices may report different parameters
+    return [str(d) for d, _ in pairs], {k: np.array([p.get(k, np.nan) for _, p in pairs], dtype=float) for k in names}
+
+def write_spice_library(path, results, device_type, index_path=None, model_name='DUT', prefix='', corners=CORNERS,
+                        metric=None, chunk_size=1000):
+    """
+    Streams a SPICE model library for a whole lot: one .MODEL per extracted device in a '.LIB DEVICES' section,
+    followed by one section per statistical corner ('.LIB TT', '.LIB FF', '.LIB SS') that each define model_name, so a
+    netlist selects a corner with .LIB <path> <corner>. Devices are formatted and written one chunk at a time; only
+    the parameter values are kept for the corner selection, never the model text
+
+    Corners are the devices whose metric sits at the given percentiles over the lot (see montecarlo.metric_corners).
+    Devices with a non-finite required parameter (failed fits) are left out of the library and get an empty model name
+    in the index. Chunks may carry different parameters: required parameters missing from a chunk take their SPICE
+    default, optional ones only enter the corner selection when every chunk has them
+
+    Args:
+        path (str): output .lib file
+        results (DataFrame/dict/iterable): batch extraction results, a table with a 'device' column and one column
+            per parameter (other numeric columns are ignored), a {device: params} dict, or an iterable of DataFrame
+            chunks or (device, params) pairs
+        device_type (str): 'diode', 'MOSFET' or 'EKV'
+        index_path (str, optional): CSV of device -> model name, defaults to path with a .csv extension
+        model_name (str, optional): name of the model in the corner sections, defaults to 'DUT'
+        prefix (str, optional): prepended to every per-device model name
+        corners (dict, optional): {section: percentile of the metric}, defaults to TT / FF / SS at the median and
+            +-3 sigma, None or empty writes no corner sections
+        metric (callable, optional): maps {name: array of n values} to n figures of merit (higher is faster),
+            defaults to the drive current
+        chunk_size (int, optional): devices formatted per write, defaults to 1000
+
+    Returns:
+        dict: 'devices' (models written), 'skipped' (devices left out) and 'corners' {section: parameter dict}
+
+    Raises:
+        ValueError: unknown device type
+    """
+    if device_type not in SPICE_PARAMS:
+        raise ValueError(f"Unknown device type '{device_type}'. Available: {list(SPICE_PARAMS)}")
+    spice_type, fields = SPICE_PARAMS[device_type]
+    required = [name for name, _, _, default in fields if default is not None]
+    index_path = index_path or os.path.splitext(path)[0] + '.csv'
+
+    kept = [] # per-chunk parameter columns of the written devices, for the corner selection
+    used = set()
+    written = skipped = 0
+
+    with open(path, 'w') as lib, open(index_path, 'w', newline='') as index_file:
+        lib.write(f"* {device_type} model library\n.LIB DEVICES\n")
+        index = csv.writer(index_file, lineterminator='\n')
+        index.writerow(['device', 'model'])
+
+        for devices, columns in _result_chunks(results, chunk_size):
+            params = [k for k, *_ in fields if k in columns]
+            ok = np.ones(len(devices), dtype=bool)
+            for k in required:
+                if k in columns:
+                    ok &= np.isfinite(columns[k])
+
+            lines, rows = [], []
+            for i, device in enumerate(devices):
+                if not ok[i]:
+                    rows.append((device, ''))
+                    continue
+                name = spice_model_name(device, prefix)
+                while name in used: # sanitising can map two devices to one name
+                    name += '_'
+                used.add(name)
+                lines.append(_spice_card({k: columns[k][i] for k in params}, device_type, name))
+                rows.append((device, name))
+
+            lib.writelines(lines)
+            index.writerows(rows)
+            kept.append({k: columns[k][ok] if k in columns else np.full(int(ok.sum()), default)
+                         for k, _, _, default in fields if k in columns or default is not None})
+            written += int(ok.sum())
+            skipped += len(devices) - int(ok.sum())
+
+        lib.write(".ENDL DEVICES\n")
+
+        selected = {}
+        if corners and written:
+            population = {k: np.concatenate([c[k] for c in kept]) for k, *_ in fields if all(k in c for c in kept)}
+            picked = metric_corners(population, (metric or _drive_metric(device_type))(population), tuple(corners.values()))
+            for section, percentile in corners.items():
+                selected[section] = picked[percentile]
+                lib.write(f"\n.LIB {section}\n")
+                lib.write(_spice_card(selected[section], device_type, model_name))
+                lib.write(f".ENDL {section}\n")
+
+    return {'devices': written, 'skipped': skipped, 'corners': selected}
 
 def generate_training_data_diode(n_samples, v_range):
     v = np.linspace(0, 1.0, 150)
@@ -193,8 +323,8 @@ def generate_training_transfer_mosfet(n_samples):
         kn = 10 ** np.random.uniform(low_log, high_log)
         lam = np.random.uniform(bounds['lam'][0], bounds['lam'][1])
         vds = np.random.uniform(0.1, 5.0)
-        local_params = {'V_th': vth, 'k_n': kn, 'lam': lam, 'V_ds': vds}
-        I_true = model.compute_current(vgs, local_params)
+        local_params = {'V_th': vth, 'k_n': kn, 'lam': lam}
+        I_true = model.compute_current(vgs, local_params, V_ds=vds)
         I_noise = I_true * (1 + np.random.normal(scale=0.01, size=I_true.shape))
         I_noise = np.abs(I_noise)
         I_final = np.log10(I_noise + 1e-15)
@@ -219,9 +349,8 @@ def generate_training_output_mosfet(n_samples):
         kn = 10 ** np.random.uniform(low_log, high_log)
         lam = np.random.uniform(bounds['lam'][0], bounds['lam'][1])
         vgs = np.random.uniform(1.0, 5.0)
-        local_params = {'V_th': vth, 'k_n': kn, 'lam': lam, 'V_ds': vds}
-        vgs_array = np.full_like(vds, vgs)
-        I_true = model.compute_current(vgs_array, local_params)
+        local_params = {'V_th': vth, 'k_n': kn, 'lam': lam}
+        I_true = model.compute_current(vgs, local_params, V_ds=vds)
         I_noise = I_true * (1 + np.random.normal(scale=0.01, size=I_true.shape))
         I_noise = np.abs(I_noise)
         I_final = np.log10(I_noise + 1e-15)
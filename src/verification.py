@@ -0,0 +1,355 @@
+# Verification of exported SPICE models against the extraction fits
+# The .MODEL cards of a library are parsed back and re-simulated either with a built-in DC evaluator of the SPICE
+# diode and Level 1 MOSFET equations, or with a local ngspice binary when one is on the PATH. EKV cards have no
+# simulator equivalent (see utils.SPICE_LEVELS): they are evaluated with the repo model itself, which only checks that
+# the card carries the fitted parameters (formatting and rounding), not what a simulator would produce. All devices of a lot are
+# evaluated in one vectorized sweep (one netlist with an instance per device for ngspice), and every device gets the
+# largest deviation between the simulated curve and the curve of its extracted parameters
+# The evaluator follows SPICE semantics rather than the repo models: a GMIN conductance across the junction, the
+# diode series resistance solved at the internal node, and channel-length modulation in the triode region as well
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import numpy as np
+import pandas as pd
+from scipy.constants import e as q_e, k as k_B
+
+from src.models import DiodeModel, EKVMOSFETModel
+from src.simformats import read_ngspice_raw
+from src.utils import SPICE_PARAMS, SPICE_LEVELS, SPICE_MODELS, spice_model_name
+
+# SPICE scale factors, 'meg' and 'mil' before the single letters
+SPICE_SCALE = {'t': 1e12, 'g': 1e9, 'meg': 1e6, 'k': 1e3, 'mil': 25.4e-6, 'm': 1e-3, 'u': 1e-6, 'n': 1e-9, 'p': 1e-12, 'f': 1e-15}
+ENGINES = ('auto', 'builtin', 'ngspice')
+CARD_ONLY = ('EKV',) # device types without a simulator equivalent, verified against the repo model only
+
+_NUMBER = re.compile(r'^([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|mil|[tgkmunpf])?', re.IGNORECASE)
+
+def spice_value(token):
+    """
+    Converts a SPICE number with an optional scale factor ('1.5p', '2meg', '1e-12') to float
+    """
+    match = _NUMBER.match(token.strip())
+    if not match:
+        raise ValueError(f"Not a SPICE number: '{token}'")
+    return float(match.group(1)) * SPICE_SCALE.get((match.group(2) or '').lower(), 1.0)
+
+def parse_spice_models(text, section=None):
+    """
+    Parses the .MODEL cards of a netlist or library back into extracted parameter dicts
+
+    Args:
+        text (str): netlist or library text, '+' continuation lines and '*' comments are handled
+        section (str, optional): only read the models inside '.LIB <section>' ... '.ENDL', all models if None (a later
+            definition of the same name replaces an earlier one)
+
+    Returns:
+        dict: {model name: (device type, params)}, device type as in utils.SPICE_PARAMS ('diode', 'MOSFET' or 'EKV'),
+              params keyed by the repo parameter names, cards of other device types are skipped. Device types sharing a
+              SPICE type are told apart by LEVEL (none reads as Level 1 or as a type without a level), then by the
+              type that knows most of the card's parameters; a card matching no LEVEL reads as the first of them
+    """
+    types = {}
+    for device_type, (spice_type, _) in SPICE_PARAMS.items():
+        types.setdefault(spice_type, []).append(device_type)
+    names = {device_type: {spice_name: name for name, spice_name, _, _ in fields}
+             for device_type, (_, fields) in SPICE_PARAMS.items()}
+
+    lines = []
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line.startswith('*'):
+            continue
+        if line.startswith('+') and lines:
+            lines[-1] += ' ' + line[1:]
+        else:
+            lines.append(line)
+
+    models = {}
+    current = None
+    for line in lines:
+        words = line.split()
+        keyword = words[0].lower()
+        if keyword == '.lib' and len(words) == 2: # '.lib <file> <section>' is an include, not a section
+            current = words[1]
+        elif keyword == '.endl':
+            current = None
+        elif keyword == '.model' and len(words) >= 3 and (section is None or (current or '').lower() == section.lower()):
+            name = words[1]
+            body = line.split(None, 2)[2]
+            spice_type, _, assignments = body.replace('(', ' ', 1).rstrip(')').partition(' ')
+            candidates = types.get(spice_type.upper())
+            if candidates is None:
+                continue
+            level = re.search(r'\bLEVEL\s*=\s*([^\s)]+)', assignments, re.IGNORECASE)
+            level = int(spice_value(level.group(1))) if level else None
+            found = re.findall(r'(\w+)\s*=\s*([^\s)]+)', assignments)
+            pool = [d for d in candidates if SPICE_LEVELS.get(d) == level or (level is None and SPICE_LEVELS.get(d) == 1)]
+            device_type = max(pool or candidates[:1], key=lambda d: sum(key.upper() in names[d] for key, _ in found))
+            params = {}
+            for key, value in found:
+                if key.upper() in names[device_type]:
+                    params[names[device_type][key.upper()]] = spice_value(value)
+            models[name] = (device_type, params)
+
+    return models
+
+def read_spice_models(path, section=None):
+    """
+    Reads the .MODEL cards of a library file, see parse_spice_models
+    """
+    with open(path) as f:
+        return parse_spice_models(f.read(), section)
+
+def _bias_points(device_type, bias):
+    # bias arrays broadcast against each other and flattened to one column per terminal voltage
+    keys = ('V',) if device_type == 'diode' else ('V_gs', 'V_ds')
+    arrays = np.broadcast_arrays(*[np.asarray(bias[k], dtype=float) for k in keys])
+    return [a.ravel() for a in arrays]
+
+def _columns(params, fields, n_dev):
+    # one (n_dev, 1) column per parameter, exporter defaults for missing ones
+    return [np.broadcast_to(np.asarray(params.get(name, default), dtype=float), (n_dev,))[:, None]
+            for name, _, _, default in fields]
+
+def spice_dc(device_type, params, bias, T=300.0, gmin=1e-12):
+    """
+    DC currents of SPICE diode / Level 1 MOSFET / EKV models for many devices at once
+
+    Diode: I = IS (exp(V_d / (N V_t)) - 1) + GMIN V_d at the internal node V_d = V - I RS, solved by Newton from an
+    upper bound on V_d so the iteration converges monotonically. MOSFET (W = L, bulk tied to source):
+    I_D = KP (V_ov - V_DS / 2) V_DS (1 + LAMBDA V_DS) in triode and KP / 2 V_ov**2 (1 + LAMBDA V_DS) in saturation,
+    source and drain swap for negative V_DS. EKV: the EKV-style model of the repo itself at W = L with the bulk tied
+    to the source, so comparing it with the fits only checks the card formatting
+
+    Args:
+        device_type (str): 'diode', 'MOSFET' or 'EKV'
+        params (dict): repo parameter names to scalars or arrays of n_dev values
+        bias (dict): 'V' for diodes, 'V_gs' and 'V_ds' for MOSFETs, arrays broadcast against each other
+        T (float, optional): simulation temperature in Kelvin (TEMP = TNOM), defaults to 300
+        gmin (float, optional): junction shunt conductance, defaults to the SPICE default of 1e-12 S
+
+    Returns:
+        Numpy array: current of shape (n_dev, n_points)
+    """
+    _, fields = SPICE_PARAMS[device_type]
+    n_dev = max([np.size(v) for v in params.values()] + [1])
+    points = _bias_points(device_type, bias)
+
+    if device_type == 'diode':
+        I_s, n, R_s = _columns(params, fields[:3], n_dev)
+        V = points[0][None, :]
+        nvt = n * k_B * T / q_e
+
+        # the internal node never exceeds the voltage at which the series resistor alone would carry the current
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            V_d = np.fmin(V, nvt * np.log1p(np.maximum(V, 0.0) / (R_s * I_s)))
+        V_d = np.broadcast_to(V_d, (n_dev, V.shape[1])).copy()
+
+        for _ in range(100):
+            expo = np.exp(np.minimum(V_d / nvt, 700.0))
+            I = I_s * (expo - 1) + gmin * V_d
+            step = (V_d + R_s * I - V) / (1 + R_s * (I_s * expo / nvt + gmin))
+            V_d -= step
+            if np.max(np.abs(step)) < 1e-13:
+                break
+
+        return I_s * (np.exp(np.minimum(V_d / nvt, 700.0)) - 1) + gmin * V_d
+
+    if device_type == 'EKV':
+        columns = {name: column[:, 0] for (name, *_), column in zip(fields, _columns(params, fields, n_dev))}
+        return EKVMOSFETModel(T).compute_current_sets(points[0], columns, V_ds=points[1], dtype=np.float64)
+
+    V_th, k_n, lam = _columns(params, fields, n_dev)
+    V_gs, V_ds = points[0][None, :], points[1][None, :]
+    sign = np.where(V_ds < 0, -1.0, 1.0)
+    V_gs = np.where(V_ds < 0, V_gs - V_ds, V_gs) # gate to the terminal acting as source
+    V_ds = np.abs(V_ds)
+
+    V_ov = np.maximum(V_gs - V_th, 0.0)
+    V_ch = np.minimum(V_ds, V_ov)
+    return sign * k_n * (V_ov * V_ch - 0.5 * V_ch**2) * (1 + lam * V_ds)
+
+def _sweep(values):
+    # start, step and count of the uniform .DC sweep holding every value, plus each value's index on it
+    grid = np.unique(values)
+    if len(grid) == 1:
+        return grid[0], 1.0, 1, np.zeros(len(values), dtype=int)
+    step = np.min(np.diff(grid))
+    idx = np.rint((values - grid[0]) / step).astype(int)
+    if not np.allclose(grid[0] + idx * step, values, rtol=0, atol=1e-9 * max(1.0, np.abs(grid).max())):
+        raise ValueError("ngspice verification needs bias values on a uniform grid")
+    return grid[0], step, int(idx.max()) + 1, idx
+
+def run_ngspice(library, models, device_type, bias, T=300.0, section=None, binary=None):
+    """
+    Simulates library models with ngspice in batch mode, one instance per model in a single netlist and .DC sweep
+
+    Args:
+        library (str): path of the library file, read by ngspice itself
+        models (list): model names to simulate
+        device_type (str): 'diode', 'MOSFET' or 'EKV'
+        bias (dict): as for spice_dc, values must lie on a uniform grid per terminal
+        T (float, optional): simulation temperature in Kelvin, also used as TNOM, defaults to 300
+        section (str, optional): library section holding the models, the file is included whole if None
+        binary (str, optional): ngspice executable, looked up on the PATH if None
+
+    Returns:
+        Numpy array: current of shape (n_models, n_points)
+
+    Raises:
+        RuntimeError: ngspice not found or the simulation failed
+        ValueError: bias values off a uniform grid
+    """
+    binary = binary or shutil.which('ngspice')
+    if binary is None:
+        raise RuntimeError("ngspice not found on the PATH")
+
+    points = _bias_points(device_type, bias)
+    sweeps = [_sweep(p) for p in points]
+    path = os.path.abspath(library)
+    lines = ["* model verification", f'.lib "{path}" {section}' if section else f'.include "{path}"',
+             f".options temp={T - 273.15:.4f} tnom={T - 273.15:.4f}"]
+
+    if device_type == 'diode':
+        lines.append("VA a 0 DC 0")
+        for i, name in enumerate(models):
+            lines += [f"VM{i} a n{i} DC 0", f"D{i} n{i} 0 {name}"]
+        lines.append(".dc VA {:.9g} {:.9g} {:.9g}".format(sweeps[0][0], sweeps[0][0] + (sweeps[0][2] - 1) * sweeps[0][1], sweeps[0][1]))
+    else:
+        lines += ["VG g 0 DC 0", "VD d 0 DC 0"]
+        for i, name in enumerate(models):
+            lines += [f"VM{i} d d{i} DC 0", f"M{i} d{i} g 0 0 {name} L=1u W=1u"]
+        (gs0, gs_step, n_gs, _), (ds0, ds_step, n_ds, _) = sweeps
+        lines.append(f".dc VD {ds0:.9g} {ds0 + (n_ds - 1) * ds_step:.9g} {ds_step:.9g} "
+                     f"VG {gs0:.9g} {gs0 + (n_gs - 1) * gs_step:.9g} {gs_step:.9g}")
+    lines.append(".end")
+
+    with tempfile.TemporaryDirectory() as work_dir: # the raw file of a large chunk is big, never leave it behind
+        netlist, raw = os.path.join(work_dir, 'verify.cir'), os.path.join(work_dir, 'verify.raw')
+        with open(netlist, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+        result = subprocess.run([binary, '-b', '-r', raw, netlist], capture_output=True, text=True)
+        if result.returncode != 0 or not os.path.exists(raw):
+            raise RuntimeError(f"ngspice failed: {result.stderr.strip()[-500:]}")
+
+        df = read_ngspice_raw(raw)
+    df.columns = [c.lower() for c in df.columns]
+    shape = [s[2] for s in sweeps]
+    if len(df) != np.prod(shape):
+        raise RuntimeError(f"ngspice returned {len(df)} points, expected {int(np.prod(shape))}")
+
+    # the first .dc source is the inner loop, V_ds for MOSFETs
+    flat = sweeps[0][3] if device_type == 'diode' else sweeps[0][3] * shape[1] + sweeps[1][3]
+    currents = []
+    for i in range(len(models)):
+        column = f"vm{i}#branch" if f"vm{i}#branch" in df.columns else f"i(vm{i})"
+        currents.append(np.real(df[column].to_numpy())[flat])
+    return np.array(currents)
+
+def _results_table(results):
+    if isinstance(results, dict):
+        return pd.DataFrame.from_dict(results, orient='index').rename_axis('device').reset_index()
+    return results
+
+def verify_library(path, results, bias, index_path=None, section='DEVICES', T=300.0, engine='auto', rtol=1e-2,
+                   atol=1e-9, gmin=1e-12, chunk_size=2000):
+    """
+    Re-simulates every device model of an exported library and compares it with the curve of its extracted parameters
+
+    Args:
+        path (str): library written by utils.write_spice_library (or any file of .MODEL cards)
+        results (DataFrame/dict): the extraction results the library was written from, a table with a 'device' column
+            and one column per parameter or a {device: params} dict
+        bias (dict): bias points to compare on, 'V' for diodes, 'V_gs' and 'V_ds' for MOSFETs
+        index_path (str, optional): device -> model name CSV, defaults to the library's .csv index when it exists,
+            otherwise model names are derived with utils.spice_model_name
+        section (str, optional): library section of the device models, defaults to 'DEVICES', None reads every model
+        T (float, optional): temperature of the extraction in Kelvin, defaults to 300
+        engine (str, optional): 'builtin', 'ngspice' or 'auto' (ngspice when found on the PATH), defaults to 'auto'.
+            Device types in CARD_ONLY (EKV) always use the built-in evaluator, which is the repo model itself, so their
+            check only covers the card formatting and rounding, not what a simulator would produce
+        rtol (float, optional): largest relative deviation that passes, defaults to 1%
+        atol (float, optional): current added to the reference in the relative deviation, defaults to 1 nA so the
+            GMIN leakage (1 pA at 1 V) and near-zero currents do not dominate
+        gmin (float, optional): junction shunt conductance of the built-in evaluator, defaults to the SPICE 1e-12 S
+        chunk_size (int, optional): devices simulated per vectorized sweep or netlist, defaults to 2000
+
+    Returns:
+        DataFrame: one row per device with 'device', 'model', 'max_abs_dev', 'max_rel_dev' and 'passed', NaN
+                   deviations for devices without a model in the library, the engine used in .attrs['engine'] and the
+                   device types only checked for card formatting in .attrs['card_only']
+
+    Raises:
+        ValueError: unknown engine, or 'ngspice' requested for a library with CARD_ONLY models
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Available: {list(ENGINES)}")
+    requested = engine
+    if engine == 'auto':
+        engine = 'ngspice' if shutil.which('ngspice') else 'builtin'
+
+    models = read_spice_models(path, section)
+    table = _results_table(results)
+    devices = table['device'].astype(str).tolist()
+
+    if index_path is None and os.path.exists(os.path.splitext(path)[0] + '.csv'):
+        index_path = os.path.splitext(path)[0] + '.csv'
+    if index_path is not None:
+        index = pd.read_csv(index_path, dtype=str, keep_default_na=False)
+        names = dict(zip(index['device'], index['model']))
+        model_names = [names.get(d, '') for d in devices]
+    else:
+        model_names = [spice_model_name(d) for d in devices]
+
+    n_points = len(_bias_points('diode' if 'V' in bias else 'MOSFET', bias)[0])
+    abs_dev = np.full(len(devices), np.nan)
+    rel_dev = np.full(len(devices), np.nan)
+    card_only = []
+
+    for device_type in SPICE_PARAMS:
+        rows = np.array([i for i, m in enumerate(model_names) if m in models and models[m][0] == device_type], dtype=int)
+        if device_type in CARD_ONLY and len(rows):
+            if requested == 'ngspice':
+                raise ValueError(f"'{device_type}' models have no simulator equivalent, use engine='builtin' to check "
+                                 "their cards against the repo model")
+            card_only.append(device_type)
+        param_names = [name for name, _, _, _ in SPICE_PARAMS[device_type][1] if name in table.columns]
+
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            fitted = {k: table[k].to_numpy(dtype=float)[chunk] for k in param_names}
+            if device_type == 'diode':
+                reference = DiodeModel().compute_current_sets(bias['V'], fitted, T=T, dtype=np.float64)
+            else:
+                reference = SPICE_MODELS[device_type]().compute_current_sets(bias['V_gs'], fitted, V_ds=bias['V_ds'],
+                                                                             T=T, dtype=np.float64)
+            reference = reference.reshape(len(chunk), n_points)
+
+            chunk_models = [model_names[i] for i in chunk]
+            if engine == 'ngspice' and device_type not in CARD_ONLY:
+                simulated = run_ngspice(path, chunk_models, device_type, bias, T=T, section=section)
+            else:
+                exported = [models[m][1] for m in chunk_models]
+                columns = {k: np.array([p.get(k, default) for p in exported], dtype=float)
+                           for k, _, _, default in SPICE_PARAMS[device_type][1] if default is not None}
+                simulated = spice_dc(device_type, columns, bias, T=T, gmin=gmin)
+
+            diff = np.abs(simulated - reference)
+            abs_dev[chunk] = diff.max(axis=1)
+            rel_dev[chunk] = (diff / (np.abs(reference) + atol)).max(axis=1)
+
+    report = pd.DataFrame({
+        'device': devices,
+        'model': model_names,
+        'max_abs_dev': abs_dev,
+        'max_rel_dev': rel_dev,
+        'passed': rel_dev <= rtol,
+    })
+    report.attrs['engine'] = engine
+    report.attrs['card_only'] = card_only
+    return report
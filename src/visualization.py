@@ -2,8 +2,12 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import plotly.graph_objects as go
+from plotly.colors import sample_colorscale
 from scipy.constants import k as k_B, e as q_e
 
+from src.datasets import CurveSet
+from src.decimation import decimate
+
 def plot_diode_fit(V_data, I_data, model, fitted_params, filename=None, temps=None):
     """
     Generates a comparison of the I-V data and the I-V curve from the fitted parameters
@@ -15,7 +19,13 @@ def plot_diode_fit(V_data, I_data, model, fitted_params, filename=None, temps=No
         fitted_params (dict): dict containing fitted parameters from least squares algorithm
         filename (optional): filename for saving the error plot locally, defaults to None
         temps (optional): array of temperatures for multi-temp diode curves, defaults to None
-    """ 
+
+    V_data can also be a CurveSet of multi-temperature curves, I_data and temps are then taken from it
+    """
+    if isinstance(V_data, CurveSet):
+        curves = V_data
+        V_data, I_data, temps = [c[0] for c in curves], [c[1] for c in curves], curves.values
+        
     if temps is None:
         plt.semilogy(V_data, I_data, label='Original data')
         I_fit = model.compute_current(V_data, fitted_params)
@@ -58,7 +68,13 @@ def diode_error_plot(V_data, I_data, model, fitted_params, filename=None, temps=
         fitted_params (dict): dict containing fitted parameters from least squares algorithm
         filename (optional): filename for saving the error plot locally, defaults to None
         temps (optional): array of temperatures for multi-temp diode curves, defaults to None
+
+    V_data can also be a CurveSet of multi-temperature curves, I_data and temps are then taken from it
     """
+    if isinstance(V_data, CurveSet):
+        curves = V_data
+        V_data, I_data, temps = [c[0] for c in curves], [c[1] for c in curves], curves.values
+        
     if temps is None:
         I_fit = model.compute_current(V_data, fitted_params)
         err = (I_fit - I_data) / np.maximum(np.abs(I_data), 1e-15)
@@ -276,14 +292,34 @@ def plot_mosfet_multi(V_ds, I_data, model, fitted_params, V_gs_label=None, filen
     Generates a comparison of the Id-Vds data and the Id-Vds curves from the fitted parameters
 
     Args:
-        V_ds (scalar/numpy array): drain-to-source voltage
-        I_data (scalar/numpy array): curret from Id-Vgs data
+        V_ds (scalar/numpy array/CurveSet): drain-to-source voltage, or a CurveSet of Id-Vds curves at several V_gs
+        I_data (scalar/numpy array): curret from Id-Vgs data, ignored for a CurveSet
         model: instance of device model class
         fitted_params (dict): dict containing fitted parameters from least squares algorithm
         V_gs_label (str, optional): label for title of plots
         filename (str, optional): filename for saving the error plot locally, defaults to None
     """
-    I_fit = model.compute_current(fitted_params['vgs_array'], {**fitted_params, 'V_ds': V_ds})
+    if isinstance(V_ds, CurveSet): # whole family evaluated in one call on the packed points
+        curves = V_ds
+        I_fit = model.compute_current(curves.point_values, fitted_params, V_ds=curves.x)
+        colors = plt.cm.jet(np.linspace(0, 1, len(curves)))
+        
+        for idx, (vds_data, id_data, vgs) in enumerate(curves):
+            fit = I_fit[curves.offsets[idx]:curves.offsets[idx + 1]]
+            plt.plot(vds_data, id_data, 'o', alpha=0.4, color=colors[idx], label=f"Data {vgs} V")
+            plt.plot(vds_data, fit, '-', color=colors[idx], label=f"Fit {vgs} V")
+            
+        plt.xlabel("$V_{ds}$ [V]")
+        plt.ylabel("$I_{d}$ [A]")
+        plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+        
+        if filename is not None:
+            plt.savefig(filename, dpi=300, bbox_inches='tight')
+            
+        plt.show()
+        return
+    
+    I_fit = model.compute_current(fitted_params['vgs_array'], fitted_params, V_ds=V_ds)
     
     plt.semilogy(V_ds, I_data, label='Original data')
     plt.semilogy(V_ds, I_fit, label='Fitted data')
@@ -348,17 +384,9 @@ def plot_3d_fet_surface(model, params, vgs_max=5.0, vds_max=5.0):
     """
     Plots 3D surface plot of drain current against gate-to-source and drain-to-source current
     """
-    fig = plt.figure(figsize=(10, 7))
     vgs = np.linspace(0, vgs_max, 30)
     vds = np.linspace(0, vds_max, 30)
-    Vgs, Vds = np.meshgrid(vgs, vds)
-    Id = np.zeros_like(Vgs)
-    
-    for i in range(Vgs.shape[0]):
-        for j in range(Vds.shape[0]):
-            local_params = params.copy()
-            local_params['V_ds'] = Vds[i, j]
-            Id[i, j] = model.compute_current([Vgs[i, j]], local_params)[0]
+    Id = model.compute_grid(vgs, vds, params).T # rows follow V_ds (y axis), columns follow V_gs (x axis)
     
     fig = go.Figure(data=[go.Surface(z=Id, x=vgs, y=vds, colorscale='Viridis')])
     fig.update_layout(
@@ -444,4 +472,198 @@ def plot_mos_bands(band, filename=None):
         plt.savefig(filename, dpi=300, bbox_inches='tight')
     
     return fig
-    
\ No newline at end of file
+    
+
+def plot_fit_family_gl(datasets, fit, x_label, y_label, title=None, log_y=False, x_range=None, max_points=4000,
+                       method='lttb'):
+    """
+    Interactive data vs fit figure drawn with WebGL traces, every curve decimated before it is sent to the browser
+
+    The point budget is shared by the curves and applied inside the zoom window, so the figure size stays bounded
+    whatever the file size, and a window narrow enough to hold fewer points than the budget shows full resolution
+
+    Args:
+        datasets (list/CurveSet): (x, y, label) per curve
+        fit (callable): fit(i, idx) returns the fitted values of curve i at its point indices idx, the model is only
+            evaluated on the points that are drawn
+        x_label (str): x axis title
+        y_label (str): y axis title
+        title (str, optional): figure title
+        log_y (bool, optional): logarithmic y axis, points are also selected on log|y|
+        x_range (tuple, optional): (x_min, x_max) zoom window, whole curves if None
+        max_points (int, optional): data points drawn over all curves, defaults to 4000
+        method (str, optional): 'lttb' or 'minmax', see decimation.decimate
+
+    Returns:
+        plotly Figure
+    """
+    datasets = list(datasets)
+    colors = sample_colorscale('Plasma', list(np.linspace(0, 0.85, max(len(datasets), 2))))
+    per_curve = max(max_points // max(len(datasets), 1), 4)
+    fig = go.Figure()
+
+    for i, (x, y, label) in enumerate(datasets):
+        idx, x_dec, y_dec = decimate(x, y, per_curve, method=method, x_range=x_range, log_y=log_y)
+        fig.add_trace(go.Scattergl(x=x_dec, y=y_dec, mode='markers', name=f"Data {label}", legendgroup=str(i),
+                                   marker=dict(color=colors[i], size=5, opacity=0.5)))
+        fig.add_trace(go.Scattergl(x=x_dec, y=fit(i, idx), mode='lines', name=f"Fit {label}", legendgroup=str(i),
+                                   line=dict(color=colors[i], width=2)))
+
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label, margin=dict(l=0, r=0, b=0, t=40),
+                      uirevision='fit') # keeps the user's pan / zoom across reruns
+    if log_y:
+        fig.update_yaxes(type='log')
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
+
+    return fig
+
+def plot_diode_fit_gl(V_data, I_data, model, fitted_params, temps=None, x_range=None, max_points=4000):
+    """
+    WebGL version of plot_diode_fit for large I-V files, see plot_fit_family_gl
+
+    Args:
+        V_data (numpy array/CurveSet): voltage, or a CurveSet of multi-temperature curves (I_data and temps are then
+            taken from it)
+        I_data (numpy array): current, ignored for a CurveSet
+        model: instance of device model class
+        fitted_params (dict): fitted parameters, I_s is scaled to each temperature when 'Eg' is present
+        temps (list, optional): temperature of each curve when V_data and I_data are lists of curves
+        x_range (tuple, optional): (V_min, V_max) zoom window
+        max_points (int, optional): data points drawn over all curves, defaults to 4000
+
+    Returns:
+        plotly Figure
+    """
+    if isinstance(V_data, CurveSet):
+        curves = list(V_data)
+    elif temps is None:
+        curves = [(V_data, I_data, None)]
+    else:
+        curves = list(zip(V_data, I_data, temps))
+    curves = [(np.asarray(V, dtype=float), np.asarray(I, dtype=float), T) for V, I, T in curves]
+
+    def fit(i, idx):
+        V, _, T = curves[i]
+        local_params = dict(fitted_params)
+        if T is not None and 'Eg' in fitted_params:
+            local_params['I_s'] = model.compute_sat_current(fitted_params['I_s'], fitted_params['Eg'], T)
+        return model.compute_current(V[idx], local_params, T=T)
+
+    labels = [(V, I, '' if T is None else f"{T}K") for V, I, T in curves]
+    return plot_fit_family_gl(labels, fit, "Voltage [V]", "Current [A]", log_y=True, x_range=x_range,
+                              max_points=max_points)
+
+def plot_mosfet_multi_gl(curves, model, fitted_params, x_range=None, max_points=4000):
+    """
+    WebGL version of plot_mosfet_multi for large output families, see plot_fit_family_gl
+
+    Args:
+        curves (CurveSet/list): (V_ds, I_d, V_gs) per curve
+        model: instance of device model class
+        fitted_params (dict): fitted parameters
+        x_range (tuple, optional): (V_ds_min, V_ds_max) zoom window
+        max_points (int, optional): data points drawn over all curves, defaults to 4000
+
+    Returns:
+        plotly Figure
+    """
+    curves = [(np.asarray(v, dtype=float), np.asarray(i, dtype=float), vgs) for v, i, vgs in curves]
+
+    def fit(i, idx):
+        V_ds, _, V_gs = curves[i]
+        return model.compute_current(V_gs, fitted_params, V_ds=V_ds[idx])
+
+    labels = [(V_ds, I_d, f"{V_gs} V") for V_ds, I_d, V_gs in curves]
+    return plot_fit_family_gl(labels, fit, "V_ds [V]", "I_d [A]", title="Global Fit: Output Characteristics",
+                              x_range=x_range, max_points=max_points)
+
+def _band_animation(x, traces, values, label, title, x_label, active=0, controls=True):
+    # one frame per bias value, the slider and play button run client-side without a round trip. Without controls the
+    # frames only serve as precomputed diagrams for show_frame, driven by a slider outside the figure
+    y_all = np.concatenate([np.ravel(y) for _, y, _ in traces])
+    y_all = y_all[np.isfinite(y_all)]
+    pad = 0.05 * (y_all.max() - y_all.min())
+    names = [f"{v:.2f}" for v in values]
+    traces = [(name, y.astype(np.float32), style) for name, y, style in traces] # halves the frame payload
+
+    # frames only carry y, x and the styles stay on the traces
+    fig = go.Figure(data=[go.Scatter(x=x, y=y[active], name=name, line=style) for name, y, style in traces],
+                    frames=[go.Frame(data=[go.Scatter(y=y[i]) for _, y, _ in traces], name=n) for i, n in enumerate(names)])
+    fig.update_layout(
+        title=title,
+        xaxis=dict(title=x_label, range=[float(np.min(x)), float(np.max(x))]),
+        yaxis=dict(title='Energy [eV]', range=[y_all.min() - pad, y_all.max() + pad]),
+        margin=dict(l=0, r=0, b=0, t=40),
+    )
+    if controls:
+        step_args = {'mode': 'immediate', 'frame': {'duration': 0, 'redraw': False}, 'transition': {'duration': 0}}
+        fig.update_layout(
+            sliders=[dict(active=active, currentvalue={'prefix': f"{label} = ", 'suffix': ' V'}, pad={'t': 40},
+                          steps=[dict(method='animate', label=n, args=[[n], step_args]) for n in names])],
+            updatemenus=[dict(type='buttons', showactive=False, x=0, y=-0.15, xanchor='left',
+                              buttons=[dict(label='Play', method='animate',
+                                            args=[None, dict(step_args, frame={'duration': 50, 'redraw': False}, fromcurrent=True)])])],
+        )
+    return fig
+
+def animate_diode_bands(band, active=0, controls=True):
+    """
+    Animated PN junction band diagram over a bias sweep, one Plotly frame per bias
+
+    Args:
+        band (dict): DiodePhysics.compute_energy_bands output for an array of biases
+        active (int, optional): index of the frame shown first
+        controls (bool, optional): add the in-figure bias slider and play button, defaults to True, turn off when
+            an outside slider selects the frame through show_frame
+
+    Returns:
+        plotly Figure
+    """
+    x = band['x'] * 1e4
+    traces = [
+        ('E_c', band['Ec'], dict(color='blue', width=2)),
+        ('E_v', band['Ev'], dict(color='red', width=2)),
+        ('E_i', band['Ei'], dict(color='green', dash='dash')),
+        ('E_fp', band['Efp'], dict(color='blue', dash='dot')),
+        ('E_fn', band['Efn'], dict(color='red', dash='dot')),
+    ]
+    return _band_animation(x, traces, band['v_bias'], 'V_bias', 'PN Junction Energy Bands', 'Position [um]', active, controls)
+
+def animate_mos_bands(band, Vgs, active=0, controls=True):
+    """
+    Animated MOS band diagram over a gate voltage sweep, one Plotly frame per V_gs
+
+    Args:
+        band (dict): MOSFETPhysics.compute_band_diagrams output for an array of gate voltages
+        Vgs (numpy array): the gate voltages of the frames
+        active (int, optional): index of the frame shown first
+        controls (bool, optional): add the in-figure bias slider and play button, defaults to True, turn off when
+            an outside slider selects the frame through show_frame
+
+    Returns:
+        plotly Figure
+    """
+    x = band['x'] * 1e4
+    traces = [
+        ('E_c', band['Ec'], dict(color='blue', width=2)),
+        ('E_v', band['Ev'], dict(color='red', width=2)),
+        ('E_i', band['Ei'], dict(color='green', dash='dash')),
+        ('E_f', band['Ef'], dict(color='black', dash='dash')),
+    ]
+    return _band_animation(x, traces, Vgs, 'V_gs', 'MOS Band Diagram', 'Depth into Si [um]', active, controls)
+
+def show_frame(fig, index):
+    """
+    Shallow copy of an animated figure dict (Figure.to_dict()) opened on frame index, so one cached figure serves
+    every slider position without re-validating its frames, an in-figure slider is moved to the same frame
+    
+    Without an in-figure slider the browser never plays the frames, so only the shown diagram is returned and each
+    outside slider tick sends one diagram instead of the whole sweep
+    """
+    layout = fig['layout']
+    data = [dict(trace, y=frame['y']) for trace, frame in zip(fig['data'], fig['frames'][index]['data'])]
+    if not layout.get('sliders'):
+        return {k: v for k, v in dict(fig, data=data).items() if k != 'frames'}
+    layout = dict(layout, sliders=[dict(layout['sliders'][0], active=index)])
+    return dict(fig, data=data, layout=layout)
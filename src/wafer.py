@@ -0,0 +1,266 @@
+# Synthetic wafer / lot generator used as the scale benchmark of the ingest -> extract -> export pipeline
+# Device parameters vary on three levels, wafer-to-wafer offsets, a spatially correlated field across each wafer
+# (white noise smoothed by a Gaussian kernel with FFTs on the die lattice) plus a radial center-to-edge bowl, and
+# independent die-to-die mismatch. Cross-parameter correlation mixes the deviates of all parameters. Measurements
+# add multiplicative noise and an additive instrument noise floor and clip at compliance, every stage works on all
+# devices of a chunk at once through the parameter-set model API. Writers stream chunk by chunk so memory stays flat
+
+import os
+import numpy as np
+import pandas as pd
+
+from src.models import DiodeModel, MOSFETModel
+from src.montecarlo import LOG_PARAMS
+
+# device type: (sweep columns, measured column, model parameters)
+DEVICE_TYPES = {
+    'diode': (('V', 'T'), 'I', ('I_s', 'n', 'R_s')),
+    'diode_cv': (('V',), 'C', ('C_j', 'V_bi', 'm')),
+    'mosfet': (('V_gs', 'V_ds'), 'I_d', ('V_th', 'k_n', 'lam')),
+}
+
+def die_grid(diameter=200.0, pitch=5.0, edge_exclusion=3.0):
+    """
+    Die lattice of a round wafer, dies whose four corners lie inside the usable radius are kept
+
+    Args:
+        diameter (float, optional): wafer diameter in mm, defaults to 200
+        pitch (float, optional): die step in mm, defaults to 5
+        edge_exclusion (float, optional): unusable rim in mm, defaults to 3
+
+    Returns:
+        tuple: (die_x, die_y) integer lattice indices and (x, y) die centres in mm, one entry per die
+    """
+    radius = diameter / 2 - edge_exclusion
+    n = int(np.ceil(radius / pitch))
+    ix, iy = np.meshgrid(np.arange(-n, n + 1), np.arange(-n, n + 1), indexing='ij')
+    ix, iy = ix.ravel(), iy.ravel()
+
+    # farthest corner of each die from the wafer centre
+    far_x = (np.abs(ix) + 0.5) * pitch
+    far_y = (np.abs(iy) + 0.5) * pitch
+    inside = far_x**2 + far_y**2 <= radius**2
+
+    return ix[inside], iy[inside], ix[inside] * pitch, iy[inside] * pitch
+
+def _smooth_noise(rng, n_fields, shape, corr_length):
+    """
+    Unit-variance Gaussian random fields with a Gaussian correlation of corr_length lattice steps, shape (n_fields, *shape)
+
+    The lattice is padded by three correlation lengths so the periodic FFT convolution does not wrap opposite edges together
+    """
+    pad = int(np.ceil(3 * corr_length))
+    full = (shape[0] + 2 * pad, shape[1] + 2 * pad)
+    noise = rng.standard_normal((n_fields,) + full)
+
+    kx = np.fft.fftfreq(full[0])[:, None]
+    ky = np.fft.rfftfreq(full[1])[None, :]
+    # Fourier transform of a Gaussian kernel exp(-r^2 / (2 l^2)) normalized to unit output variance
+    kernel = np.exp(-2 * (np.pi * corr_length)**2 * (kx**2 + ky**2))
+    field = np.fft.irfft2(np.fft.rfft2(noise) * kernel, s=full)
+    field = field[:, pad:pad + shape[0], pad:pad + shape[1]]
+
+    return field / field.std(axis=(1, 2), keepdims=True)
+
+def sample_lot(nominal, sigma, n_wafers=25, diameter=200.0, pitch=5.0, edge_exclusion=3.0, corr_length=30.0,
+               wafer_fraction=0.3, spatial_fraction=0.5, radial=None, corr=None, log_params=LOG_PARAMS, bounds=None,
+               lot='LOT', seed=None):
+    """
+    Draws the true parameters of every die of a lot
+
+    Args:
+        nominal (dict): nominal parameter values, parameters missing from sigma are constant
+        sigma (dict): total standard deviation per parameter, of ln(value) for log parameters
+        n_wafers (int, optional): wafers in the lot, defaults to 25
+        diameter (float, optional): wafer diameter in mm, defaults to 200
+        pitch (float, optional): die step in mm, defaults to 5
+        edge_exclusion (float, optional): unusable rim in mm, defaults to 3
+        corr_length (float, optional): correlation length of the within-wafer field in mm, defaults to 30
+        wafer_fraction (float, optional): share of the variance from wafer-to-wafer offsets, defaults to 0.3
+        spatial_fraction (float, optional): share of the variance from the correlated within-wafer field, defaults to 0.5,
+            the remainder is independent die-to-die mismatch
+        radial (dict, optional): center-to-edge shift per parameter (in the sampling space), added as a bowl over r^2
+        corr (numpy array, optional): correlation matrix in the order of sigma's keys, uncorrelated if None
+        log_params (tuple, optional): parameters varied log-normally
+        bounds (dict, optional): (lower, upper) per parameter, e.g. model.get_param_bounds()
+        lot (str, optional): lot name used in the device names, defaults to 'LOT'
+        seed (int, optional): random seed
+
+    Returns:
+        DataFrame: one row per die with 'device', 'lot', 'wafer', 'die_x', 'die_y', 'x_mm', 'y_mm' and the parameters
+
+    Raises:
+        ValueError: variance fractions above one or a correlation matrix of the wrong shape
+    """
+    if wafer_fraction < 0 or spatial_fraction < 0 or wafer_fraction + spatial_fraction > 1:
+        raise ValueError(f"Variance fractions must be non-negative and sum to at most 1, got {wafer_fraction} and {spatial_fraction}")
+
+    rng = np.random.default_rng(seed)
+    names = list(sigma)
+    corr = np.eye(len(names)) if corr is None else np.asarray(corr, dtype=float)
+    if corr.shape != (len(names), len(names)):
+        raise ValueError(f"Correlation matrix of shape {corr.shape} does not match {len(names)} parameters")
+
+    die_x, die_y, x_mm, y_mm = die_grid(diameter, pitch, edge_exclusion)
+    n_dies, n_params = len(die_x), len(names)
+    lattice = (die_x.max() - die_x.min() + 1, die_y.max() - die_y.min() + 1)
+
+    # unit deviates of every level, shape (n_wafers, n_params, n_dies)
+    spatial = _smooth_noise(rng, n_wafers * n_params, lattice, corr_length / pitch)
+    spatial = spatial[:, die_x - die_x.min(), die_y - die_y.min()].reshape(n_wafers, n_params, n_dies)
+    wafer = rng.standard_normal((n_wafers, n_params, 1))
+    local = rng.standard_normal((n_wafers, n_params, n_dies))
+    z = np.sqrt(wafer_fraction) * wafer + np.sqrt(spatial_fraction) * spatial + np.sqrt(1 - wafer_fraction - spatial_fraction) * local
+    z = np.einsum('ij,wjd->wid', np.linalg.cholesky(corr), z)
+
+    r2 = (x_mm**2 + y_mm**2) / (diameter / 2 - edge_exclusion)**2
+    wafer_idx = np.repeat(np.arange(n_wafers), n_dies)
+    df = pd.DataFrame({
+        'device': [f"{lot}_W{w:02d}_X{x:+03d}_Y{y:+03d}" for w, x, y in zip(wafer_idx + 1, np.tile(die_x, n_wafers), np.tile(die_y, n_wafers))],
+        'lot': lot,
+        'wafer': wafer_idx + 1,
+        'die_x': np.tile(die_x, n_wafers),
+        'die_y': np.tile(die_y, n_wafers),
+        'x_mm': np.tile(x_mm, n_wafers),
+        'y_mm': np.tile(y_mm, n_wafers),
+    })
+
+    for name, value in nominal.items():
+        if name not in sigma:
+            df[name] = float(value)
+            continue
+        col = names.index(name)
+        dev = sigma[name] * z[:, col, :] + (radial or {}).get(name, 0.0) * r2
+        df[name] = (value * np.exp(dev) if name in log_params else value + dev).ravel()
+
+    for name, (lower, upper) in (bounds or {}).items():
+        if name in df:
+            df[name] = df[name].clip(lower, upper)
+
+    return df
+
+def simulate_curves(devices, device_type, sweep, noise=0.01, noise_floor=1e-12, compliance=None, seed=None):
+    """
+    Synthesizes the measured sweep of every device in one vectorized model call
+
+    Args:
+        devices (DataFrame): per-device parameters, e.g. from sample_lot
+        device_type (str): 'diode', 'diode_cv' or 'mosfet'
+        sweep (dict): bias arrays by column name, broadcast against each other, e.g. {'V': V, 'T': 300.0} or
+            {'V_gs': V_gs_grid, 'V_ds': V_ds_grid} for output families
+        noise (float, optional): relative measurement noise, defaults to 0.01
+        noise_floor (float, optional): standard deviation of the additive instrument noise, defaults to 1e-12
+        compliance (float, optional): measured values are clipped to +-compliance
+
+    Returns:
+        tuple: (dict of flattened bias arrays, measured values of shape (n_devices, n_points))
+    """
+    x_cols, _, param_names = DEVICE_TYPES[device_type]
+    rng = np.random.default_rng(seed)
+    params = {k: devices[k].to_numpy(dtype=float) for k in param_names}
+    bias = dict(zip(x_cols, np.broadcast_arrays(*[np.asarray(sweep.get(c, 300.0), dtype=float) for c in x_cols])))
+
+    if device_type == 'diode':
+        y = DiodeModel().compute_current_sets(bias['V'], params, T=bias['T'])
+    elif device_type == 'diode_cv':
+        y = DiodeModel().compute_capacitance_sets(bias['V'], params)
+    else:
+        y = MOSFETModel().compute_current_sets(bias['V_gs'], params, V_ds=bias['V_ds'])
+
+    y = y.reshape(len(devices), -1)
+    y *= 1 + noise * rng.standard_normal(y.shape)
+    if noise_floor:
+        y += noise_floor * rng.standard_normal(y.shape)
+    if compliance is not None:
+        np.clip(y, -compliance, compliance, out=y)
+
+    return {k: v.ravel() for k, v in bias.items()}, y
+
+def _chunks(devices, chunk_size):
+    for start in range(0, len(devices), chunk_size):
+        yield devices.iloc[start:start + chunk_size]
+
+def write_lot(path, devices, device_type, sweep, fmt=None, chunk_size=500, noise=0.01, noise_floor=1e-12,
+              compliance=None, seed=None):
+    """
+    Streams the synthetic measurements of a lot to disk, one chunk of devices at a time
+
+    Formats:
+        'csv'     - one long-format CSV with 'device', 'wafer', 'die_x', 'die_y', the sweep and measured columns
+        'npy'     - the same table as a structured .npy array written through a memory map, read back by DataLoader.load
+        'per_die' - a directory with one CSV per device named after it, lot / wafer / die in '!' comment headers,
+                    the layout DataLoader.load_many ingests
+
+    Args:
+        path (str): output file, or directory for 'per_die'
+        devices (DataFrame): per-device parameters, e.g. from sample_lot
+        device_type (str): 'diode', 'diode_cv' or 'mosfet'
+        sweep (dict): bias arrays by column name, see simulate_curves
+        fmt (str, optional): 'csv', 'npy' or 'per_die', inferred from the extension (none means 'per_die') if None
+        chunk_size (int, optional): devices simulated and written per step, defaults to 500
+        noise, noise_floor, compliance: measurement model, see simulate_curves
+        seed (int, optional): random seed
+
+    Returns:
+        int: number of data rows written
+
+    Raises:
+        ValueError: unknown format
+    """
+    if fmt is None:
+        fmt = {'.csv': 'csv', '.npy': 'npy', '': 'per_die'}.get(os.path.splitext(path)[1].lower())
+    if fmt not in ('csv', 'npy', 'per_die'):
+        raise ValueError(f"Unknown format '{fmt}' for {path}. Available: ['csv', 'npy', 'per_die']")
+
+    x_cols, y_col, _ = DEVICE_TYPES[device_type]
+    rng = np.random.default_rng(seed)
+    n_points = int(np.prod(np.broadcast_shapes(*[np.shape(sweep.get(c, 300.0)) for c in x_cols])))
+    n_rows = len(devices) * n_points
+    name_len = max((len(d) for d in devices['device']), default=1)
+    columns = [('device', f'U{name_len}'), ('wafer', '<i4'), ('die_x', '<i4'), ('die_y', '<i4')] + [(c, '<f8') for c in x_cols + (y_col,)]
+
+    if fmt == 'per_die':
+        os.makedirs(path, exist_ok=True)
+    elif fmt == 'npy':
+        table = np.lib.format.open_memmap(path, mode='w+', dtype=np.dtype(columns), shape=(n_rows,))
+    else:
+        handle = open(path, 'w', newline='')
+
+    row = 0
+    try:
+        for chunk in _chunks(devices, chunk_size):
+            bias, y = simulate_curves(chunk, device_type, sweep, noise, noise_floor, compliance, seed=rng)
+            n_chunk = len(chunk) * n_points
+
+            if fmt == 'per_die':
+                for (_, dev), curve in zip(chunk.iterrows(), y):
+                    with open(os.path.join(path, f"{dev['device']}.csv"), 'w') as f:
+                        f.write(f"! lot={dev['lot']} wafer={dev['wafer']} die_x={dev['die_x']} die_y={dev['die_y']}\n")
+                        np.savetxt(f, np.column_stack([bias[c] for c in x_cols] + [curve]), delimiter=',', fmt='%.10g',
+                                   header=','.join(x_cols + (y_col,)), comments='')
+                row += n_chunk
+                continue
+
+            block = {
+                'device': np.repeat(chunk['device'].to_numpy(), n_points),
+                'wafer': np.repeat(chunk['wafer'].to_numpy(), n_points),
+                'die_x': np.repeat(chunk['die_x'].to_numpy(), n_points),
+                'die_y': np.repeat(chunk['die_y'].to_numpy(), n_points),
+            }
+            block.update({c: np.tile(bias[c], len(chunk)) for c in x_cols})
+            block[y_col] = y.ravel()
+
+            if fmt == 'npy':
+                for name, _ in columns:
+                    table[name][row:row + n_chunk] = block[name]
+            else:
+                pd.DataFrame(block).to_csv(handle, header=row == 0, index=False, float_format='%.10g')
+            row += n_chunk
+    finally:
+        if fmt == 'npy':
+            table.flush()
+            del table
+        elif fmt == 'csv':
+            handle.close()
+
+    return row
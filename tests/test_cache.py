@@ -0,0 +1,51 @@
+import tempfile
+import numpy as np
+
+from src.models import DiodeModel, MOSFETModel
+from src.extraction import ModelExtractor
+from src.cache import ResultCache, make_key
+
+## Cached diode extraction test
+
+cache_dir = tempfile.mkdtemp()
+cache = ResultCache(cache_dir)
+model = DiodeModel()
+extractor = ModelExtractor(model, cache=cache)
+
+params = {'I_s': 1e-10, 'n': 1.5, 'R_s': 2.5}
+V_data = np.linspace(0, 0.8, 50)
+np.random.seed(67)
+I_data = model.compute_current(V_data, params) * (1 + np.random.normal(0, 0.02, size=V_data.shape))
+guess = {'I_s': 1e-11, 'n': 1.4, 'R_s': 0.1}
+
+first = extractor.diode_fit(V_data, I_data, initial_params=dict(guess))
+assert extractor.result is not None and cache.misses == 1 and len(cache) == 1
+
+second = extractor.diode_fit(V_data.copy(), I_data.copy(), initial_params=dict(guess))
+assert extractor.result is None and cache.hits == 1 # solver skipped
+assert second['parameters'] == first['parameters']
+
+extractor.diode_fit(V_data, I_data, T=320, initial_params=dict(guess)) # different temperature, new entry
+extractor.diode_fit(V_data, I_data, initial_params={'I_s': 1e-12, 'n': 1.4, 'R_s': 0.1}) # different guess, new entry
+assert len(cache) == 3
+
+# persisted across instances
+reopened = ModelExtractor(DiodeModel(), cache=ResultCache(cache_dir))
+assert reopened.diode_fit(V_data, I_data, initial_params=dict(guess))['parameters'] == first['parameters']
+assert reopened.cache.hits == 1
+print("Cached diode extraction passed.\n")
+
+## LRU eviction test
+
+entry_size = cache.size // len(cache)
+small = ResultCache(tempfile.mkdtemp(), max_bytes=int(2.5 * entry_size))
+extractor = ModelExtractor(MOSFETModel(), cache=small)
+V_gs = np.linspace(0, 2, 40)
+
+for vth in [0.6, 0.7, 0.8]:
+    I_d = MOSFETModel().compute_current(V_gs, {'V_th': vth, 'k_n': 1e-3, 'lam': 0.0}, V_ds=1.0)
+    extractor.mosfet_fit(V_gs, I_d, V_ds=1.0, initial_params={'V_th': 0.5, 'k_n': 1e-4, 'lam': 0.0})
+
+assert len(small) <= 2 and small.size <= small.max_bytes
+assert make_key('a', np.arange(3)) == make_key('a', np.arange(3.0)) != make_key('a', np.arange(4))
+print("Cache eviction passed.\n")
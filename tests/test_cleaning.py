@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from src.cleaning import clean_sweeps
+from src.dataloader import DataLoader
+from src.datasets import CurveSet
+from src.models import DiodeModel
+from src.extraction import ModelExtractor
+
+## Multi-temperature diode sweeps with injected defects
+
+model = DiodeModel()
+params = {'I_s': 1e-12, 'n': 1.3, 'R_s': 0.5}
+temps = [280.0, 300.0, 320.0]
+V_sweep = np.linspace(0, 0.9, 91)
+limit = 1e-3
+floor = 1e-13
+
+np.random.seed(67)
+frames = []
+for T in temps:
+    I = model.compute_current(V_sweep, params, T=T) * (1 + np.random.normal(0, 0.005, size=V_sweep.shape))
+    I = np.minimum(I, limit) # instrument clamps at compliance
+    I[5] = 1e-14 # below the noise floor
+    frames.append(pd.DataFrame({'V': V_sweep, 'I': I, 'T': T}))
+
+df = pd.concat(frames, ignore_index=True)
+glitch_rows = df.index[(df['V'] == V_sweep[40])].to_numpy()
+df.loc[glitch_rows, 'I'] *= 30 # single-point glitches
+dup = df[df['V'] == V_sweep[20]].assign(I=lambda d: d['I'] * 1.01) # repeated voltage points
+df = pd.concat([df, dup], ignore_index=True).sample(frac=1.0, random_state=1) # unordered rows
+
+n_clamped = int(np.sum(df['I'] >= limit * (1 - 1e-3)))
+n_floor = int(np.sum(df['I'].abs() < floor)) # injected points and the zero current at V = 0
+clean, report = clean_sweeps(df, 'V', 'I', by='T', compliance=limit, noise_floor=floor, outlier_threshold=6.0)
+
+print("Cleaning report:", report['removed'])
+assert report['removed']['compliance'] == n_clamped > 0
+assert report['removed']['noise_floor'] == n_floor == 6
+assert report['removed']['duplicate'] == 3
+assert report['removed']['outlier'] == 3
+assert set(report['reasons'].loc[glitch_rows]) == {'outlier'}
+assert report['kept'] == len(clean) == report['total'] - sum(report['removed'].values())
+
+# sorted by sweep then voltage, duplicates collapsed into their mean
+assert (np.diff(clean['T'].to_numpy()) >= 0).all()
+for T, sweep in clean.groupby('T'):
+    assert (np.diff(sweep['V'].to_numpy()) > 0).all()
+row = clean[(clean['T'] == 300.0) & (clean['V'] == V_sweep[20])]
+assert len(row) == 1
+print("Multi-sweep cleaning passed.\n")
+
+## Cleaned data fits with fewer evaluations
+
+guess = {'I_s': 1e-11, 'Eg': 1.0, 'n': 1.2, 'R_s': 0.1}
+dirty_report = ModelExtractor(model).diode_temp_fit(CurveSet.from_frame(df, 'V', 'I', by='T'), initial_params=dict(guess))
+clean_report = ModelExtractor(model).diode_temp_fit(CurveSet.from_frame(clean, 'V', 'I', by='T'), initial_params=dict(guess))
+print(f"nfev dirty: {dirty_report['num_iters']}, clean: {clean_report['num_iters']}")
+
+assert clean_report['rms_err'] < dirty_report['rms_err']
+assert abs(clean_report['parameters']['n'] - params['n']) / params['n'] < 0.05
+print("Fit on cleaned data passed.\n")
+
+## Auto compliance and DataLoader stage
+
+I_out = np.minimum(model.compute_current(V_sweep, params), 2e-3)
+loader = DataLoader()
+loader.df = pd.DataFrame({'V': V_sweep, 'I': I_out})
+cleaned = loader.clean('V', 'I', compliance='auto')
+assert loader.df is cleaned
+assert loader.cleaning_report['removed']['compliance'] == int(np.sum(I_out == 2e-3))
+assert cleaned['I'].max() < 2e-3
+
+rising = pd.DataFrame({'V': V_sweep, 'I': model.compute_current(V_sweep, params)})
+assert clean_sweeps(rising, 'V', 'I', compliance='auto')[1]['kept'] == len(rising) # no plateau, nothing clamped
+print("Auto compliance passed.\n")
@@ -1,4 +1,5 @@
 import numpy as np
+import pandas as pd
 import os, pytest
 
 from src.dataloader import DataLoader
@@ -87,4 +88,34 @@ initial_guess = {
 report = extractor.multi_mosfet_fit(datasets, initial_params=initial_guess)
 
 assert report['success'] is True
-print ("Fitted params from CSV:", report['parameters'])
\ No newline at end of file
+print ("Fitted params from CSV:", report['parameters'])
+# test parallel multi-file ingestion of a lot of per-die CSVs with comment headers
+
+import tempfile
+
+lot_dir = tempfile.mkdtemp()
+vds_die = np.linspace(0, 3, 20)
+for die in range(6):
+    die_path = os.path.join(lot_dir, f"wafer{die % 2}", f"die_{die:02d}.csv")
+    os.makedirs(os.path.dirname(die_path), exist_ok=True)
+    with open(die_path, 'w') as f:
+        f.write(f"! lot: test\n! die: {die}\n")
+    i_die = MOSFETModel().compute_grid([1.5, 2.5], vds_die, {'V_th': 0.5 + 0.01 * die, 'k_n': 1e-3, 'lam': 0.02})
+    pd.DataFrame({'V_Gate': np.repeat([1.5, 2.5], len(vds_die)), 'V_Drain': np.tile(vds_die, 2), 'I_Drain': i_die.ravel()}).to_csv(die_path, mode='a', index=False)
+
+lot = DataLoader()
+lot_df = lot.load_many(lot_dir, col_map=col_map, workers=3)
+assert len(lot_df) == 6 * 40
+assert sorted(lot_df['device'].unique()) == [f"die_{d:02d}" for d in range(6)]
+assert {'V_gs', 'V_ds', 'I_d', 'file'} <= set(lot_df.columns)
+
+glob_df = DataLoader().load_many(os.path.join(lot_dir, 'wafer0', '*.csv'), col_map=col_map, executor='process', workers=2)
+assert glob_df['device'].nunique() == 3
+
+devices = []
+for device, device_df in DataLoader().iter_many([lot_dir], col_map=col_map):
+    device_sets = lot.get_mosfet_datasets(df=device_df)
+    assert len(device_sets) == 2
+    devices.append(device)
+assert len(devices) == 6
+print("Multi-file ingestion passed.")
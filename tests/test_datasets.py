@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from src.datasets import CurveSet, as_curveset
+from src.dataloader import DataLoader
+from src.models import MOSFETModel
+from src.extraction import ModelExtractor
+
+## CurveSet container test
+
+curves = [(np.linspace(0, 1, 5), np.arange(5.0), 300), (np.linspace(0, 1, 3), np.arange(3.0) + 10, 320.0)]
+cs = CurveSet.from_curves(curves, names=('V', 'I', 'T'))
+
+assert len(cs) == 2 and len(cs.x) == 8
+assert list(cs.offsets) == [0, 5, 8] and list(cs.lengths) == [5, 3]
+assert list(cs.curve_idx) == [0] * 5 + [1] * 3
+assert np.array_equal(cs.point_values, [300.0] * 5 + [320.0] * 3)
+
+for (x, y, T), (x_ref, y_ref, T_ref) in zip(cs, curves): # backward compatible tuple iteration
+    assert np.array_equal(x, x_ref) and np.array_equal(y, y_ref) and T == T_ref
+    assert np.shares_memory(x, cs.x) # curves are views into the shared buffer
+
+v, i, T = cs[-1]
+assert T == 320.0 and len(v) == 3
+assert as_curveset(cs) is cs
+
+sub = cs[::-1]
+assert isinstance(sub, CurveSet) and list(sub.values) == [320.0, 300.0]
+assert np.array_equal(sub[1][1], curves[0][1])
+
+try:
+    CurveSet(np.zeros(3), np.zeros(3), [0, 2], [1.0])
+    assert False
+except ValueError:
+    pass
+
+try:
+    cs.foo = 1 # __slots__, no per-instance dict
+    assert False
+except AttributeError:
+    pass
+print("CurveSet container passed.\n")
+
+## DataFrame round trip test
+
+model = MOSFETModel()
+params = {'V_th': 0.8, 'k_n': 1e-3, 'lam': 0.05}
+vgs_sweep = np.array([1.5, 2.0, 2.5, 3.0])
+vds_sweep = np.linspace(0, 5.0, 50)
+I_grid = model.compute_grid(vgs_sweep, vds_sweep, params)
+
+df = pd.DataFrame({'V_gs': np.repeat(vgs_sweep, len(vds_sweep)), 'V_ds': np.tile(vds_sweep, len(vgs_sweep)), 'I_d': I_grid.ravel()})
+df['device'] = 'die_00'
+df = df.sample(frac=1.0, random_state=0) # shuffled rows
+
+family = DataLoader().get_mosfet_datasets(df=df)
+assert isinstance(family, CurveSet) and family.names == ('V_ds', 'I_d', 'V_gs')
+assert np.array_equal(family.values, vgs_sweep)
+for (vds, ids, vgs), row in zip(family, I_grid):
+    assert np.array_equal(vds, vds_sweep) and np.array_equal(ids, row)
+
+with_meta = CurveSet.from_frame(df, 'V_ds', 'I_d', by='V_gs', meta_cols=['device'])
+assert list(with_meta.meta['device']) == ['die_00'] * 4
+back = with_meta.to_frame()
+assert len(back) == len(df) and set(back.columns) == {'V_gs', 'V_ds', 'I_d', 'device'}
+print("DataFrame round trip passed.\n")
+
+## Fits accept CurveSet and lists alike
+
+np.random.seed(67)
+noisy = [(vds, ids * (1 + np.random.normal(0, 0.02, size=ids.shape)), vgs) for vds, ids, vgs in family]
+guess = {'V_th': 0.5, 'k_n': 1e-4, 'lam': 0.0}
+report_list = ModelExtractor(model).multi_mosfet_fit(noisy, initial_params=dict(guess))
+report_set = ModelExtractor(model).multi_mosfet_fit(CurveSet.from_curves(noisy), initial_params=dict(guess))
+
+assert report_list['parameters'] == report_set['parameters']
+assert abs(report_set['parameters']['V_th'] - params['V_th']) / params['V_th'] < 0.1
+print("CurveSet fit passed.\n")
@@ -0,0 +1,76 @@
+import time
+import numpy as np
+
+from src.decimation import minmax_indices, lttb_indices, decimate
+from src.models import DiodeModel, MOSFETModel
+from src.datasets import CurveSet
+from src.visualization import plot_diode_fit_gl, plot_mosfet_multi_gl
+
+rng = np.random.default_rng(67)
+
+## Decimation test
+
+x = np.linspace(0, 1, 200_000)
+y = np.sin(40 * x) + 0.01 * rng.standard_normal(len(x))
+y[123_456] = 5.0 # single-point spike
+
+for method, select in [('minmax', lambda: minmax_indices(y, 2000)), ('lttb', lambda: lttb_indices(x, y, 2000))]:
+    idx = select()
+    assert len(idx) <= 2000 and idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0) and 123_456 in idx
+    assert np.isclose(y[idx].min(), y.min()) or method == 'lttb'
+
+# LTTB keeps the shape: interpolating the kept points reproduces the curve
+idx = lttb_indices(x, y, 2000)
+mask = np.ones(len(x), dtype=bool)
+mask[123_456 - 200:123_456 + 200] = False # buckets around the spike
+assert np.max(np.abs(np.interp(x, x[idx], y[idx]) - y)[mask]) < 0.1
+
+assert np.array_equal(lttb_indices(x[:50], y[:50], 2000), np.arange(50)) # short curves are untouched
+
+# a zoom window holding fewer points than the budget comes back at full resolution
+idx, x_win, y_win = decimate(x, y, 2000, x_range=(0.5, 0.505))
+assert np.array_equal(idx, np.flatnonzero((x >= 0.5) & (x <= 0.505)))
+
+# points are picked on log|y| for log axes, the returned values stay linear
+I = DiodeModel().compute_current(x[1:], {'I_s': 1e-12, 'n': 1.3, 'R_s': 0.5}) * (1 + 0.05 * rng.standard_normal(len(x) - 1))
+idx_log, _, I_log = decimate(x[1:], I, 200, log_y=True)
+assert np.array_equal(idx_log, lttb_indices(x[1:], np.log10(I), 200)) and np.array_equal(I_log, I[idx_log])
+assert not np.array_equal(idx_log, decimate(x[1:], I, 200)[0])
+
+try:
+    decimate(x, y, method='every_nth')
+    assert False
+except ValueError:
+    pass
+
+x_big = np.linspace(0, 1, 2_000_000)
+y_big = np.cumsum(rng.standard_normal(len(x_big)))
+start = time.perf_counter()
+decimate(x_big, y_big, 2000, method='lttb')
+lttb_time = time.perf_counter() - start
+start = time.perf_counter()
+decimate(x_big, y_big, 2000, method='minmax')
+print(f"2M points: lttb {lttb_time * 1e3:.0f} ms, minmax {(time.perf_counter() - start) * 1e3:.0f} ms")
+print("Decimation passed.\n")
+
+## WebGL figure test
+
+model = DiodeModel()
+params = {'I_s': 1e-12, 'n': 1.3, 'R_s': 0.5, 'Eg': 1.12}
+V = np.linspace(0, 1, 100_000)
+curves = CurveSet.from_curves([(V, model.compute_current(V, dict(params, I_s=model.compute_sat_current(1e-12, 1.12, T)), T=T), T)
+                               for T in [280.0, 320.0]])
+fig = plot_diode_fit_gl(curves, None, model, params, max_points=4000)
+assert [trace.type for trace in fig.data] == ['scattergl'] * 4 and fig.layout.yaxis.type == 'log'
+assert all(len(trace.x) <= 2000 for trace in fig.data)
+data_320, fit_320 = fig.data[2], fig.data[3]
+assert np.allclose(fit_320.y, data_320.y, rtol=1e-9) # fit evaluated on the drawn points, at each curve's temperature
+
+mosfet = MOSFETModel()
+mos_params = {'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.04}
+V_ds = np.linspace(0, 3, 50_000)
+family = [(V_ds, mosfet.compute_current(V_gs, mos_params, V_ds=V_ds), V_gs) for V_gs in [1.5, 2.0, 2.5]]
+fig = plot_mosfet_multi_gl(family, mosfet, mos_params, x_range=(1.0, 1.001))
+assert len(fig.data[0].x) == np.sum((V_ds >= 1.0) & (V_ds <= 1.001)) # full resolution inside a narrow window
+print("WebGL figures passed.\n")
@@ -69,4 +69,117 @@ assert np.abs((fit_diode_temp['I_s'] - true_diode_temp['I_s']) / true_diode_temp
 assert np.abs((fit_diode_temp['Eg'] - true_diode_temp['Eg']) / true_diode_temp['Eg']) < 0.1
 assert np.abs((fit_diode_temp['n'] - true_diode_temp['n']) / true_diode_temp['n']) < 0.1
 assert np.abs((fit_diode_temp['R_s'] - true_diode_temp['R_s']) / true_diode_temp['R_s']) < 0.1
-print("Diode temp fit passed.\n")
\ No newline at end of file
+print("Diode temp fit passed.\n")
+
+## Packed multi-temperature evaluation test
+
+V_packed = np.concatenate([d[0] for d in datasets])
+T_packed = np.repeat(temps, len(V_sweep)).astype(float)
+Is_packed = model.compute_sat_current(true_diode_temp['I_s'], true_diode_temp['Eg'], T_packed)
+packed_params = {'I_s': Is_packed, 'n': true_diode_temp['n'], 'R_s': true_diode_temp['R_s']}
+I_packed = model.compute_current(V_packed, packed_params, T=T_packed)
+
+for i, T in enumerate(temps):
+    local_params = {'I_s': Is_at_T(T), 'n': true_diode_temp['n'], 'R_s': true_diode_temp['R_s']}
+    I_curve = model.compute_current(V_sweep, local_params, T=T)
+    assert np.allclose(I_packed[i * len(V_sweep):(i + 1) * len(V_sweep)], I_curve, rtol=1e-10, atol=0)
+
+print("Packed multi-temperature evaluation passed.\n")
+
+## Robust C-V fit test
+
+cv_params = {'C_j': 2e-12, 'V_bi': 0.75, 'm': 0.45}
+V_cv = np.linspace(-5, 0.3, 200)
+C_cv = model.compute_capacitance(V_cv, cv_params) * (1 + np.random.normal(0, 0.01, size=V_cv.shape))
+C_cv[::20] *= 5 # glitched points
+cv_guess = {'C_j': 1e-12, 'V_bi': 0.6, 'm': 0.5}
+
+jac = model.capacitance_jacobian(V_cv, cv_params)
+h = 1e-6 * cv_params['m']
+fd = (model.compute_capacitance(V_cv, {**cv_params, 'm': cv_params['m'] + h}) - model.compute_capacitance(V_cv, {**cv_params, 'm': cv_params['m'] - h})) / (2 * h)
+assert np.allclose(jac['m'], fd, rtol=1e-6)
+
+# scalar voltages and parameters broadcasting wider than V
+baseline = lambda V, C_j, V_bi, m: C_j / np.power(np.maximum(1 - V/V_bi, 1e-3), m)
+assert np.isclose(model.compute_capacitance(-1.0, cv_params), baseline(-1.0, **cv_params), rtol=1e-12)
+wide = {'C_j': 2e-12, 'V_bi': 0.75, 'm': np.array([[0.33], [0.5]])}
+C_wide = model.compute_capacitance(V_cv[:3], wide)
+assert C_wide.shape == (2, 3) and np.allclose(C_wide, baseline(V_cv[:3], **wide), rtol=1e-12)
+
+for solver in ['trf', 'irls']:
+    fit_cv = extractor.diode_cv_fit(V_cv, C_cv, initial_params=dict(cv_guess), loss='cauchy', f_scale=0.05, solver=solver)['parameters']
+    for name, value in cv_params.items():
+        assert np.abs((fit_cv[name] - value) / value) < 0.05, (solver, name, fit_cv[name])
+
+print("Robust C-V fit passed.\n")
+
+## Prepared sweep test
+
+sweep = model.prepare(V_sweep, T=320)
+assert model.prepare(V_sweep, T=320) is sweep # same grid, same plan
+assert model.prepare(V_sweep, T=300) is not sweep
+
+single = {'I_s': 1e-12, 'n': 1.3, 'R_s': 0.5}
+assert np.allclose(sweep.current(single), model.compute_current(V_sweep, single, T=320), rtol=1e-9, atol=1e-18)
+stepped = {**single, 'n': 1.31} # warm-started from the previous solution
+assert np.allclose(sweep.current(stepped), model.compute_current(V_sweep, stepped, T=320), rtol=1e-9, atol=1e-18)
+
+sets = {'I_s': np.array([1e-13, 1e-12, 1e-11]), 'n': np.array([1.0, 1.3, 1.8]), 'R_s': 0.5}
+I_sets = sweep.current(sets)
+C_sets = model.prepare(V_cv).capacitance({'C_j': np.array([1e-12, 2e-12]), 'V_bi': 0.75, 'm': np.array([0.33, 0.5])})
+assert I_sets.shape == (3, len(V_sweep)) and C_sets.shape == (2, len(V_cv))
+for i in range(3):
+    local = {'I_s': sets['I_s'][i], 'n': sets['n'][i], 'R_s': 0.5}
+    assert np.allclose(I_sets[i], model.compute_current(V_sweep, local, T=320), rtol=1e-9, atol=1e-18)
+assert np.allclose(C_sets[1], model.compute_capacitance(V_cv, {'C_j': 2e-12, 'V_bi': 0.75, 'm': 0.5}), rtol=1e-12)
+
+try:
+    sweep.current({'I_s': np.ones(2) * 1e-12, 'n': np.ones(3)})
+    assert False
+except ValueError:
+    pass
+print("Prepared sweep passed.\n")
+
+## Joint multi-temperature I-V + C-V fit test
+
+assert np.isclose(model.compute_bi_potential(0.75, 1.12, 300.0), 0.75)
+assert np.isclose(model.compute_zero_bias_cap(2e-12, 0.75, 0.45, 1.12, 300.0), 2e-12)
+assert -2.0e-3 < (model.compute_bi_potential(0.75, 1.12, 301.0) - 0.75) < -1.0e-3 # about -1.5 mV/K for silicon
+
+V_jac = np.linspace(-0.5, 0.9, 60)
+T_jac = np.repeat([250.0, 300.0, 350.0], 20)
+iv_point = {'I_s': np.full(60, 1e-12), 'n': 1.4, 'R_s': 2.0}
+jac = model.current_jacobian(V_jac, iv_point, T=T_jac)
+for name in ['I_s', 'n', 'R_s']:
+    h = 1e-5 * np.mean(iv_point[name])
+    upper = model.compute_current(V_jac, {**iv_point, name: iv_point[name] + h}, T=T_jac)
+    lower = model.compute_current(V_jac, {**iv_point, name: iv_point[name] - h}, T=T_jac)
+    assert np.allclose(jac[name], (upper - lower) / (2 * h), rtol=1e-5, atol=1e-6 * np.max(np.abs(jac[name])))
+
+joint_truth = {'I_s': 1e-11, 'Eg': 1.12, 'n': 1.3, 'R_s': 1.5, 'C_j': 2e-12, 'V_bi': 0.75, 'm': 0.45}
+joint_temps = [250.0, 275.0, 300.0, 325.0, 350.0, 375.0]
+V_iv, V_cv_joint = np.linspace(0.05, 0.8, 60), np.linspace(-5, 0.3, 80)
+iv_curves, cv_curves = [], []
+for T in joint_temps:
+    iv_local = {'I_s': model.compute_sat_current(joint_truth['I_s'], joint_truth['Eg'], T), 'n': 1.3, 'R_s': 1.5}
+    cv_local = {'C_j': model.compute_zero_bias_cap(2e-12, 0.75, 0.45, 1.12, T),
+                'V_bi': model.compute_bi_potential(0.75, 1.12, T), 'm': 0.45}
+    iv_curves.append((V_iv, model.compute_current(V_iv, iv_local, T=T) * (1 + np.random.normal(0, 0.01, len(V_iv))), T))
+    cv_curves.append((V_cv_joint, model.compute_capacitance(V_cv_joint, cv_local) * (1 + np.random.normal(0, 0.01, len(V_cv_joint))), T))
+
+joint_guess = {'I_s': 1e-12, 'Eg': 1.0, 'n': 1.2, 'R_s': 0.5, 'C_j': 1e-12, 'V_bi': 0.6, 'm': 0.5}
+for solver in ['trf', 'irls']:
+    joint = extractor.diode_joint_fit(iv_curves, cv_curves, initial_params=dict(joint_guess), solver=solver)
+    assert joint['success'] and joint['rms_err_iv'] < 0.015 and joint['rms_err_cv'] < 0.015
+    for name, value in joint_truth.items():
+        assert np.abs((joint['parameters'][name] - value) / value) < 0.05, (solver, name, joint['parameters'][name])
+
+# one joint solve against a temperature I-V fit plus one C-V fit per temperature
+separate = extractor.diode_temp_fit(iv_curves, initial_params={k: joint_guess[k] for k in ['I_s', 'Eg', 'n', 'R_s']})['num_iters']
+for V_c, C_c, T in cv_curves:
+    separate += extractor.diode_cv_fit(V_c, C_c, initial_params={k: joint_guess[k] for k in ['C_j', 'V_bi', 'm']})['num_iters']
+assert joint['num_iters'] < separate
+
+seeded = ModelExtractor(model, guess='analytic').diode_joint_fit(iv_curves, cv_curves)['parameters']
+assert np.abs(seeded['Eg'] / joint_truth['Eg'] - 1) < 0.02
+print("Joint I-V + C-V temperature fit passed.\n")
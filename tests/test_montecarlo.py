@@ -0,0 +1,71 @@
+import time
+import numpy as np
+
+from src.models import DiodeModel, MOSFETModel
+from src.montecarlo import population_stats, sample_parameters, monte_carlo, metric_corners
+
+diode = DiodeModel()
+mosfet = MOSFETModel()
+
+## Parameter-set evaluation test
+
+V = np.linspace(0, 1.0, 150)
+sets = [{'I_s': 1e-12, 'n': 1.3, 'R_s': 0.5}, {'I_s': 5e-12, 'n': 1.5, 'R_s': 1.0}]
+I_sets = diode.compute_current_sets(V, sets)
+assert I_sets.shape == (2, len(V))
+for row, p in zip(I_sets, sets):
+    assert np.allclose(row, diode.compute_current(V, p), rtol=1e-9, atol=1e-18)
+assert diode.compute_current_sets(V, sets[0]).shape == (1, len(V)) # a single dict is one set
+
+V_gs = np.linspace(0, 3, 31)
+I_mos = mosfet.compute_current_sets(V_gs, {'V_th': np.array([0.6, 0.7, 0.8]), 'k_n': 2e-3, 'lam': 0.04}, V_ds=1.0)
+assert I_mos.shape == (3, len(V_gs))
+assert np.allclose(I_mos[2], mosfet.compute_current(V_gs, {'V_th': 0.8, 'k_n': 2e-3, 'lam': 0.04}, V_ds=1.0))
+
+# scalars are shared by every set, also V_th while k_n or lam vary
+I_kn = mosfet.compute_current_sets(V_gs, {'V_th': 0.7, 'k_n': [1e-3, 2e-3], 'lam': 0.04}, V_ds=1.0)
+assert I_kn.shape == (2, len(V_gs)) and np.allclose(I_kn[1], 2 * I_kn[0])
+I_lam = mosfet.compute_current_sets(V_gs, {'V_th': 0.7, 'k_n': 2e-3, 'lam': np.array([0.0, 0.04])}, V_ds=1.0)
+assert np.allclose(I_lam[1], mosfet.compute_current(V_gs, {'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.04}, V_ds=1.0))
+I_list = mosfet.compute_current_sets(V_gs, [{'V_th': 0.7, 'k_n': k, 'lam': 0.04} for k in (1e-3, 2e-3)], V_ds=1.0)
+assert np.allclose(I_list, I_kn)
+print("Parameter sets passed.\n")
+
+## Correlated sampling test
+
+nominal = {'I_s': 1e-12, 'n': 1.3, 'R_s': 0.5}
+sigma = {'I_s': 0.3, 'n': 0.02}
+corr = np.array([[1.0, 0.8], [0.8, 1.0]])
+samples = sample_parameters(nominal, sigma, corr, n_samples=100_000, bounds=diode.get_param_bounds(), seed=67)
+
+assert np.all(samples['R_s'] == 0.5) and samples['n'].min() >= 1.0
+assert abs(np.median(samples['I_s']) / nominal['I_s'] - 1) < 0.01
+stats = population_stats(samples)
+assert abs(stats['corr'][0, 1] - 0.8) < 0.01 and abs(stats['sigma']['I_s'] - 0.3) < 0.01
+assert stats['corr'][0, 2] == 0.0 # constant R_s
+
+try:
+    sample_parameters(nominal, sigma, np.array([[1.0, 2.0], [2.0, 1.0]]))
+    assert False
+except ValueError:
+    pass
+print("Correlated sampling passed.\n")
+
+## Corner percentiles test
+
+start = time.perf_counter()
+mc = monte_carlo(diode.prepare(V).current, samples)
+elapsed = time.perf_counter() - start
+print(f"100k diode samples in {elapsed:.2f} s")
+
+low, mid, high = mc['percentiles'][0.135], mc['percentiles'][50.0], mc['percentiles'][99.865]
+assert mc['values'].shape == (100_000, len(V))
+assert np.all(low <= mid) and np.all(mid <= high) and np.all(high[V > 0.2] > low[V > 0.2])
+assert np.allclose(mid, diode.compute_current(V, nominal), rtol=0.02)
+
+mos_samples = sample_parameters({'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.04}, {'V_th': 0.03, 'k_n': 0.05}, seed=1)
+drive = mosfet.compute_current_sets(3.0, mos_samples, V_ds=3.0) # scalar bias point, one current per set
+corners = metric_corners(mos_samples, drive)
+slow, fast = corners[0.135], corners[99.865]
+assert slow['V_th'] > fast['V_th'] and slow['k_n'] < fast['k_n']
+print("Monte Carlo corners passed.\n")
@@ -1,7 +1,8 @@
 import numpy as np
 from scipy.constants import e as q_e, k as k_B
 
-from src.models import DiodeModel, MOSFETModel
+from src.models import DiodeModel, MOSFETModel, EKVMOSFETModel
+from src.physics import MOSFETPhysics
 from src.extraction import ModelExtractor
 
 ## MOSFET fit test
@@ -56,4 +57,213 @@ print("Fitted global MOSFET params:", fit)
 assert np.abs((fit['V_th'] - global_params['V_th']) / global_params['V_th']) < 0.1
 assert np.abs((fit['k_n'] - global_params['k_n']) / global_params['k_n']) < 0.1
 assert np.abs((fit['lam'] - global_params['lam']) / global_params['lam']) < 0.1
-print("MOSFET global fit passed.\n")
\ No newline at end of file
+print("MOSFET global fit passed.\n")
+
+## Broadcast evaluation test
+
+grid = model.compute_grid(vgs_sweep, vds_sweep, global_params)
+assert grid.shape == (len(vgs_sweep), len(vds_sweep))
+
+for row, vgs in zip(grid, vgs_sweep):
+    assert np.allclose(row, model.compute_current(vgs, global_params, V_ds=vds_sweep), rtol=1e-12, atol=0)
+
+# region values: cutoff, triode and saturation with channel-length modulation
+I_regions = model.compute_current(np.array([0.5, 1.8, 1.8]), global_params, V_ds=np.array([2.0, 0.5, 2.0]))
+assert I_regions[0] == 0.0
+assert np.isclose(I_regions[1], global_params['k_n'] * (1.0 * 0.5 - 0.5 * 0.5**2))
+assert np.isclose(I_regions[2], 0.5 * global_params['k_n'] * 1.0**2 * (1 + global_params['lam'] * 2.0))
+print("MOSFET broadcast evaluation passed.\n")
+
+## Robust loss and IRLS test
+
+# analytic derivatives against central differences
+jac = model.current_jacobian(vgs_array, global_params, V_ds=vds_sweep)
+for name in ['V_th', 'k_n', 'lam']:
+    h = 1e-6 * global_params[name]
+    up, down = dict(global_params), dict(global_params)
+    up[name] += h
+    down[name] -= h
+    fd = (model.compute_current(vgs_array, up, V_ds=vds_sweep) - model.compute_current(vgs_array, down, V_ds=vds_sweep)) / (2 * h)
+    assert np.allclose(jac[name], fd, rtol=1e-5, atol=1e-12 * np.max(np.abs(fd)))
+
+# 5% of the points scaled by 3-10x
+np.random.seed(67)
+V_gs_robust = np.linspace(1.0, 3.0, 200)
+I_robust = model.compute_current(V_gs_robust, global_params, V_ds=2.0) * (1 + np.random.normal(0, 0.01, size=V_gs_robust.shape))
+outliers = np.random.choice(len(V_gs_robust), size=10, replace=False)
+I_robust[outliers] *= np.random.uniform(3, 10, size=10)
+
+plain = extractor.mosfet_fit(V_gs_robust, I_robust, 2.0, initial_params=dict(initial_guess))['parameters']
+robust = extractor.mosfet_fit(V_gs_robust, I_robust, 2.0, initial_params=dict(initial_guess), loss='huber', f_scale=0.05)['parameters']
+irls_report = extractor.mosfet_fit(V_gs_robust, I_robust, 2.0, initial_params=dict(initial_guess), loss='huber', f_scale=0.05, solver='irls')
+print("Plain V_th:", plain['V_th'], "Huber V_th:", robust['V_th'], "IRLS V_th:", irls_report['parameters']['V_th'])
+
+assert abs(robust['V_th'] - global_params['V_th']) < abs(plain['V_th'] - global_params['V_th'])
+assert abs(robust['V_th'] - global_params['V_th']) / global_params['V_th'] < 0.01
+assert np.isclose(irls_report['parameters']['V_th'], robust['V_th'], rtol=1e-4)
+assert irls_report['success']
+
+try:
+    extractor.mosfet_fit(V_gs_robust, I_robust, 2.0, initial_params=dict(initial_guess), loss='l3')
+    assert False
+except ValueError:
+    pass
+print("MOSFET robust fit passed.\n")
+
+## Prepared sweep test
+
+V_gs_grid, V_ds_grid = np.meshgrid(np.linspace(0, 3, 30), np.linspace(0, 5, 30), indexing='ij')
+surface = model.prepare(V_gs_grid, V_ds_grid)
+assert model.prepare(V_gs_grid, V_ds_grid) is surface
+assert np.allclose(surface.current(global_params), model.compute_current(V_gs_grid, global_params, V_ds=V_ds_grid), rtol=1e-12, atol=0)
+
+jac_ref = model.current_jacobian(V_gs_grid, global_params, V_ds=V_ds_grid)
+for name, value in surface.jacobian(global_params).items():
+    assert np.allclose(value, jac_ref[name], rtol=1e-12, atol=0)
+
+sets = {'V_th': np.array([0.6, 0.8]), 'k_n': np.array([1e-3, 2e-3]), 'lam': 0.05}
+I_sets = surface.current(sets)
+assert I_sets.shape == (2, 30, 30)
+assert np.allclose(I_sets[1], model.compute_grid(V_gs_grid[:, 0], V_ds_grid[0], {'V_th': 0.8, 'k_n': 2e-3, 'lam': 0.05}), rtol=1e-12, atol=0)
+
+# a shared V_th with per-set k_n or lam still gets the set axis
+for varied in [{'k_n': np.array([1e-3, 2e-3])}, {'lam': np.array([0.0, 0.05])}]:
+    shared = surface.current({'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.05, **varied})
+    last = {'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.05, **{k: v[-1] for k, v in varied.items()}}
+    assert shared.shape == (2, 30, 30) and np.allclose(shared[1], surface.current(last), rtol=1e-12, atol=0)
+    jac_shared, jac_last = surface.jacobian({'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.05, **varied}), surface.jacobian(last)
+    assert all(value.shape == (2, 30, 30) and np.allclose(value[1], jac_last[name], rtol=1e-12, atol=0)
+               for name, value in jac_shared.items())
+print("MOSFET prepared sweep passed.\n")
+
+## Surface fit test
+
+surface_params = {'V_th': 0.77, 'k_n': 1e-3, 'lam': 0.05}
+tolerance = {'V_th': 0.02, 'k_n': 0.02, 'lam': 0.1} # lam only shows in the small slope of the plateau
+rng = np.random.default_rng(48)
+vgs_axis, vds_axis = np.linspace(0, 3, 31), np.linspace(0, 3, 31)
+I_grid = model.compute_current(vgs_axis[:, None], surface_params, V_ds=vds_axis[None, :])
+I_grid = I_grid * (1 + rng.normal(0, 0.02, I_grid.shape)) + rng.normal(0, 1e-9, I_grid.shape)
+
+regions = model.classify_regions(vgs_axis[:, None], vds_axis[None, :], surface_params)
+assert np.all(regions[vgs_axis <= 0.77] == 0) and regions[-1, 0] == 1 and regions[-1, -1] == 2
+
+surface_extractor = ModelExtractor(model, guess='analytic')
+for solver in ['trf', 'irls']:
+    grid_fit = surface_extractor.mosfet_surface_fit(vgs_axis, vds_axis, I_grid, solver=solver)
+    assert grid_fit['success'] and sum(grid_fit['regions'].values()) == I_grid.size
+    for name, value in surface_params.items():
+        assert abs(grid_fit['parameters'][name] / value - 1) < tolerance[name], (solver, name, grid_fit['parameters'][name])
+
+# scattered bias points given as a table, fitted from a poor guess
+vg_scatter, vd_scatter = rng.uniform(0, 3, 3000), rng.uniform(0, 3, 3000)
+I_scatter = model.compute_current(vg_scatter, surface_params, V_ds=vd_scatter) * (1 + rng.normal(0, 0.02, 3000))
+table = {'V_gs': vg_scatter, 'V_ds': vd_scatter, 'I_d': I_scatter}
+scatter_fit = extractor.mosfet_surface_fit(table, initial_params={'V_th': 0.5, 'k_n': 1e-4, 'lam': 0.0})['parameters']
+assert all(abs(scatter_fit[name] / value - 1) < tolerance[name] for name, value in surface_params.items())
+
+# regions follow the V_th estimate, zero-weight points drop out of the residual
+no_sat = extractor.mosfet_surface_fit(table, initial_params={'V_th': 0.7, 'k_n': 1e-3, 'lam': 0.01},
+                                      region_weights={'saturation': 0.0})
+final_regions = model.classify_regions(vg_scatter, vd_scatter, no_sat['parameters'])
+assert np.all(extractor.result.fun[final_regions == 2] == 0) and np.any(extractor.result.fun != 0)
+assert no_sat['regions']['saturation'] == np.sum(final_regions == 2) and abs(no_sat['parameters']['V_th'] / 0.77 - 1) < 0.02
+
+try:
+    extractor.mosfet_surface_fit(table, region_weights={'subthreshold': 0.1})
+    assert False
+except ValueError:
+    pass
+print("MOSFET surface fit passed.\n")
+
+## Noise floor and region weighting test
+
+floor_params = {'V_th': 0.67, 'k_n': 5e-4, 'lam': 0.03}
+rng = np.random.default_rng(49)
+vgs_floor = np.linspace(0, 2, 201)
+I_floor = model.compute_current(vgs_floor, floor_params, V_ds=1.5)
+I_floor = I_floor * (1 + rng.normal(0, 0.02, vgs_floor.shape)) + rng.normal(0, 1e-9, vgs_floor.shape)
+floor_guess = {'V_th': 0.4, 'k_n': 2e-4, 'lam': 0.0}
+I_sat = floor_params['k_n'] * (1 + floor_params['lam'] * 1.5) # a single transfer curve only fixes k_n (1 + lam V_ds)
+
+for solver in ['trf', 'irls']:
+    plain = extractor.mosfet_fit(vgs_floor, I_floor, 1.5, initial_params=dict(floor_guess), solver=solver)
+    masked = extractor.mosfet_fit(vgs_floor, I_floor, 1.5, initial_params=dict(floor_guess), solver=solver,
+                                  region_weights={'cutoff': 0.0}, noise_floor=1e-8)
+    p = masked['parameters']
+    assert masked['success'] and masked['num_iters'] < plain['num_iters'], (solver, masked['num_iters'], plain['num_iters'])
+    assert abs(p['V_th'] / 0.67 - 1) < 0.01 and abs(p['k_n'] * (1 + p['lam'] * 1.5) / I_sat - 1) < 0.05
+    
+    # cutoff is taken from the final V_th estimate and from points measured at or below the floor
+    cutoff = (model.classify_regions(vgs_floor, 1.5, p) == 0) | (np.abs(I_floor) <= 1e-8)
+    assert np.all(extractor.result.fun[cutoff] == 0) and masked['regions']['cutoff'] == np.sum(cutoff)
+
+# reclassifying every evaluation ends on the same regions
+every = extractor.mosfet_fit(vgs_floor, I_floor, 1.5, initial_params=dict(floor_guess), region_weights={'cutoff': 0.0},
+                             noise_floor=1e-8, reclassify_every=1)
+assert every['regions'] == masked['regions'] and abs(every['parameters']['V_th'] / p['V_th'] - 1) < 1e-3
+print("MOSFET noise floor and region weighting passed.\n")
+
+## EKV model test
+
+ekv = EKVMOSFETModel()
+U_t = k_B * 300 / q_e
+level1 = {'V_th': 0.7, 'k_n': 1e-3, 'lam': 0.0}
+vgs_strong, vds_strong = np.array([[1.5], [2.0], [3.0]]), np.array([0.05, 0.3, 3.0])
+assert np.allclose(ekv.compute_current(vgs_strong, level1, V_ds=vds_strong),
+                   model.compute_current(vgs_strong, level1, V_ds=vds_strong), rtol=1e-3) # Level 1 far from V_th
+
+ekv_params = {'V_th': 0.7, 'k_n': 1e-3, 'lam': 0.05, 'theta': 0.15, 'gamma': 0.4, 'phi': 0.8}
+I_sub = ekv.compute_current(np.array([0.2, 0.3]), ekv_params, V_ds=1.0)
+slope = 1 + ekv_params['gamma'] / (2 * np.sqrt(ekv_params['phi']))
+assert abs(0.1 / np.log10(I_sub[1] / I_sub[0]) / (slope * U_t * np.log(10)) - 1) < 1e-3 # n U_t ln(10) per decade
+assert ekv.compute_current(1.5, ekv_params, V_ds=1.0, V_sb=1.0) < ekv.compute_current(1.5, ekv_params, V_ds=1.0) # body effect
+assert ekv.compute_current(1.5, ekv_params, V_ds=-0.5) < 0 # reverse current from the same expression
+
+# analytic derivatives against central differences, across weak and strong inversion and negative V_ds
+vgs_ekv, vds_ekv = np.linspace(0, 3, 31)[:, None], np.linspace(-0.5, 3, 36)[None, :]
+jac_ekv = ekv.current_jacobian(vgs_ekv, ekv_params, V_ds=vds_ekv, V_sb=0.3)
+for name in ekv.param_names:
+    h = 1e-6 * ekv_params[name]
+    up, down = dict(ekv_params, **{name: ekv_params[name] + h}), dict(ekv_params, **{name: ekv_params[name] - h})
+    fd = (ekv.compute_current(vgs_ekv, up, V_ds=vds_ekv, V_sb=0.3) - ekv.compute_current(vgs_ekv, down, V_ds=vds_ekv, V_sb=0.3)) / (2 * h)
+    assert np.max(np.abs(fd - jac_ekv[name])) < 1e-7 * np.max(np.abs(jac_ekv[name])), name
+
+ekv_sweep = ekv.prepare(vgs_ekv, vds_ekv, V_sb=0.3)
+assert ekv.prepare(vgs_ekv, vds_ekv, V_sb=0.3) is ekv_sweep
+assert np.allclose(ekv_sweep.current(ekv_params), ekv.compute_current(vgs_ekv, ekv_params, V_ds=vds_ekv, V_sb=0.3), rtol=1e-12, atol=0)
+assert all(np.allclose(value, jac_ekv[name], rtol=1e-12, atol=0) for name, value in ekv_sweep.jacobian(ekv_params).items())
+ekv_sets = ekv.compute_current_sets(vgs_ekv, dict(ekv_params, V_th=np.array([0.6, 0.7])), V_ds=vds_ekv)
+assert ekv_sets.shape == (2, 31, 36) and np.allclose(ekv_sets[1], ekv.compute_grid(vgs_ekv[:, 0], vds_ekv[0], ekv_params))
+assert ekv.compute_current(vgs_ekv, ekv_params, V_ds=vds_ekv, dtype=np.float32).dtype == np.float32
+assert list(ekv.classify_regions(np.array([0.5, 1.5, 1.5]), np.array([1.0, 0.1, 2.0]), ekv_params)) == [0, 1, 2]
+
+# one smooth expression needs far fewer evaluations than the piecewise Level 1 model on the same grid and start
+rng = np.random.default_rng(50)
+vgs_axis, vds_axis = np.linspace(0, 3, 31), np.linspace(0.05, 3, 30)
+I_ekv = ekv.compute_grid(vgs_axis, vds_axis, ekv_params) * (1 + rng.normal(0, 0.01, (31, 30)))
+I_l1 = model.compute_grid(vgs_axis, vds_axis, {'V_th': 0.7, 'k_n': 1e-3, 'lam': 0.05})
+I_l1 = I_l1 * (1 + rng.normal(0, 0.01, (31, 30))) + rng.normal(0, 1e-9, (31, 30))
+poor_guess = {'V_th': 0.5, 'k_n': 2e-4, 'lam': 0.0}
+
+ekv_extractor = ModelExtractor(ekv)
+ekv_fit = ekv_extractor.mosfet_surface_fit(vgs_axis, vds_axis, I_ekv, initial_params=dict(poor_guess, phi=0.8))
+l1_fit = ModelExtractor(model).mosfet_surface_fit(vgs_axis, vds_axis, I_l1, initial_params=dict(poor_guess), noise_floor=1e-8)
+assert ekv_fit['success'] and ekv_fit['num_iters'] < l1_fit['num_iters'] / 2, (ekv_fit['num_iters'], l1_fit['num_iters'])
+assert ekv_fit['parameters']['phi'] == 0.8 # held, not fitted
+for name in ekv.param_names:
+    assert abs(ekv_fit['parameters'][name] / ekv_params[name] - 1) < 0.05, (name, ekv_fit['parameters'][name])
+
+# the IRLS path and single curves use the same model, phi and the start taken from the device physics
+body = MOSFETPhysics(1e17, 5e-7, 300).body_effect_params()
+assert body['gamma'] > 0 and 0.6 < body['phi'] < 1.2
+near = {'V_th': 0.6, 'k_n': 8e-4, 'lam': 0.03, 'phi': 0.8}
+irls_fit = ekv_extractor.mosfet_surface_fit(vgs_axis, vds_axis, I_ekv, initial_params=near, solver='irls')
+assert irls_fit['success'] and abs(irls_fit['parameters']['gamma'] / ekv_params['gamma'] - 1) < 0.05
+
+I_transfer = ekv.compute_current(np.linspace(0, 2, 201), dict(ekv_params, phi=body['phi']), V_ds=1.0)
+transfer_fit = ekv_extractor.mosfet_fit(np.linspace(0, 2, 201), I_transfer, 1.0,
+                                        initial_params={'V_th': 0.5, 'k_n': 2e-4, 'phi': body['phi']})
+assert transfer_fit['success'] and abs(transfer_fit['parameters']['V_th'] / 0.7 - 1) < 1e-3
+assert abs(transfer_fit['parameters']['gamma'] / ekv_params['gamma'] - 1) < 0.01 # from the subthreshold slope
+print("EKV model passed.\n")
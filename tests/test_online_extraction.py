@@ -0,0 +1,66 @@
+import numpy as np
+
+from src.models import DiodeModel, MOSFETModel, EKVMOSFETModel
+from src.extraction import ModelExtractor
+from src.online import IncrementalExtractor
+
+## Streamed diode sweep test
+
+model = DiodeModel()
+params = {'I_s': 1e-10, 'n': 1.5, 'R_s': 2.5}
+V_sweep = np.linspace(0, 1.0, 200)
+np.random.seed(67)
+I_sweep = model.compute_current(V_sweep, params) * (1 + np.random.normal(0, 0.01, size=V_sweep.shape))
+
+online = IncrementalExtractor(ModelExtractor(model), fit_mode='diode', bias=300, refit_every=10, rtol=1e-2, patience=2,
+                              initial_params={'I_s': 1e-11, 'n': 1.4, 'R_s': 0.1})
+n_refits = 0
+
+for v, i in zip(V_sweep, I_sweep):
+    if online.add_point(v, i) is not None:
+        n_refits += 1
+
+print("Streamed diode estimate:", online.estimate)
+print("Streamed diode uncertainty:", online.uncertainty)
+
+assert n_refits == len(online.history)
+assert online.n_points == len(V_sweep)
+assert np.abs((online.estimate['I_s'] - params['I_s']) / params['I_s']) < 0.2
+assert np.abs((online.estimate['n'] - params['n']) / params['n']) < 0.1
+assert all(0 < online.uncertainty[name] < np.inf for name in ['I_s', 'n', 'R_s'])
+assert online.is_stable
+print("Streamed diode fit passed.\n")
+
+## Streamed MOSFET output sweep test
+
+mosfet = MOSFETModel()
+mos_params = {'V_th': 0.8, 'k_n': 1e-3, 'lam': 0.05}
+V_ds = np.linspace(0.05, 5.0, 60)
+I_d = mosfet.compute_current(2.5, mos_params, V_ds=V_ds)
+
+online = IncrementalExtractor(ModelExtractor(mosfet), fit_mode='mosfet_output', bias=2.5, refit_every=20,
+                              initial_params={'V_th': 0.5, 'k_n': 1e-4, 'lam': 0.0})
+report = online.add_points(V_ds, I_d)
+
+assert report is not None and len(online.history) == 3
+assert np.abs((online.estimate['V_th'] - mos_params['V_th']) / mos_params['V_th']) < 0.05
+print("Streamed MOSFET fit passed.\n")
+
+## Streamed EKV transfer sweep test
+
+ekv = EKVMOSFETModel()
+ekv_params = {'V_th': 0.7, 'k_n': 1e-3, 'lam': 0.05, 'theta': 0.15, 'gamma': 0.4, 'phi': 0.8}
+V_gs = np.linspace(0.0, 2.0, 120)
+I_d = ekv.compute_current(V_gs, ekv_params, V_ds=1.0)
+
+online = IncrementalExtractor(ModelExtractor(ekv), fit_mode='mosfet_transfer', bias=1.0, refit_every=40,
+                              initial_params={'V_th': 0.6, 'k_n': 5e-4, 'phi': 0.8})
+online.add_points(V_gs, I_d)
+
+assert len(online.history) == 3 and online.estimate['phi'] == 0.8 # the held phi survives every warm start
+assert set(online.uncertainty) == set(ekv.param_names)
+for name in ['V_th', 'theta', 'gamma']:
+    assert abs(online.estimate[name] / ekv_params[name] - 1) < 1e-3, (name, online.estimate[name])
+drive = online.estimate['k_n'] * (1 + online.estimate['lam']) # one V_ds only fixes k_n (1 + lam V_ds)
+assert abs(drive / (ekv_params['k_n'] * (1 + ekv_params['lam'])) - 1) < 1e-4
+print("Streamed EKV fit passed.\n")
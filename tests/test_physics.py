@@ -0,0 +1,92 @@
+import time
+import numpy as np
+import plotly.io
+
+from src.physics import DiodePhysics, MOSFETPhysics
+from src.visualization import animate_diode_bands, animate_mos_bands, show_frame
+
+## Vectorized band diagram test
+
+diode = DiodePhysics(1e16, 1e17, 300)
+v_bias = np.round(np.arange(-2.0, 1.0 + 1e-9, 0.05), 2)
+x = np.linspace(-2e-4, 2e-4, 400)
+bands = diode.compute_energy_bands(v_bias, x)
+assert bands['Ec'].shape == (len(v_bias), len(x))
+
+for i in [0, 20, 40, 55]:
+    single = diode.compute_energy_bands(v_bias[i], x)
+    for key in ['Ec', 'Ev', 'Ei', 'Efp', 'Efn']:
+        assert np.allclose(single[key], bands[key][i])
+
+# the barrier across the junction is V_bi - V, the quasi-Fermi levels end at 0 and V
+drop = bands['Ec'][:, 0] - bands['Ec'][:, -1]
+assert np.allclose(drop, diode.get_bi_potential() - v_bias)
+assert np.allclose(bands['Efn'][:, -1], v_bias) and np.all(bands['Efp'][:, 0] == 0)
+
+mos = MOSFETPhysics(1e16, 1e-6, 300)
+V_gs = np.round(np.arange(-2.0, 5.0 + 1e-9, 0.05), 2)
+phi_s = mos.solve_surface_potential(V_gs)
+assert isinstance(mos.solve_surface_potential(0.0), float) and np.all(np.diff(phi_s) >= 0)
+assert np.allclose(phi_s[V_gs < -0.9], V_gs[V_gs < -0.9] + 0.9) # accumulation
+mos_bands = mos.compute_band_diagrams(V_gs, np.linspace(-1e-5, 1e-4, 300))
+assert mos_bands['Ec'].shape == (len(V_gs), 300) and mos_bands['w'].shape == V_gs.shape
+single = mos.compute_band_diagrams(1.0, np.linspace(-1e-5, 1e-4, 300))
+assert np.allclose(single['Ei'], mos_bands['Ei'][np.argmin(np.abs(V_gs - 1.0))])
+assert np.isclose(single['Ei'][-1], mos.phi_f) and np.isclose(mos.phi_f - single['Ei'][0], single['phi_s'])
+print("Vectorized bands passed.\n")
+
+## Band animation frames test
+
+figure = animate_diode_bands(bands)
+assert np.allclose(figure.frames[40].data[0].y, bands['Ec'][40], atol=1e-6)
+fig = figure.to_dict()
+assert len(fig['frames']) == len(v_bias) and len(fig['layout']['sliders'][0]['steps']) == len(v_bias)
+shown = show_frame(fig, 40)
+assert shown['layout']['sliders'][0]['active'] == 40 and fig['layout']['sliders'][0]['active'] == 0
+assert shown['data'][0]['y'] is fig['frames'][40]['data'][0]['y'] and shown['data'][0]['x'] is fig['data'][0]['x']
+
+mos_fig = animate_mos_bands(mos_bands, V_gs, controls=False).to_dict()
+assert len(mos_fig['frames']) == len(V_gs) and mos_fig['frames'][0]['name'] == '-2.00'
+assert not mos_fig['layout'].get('sliders') and not mos_fig['layout'].get('updatemenus')
+shown = show_frame(mos_fig, 10)
+assert shown['data'][0]['y'] is mos_fig['frames'][10]['data'][0]['y'] and not shown['layout'].get('sliders')
+
+# payload of one dashboard slider tick: a single diagram, the cached frames stay on the server
+app_fig = animate_diode_bands(bands, controls=False).to_dict()
+tick = show_frame(app_fig, 40)
+assert 'frames' not in tick and len(app_fig['frames']) == len(v_bias)
+assert tick['data'][0]['y'] is app_fig['frames'][40]['data'][0]['y']
+payload = len(plotly.io.to_json(tick))
+assert payload < len(plotly.io.to_json(app_fig)) / 10 # ~0.05 MB against ~0.8 MB for the whole sweep
+print("Band animation passed.\n")
+
+## Design map test
+
+Na = np.logspace(14, 18, 1000)
+tox = np.linspace(1e-7, 1e-5, 1000)
+start = time.perf_counter()
+V_th = MOSFETPhysics(Na[:, None], tox[None, :], 300).Vth
+print(f"1M-point V_th map in {(time.perf_counter() - start) * 1e3:.1f} ms")
+assert V_th.shape == (1000, 1000)
+for i, j in [(0, 0), (500, 250), (999, 999)]:
+    assert np.isclose(V_th[i, j], MOSFETPhysics(Na[i], tox[j], 300).Vth)
+assert np.all(np.diff(V_th, axis=0) > 0) and np.all(np.diff(V_th[500]) > 0) # V_th rises with doping and oxide thickness
+
+Nd = np.logspace(14, 18, 100)
+T = np.linspace(200, 400, 100)
+grid = DiodePhysics(Na[::10, None, None], Nd[None, :, None], T[None, None, :])
+v_bi = grid.get_bi_potential()
+w, xp, xn = grid.get_dep_width(-1.0)
+assert v_bi.shape == w.shape == (100, 100, 100) and np.allclose(xp + xn, w)
+point = DiodePhysics(Na[10 * 40], Nd[70], T[20])
+assert np.isclose(v_bi[40, 70, 20], point.get_bi_potential()) and np.isclose(w[40, 70, 20], point.get_dep_width(-1.0)[0])
+assert np.all(np.diff(v_bi, axis=2) < 0) # V_bi falls with temperature
+
+# lists work like arrays, and bias broadcasts against the device grid for the band diagrams
+assert np.allclose(DiodePhysics([1e16, 1e17], 1e17, 300).get_bi_potential(),
+                   [DiodePhysics(1e16, 1e17, 300).get_bi_potential(), DiodePhysics(1e17, 1e17, 300).get_bi_potential()])
+mos_grid = MOSFETPhysics(Na[::100], 1e-6, 300)
+grid_bands = mos_grid.compute_band_diagrams(1.0, np.linspace(0, 1e-4, 50))
+assert grid_bands['Ec'].shape == (10, 50) and grid_bands['phi_s'].shape == (10,)
+assert np.allclose(grid_bands['Ec'][3], MOSFETPhysics(Na[300], 1e-6, 300).compute_band_diagrams(1.0, np.linspace(0, 1e-4, 50))['Ec'])
+print("Design maps passed.\n")
@@ -0,0 +1,108 @@
+import threading
+import numpy as np
+
+from src.precision import precision, set_default_dtype, get_default_dtype, resolve_dtype
+from src.models import DiodeModel, MOSFETModel
+from src.physics import DiodePhysics, MOSFETPhysics
+from src.extraction import ModelExtractor
+
+diode = DiodeModel()
+mosfet = MOSFETModel()
+eps = float(np.finfo(np.float32).eps)
+
+def max_rel(a, b):
+    return np.max(np.abs(a - b) / np.abs(b))
+
+## Dtype policy test
+
+V = np.linspace(-1.0, 1.0, 150)
+nominal = {'I_s': 1e-12, 'n': 1.3, 'R_s': 0.5}
+assert get_default_dtype() == np.float64 and diode.compute_current(V, nominal).dtype == np.float64
+assert diode.compute_current(V, nominal, dtype=np.float32).dtype == np.float32
+
+with precision(np.float32):
+    assert diode.compute_current(V, nominal).dtype == np.float32
+    assert diode.compute_current(V, nominal, dtype=np.float64).dtype == np.float64 # the call wins over the block
+    seen = []
+    worker = threading.Thread(target=lambda: seen.append(resolve_dtype()))
+    worker.start()
+    worker.join()
+    assert seen == [np.float64] # blocks are per thread
+assert resolve_dtype() == np.float64
+
+assert diode.prepare(V, dtype=np.float32) is not diode.prepare(V) # plans are kept per dtype
+assert diode.prepare(V, dtype=np.float32) is diode.prepare(V, dtype=np.float32)
+
+try:
+    resolve_dtype(np.float16)
+    assert False
+except ValueError:
+    pass
+print("Dtype policy passed.\n")
+
+## Float32 error bounds test
+
+rng = np.random.default_rng(3)
+n_sets = 5000
+sets = {'I_s': 1e-12 * np.exp(0.3 * rng.standard_normal(n_sets)), 'n': 1.3 + 0.02 * rng.standard_normal(n_sets),
+        'R_s': rng.uniform(0.0, 1.0, n_sets)}
+I64 = diode.compute_current_sets(V, sets)
+I32 = diode.compute_current_sets(V, sets, dtype=np.float32)
+arg = np.abs(V) / (sets['n'].min() * 0.02585)
+assert I32.dtype == np.float32 and max_rel(I32, I64) <= (2 * arg.max() + 4) * eps
+
+ideal = {'I_s': 1e-14, 'n': 1.0}
+assert max_rel(diode.compute_current(V, ideal, dtype=np.float32), diode.compute_current(V, ideal)) < 1e-5
+
+cv = {'C_j': 1e-12, 'V_bi': 0.8, 'm': 0.5}
+V_cv = np.linspace(-5.0, 0.7, 200)
+assert max_rel(diode.compute_capacitance(V_cv, cv, dtype=np.float32), diode.compute_capacitance(V_cv, cv)) < 1e-6
+C_sets = diode.compute_capacitance_sets(V_cv, [cv, cv], dtype=np.float32)
+assert C_sets.dtype == np.float32 and max_rel(C_sets[1], diode.compute_capacitance(V_cv, cv)) < 1e-6
+
+grid = np.linspace(0.0, 3.0, 301)
+level1 = {'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.04}
+I_grid = mosfet.compute_grid(grid, grid, level1, dtype=np.float32)
+assert I_grid.dtype == np.float32
+off_pinch = np.abs(grid[None, :] - (grid[:, None] - level1['V_th'])) > 1e-6 # ties may change region
+error = np.abs(I_grid - mosfet.compute_grid(grid, grid, level1))
+assert np.max(error[off_pinch]) <= 4 * eps * level1['k_n'] * 3.0**2
+I_mos = mosfet.compute_current_sets(grid, dict(level1, V_th=np.array([0.6, 0.7])), V_ds=1.0, dtype=np.float32)
+assert I_mos.dtype == np.float32 and np.allclose(I_mos[1], I_grid[:, 100], rtol=1e-5, atol=1e-12)
+
+x = np.linspace(-2e-4, 2e-4, 400)
+bias = np.linspace(-2.0, 0.5, 26)
+bands64 = DiodePhysics(1e16, 1e17, 300).compute_energy_bands(bias, x)
+bands32 = DiodePhysics(1e16, 1e17, 300, dtype=np.float32).compute_energy_bands(bias, x)
+for key in ['Ec', 'Ev', 'Efn', 'Efp']:
+    assert bands32[key].dtype == np.float32
+    assert np.max(np.abs(bands32[key] - bands64[key])) <= 8 * eps * np.max(np.abs(bands64[key]))
+
+Vgs, depth = np.linspace(-1, 3, 41), np.linspace(-5e-7, 1e-5, 300)
+mos64 = MOSFETPhysics(1e17, 5e-7, 300).compute_band_diagrams(Vgs, depth)
+mos32 = MOSFETPhysics(1e17, 5e-7, 300, dtype=np.float32).compute_band_diagrams(Vgs, depth)
+assert mos32['Ec'].dtype == np.float32 and np.max(np.abs(mos32['Ec'] - mos64['Ec'])) < 1e-6
+
+doping = np.logspace(14, 21, 300)
+v_bi = DiodePhysics(doping[:, None], doping[None, :], 300, dtype=np.float32).get_bi_potential()
+assert v_bi.dtype == np.float32 and np.all(np.isfinite(v_bi)) # 1e21 x 1e21 overflows a float32 product
+assert np.max(np.abs(v_bi - DiodePhysics(doping[:, None], doping[None, :], 300).get_bi_potential())) < 1e-5
+print("Float32 error bounds passed.\n")
+
+## Optimizer path stays in float64
+
+truth = {'I_s': 2e-12, 'n': 1.4, 'R_s': 0.3}
+V_fit = np.linspace(0.1, 0.9, 81)
+I_fit = diode.compute_current(V_fit, truth) * (1 + 0.002 * rng.standard_normal(len(V_fit)))
+reference = ModelExtractor(DiodeModel()).diode_fit(V_fit, I_fit, initial_params={'I_s': 1e-12, 'n': 1.3, 'R_s': 0.1})
+
+set_default_dtype(np.float32)
+try:
+    fitted = ModelExtractor(DiodeModel()).diode_fit(V_fit, I_fit, initial_params={'I_s': 1e-12, 'n': 1.3, 'R_s': 0.1})
+    assert DiodeModel().compute_current(V_fit, truth).dtype == np.float32
+finally:
+    set_default_dtype(np.float64)
+
+assert fitted['parameters'] == reference['parameters']
+assert abs(fitted['parameters']['n'] / truth['n'] - 1) < 0.01
+print("Float64 optimizer path passed.\n")
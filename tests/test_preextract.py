@@ -0,0 +1,79 @@
+import numpy as np
+
+from src.models import DiodeModel, MOSFETModel
+from src.datasets import CurveSet
+from src.extraction import ModelExtractor
+from src.preextract import analytic_guess_batch, diode_temp_guess, guess_cost, mosfet_output_guess
+
+def rel_err(guess, true):
+    return max(abs(guess[k] - v) / abs(v) for k, v in true.items())
+
+np.random.seed(67)
+diode = DiodeModel()
+mosfet = MOSFETModel()
+
+## Diode I-V and C-V estimators
+
+V = np.linspace(0, 1.0, 101)
+iv_params = [{'I_s': 1e-12, 'n': 1.3, 'R_s': 0.5}, {'I_s': 1e-14, 'n': 1.0, 'R_s': 2.0}, {'I_s': 1e-10, 'n': 1.8, 'R_s': 0.1}]
+temps = [280.0, 300.0, 350.0]
+iv_curves = [(V, diode.compute_current(V, p, T=T) * (1 + np.random.normal(0, 0.01, V.shape)), T) for p, T in zip(iv_params, temps)]
+
+for guess, true in zip(analytic_guess_batch('diode', iv_curves), iv_params):
+    print("Diode I-V guess:", guess)
+    assert rel_err(guess, {'I_s': true['I_s']}) < 0.2 and rel_err(guess, {'n': true['n']}) < 0.02
+
+V_cv = np.linspace(-5, 0.3, 200)
+cv_params = [{'C_j': 2e-12, 'V_bi': 0.75, 'm': 0.45}, {'C_j': 1e-10, 'V_bi': 0.6, 'm': 0.33}]
+cv_curves = [(V_cv, diode.compute_capacitance(V_cv, p) * (1 + np.random.normal(0, 0.005, V_cv.shape)), None) for p in cv_params]
+
+for guess, true in zip(analytic_guess_batch('diode_cv', cv_curves), cv_params):
+    print("Diode C-V guess:", guess)
+    assert rel_err(guess, true) < 0.05
+
+family = CurveSet.from_curves([(V, diode.compute_current(V, {'I_s': diode.compute_sat_current(1e-12, 1.1, T), 'n': 1.2, 'R_s': 0.5}, T=T), T) for T in temps])
+temp_guess = diode_temp_guess(family)
+assert rel_err(temp_guess, {'I_s': 1e-12, 'Eg': 1.1, 'n': 1.2}) < 0.1
+print("Diode estimators passed.\n")
+
+## MOSFET estimators, transfer curves in saturation and triode
+
+params = {'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.04}
+V_gs = np.linspace(0, 3, 151)
+transfer = [(V_gs, mosfet.compute_current(V_gs, params, V_ds=v_ds), v_ds) for v_ds in [0.05, 1.0, 3.0]]
+for guess in analytic_guess_batch('mosfet_transfer', transfer):
+    assert abs(guess['V_th'] - params['V_th']) < 0.01
+
+V_ds = np.linspace(0, 4, 101)
+output = CurveSet.from_curves([(V_ds, mosfet.compute_current(v_gs, params, V_ds=V_ds), v_gs) for v_gs in [1.5, 2.0, 3.0]])
+batch = mosfet_output_guess(output)
+assert np.allclose(batch['V_th'], params['V_th']) and np.allclose(batch['k_n'], params['k_n']) and np.allclose(batch['lam'], params['lam'])
+
+# shuffled points, an off curve and a two-point curve
+off = (V_ds, np.zeros_like(V_ds), 0.3)
+short = (np.array([0.0, 1.0]), np.array([0.0, 1e-4]), 2.0)
+shuffled = np.random.permutation(len(V_ds))
+guesses = analytic_guess_batch('mosfet_output', [(V_ds[shuffled], output.y[:len(V_ds)][shuffled], 1.5), off, short])
+assert abs(guesses[0]['V_th'] - params['V_th']) < 1e-6 and guesses[1] is None
+print("MOSFET estimators passed.\n")
+
+## Guess strategies in ModelExtractor
+
+cost = guess_cost('mosfet_output', output, [params, {'V_th': 1.0, 'k_n': 1e-3, 'lam': 0.0}, None])
+assert cost[0] < 1e-9 and cost[1] > 0.1 and cost[2] == np.inf
+
+I_data = diode.compute_current(V, iv_params[0]) * (1 + np.random.normal(0, 0.01, V.shape))
+for strategy in ['ml', 'analytic', 'both', 'none']:
+    report = ModelExtractor(DiodeModel(), guess=strategy).diode_fit(V, I_data)
+    print(f"{strategy}: n={report['parameters']['n']:.4f} nfev={report['num_iters']}")
+    assert report['success'] and abs(report['parameters']['n'] - 1.3) < 0.05
+
+report = ModelExtractor(MOSFETModel(), guess='analytic').multi_mosfet_fit(output)
+assert abs(report['parameters']['V_th'] - params['V_th']) < 1e-3
+
+try:
+    ModelExtractor(DiodeModel(), guess='random')
+    assert False
+except ValueError:
+    pass
+print("Guess strategies passed.\n")
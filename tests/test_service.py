@@ -0,0 +1,115 @@
+import asyncio, json
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from src.models import DiodeModel, MOSFETModel
+from src.service import ExtractionService
+
+## Batched local extraction service test
+
+diode = DiodeModel()
+mosfet = MOSFETModel()
+diode_params = {'I_s': 1e-10, 'n': 1.5, 'R_s': 2.5}
+mosfet_params = {'V_th': 0.7, 'k_n': 1e-3, 'lam': 0.02}
+
+V = np.linspace(0, 0.8, 50)
+V_gs = np.linspace(0, 2.0, 50)
+jobs = []
+for i in range(4):
+    jobs.append({'id': f"diode-{i}", 'mode': 'diode', 'x': V, 'y': diode.compute_current(V, diode_params), 'bias': 300,
+                 'initial_params': {'I_s': 1e-11, 'n': 1.4, 'R_s': 0.1}})
+    jobs.append({'id': f"mosfet-{i}", 'mode': 'mosfet_transfer', 'x': V_gs,
+                 'y': mosfet.compute_current(V_gs, mosfet_params, V_ds=1.0), 'bias': 1.0})
+
+TIMEOUT = 120 # seconds, a hung batch fails the test instead of blocking it
+
+async def run_service():
+    async with ExtractionService(max_batch_size=8, max_wait=0.05, max_workers=2) as service:
+        stream = service.results()
+        first = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0) # the stream is open before any job completes
+        futures = [service.submit(job) for job in jobs]
+        assert service.metrics()['queue_depth'] == len(jobs)
+        results = await asyncio.wait_for(asyncio.gather(*futures), TIMEOUT)
+        assert (await asyncio.wait_for(first, TIMEOUT))['id'] in [job['id'] for job in jobs]
+        await stream.aclose()
+        assert service._consumers == 0 and service._results.empty()
+        metrics = service.metrics()
+
+        server = await service.serve()
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        request = {**jobs[1], 'id': 'tcp', 'x': V_gs.tolist(), 'y': jobs[1]['y'].tolist()}
+        writer.write((json.dumps(request) + '\n').encode())
+        writer.write(b'{"metrics": true}\n')
+        writer.write(b'[1, 2]\n')
+        await writer.drain()
+        responses = [json.loads(await asyncio.wait_for(reader.readline(), TIMEOUT)) for _ in range(3)]
+        writer.close()
+        server.close()
+        await server.wait_closed()
+
+    return results, metrics, responses
+
+if __name__ != '__mp_main__': # spawned pool workers re-import this script, only the parent runs the scenarios
+    results, metrics, responses = asyncio.run(run_service())
+
+    for job, result in zip(jobs, results):
+        assert result['id'] == job['id']
+        fit = result['report']['parameters']
+        if job['mode'] == 'diode':
+            assert np.abs((fit['I_s'] - diode_params['I_s']) / diode_params['I_s']) < 0.1
+        else:
+            assert np.abs((fit['V_th'] - mosfet_params['V_th']) / mosfet_params['V_th']) < 0.1
+
+    assert metrics['completed'] == len(jobs) and metrics['in_flight'] == 0
+    assert metrics['mean_batch_size'] > 1
+    tcp_result = next(r for r in responses if r.get('id') == 'tcp')
+    assert np.abs((tcp_result['report']['parameters']['V_th'] - mosfet_params['V_th']) / mosfet_params['V_th']) < 0.1
+    assert any('metrics' in r for r in responses)
+    assert any('JSON object' in r.get('error', '') for r in responses)
+    print("Service metrics:", metrics)
+    print("Extraction service passed.\n")
+
+## Service failure handling test
+
+async def run_failures():
+    try:
+        ExtractionService().submit(jobs[0])
+        assert False
+    except RuntimeError:
+        pass
+
+    async with ExtractionService(max_wait=0.01, executor=ThreadPoolExecutor(1)) as service:
+        for bad in [{'mode': 'bjt', 'x': V, 'y': V}, {'mode': 'diode', 'x': V, 'y': V[:-1]},
+                    {'mode': 'mosfet_transfer', 'x': V_gs, 'y': jobs[1]['y']}]:
+            try:
+                service.submit(bad)
+                assert False, bad
+            except ValueError:
+                pass
+
+        # jobs of a batch whose fits cannot be dispatched resolve with an error and the batcher keeps running
+        service._executor.shutdown()
+        broken = await asyncio.wait_for(service.extract(jobs[0]), TIMEOUT)
+        service._executor = ThreadPoolExecutor(1)
+        recovered = await asyncio.wait_for(service.extract(jobs[1]), TIMEOUT)
+        service._executor.shutdown()
+        metrics = service.metrics()
+
+    # jobs still queued when the service stops resolve with an error instead of hanging
+    service = await ExtractionService(max_wait=10.0, executor=ThreadPoolExecutor(1)).start()
+    queued = [service.submit(job) for job in jobs[:2]]
+    await asyncio.sleep(0.05) # the batcher holds them while it waits for the batch to fill
+    await service.stop()
+    stopped = await asyncio.wait_for(asyncio.gather(*queued), TIMEOUT)
+    service._executor.shutdown()
+    return broken, recovered, metrics, stopped
+
+if __name__ != '__mp_main__':
+    broken, recovered, failure_metrics, stopped = asyncio.run(run_failures())
+    assert 'error' in broken and 'report' not in broken
+    assert np.abs((recovered['report']['parameters']['V_th'] - mosfet_params['V_th']) / mosfet_params['V_th']) < 0.1
+    assert failure_metrics['failed'] == 1 and failure_metrics['completed'] == 1 and failure_metrics['in_flight'] == 0
+    assert all('stopped' in r['error'] for r in stopped)
+    print("Service failure handling passed.\n")
@@ -0,0 +1,127 @@
+import os, tempfile
+import numpy as np
+import pandas as pd
+
+from src.dataloader import DataLoader
+from src.models import MOSFETModel
+from src.extraction import ModelExtractor
+from src.simformats import iter_ngspice_raw, read_ngspice_raw, read_plt, read_whitespace_table
+
+tmp_dir = tempfile.mkdtemp()
+model = MOSFETModel()
+true_params = {'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.03}
+V_gs = np.linspace(0, 2, 41)
+I_d = model.compute_current(V_gs, true_params, V_ds=1.0)
+
+def raw_header(plotname, names, n_points, block, flags='real'):
+    lines = ["Title: nmos transfer", "Date: Mon Oct 19 12:00:00 2026", f"Plotname: {plotname}", f"Flags: {flags}",
+             f"No. Variables: {len(names)}", f"No. Points: {n_points}", "Variables:"]
+    lines += [f"\t{i}\t{name}\t{'voltage' if name.startswith('v') else 'current'}" for i, name in enumerate(names)]
+    return ('\n'.join(lines) + f"\n{block}:\n").encode()
+
+# ngspice measures current into the positive node of the drain source, so I_d appears negated
+names = ['v(v-sweep)', 'v(gate)', 'i(vd)']
+values = np.column_stack([V_gs, V_gs, -I_d])
+
+## Binary raw test (two plots in one file)
+
+binary_path = os.path.join(tmp_dir, 'transfer.raw')
+with open(binary_path, 'wb') as f:
+    f.write(raw_header('DC transfer characteristic', names, len(V_gs), 'Binary'))
+    f.write(values.astype('<f8').tobytes())
+    f.write(raw_header('DC transfer characteristic', names, 3, 'Binary'))
+    f.write(values[:3].astype('<f8').tobytes())
+
+plots = list(iter_ngspice_raw(binary_path))
+assert len(plots) == 2 and [len(df) for _, df in plots] == [len(V_gs), 3]
+assert list(plots[0][1].columns) == names
+assert np.array_equal(plots[0][1].to_numpy(), values) # lossless
+assert len(read_ngspice_raw(binary_path, plot=1)) == 3
+
+loader = DataLoader()
+df = loader.load(binary_path, col_map={'v(gate)': 'V_gs', 'i(vd)': 'I_d'}, scale={'I_d': -1})
+assert np.array_equal(df['I_d'].to_numpy(), I_d)
+
+report = ModelExtractor(model).mosfet_fit(df['V_gs'].to_numpy(), df['I_d'].to_numpy(), V_ds=1.0,
+                                          initial_params={'V_th': 0.5, 'k_n': 1e-3, 'lam': 0.0})
+assert abs(report['parameters']['V_th'] - true_params['V_th']) < 1e-3
+print("Binary raw passed.\n")
+
+## ASCII raw test (including a complex AC plot)
+
+ascii_path = os.path.join(tmp_dir, 'transfer_ascii.raw')
+with open(ascii_path, 'wb') as f:
+    f.write(raw_header('DC transfer characteristic', names, len(V_gs), 'Values'))
+    for p, row in enumerate(values):
+        f.write(f" {p}\t{row[0]:.16e}\n".encode())
+        f.write(''.join(f"\t{v:.16e}\n" for v in row[1:]).encode())
+        f.write(b"\n")
+    f.write(raw_header('AC Analysis', ['frequency', 'v(out)'], 2, 'Values', flags='complex'))
+    f.write(b" 0\t1.0e3,0.0\n\t5.0e-1,-2.5e-1\n\n 1\t1.0e4,0.0\n\t1.0e-1,-3.0e-1\n\n")
+
+df_ascii = read_ngspice_raw(ascii_path)
+assert np.allclose(df_ascii.to_numpy(), values, rtol=1e-15, atol=0)
+ac = read_ngspice_raw(ascii_path, plot='AC Analysis')
+assert ac['v(out)'].iloc[1] == complex(0.1, -0.3)
+
+try:
+    read_ngspice_raw(ascii_path, plot='Transient Analysis')
+    assert False
+except ValueError:
+    pass
+print("ASCII raw passed.\n")
+
+## Sentaurus plt test
+
+plt_path = os.path.join(tmp_dir, 'idvg_des.plt')
+with open(plt_path, 'w') as f:
+    f.write('DF-ISE text\n\nInfo {\n  version   = 1.0\n  type      = xyplot\n'
+            '  datasets  = [\n    "time" "gate OuterVoltage" "drain OuterVoltage"\n    "drain TotalCurrent" ]\n'
+            '  functions = [ time OuterVoltage OuterVoltage TotalCurrent ]\n}\n\nData {\n')
+    for i, (vg, i_d) in enumerate(zip(V_gs, I_d)): # each row wrapped across two lines
+        f.write(f"  {i / (len(V_gs) - 1):.15e} {vg:.15e}\n  1.0 {i_d:.15e}\n")
+    f.write('}\n')
+
+df_plt = read_plt(plt_path)
+assert list(df_plt.columns) == ['time', 'gate OuterVoltage', 'drain OuterVoltage', 'drain TotalCurrent']
+df_plt = loader.load(plt_path, col_map={'gate OuterVoltage': 'V_gs', 'drain OuterVoltage': 'V_ds', 'drain TotalCurrent': 'I_d'})
+assert np.allclose(df_plt['I_d'], I_d, rtol=1e-14, atol=0) and (df_plt['V_ds'] == 1.0).all()
+print("Sentaurus plt passed.\n")
+
+## Whitespace table test
+
+table_path = os.path.join(tmp_dir, 'cv.s1p')
+with open(table_path, 'w') as f:
+    f.write("! C-V export\n# HZ S MA R 50\nV_d   C   ! header line\n")
+    for v, c in zip(np.linspace(-5, 0, 6), np.linspace(1e-12, 3e-12, 6)):
+        f.write(f"{v:.6f}\t  {c:.6e}   ! point\n")
+
+df_table = read_whitespace_table(table_path)
+assert list(df_table.columns) == ['V_d', 'C'] and len(df_table) == 6
+assert df_table.attrs['options'] == 'HZ S MA R 50'
+
+headerless_path = os.path.join(tmp_dir, 'iv.dat')
+with open(headerless_path, 'w') as f:
+    f.write("! no header\n0.0 1e-12\n0.1 2e-12\n")
+assert list(loader.load(headerless_path).columns) == ['col0', 'col1']
+
+try:
+    loader.load(table_path, col_map={'V_g': 'V_gs'})
+    assert False
+except ValueError as e:
+    assert 'not found' in str(e)
+print("Whitespace table passed.\n")
+
+## Parallel lot of raw files
+
+lot_dir = os.path.join(tmp_dir, 'lot')
+os.makedirs(lot_dir)
+for d in range(4):
+    with open(os.path.join(lot_dir, f"die_{d}.raw"), 'wb') as f:
+        f.write(raw_header('DC transfer characteristic', names, len(V_gs), 'Binary'))
+        f.write((values * [1, 1, 1 + d]).astype('<f8').tobytes())
+
+lot = loader.load_many(lot_dir, col_map={'v(gate)': 'V_gs', 'i(vd)': 'I_d'}, pattern='*.raw', workers=2, scale={'I_d': -1})
+assert list(lot['device'].cat.categories) == [f"die_{d}" for d in range(4)]
+assert np.allclose(lot.loc[lot['device'] == 'die_3', 'I_d'], 4 * I_d)
+print("Parallel raw lot passed.\n")
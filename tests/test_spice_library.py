@@ -0,0 +1,70 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+from src.utils import generate_spice_model, spice_model_name, write_spice_library
+from src.wafer import sample_lot
+from src.models import MOSFETModel
+
+## Single model formatting test
+
+card = generate_spice_model({'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.04}, 'MOSFET', model_name='M1')
+assert card == ".MODEL M1 NMOS(LEVEL=1 VTO=0.7000 KP=2.00000e-03 LAMBDA=0.0400)\n"
+card = generate_spice_model({'I_s': 1e-12, 'n': 1.3, 'R_s': 0.5, 'C_j': 2e-12}, 'diode')
+assert card == ".MODEL DUT D(IS=1.00000e-12 N=1.3000 RS=0.5000 CJO=2.00000e-12)\n"
+card = generate_spice_model({'V_th': 0.7, 'k_n': 2e-3, 'theta': 0.15, 'gamma': 0.4, 'phi': 0.8}, 'EKV', model_name='E1')
+assert card == ".MODEL E1 NMOS(VTO=0.7000 KP=2.00000e-03 LAMBDA=0.0000 GAMMA=0.4000 PHI=0.8000 THETA=0.1500)\n"
+assert spice_model_name('LOT_W01_X-03_Y+12') == 'LOT_W01_XM03_YP12' and spice_model_name('7a') == 'M7a'
+print("SPICE model cards passed.\n")
+
+## Streamed library test
+
+tmp_dir = tempfile.mkdtemp()
+lot = sample_lot({'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.04}, {'V_th': 0.03, 'k_n': 0.05}, n_wafers=2, pitch=20.0, seed=1)
+lot.loc[3, 'V_th'] = np.nan # failed fit
+path = os.path.join(tmp_dir, 'lot.lib')
+summary = write_spice_library(path, lot, 'MOSFET', chunk_size=7)
+assert summary['devices'] == len(lot) - 1 and summary['skipped'] == 1
+
+with open(path) as f:
+    text = f.read()
+assert text.count('.MODEL ') == len(lot) - 1 + 3
+for section in ['DEVICES', 'TT', 'FF', 'SS']:
+    assert f".LIB {section}\n" in text and f".ENDL {section}\n" in text
+assert text.count('.MODEL DUT NMOS(') == 3
+
+drive = {name: MOSFETModel().compute_current(3.0, p, V_ds=3.0) for name, p in summary['corners'].items()}
+assert drive['SS'] < drive['TT'] < drive['FF']
+
+index = pd.read_csv(os.path.join(tmp_dir, 'lot.csv'), keep_default_na=False)
+assert list(index['device']) == list(lot['device']) and index['model'].iloc[3] == ''
+named = index[index['model'] != '']
+assert named['model'].is_unique and all(f".MODEL {m} NMOS(" in text for m in named['model'])
+
+# {device: params} dicts and streamed (device, params) pairs give the same library
+fits = {d: {'V_th': v, 'k_n': k, 'lam': l} for d, v, k, l in lot[['device', 'V_th', 'k_n', 'lam']].itertuples(index=False)}
+write_spice_library(os.path.join(tmp_dir, 'dict.lib'), fits, 'MOSFET')
+write_spice_library(os.path.join(tmp_dir, 'pairs.lib'), iter(fits.items()), 'MOSFET', chunk_size=5)
+with open(os.path.join(tmp_dir, 'dict.lib')) as a, open(os.path.join(tmp_dir, 'pairs.lib')) as b:
+    assert a.read() == b.read() == text
+
+# chunks with different parameter sets, and device names that need CSV quoting
+diodes = [pd.DataFrame({'device': ['d,1', 'd"2'], 'I_s': [1e-12, 2e-12], 'n': [1.2, 1.3], 'C_j': [1e-12, 2e-12]}),
+          pd.DataFrame({'device': ['d3'], 'I_s': [3e-12], 'n': [1.4], 'R_s': [0.5]})]
+summary = write_spice_library(os.path.join(tmp_dir, 'mixed.lib'), diodes, 'diode')
+assert summary['devices'] == 3 and set(summary['corners']['TT']) == {'I_s', 'n', 'R_s'}
+index = pd.read_csv(os.path.join(tmp_dir, 'mixed.csv'))
+assert list(index['device']) == ['d,1', 'd"2', 'd3'] and index['model'].is_unique
+mixed = [('a', {'I_s': 1e-12, 'n': 1.2}), ('b', {'I_s': 2e-12, 'n': 1.3, 'C_j': 1e-12})]
+write_spice_library(os.path.join(tmp_dir, 'pairs_mixed.lib'), mixed, 'diode')
+with open(os.path.join(tmp_dir, 'pairs_mixed.lib')) as f:
+    text = f.read()
+assert 'nan' not in text and '.MODEL a D(IS=1.00000e-12 N=1.2000 RS=0.0000)\n' in text
+
+try:
+    write_spice_library(path, lot, 'BJT')
+    assert False
+except ValueError:
+    pass
+print("SPICE library passed.\n")
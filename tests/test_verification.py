@@ -0,0 +1,154 @@
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import numpy as np
+
+from src.models import DiodeModel, MOSFETModel, EKVMOSFETModel
+from src.utils import write_spice_library
+from src.verification import spice_value, parse_spice_models, spice_dc, run_ngspice, verify_library
+from src.wafer import sample_lot
+
+## Model card parsing test
+
+assert spice_value('1.5p') == 1.5e-12 and spice_value('2MEG') == 2e6 and spice_value('3e-3') == 3e-3
+text = """* library
+.LIB TT
+.model nom D(IS=1.0p N=1.3
++ RS=0.5 CJO=2e-12)
+.ENDL TT
+.LIB FF
+.MODEL nom D(IS=2p N=1.25 RS=0.4)
+.ENDL FF
+.MODEL m1 NMOS (LEVEL=1 VTO=0.7 KP=2m LAMBDA=0.04 TOX=1e-8)
+.MODEL q1 NPN(BF=100)
+.MODEL e1 NMOS(VTO=0.7 KP=2m GAMMA=0.4 PHI=0.8 THETA=0.15)
+.MODEL m2 NMOS(VTO=0.6 KP=1m)
+"""
+models = parse_spice_models(text, section='TT')
+assert models == {'nom': ('diode', {'I_s': 1e-12, 'n': 1.3, 'R_s': 0.5, 'C_j': 2e-12})}
+models = parse_spice_models(text)
+assert models['nom'][1]['I_s'] == 2e-12 and 'q1' not in models
+assert models['m1'] == ('MOSFET', {'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.04})
+assert models['e1'] == ('EKV', {'V_th': 0.7, 'k_n': 2e-3, 'gamma': 0.4, 'phi': 0.8, 'theta': 0.15}) # by its parameters
+assert models['m2'][0] == 'MOSFET' # no LEVEL is SPICE Level 1
+print("Model card parsing passed.\n")
+
+## Built-in SPICE evaluator test
+
+V = np.linspace(-1, 1, 81)
+params = {'I_s': np.array([1e-12, 5e-12]), 'n': np.array([1.3, 1.5]), 'R_s': np.array([0.5, 0.0])}
+I = spice_dc('diode', params, {'V': V}, gmin=0.0)
+assert I.shape == (2, len(V))
+assert np.allclose(I, DiodeModel().compute_current_sets(V, params), rtol=1e-9, atol=1e-20)
+assert np.allclose(spice_dc('diode', params, {'V': V})[:, 0] - I[:, 0], -1e-12) # GMIN leakage at -1 V
+
+V_gs, V_ds = np.meshgrid(np.linspace(0, 3, 16), np.linspace(-1, 3, 21), indexing='ij')
+mos = {'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.0}
+I_d = spice_dc('MOSFET', mos, {'V_gs': V_gs, 'V_ds': V_ds})[0].reshape(V_gs.shape)
+forward = V_ds >= 0
+assert np.allclose(I_d[forward], MOSFETModel().compute_current(V_gs, mos, V_ds=V_ds)[forward])
+assert np.all(I_d[~forward] <= 0) # source and drain swap
+print("SPICE evaluator passed.\n")
+
+## Library verification test
+
+tmp_dir = tempfile.mkdtemp()
+lot = sample_lot({'I_s': 1e-12, 'n': 1.3, 'R_s': 0.5}, {'I_s': 0.3, 'n': 0.02, 'R_s': 0.1}, n_wafers=3, pitch=20.0,
+                 bounds=DiodeModel().get_param_bounds(), seed=7)
+path = os.path.join(tmp_dir, 'lot.lib')
+write_spice_library(path, lot, 'diode')
+
+report = verify_library(path, lot, {'V': np.linspace(0, 1, 101)}, engine='builtin')
+assert len(report) == len(lot) and report['passed'].all() and report.attrs['engine'] == 'builtin'
+assert report['max_rel_dev'].max() < 2e-3 # 5 significant digits in IS and 4 decimals in N
+
+# a device whose exported model does not match its fit is flagged
+changed = lot.copy()
+changed.loc[5, 'n'] *= 1.05
+flagged = verify_library(path, changed, {'V': np.linspace(0, 1, 101)}, engine='builtin')
+assert list(flagged.index[~flagged['passed']]) == [5]
+
+# channel-length modulation in triode is a real SPICE Level 1 difference from the repo model
+mos_lot = sample_lot({'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.04}, {'V_th': 0.02}, n_wafers=1, pitch=40.0, seed=8)
+write_spice_library(os.path.join(tmp_dir, 'mos.lib'), mos_lot, 'MOSFET', corners=None)
+mos_report = verify_library(os.path.join(tmp_dir, 'mos.lib'), mos_lot, {'V_gs': V_gs, 'V_ds': np.abs(V_ds)}, engine='builtin')
+assert not mos_report['passed'].any() and np.allclose(mos_report['max_rel_dev'], 0.04 * (3.0 - 0.7), rtol=0.1) # lam * V_ds up to pinch-off
+
+if shutil.which('ngspice') is None:
+    try:
+        verify_library(path, lot, {'V': np.linspace(0, 1, 101)}, engine='ngspice')
+        assert False
+    except RuntimeError:
+        pass
+else:
+    ngspice = verify_library(path, lot, {'V': np.linspace(0, 1, 101)}, engine='ngspice')
+    assert ngspice['passed'].all()
+
+# netlist and raw file handling with a stub simulator: it logs its work directory and answers every VM<i> branch
+# with (i + 1) mA/V * V on the .dc grid in an ASCII raw file
+stub = os.path.join(tmp_dir, 'ngspice_stub')
+with open(stub, 'w') as f:
+    f.write(f"""#!{sys.executable}
+import os, sys
+raw, netlist = sys.argv[3], sys.argv[4]
+open({os.path.join(tmp_dir, 'stub.log')!r}, 'a').write(os.path.dirname(netlist) + '\\n')
+lines = open(netlist).read().splitlines()
+if any('FAIL' in line for line in lines):
+    sys.exit(1)
+start, stop, step = [float(v) for v in next(l for l in lines if l.startswith('.dc')).split()[2:5]]
+n_models = sum(l.startswith('VM') for l in lines)
+V = [start + k * step for k in range(int(round((stop - start) / step)) + 1)]
+names = ['v(v-sweep)'] + [f'vm{{i}}#branch' for i in range(n_models)]
+with open(raw, 'w') as out:
+    out.write(f'Title: stub\\nPlotname: DC transfer characteristic\\nFlags: real\\nNo. Variables: {{len(names)}}\\n')
+    out.write(f'No. Points: {{len(V)}}\\nVariables:\\n')
+    out.writelines(f'\\t{{i}}\\t{{n}}\\tcurrent\\n' for i, n in enumerate(names))
+    out.write('Values:\\n')
+    for k, v in enumerate(V):
+        out.write(f'{{k}}\\t{{v!r}}\\n' + ''.join(f'\\t{{(i + 1) * 1e-3 * v!r}}\\n' for i in range(n_models)))
+""")
+os.chmod(stub, os.stat(stub).st_mode | stat.S_IEXEC)
+
+V_grid = np.linspace(0, 1, 11)
+stubbed = run_ngspice(path, ['D_A', 'D_B', 'D_C'], 'diode', {'V': V_grid[::-1]}, section='DEVICES', binary=stub)
+assert stubbed.shape == (3, len(V_grid)) and np.allclose(stubbed, np.arange(1, 4)[:, None] * 1e-3 * V_grid[::-1])
+try:
+    run_ngspice(path, ['FAIL'], 'diode', {'V': V_grid}, binary=stub)
+    assert False
+except RuntimeError:
+    pass
+with open(os.path.join(tmp_dir, 'stub.log')) as f:
+    work_dirs = f.read().split()
+assert len(work_dirs) == 2 and not any(os.path.exists(d) for d in work_dirs) # removed after success and failure
+
+try:
+    verify_library(path, lot, {'V': np.linspace(0, 1, 101)}, engine='hspice')
+    assert False
+except ValueError:
+    pass
+print("Library verification passed.\n")
+
+## EKV library verification test
+
+ekv_lot = sample_lot({'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.04, 'theta': 0.15, 'gamma': 0.4, 'phi': 0.8},
+                     {'V_th': 0.02, 'k_n': 0.05, 'gamma': 0.03}, n_wafers=1, pitch=40.0, seed=50)
+ekv_path = os.path.join(tmp_dir, 'ekv.lib')
+ekv_summary = write_spice_library(ekv_path, ekv_lot, 'EKV')
+assert {t for t, _ in parse_spice_models(open(ekv_path).read()).values()} == {'EKV'}
+drive = {name: EKVMOSFETModel().compute_current(3.0, p, V_ds=3.0) for name, p in ekv_summary['corners'].items()}
+assert drive['SS'] < drive['TT'] < drive['FF']
+
+# the built-in EKV check is the repo model itself, it only covers the card formatting: a small atol keeps the
+# subthreshold points in the comparison, where rounding VTO to 4 decimals moves the current by up to
+# exp(5e-5 / (n U_t)) - 1 = 1.6e-3
+ekv_report = verify_library(ekv_path, ekv_lot, {'V_gs': V_gs, 'V_ds': np.abs(V_ds)}, engine='builtin', atol=1e-15)
+assert ekv_report['passed'].all() and ekv_report['max_rel_dev'].max() < 2e-3
+assert ekv_report.attrs['card_only'] == ['EKV'] and report.attrs['card_only'] == []
+try:
+    verify_library(ekv_path, ekv_lot, {'V_gs': V_gs, 'V_ds': np.abs(V_ds)}, engine='ngspice') # no simulator equivalent
+    assert False
+except ValueError:
+    pass
+print("EKV library verification passed.\n")
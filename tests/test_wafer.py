@@ -0,0 +1,90 @@
+import os
+import tempfile
+import numpy as np
+
+from src.wafer import die_grid, sample_lot, simulate_curves, write_lot
+from src.dataloader import DataLoader
+from src.models import DiodeModel
+from src.extraction import ModelExtractor
+
+## Wafer map and spatial variation test
+
+die_x, die_y, x_mm, y_mm = die_grid(diameter=200.0, pitch=5.0, edge_exclusion=3.0)
+assert np.all(np.hypot(np.abs(x_mm) + 2.5, np.abs(y_mm) + 2.5) <= 97.0)
+assert 1000 < len(die_x) < 1300 and len(set(zip(die_x, die_y))) == len(die_x)
+
+nominal = {'V_th': 0.7, 'k_n': 2e-3, 'lam': 0.04}
+sigma = {'V_th': 0.02, 'k_n': 0.05}
+
+def neighbour_corr(lot, name):
+    # correlation of a parameter between horizontally adjacent dies of the same wafer
+    grid = lot.set_index(['wafer', 'die_x', 'die_y'])[name]
+    shifted = lot.assign(die_x=lot['die_x'] - 1).set_index(['wafer', 'die_x', 'die_y'])[name]
+    both = grid.to_frame('a').join(shifted.to_frame('b'), how='inner')
+    return np.corrcoef(both['a'], both['b'])[0, 1]
+
+smooth = sample_lot(nominal, sigma, n_wafers=4, wafer_fraction=0.0, spatial_fraction=1.0, seed=1)
+rough = sample_lot(nominal, sigma, n_wafers=4, wafer_fraction=0.0, spatial_fraction=0.0, seed=1)
+assert neighbour_corr(smooth, 'V_th') > 0.8 and abs(neighbour_corr(rough, 'V_th')) < 0.1
+assert abs(smooth['V_th'].std() / sigma['V_th'] - 1) < 0.15
+assert np.all(smooth['lam'] == 0.04) and smooth['device'].is_unique
+
+per_wafer = sample_lot(nominal, sigma, n_wafers=5, wafer_fraction=1.0, spatial_fraction=0.0, seed=2)
+assert np.allclose(per_wafer.groupby('wafer')['V_th'].std(), 0.0) and per_wafer.groupby('wafer')['V_th'].mean().std() > 0
+
+bowl = sample_lot(nominal, {'V_th': 1e-6}, n_wafers=1, radial={'V_th': 0.1}, seed=3)
+edge = bowl['x_mm']**2 + bowl['y_mm']**2 > 80**2
+assert bowl.loc[edge, 'V_th'].mean() > bowl.loc[~edge, 'V_th'].mean() + 0.03
+
+try:
+    sample_lot(nominal, sigma, wafer_fraction=0.6, spatial_fraction=0.6)
+    assert False
+except ValueError:
+    pass
+print("Wafer variation passed.\n")
+
+## Measurement synthesis and streaming writers test
+
+lot = sample_lot({'I_s': 1e-12, 'n': 1.3, 'R_s': 0.5}, {'I_s': 0.3, 'n': 0.02}, n_wafers=2, pitch=25.0,
+                 bounds=DiodeModel().get_param_bounds(), seed=4)
+V = np.linspace(0, 1.0, 101)
+bias, I = simulate_curves(lot, 'diode', {'V': V, 'T': 300.0}, noise_floor=1e-12, compliance=5e-3, seed=5)
+assert I.shape == (len(lot), len(V)) and np.all(np.abs(I) <= 5e-3) and np.any(I == 5e-3)
+assert np.std(I[:, 0]) > 5e-13 # zero-bias points sit in the noise floor
+
+V_gs, V_ds = np.meshgrid([1.5, 2.0, 2.5], np.linspace(0, 3, 31), indexing='ij')
+_, I_family = simulate_curves(sample_lot(nominal, sigma, n_wafers=1, pitch=25.0, seed=6), 'mosfet', {'V_gs': V_gs, 'V_ds': V_ds}, noise=0.0, noise_floor=0.0)
+assert I_family.shape[1] == V_gs.size
+
+tmp_dir = tempfile.mkdtemp()
+sweep = {'V': V, 'T': 300.0}
+rows = {fmt: write_lot(os.path.join(tmp_dir, name), lot, 'diode', sweep, chunk_size=7, compliance=5e-3, seed=5)
+        for fmt, name in [('csv', 'lot.csv'), ('npy', 'lot.npy'), ('per_die', 'dies')]}
+assert set(rows.values()) == {len(lot) * len(V)}
+
+loader = DataLoader()
+from_csv = loader.load(os.path.join(tmp_dir, 'lot.csv'))
+from_npy = loader.load(os.path.join(tmp_dir, 'lot.npy'))
+from_dir = loader.load_many(os.path.join(tmp_dir, 'dies'))
+assert len(from_csv) == len(from_npy) == len(from_dir) == rows['csv']
+assert np.allclose(from_csv['I'], from_npy['I'], rtol=1e-9) and list(from_npy['device'].unique()) == list(lot['device'])
+assert set(from_dir['device'].unique()) == set(lot['device'])
+with open(os.path.join(tmp_dir, 'dies', lot['device'].iloc[0] + '.csv')) as f:
+    assert f.readline().startswith('! lot=LOT wafer=1')
+
+try:
+    write_lot(os.path.join(tmp_dir, 'lot.parquet'), lot, 'diode', sweep)
+    assert False
+except ValueError:
+    pass
+print("Streaming lot writers passed.\n")
+
+## Extraction recovers the per-die parameters
+
+extractor = ModelExtractor(DiodeModel(), guess='analytic')
+truth = lot.set_index('device')
+cleaned = loader.clean('V', 'I', by='device', df=from_npy, compliance=5e-3, noise_floor=1e-10)
+for device, curve in list(cleaned.groupby('device', sort=False))[:5]:
+    fit = extractor.diode_fit(curve['V'].to_numpy(), curve['I'].to_numpy())['parameters']
+    assert abs(fit['n'] - truth.loc[device, 'n']) / truth.loc[device, 'n'] < 0.02
+print("Lot extraction passed.\n")